@@ -7,7 +7,6 @@
 """
 
 import os
-import feedparser
 import asyncio
 from pathlib import Path
 from fastapi import APIRouter, Request, HTTPException
@@ -16,6 +15,7 @@ from app.models.pydantic import FeedUrlRequest, SaveLinkResponse
 from app.services.scraping.feeds_gd import run_dork_search_feed
 from app.services.scraping.news_gd import run_news_search
 from app.services.scraping.spider_factory import run_dynamic_spider_from_db
+from app.services.scraping.feed_service import fetch_feed
 from loguru import logger
 import threading
 
@@ -40,9 +40,10 @@ async def guardar_link(feed_req: FeedUrlRequest) -> SaveLinkResponse:
     @brief Endpoint to save a new RSS feed URL along with its title.
 
     This asynchronous POST endpoint receives a feed URL in the request body,
-    validates the feed by parsing it with `feedparser`, and extracts the feed t
-    itle.    If the feed is invalid or contains no entries, it raises an HTTP 4
-    00 error.
+    validates the feed by downloading it asynchronously and parsing it with
+    `feedparser` off the event loop (`fetch_feed`), and extracts the feed
+    title. If the feed is invalid or contains no entries, it raises an HTTP
+    400 error.
 
     Upon successful validation, it appends the feed URL and title to a
     designated file.
@@ -55,12 +56,14 @@ async def guardar_link(feed_req: FeedUrlRequest) -> SaveLinkResponse:
     url = str(feed_req.feed_url)
 
     try:
-        feed = feedparser.parse(url)
+        feed = await fetch_feed(url)
+        if feed.error:
+            raise ValueError(feed.error)
 
         if not feed.entries:
             raise ValueError("No entries found in the feed")
 
-        title = feed.feed.get("title", "Untitled")
+        title = feed.info.get("title", "Untitled")
 
     except Exception as e:
         raise HTTPException(
@@ -221,7 +224,8 @@ def recurring_google_alert_scraper(loop: asyncio.AbstractEventLoop, stop_event=N
     - Synchronously extracts Google Alerts RSS feed URLs from a local file by
     calling `fetch_and_save_alert_urls()`.
     - Logs success or failure of the feed update.
-    - Reschedules itself to run again in 24 hours using a daemon thread timer.
+    - Reschedules itself, using a daemon thread timer, for when the first
+    feed is due again according to the feed registry (24 hours at most).
 
     Note:
     This function only updates the feed URLs source. The actual scraping and
@@ -240,8 +244,11 @@ def recurring_google_alert_scraper(loop: asyncio.AbstractEventLoop, stop_event=N
 
     try:
         logger.info("[Google Alerts] Extracting feeds from file...")
-        fetch_and_save_alert_urls()
-        timer = threading.Timer(86400, recurring_google_alert_scraper, args=(loop, stop_event, register_timer))
+        delay = fetch_and_save_alert_urls()
+        # Next run when the first feed is due again (adaptive per-feed polling)
+        if not isinstance(delay, (int, float)):
+            delay = 86400
+        timer = threading.Timer(delay, recurring_google_alert_scraper, args=(loop, stop_event, register_timer))
         timer.daemon = True
         # allow caller to keep reference to timer so it can be canceled
         if callable(register_timer):
@@ -250,7 +257,7 @@ def recurring_google_alert_scraper(loop: asyncio.AbstractEventLoop, stop_event=N
             except Exception:
                 pass
         timer.start()
-        logger.info("[Scheduler] Next feed update in 24h")
+        logger.info(f"[Scheduler] Next feed update in {delay / 60:.0f} min")
     except Exception as e:
         logger.error(f"[Google Alerts] Error scheduling next run: {e}")
     except Exception as e:
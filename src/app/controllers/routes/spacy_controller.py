@@ -3,7 +3,7 @@
 @file spacy_controller.py
 @author naflashDev
 @brief REST API to process a JSON file using entity analysis with spaCy.
-@details This endpoint reads a `result.json` file, processes it to extract named entities, and returns a generated `labels_result.json` file.
+@details This endpoint reads the scraped articles of the result store (`./outputs/results/`, importing a legacy `result.json` if present), processes it to extract named entities, and returns a generated `labels_result.json` file.
 """
 
 
@@ -13,6 +13,7 @@ from fastapi import APIRouter, HTTPException, Request
 from loguru import logger
 
 from app.services.spacy.text_processor import process_json
+from app.models.result_store import RESULT_STORE_DIR, has_results
 
 router = APIRouter(
     tags=["spacy"],
@@ -35,10 +36,10 @@ async def start_background_loop(request: Request = None):
     Raises:
         HTTPException: If the input file `result.json` is not found.
     """
-    input_path = "./outputs/result.json"
+    input_path = RESULT_STORE_DIR
     output_path = "./outputs/labels_result.json"
 
-    if not os.path.exists(input_path):
+    if not has_results(input_path):
         logger.warning("[Startup] Input file result.json not found. Aborting scheduler.")
         raise HTTPException(
             status_code=404,
@@ -81,14 +82,17 @@ async def start_background_loop(request: Request = None):
 def background_process_every_24h(input_path: str, output_path: str, stop_event=None, register_timer=None):
     """
     Executes the JSON NLP processing task and schedules the next execution after 24 hours.
+    Runs incrementally: only articles added to the result store since the previous run are labeled and appended to the output file.
+    With SPACY_UPSERT=true the OpenSearch existence check is skipped and the documents are overwritten by their content-hash id.
 
     Args:
-        input_path (str): Path to the input JSON file with raw news/texts.
+        input_path (str): Path to the result store (or a JSON file) with raw news/texts.
         output_path (str): Path to save the output file with extracted SpaCy labels.
     """
     try:
-        logger.info("[SpaCy] Starting entity labeling on result.json...")
-        process_json(input_path, output_path)
+        logger.info("[SpaCy] Starting entity labeling on scraped results...")
+        upsert = os.getenv("SPACY_UPSERT", "").strip().lower() in ("1", "true", "yes", "on")
+        process_json(input_path, output_path, upsert=upsert, incremental=True)
         logger.success("[SpaCy] Entity labeling completed. Output saved to labels_result.json")
     except Exception as e:
         logger.error(f"[SpaCy] Error while labeling entities: {e}")
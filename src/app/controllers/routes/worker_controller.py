@@ -38,6 +38,7 @@ from app.controllers.routes import (
     llm_controller,
 )
 from app.utils.run_services import shutdown_services
+from app.models import result_store
 
 router = APIRouter(prefix="/workers", tags=["workers"])
 
@@ -265,9 +266,9 @@ async def toggle_worker(name: str, payload: WorkerToggle, request: Request):
     elif name == "scraping_news":
         threading.Thread(target=scrapy_news_controller.background_scraping_news, args=(loop, evt, _register_timer), daemon=True).start()
     elif name == "spacy_nlp":
-        input_path = "./outputs/result.json"
+        input_path = result_store.RESULT_STORE_DIR
         output_path = "./outputs/labels_result.json"
-        if not __import__("os").path.exists(input_path):
+        if not result_store.has_results(input_path):
             raise HTTPException(status_code=400, detail="input file missing")
         threading.Thread(target=spacy_controller.background_process_every_24h, args=(input_path, output_path, evt, _register_timer), daemon=True).start()
     elif name == "llm_updater":
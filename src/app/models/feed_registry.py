@@ -0,0 +1,279 @@
+"""
+@file feed_registry.py
+@author naflashDev
+@brief SQLite registry of the RSS/Atom feeds read by the crawlers.
+@details Keeps one row per feed URL with the HTTP validators of its last
+         response (`ETag`, `Last-Modified`), the last HTTP status and when the
+         feed was last checked and last changed. The feed service sends the
+         validators back as `If-None-Match`/`If-Modified-Since`, so a feed
+         that did not change answers `304 Not Modified` without a body and is
+         not parsed again.
+         Each feed also has health statistics: the keys of its recent entries
+         (to tell which entries are new), when it last published a new item,
+         the mean time between new items, consecutive failures and the last
+         outcome. They drive an adaptive schedule: a feed is polled again
+         after about half its mean inter-arrival time (or half the time it has
+         been quiet, if longer), between FEED_POLL_MIN and FEED_POLL_MAX, and a
+         failing or empty feed backs off exponentially up to FEED_BACKOFF_MAX.
+         Several processes can share the database (WAL mode).
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from loguru import logger
+
+# Default location of the feed registry database
+FEED_REGISTRY_PATH = "./data/feed_registry.db"
+# SQLite limits the number of bound parameters per statement
+_CHUNK = 500
+
+# Bounds of the adaptive poll interval (seconds); FEED_POLL_MAX is the former fixed cadence
+FEED_POLL_MIN = 15 * 60
+FEED_POLL_MAX = 24 * 3600
+# Longest wait between two attempts on a failing or empty feed
+FEED_BACKOFF_MAX = 7 * 24 * 3600
+# Consecutive failures after which a feed is reported as dead
+DEAD_FEED_FAILURES = 5
+# Weight of the newest sample in the mean inter-arrival time (exponential moving average)
+INTERVAL_SMOOTHING = 0.3
+# Entry keys remembered per feed to recognise new entries
+MAX_SEEN_ENTRIES = 500
+
+_COLUMNS = {
+    "seen": "TEXT",
+    "last_new_item": "REAL",
+    "mean_interval": "REAL",
+    "new_items": "INTEGER NOT NULL DEFAULT 0",
+    "failures": "INTEGER NOT NULL DEFAULT 0",
+    "last_outcome": "TEXT",
+    "poll_interval": "REAL",
+    "next_poll": "REAL",
+}
+
+
+def open_feed_registry(path: str = FEED_REGISTRY_PATH) -> sqlite3.Connection:
+    '''
+    @brief Open (and create if needed) the feed registry.
+
+    @param path Path to the SQLite database file (str).
+    @return Open SQLite connection with the schema in place (sqlite3.Connection).
+    '''
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS feeds ("
+        " url TEXT PRIMARY KEY,"
+        " etag TEXT,"
+        " last_modified TEXT,"
+        " last_status INTEGER,"
+        " last_checked REAL,"
+        " last_changed REAL)"
+    )
+    # Registries created before the health statistics get the new columns
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(feeds)")}
+    for column, definition in _COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE feeds ADD COLUMN {column} {definition}")
+    conn.execute("CREATE INDEX IF NOT EXISTS feeds_next_poll ON feeds (next_poll)")
+    conn.commit()
+    return conn
+
+
+def _rows(conn: sqlite3.Connection, columns: str, urls: List[str]) -> Iterable[tuple]:
+    for start in range(0, len(urls), _CHUNK):
+        chunk = urls[start:start + _CHUNK]
+        marks = ",".join("?" * len(chunk))
+        yield from conn.execute(f"SELECT url, {columns} FROM feeds WHERE url IN ({marks})", chunk)
+
+
+def get_validators(conn: sqlite3.Connection, urls: Iterable[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    '''
+    @brief HTTP validators stored for the given feeds.
+
+    @param conn Open registry connection (sqlite3.Connection).
+    @param urls Feed URLs (Iterable[str]).
+    @return Mapping url -> (etag, last_modified) for the feeds that have at least one (Dict).
+    '''
+    return {
+        url: (etag, modified)
+        for url, etag, modified in _rows(conn, "etag, last_modified", list(dict.fromkeys(urls)))
+        if etag is not None or modified is not None
+    }
+
+
+def due_feeds(conn: sqlite3.Connection, urls: Iterable[str], now: Optional[float] = None) -> List[str]:
+    '''
+    @brief Feeds that should be polled now: unknown ones and those whose next poll time has passed.
+
+    @param conn Open registry connection (sqlite3.Connection).
+    @param urls Candidate feed URLs (Iterable[str]).
+    @param now Current time (float); time.time() when None.
+    @return Due URLs in input order (List[str]).
+    '''
+    now = time.time() if now is None else now
+    urls = list(dict.fromkeys(urls))
+    scheduled = {url: next_poll for url, next_poll in _rows(conn, "next_poll", urls)}
+    return [url for url in urls if scheduled.get(url) is None or scheduled[url] <= now]
+
+
+def seconds_until_due(conn: sqlite3.Connection, urls: Iterable[str], now: Optional[float] = None) -> float:
+    '''
+    @brief Time until the first of the given feeds is due.
+
+    @param conn Open registry connection (sqlite3.Connection).
+    @param urls Feed URLs (Iterable[str]).
+    @param now Current time (float); time.time() when None.
+    @return Seconds, 0 if one is due already; FEED_POLL_MAX when `urls` is empty (float).
+    '''
+    now = time.time() if now is None else now
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return float(FEED_POLL_MAX)
+    scheduled = {url: next_poll for url, next_poll in _rows(conn, "next_poll", urls)}
+    if any(scheduled.get(url) is None for url in urls):
+        return 0.0
+    return max(0.0, min(scheduled.values()) - now)
+
+
+def _clamp(value: float, low: float, high: float) -> float:
+    return max(low, min(high, value))
+
+
+def next_poll_interval(
+    healthy: bool,
+    mean_interval: Optional[float],
+    last_new_item: Optional[float],
+    previous_interval: Optional[float],
+    now: float,
+) -> float:
+    '''
+    @brief Seconds until the next poll of a feed.
+
+    A healthy feed is polled after half the longer of its mean inter-arrival
+    time and the time since its last new item, within [FEED_POLL_MIN,
+    FEED_POLL_MAX]; FEED_POLL_MAX while nothing is known. A failing or empty
+    feed doubles its previous interval, up to FEED_BACKOFF_MAX.
+
+    @param healthy False if the request failed or the feed had no entries (bool).
+    @param mean_interval Mean seconds between new items, if known (float).
+    @param last_new_item Time of the last new item, if known (float).
+    @param previous_interval Interval used before this poll, if any (float).
+    @param now Current time (float).
+    @return Interval in seconds (float).
+    '''
+    if not healthy:
+        return min(float(FEED_BACKOFF_MAX), max(previous_interval or FEED_POLL_MIN, FEED_POLL_MIN) * 2)
+    quiet = now - last_new_item if last_new_item is not None else 0.0
+    estimate = max(mean_interval or 0.0, quiet)
+    if not estimate:
+        return float(FEED_POLL_MAX)
+    return _clamp(estimate / 2, FEED_POLL_MIN, FEED_POLL_MAX)
+
+
+def _update_mean(mean: Optional[float], sample: float) -> float:
+    return sample if mean is None else (1 - INTERVAL_SMOOTHING) * mean + INTERVAL_SMOOTHING * sample
+
+
+def record_fetches(
+    conn: sqlite3.Connection,
+    fetches: Iterable[Tuple[str, Optional[int], Optional[str], Optional[str], str, Sequence[Tuple[str, Optional[float]]]]],
+    now: Optional[float] = None,
+) -> int:
+    '''
+    @brief Store the outcome of feed requests and schedule the next poll of each feed.
+
+    A changed feed (full `200` response) replaces the stored validators; a
+    `304` or a failed request keeps them. Entries whose key was not seen
+    before are new items: they update the last new item time and the mean
+    inter-arrival time (from their publication dates when available). The
+    entries of the first poll of a feed only seed the statistics.
+
+    @param conn Open registry connection (sqlite3.Connection).
+    @param fetches Tuples (url, HTTP status or None, etag, last_modified, outcome, entries), where
+           outcome is "ok", "not_modified", "timeout" or "error" and entries are (key, published timestamp or None)
+           pairs of the parsed feed (Iterable[Tuple]).
+    @param now Current time (float); time.time() when None.
+    @return Number of feeds recorded (int).
+    '''
+    now = time.time() if now is None else now
+    fetches = list(fetches)
+    state = {
+        row[0]: row[1:]
+        for row in _rows(conn, "seen, last_new_item, mean_interval, failures, poll_interval", [f[0] for f in fetches])
+    }
+    rows = []
+    for url, status, etag, modified, outcome, entries in fetches:
+        seen_json, last_new_item, mean_interval, failures, previous_interval = state.get(url, (None, None, None, 0, None))
+        changed = outcome == "ok"
+        healthy = outcome == "not_modified" or (changed and bool(entries))
+        new_count = 0
+        seen = seen_json
+        if changed and entries:
+            known = json.loads(seen_json) if seen_json else None
+            keys = list(dict.fromkeys(key for key, _ in entries))
+            if known is None:
+                # First poll: estimate the publication rate from the entry dates
+                times = sorted(min(t, now) for _, t in entries if t is not None)
+                if len(times) >= 2:
+                    mean_interval = (times[-1] - times[0]) / (len(times) - 1)
+                if times:
+                    last_new_item = times[-1]
+            else:
+                known_set = set(known)
+                new = [(key, t) for key, t in entries if key not in known_set]
+                new_count = len(dict.fromkeys(key for key, _ in new))
+                if new_count:
+                    times = sorted(min(t, now) for _, t in new if t is not None) or [now] * new_count
+                    previous = last_new_item
+                    for t in times:
+                        if previous is not None and t >= previous:
+                            mean_interval = _update_mean(mean_interval, t - previous)
+                        previous = t if previous is None else max(previous, t)
+                    last_new_item = previous
+                current = set(keys)
+                keys.extend(key for key in known if key not in current)
+            seen = json.dumps(keys[:MAX_SEEN_ENTRIES])
+        failures = 0 if healthy else (failures or 0) + 1
+        if failures == DEAD_FEED_FAILURES:
+            logger.warning(f"[feeds] {url} failed {failures} polls in a row ({outcome}); backing off.")
+        interval = next_poll_interval(healthy, mean_interval, last_new_item, previous_interval, now)
+        rows.append((
+            url, etag, modified, status, now, now if changed else None,
+            seen, last_new_item, mean_interval, new_count, failures, "empty" if changed and not entries else outcome,
+            interval, now + interval,
+        ))
+    with conn:
+        conn.executemany(
+            "INSERT INTO feeds (url, etag, last_modified, last_status, last_checked, last_changed,"
+            " seen, last_new_item, mean_interval, new_items, failures, last_outcome, poll_interval, next_poll)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(url) DO UPDATE SET"
+            " etag = CASE WHEN excluded.last_changed IS NULL THEN etag ELSE excluded.etag END,"
+            " last_modified = CASE WHEN excluded.last_changed IS NULL THEN last_modified ELSE excluded.last_modified END,"
+            " last_status = excluded.last_status, last_checked = excluded.last_checked,"
+            " last_changed = COALESCE(excluded.last_changed, last_changed),"
+            " seen = excluded.seen, last_new_item = excluded.last_new_item,"
+            " mean_interval = excluded.mean_interval, new_items = new_items + excluded.new_items,"
+            " failures = excluded.failures, last_outcome = excluded.last_outcome,"
+            " poll_interval = excluded.poll_interval, next_poll = excluded.next_poll",
+            rows,
+        )
+    return len(rows)
+
+
+def feed_health(conn: sqlite3.Connection) -> Dict:
+    '''
+    @brief Summary of the registry: feeds by last outcome, dead feeds and the next due time.
+
+    @param conn Open registry connection (sqlite3.Connection).
+    @return Dictionary with "feeds", "outcomes", "dead" (URLs) and "next_poll" (timestamp or None).
+    '''
+    outcomes = dict(conn.execute("SELECT COALESCE(last_outcome, 'unknown'), COUNT(*) FROM feeds GROUP BY 1"))
+    dead = [row[0] for row in conn.execute("SELECT url FROM feeds WHERE failures >= ? ORDER BY url", (DEAD_FEED_FAILURES,))]
+    total, next_poll = conn.execute("SELECT COUNT(*), MIN(next_poll) FROM feeds").fetchone()
+    return {"feeds": total, "outcomes": outcomes, "dead": dead, "next_poll": next_poll}
@@ -0,0 +1,392 @@
+"""
+@file near_duplicates.py
+@author naflashDev
+@brief Persistent MinHash/LSH index of stored articles, to collapse syndicated copies.
+@details The same story published by several outlets reaches the result
+         store under different URLs and is tagged by spaCy and indexed in
+         OpenSearch once per copy; the exact `_id`/`text.keyword` checks only
+         catch byte-identical fragments. Each article gets a MinHash signature
+         of the word 3-shingles of its paragraph text (`MINHASH_PERMUTATIONS`
+         values, whose agreement estimates the Jaccard similarity of two
+         articles). The signature is split into `LSH_BANDS` bands whose hashes
+         are indexed in SQLite, so a lookup only compares the articles sharing
+         a band with it, and a candidate is a copy when the estimated
+         similarity reaches `NEAR_DUPLICATE_THRESHOLD`. An article that copies
+         one already registered under another URL is recorded as a link to
+         that first copy (`duplicate_of`) and is not stored, tagged or indexed
+         again. Writers look an article up first (`near_duplicate_of`) and
+         register it (`register_article`) only once it has been stored, so an
+         article whose append failed never becomes the original of a later
+         copy. Articles shorter than `MINHASH_MIN_WORDS` words are never
+         treated as copies. Several processes can share the database (WAL
+         mode, inserts under `BEGIN IMMEDIATE`, one connection per process).
+"""
+
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+# Default location of the index database
+NEAR_DUPLICATES_PATH = "./outputs/near_duplicates.db"
+# Signature length and LSH bands (rows per band = permutations / bands)
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+# Estimated Jaccard similarity from which two articles are copies of one story
+NEAR_DUPLICATE_THRESHOLD = 0.75
+# Words per shingle, and minimum words for an article to get a signature
+SHINGLE_SIZE = 3
+MINHASH_MIN_WORDS = 50
+
+# One random 64-bit mask per permutation (hash XOR mask, cheaper than a*h+b mod p);
+# fixed seed so signatures are comparable across runs and processes
+_rng = random.Random(20251017)
+_MASKS = [_rng.getrandbits(64) for _ in range(MINHASH_PERMUTATIONS)]
+_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+_SIGNATURE = struct.Struct(f"<{MINHASH_PERMUTATIONS}Q")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def article_text(record: dict) -> str:
+    '''
+    @brief Paragraph text of an article, or its headings and title when it has no paragraphs.
+
+    @param record Article dictionary (title, h1-h6, p) (dict).
+    @return Text (str).
+    '''
+    paragraphs = [p for p in record.get("p") or [] if isinstance(p, str)]
+    if not paragraphs:
+        paragraphs = [record.get("title") or ""]
+        for key in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            paragraphs.extend(t for t in record.get(key) or [] if isinstance(t, str))
+    return " ".join(paragraphs)
+
+
+def minhash(text: str, shingle_size: int = SHINGLE_SIZE, min_words: int = MINHASH_MIN_WORDS) -> Optional[List[int]]:
+    '''
+    @brief MinHash signature of the word shingles of a text.
+
+    @param text Article text (str).
+    @param shingle_size Words per shingle (int).
+    @param min_words Texts with fewer words get no signature (int).
+    @return MINHASH_PERMUTATIONS minimum hash values (List[int]) or None if the text is too short.
+    '''
+    words = _WORD.findall(text.lower())
+    if len(words) < max(min_words, shingle_size):
+        return None
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        for shingle in shingles
+    ]
+    return [min(map(mask.__xor__, hashes)) for mask in _MASKS]
+
+
+def similarity(first: List[int], second: List[int]) -> float:
+    '''
+    @brief Jaccard similarity estimated from two MinHash signatures.
+
+    @param first Signature (List[int]).
+    @param second Signature (List[int]).
+    @return Fraction of equal values, 0-1 (float).
+    '''
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+def _band_keys(signature: List[int]) -> List[tuple]:
+    '''
+    @brief LSH band keys of a signature.
+
+    @param signature MinHash signature (List[int]).
+    @return One (band number, signed 64-bit hash of the band rows) tuple per band (List[tuple]).
+    '''
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * _ROWS:(band + 1) * _ROWS]
+        digest = hashlib.blake2b(struct.pack(f"<{_ROWS}Q", *rows), digest_size=8).digest()
+        keys.append((band, int.from_bytes(digest, "little", signed=True)))
+    return keys
+
+
+class NearDuplicateIndex:
+    '''
+    @brief SQLite LSH index of article MinHash signatures.
+    '''
+
+    def __init__(self, path: str = NEAR_DUPLICATES_PATH, threshold: float = NEAR_DUPLICATE_THRESHOLD) -> None:
+        '''
+        @brief Open (and create if needed) the index.
+
+        @param path SQLite database file, or ":memory:" (str).
+        @param threshold Estimated Jaccard similarity from which an article is a copy (float).
+        '''
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " id INTEGER PRIMARY KEY,"
+            " url TEXT NOT NULL UNIQUE,"
+            " signature BLOB,"
+            " duplicate_of TEXT,"
+            " added REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bands ("
+            " band INTEGER NOT NULL,"
+            " hash INTEGER NOT NULL,"
+            " article INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS articles_duplicate_of ON articles (duplicate_of)")
+
+    def _original_of(self, signature: List[int], keys: List[tuple]) -> Optional[str]:
+        '''
+        @brief Most similar registered original among the articles sharing a band.
+
+        @param signature MinHash signature (List[int]).
+        @param keys Its band keys, see `_band_keys` (List[tuple]).
+        @return URL of the original, or None if no candidate reaches the threshold (str | None).
+        '''
+        marks = ", ".join("(?, ?)" for _ in keys)
+        rows = self._conn.execute(
+            "SELECT a.url, a.signature FROM articles a WHERE a.id IN ("
+            f" SELECT article FROM bands WHERE (band, hash) IN (VALUES {marks}))",
+            [value for key in keys for value in key],
+        )
+        best = None
+        for url, blob in rows:
+            score = similarity(signature, _SIGNATURE.unpack(blob))
+            if score >= self.threshold and (best is None or score > best[0]):
+                best = (score, url)
+        return best[1] if best else None
+
+    def _find(self, url: str, signature: Optional[List[int]]) -> Tuple[bool, Optional[str]]:
+        '''
+        @brief Look an article up; the caller holds the lock.
+
+        @param url Article URL (str).
+        @param signature MinHash signature (List[int] | None).
+        @return (URL already registered, URL of the original it copies or None) (Tuple[bool, str | None]).
+        '''
+        row = self._conn.execute("SELECT duplicate_of FROM articles WHERE url = ?", (url,)).fetchone()
+        if row is not None:
+            return True, row[0]
+        if signature is None:
+            return False, None
+        return False, self._original_of(signature, _band_keys(signature))
+
+    def _add(self, url: str, signature: Optional[List[int]], duplicate_of: Optional[str]) -> None:
+        '''
+        @brief Insert an article and, for an original, its band keys; the caller holds a transaction.
+
+        @param url Article URL (str).
+        @param signature MinHash signature (List[int] | None).
+        @param duplicate_of URL of the original it copies (str | None).
+        @return None.
+        '''
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO articles (url, signature, duplicate_of, added) VALUES (?, ?, ?, ?)",
+            (url, _SIGNATURE.pack(*signature) if signature is not None else None, duplicate_of, time.time()),
+        )
+        if cursor.rowcount and duplicate_of is None and signature is not None:
+            self._conn.executemany(
+                "INSERT INTO bands (band, hash, article) VALUES (?, ?, ?)",
+                [(band, value, cursor.lastrowid) for band, value in _band_keys(signature)],
+            )
+
+    def find(self, url: str, signature: Optional[List[int]]) -> Optional[str]:
+        '''
+        @brief Look an article up without recording it.
+
+        @param url Article URL (str).
+        @param signature MinHash signature of its text, see `minhash` (List[int] | None).
+        @return URL of the original it copies (the one recorded for a known URL), or None (str | None).
+        '''
+        with self._lock:
+            return self._find(url, signature)[1]
+
+    def add(self, url: str, signature: Optional[List[int]], duplicate_of: Optional[str] = None) -> None:
+        '''
+        @brief Record an article, as an original added to the LSH bands or as a copy of `duplicate_of`.
+
+        A URL already registered is left as it is.
+
+        @param url Article URL (str).
+        @param signature MinHash signature of its text, see `minhash` (List[int] | None).
+        @param duplicate_of URL of the original it copies (str | None).
+        @return None.
+        '''
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._add(url, signature, duplicate_of)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def register(self, url: str, text: str) -> Optional[str]:
+        '''
+        @brief Look an article up and record it in one transaction.
+
+        A new article is registered as an original and added to the LSH
+        bands; one that copies an original registered under another URL is
+        linked to it. Meant for articles already stored; writers that may
+        fail to store it use `find` and then `add`.
+
+        @param url Article URL (str).
+        @param text Article text, see `article_text` (str).
+        @return URL of the article it copies, or None if it is new, already registered as an original or too short (str | None).
+        '''
+        signature = minhash(text)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                known, original = self._find(url, signature)
+                if not known:
+                    self._add(url, signature, original)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return original
+
+    def duplicates(self, url: str) -> List[str]:
+        '''
+        @brief URLs linked to an original article as its copies.
+
+        @param url URL of the original article (str).
+        @return Copy URLs in the order they were found (List[str]).
+        '''
+        with self._lock:
+            rows = self._conn.execute("SELECT url FROM articles WHERE duplicate_of = ? ORDER BY id", (url,))
+            return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        '''
+        @brief Counters of the index.
+
+        @return Dict with "articles" and linked "duplicates" (Dict[str, int]).
+        '''
+        with self._lock:
+            total, duplicates = self._conn.execute("SELECT COUNT(*), COUNT(duplicate_of) FROM articles").fetchone()
+        return {"articles": total, "duplicates": duplicates}
+
+    def close(self) -> None:
+        '''
+        @brief Close the database connection.
+
+        @return None.
+        '''
+        with self._lock:
+            self._conn.close()
+
+
+_indexes: Dict[Tuple[int, str], NearDuplicateIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_near_duplicate_index(path: str = NEAR_DUPLICATES_PATH) -> NearDuplicateIndex:
+    '''
+    @brief Return the index of this process for `path`, opening it on first use.
+
+    Keyed by process id, so a forked worker opens its own SQLite connection
+    instead of reusing the parent's.
+
+    @param path SQLite database file (str).
+    @return Shared NearDuplicateIndex instance.
+    '''
+    key = (os.getpid(), os.path.abspath(path))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = NearDuplicateIndex(path)
+            _indexes[key] = index
+        return index
+
+
+def article_signature(record: dict) -> Optional[List[int]]:
+    '''
+    @brief MinHash signature of an article, to share between `near_duplicate_of` and `register_article`.
+
+    @param record Article dictionary with its texts (dict).
+    @return Signature (List[int]) or None if the article is too short.
+    '''
+    return minhash(article_text(record)) if isinstance(record, dict) else None
+
+
+def near_duplicate_of(record: dict, signature: Optional[List[int]] = None) -> Optional[str]:
+    '''
+    @brief Tell whether an article copies another one of the shared index, without recording it.
+
+    Errors of the index are logged and the article is treated as new.
+
+    @param record Article dictionary with "url" and its texts (dict).
+    @param signature Signature from `article_signature`; computed when None (List[int]).
+    @return URL of the article it copies, or None (str | None).
+    '''
+    url = record.get("url") if isinstance(record, dict) else None
+    if not url:
+        return None
+    try:
+        if signature is None:
+            signature = article_signature(record)
+        original = get_near_duplicate_index().find(url, signature)
+    except Exception as e:
+        logger.warning(f"[near-duplicates] Lookup failed for {url}: {e}")
+        return None
+    return original if original != url else None
+
+
+def register_article(record: dict, signature: Optional[List[int]] = None, duplicate_of: Optional[str] = None) -> None:
+    '''
+    @brief Record an article in the shared index once it has been stored, or link a copy to its original.
+
+    Errors of the index are logged.
+
+    @param record Article dictionary with "url" and its texts (dict).
+    @param signature Signature from `article_signature`; computed when None (List[int]).
+    @param duplicate_of URL of the original returned by `near_duplicate_of` (str | None).
+    @return None.
+    '''
+    url = record.get("url") if isinstance(record, dict) else None
+    if not url:
+        return
+    try:
+        if signature is None:
+            signature = article_signature(record)
+        get_near_duplicate_index().add(url, signature, duplicate_of)
+    except Exception as e:
+        logger.warning(f"[near-duplicates] Could not register {url}: {e}")
+
+
+def register_near_duplicate(record: dict) -> Optional[str]:
+    '''
+    @brief Record an article already stored and tell whether it copies another one.
+
+    Errors of the index are logged and the article is treated as new.
+
+    @param record Article dictionary with "url" and its texts (dict).
+    @return URL of the article it copies, or None (str | None).
+    '''
+    url = record.get("url") if isinstance(record, dict) else None
+    if not url:
+        return None
+    try:
+        original = get_near_duplicate_index().register(url, article_text(record))
+    except Exception as e:
+        logger.warning(f"[near-duplicates] Lookup failed for {url}: {e}")
+        return None
+    return original if original != url else None
@@ -3,16 +3,83 @@
 @author naflashDev
 @brief OpenSearch integration for storing processed data.
 @details Provides methods to connect and store extracted content in OpenSearch, using basic authentication and custom index management.
+         Clients are pooled per process and host/port (keep-alive connections are
+         reused across calls), and `BulkIndexer` buffers documents and sends them
+         through the `_bulk` API so high-volume writers (the dynamic spider and the
+         spaCy processor) do not pay one round trip per document.
 """
 
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from opensearchpy import OpenSearch, NotFoundError, TransportError
 from loguru import logger
 
+# Maximum keep-alive connections kept per host by each pooled client
+DEFAULT_POOL_MAXSIZE = 10
+# Default BulkIndexer flush thresholds
+DEFAULT_BULK_MAX_DOCS = 500
+DEFAULT_BULK_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BULK_FLUSH_INTERVAL = 5.0
+# Maximum number of ids sent in a single mget request
+DEFAULT_MGET_BATCH = 1000
+
+_clients: Dict[tuple, OpenSearch] = {}
+_clients_lock = threading.Lock()
+
+
+def get_opensearch_client(host: str, port: int) -> OpenSearch:
+    '''
+    @brief Return the pooled OpenSearch client for `host:port`, creating it on first use.
+
+    Clients are cached per process (a forked Scrapy process gets its own) so the
+    underlying urllib3 connection pool and its keep-alive connections are reused.
+
+    @param host OpenSearch server IP or hostname (str).
+    @param port OpenSearch server port (int).
+    @return Shared OpenSearch client.
+    '''
+    key = (os.getpid(), host, str(port))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = OpenSearch(
+                hosts=[{"host": host, "port": port}],
+                http_compress=True,
+                use_ssl=False,
+                verify_certs=False,
+                pool_maxsize=DEFAULT_POOL_MAXSIZE,
+            )
+            _clients[key] = client
+        return client
+
+
+def close_opensearch_clients() -> None:
+    '''
+    @brief Close and forget every pooled client.
+
+    @return None.
+    '''
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception:
+            pass
+
+
 def store_in_opensearch(data,host,port,nom_index) -> None:
     '''
     @brief Stores the processed data in OpenSearch.
 
-    Connects to a local OpenSearch instance and stores the extracted and filtered content (such as text and keywords) in the specified index.
+    Uses the pooled client for `host:port` and stores the extracted and filtered content (such as text and keywords) in the specified index.
 
     @param data The data to store in OpenSearch (dict). Typically includes the URL, text, and keywords.
     @param host The host of the OpenSearch server (str).
@@ -24,9 +91,7 @@ def store_in_opensearch(data,host,port,nom_index) -> None:
 
         logger.info(f"Connecting to OpenSearch instance at {host}:{port}.")
 
-        client = OpenSearch(
-            hosts=[{'host': host, 'port': port}]
-        )
+        client = get_opensearch_client(host, port)
 
         response = client.index(index=nom_index, body=data)
 
@@ -50,13 +115,7 @@ def text_exists_in_opensearch(text: str, host: str, port: int, index_name: str =
     @return True if at least one document with the same text already exists, False otherwise (bool).
     '''
     try:
-        # Try to create OpenSearch client
-        client = OpenSearch(
-            hosts=[{"host": host, "port": port}],
-            http_compress=True,
-            use_ssl=False,
-            verify_certs=False,
-        )
+        client = get_opensearch_client(host, port)
         # Exact search on the 'text.keyword' field (requires keyword subfield in the mapping)
         query = {
             "query": {
@@ -76,6 +135,87 @@ def text_exists_in_opensearch(text: str, host: str, port: int, index_name: str =
         logger.error(f"No existe el indice o error de conexión: {e}")
         return False
 
+def content_hash_id(text: str) -> str:
+    '''
+    @brief Build the deterministic document `_id` of a text.
+
+    The same text always maps to the same id, so indexing it again overwrites
+    the existing document instead of creating a duplicate.
+
+    @param text Document text (str).
+    @return Hex SHA-256 digest of the UTF-8 text (str).
+    '''
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def existing_ids_in_opensearch(
+    ids: Iterable[str],
+    host: str,
+    port: int,
+    index_name: str = "spacy_documents",
+    batch_size: int = DEFAULT_MGET_BATCH,
+    texts: Optional[Dict[str, str]] = None,
+) -> Set[str]:
+    '''
+    @brief Return which of the given document ids already exist in an index.
+
+    Checks whole batches with `mget` (only metadata, no `_source`) instead of
+    one search request per document. Documents indexed before the content-hash
+    `_id` (automatic ids) are not found by `mget`: when `texts` is given, the
+    ids of a batch still missing are looked up by exact text with a single
+    `terms` aggregation on `text.keyword`, so those documents are not indexed
+    a second time.
+
+    @param ids Document ids to check (Iterable[str]).
+    @param host OpenSearch server IP or hostname (str).
+    @param port OpenSearch server port (int).
+    @param index_name Name of the index where documents are stored (str).
+    @param batch_size Maximum ids per `mget` request (int).
+    @param texts Text of each id (`content_hash_id(text)` -> text), to also match documents with another `_id` (Dict[str, str]).
+    @return Set of ids that are already indexed (Set[str]).
+    '''
+    ids = list(dict.fromkeys(ids))
+    found: Set[str] = set()
+    if not ids:
+        return found
+    try:
+        client = get_opensearch_client(host, port)
+        for start in range(0, len(ids), max(1, batch_size)):
+            batch = ids[start:start + batch_size]
+            resp = client.mget(index=index_name, body={"ids": batch}, _source=False)
+            found.update(doc["_id"] for doc in resp.get("docs", []) if doc.get("found"))
+            missing = [doc_id for doc_id in batch if doc_id not in found and texts and doc_id in texts]
+            if missing:
+                found.update(_existing_texts(client, index_name, [texts[doc_id] for doc_id in missing]))
+    except NotFoundError:
+        # Index not created yet: nothing is indexed
+        return found
+    except Exception as e:
+        logger.error(f"No existe el indice o error de conexión: {e}")
+    return found
+
+
+def _existing_texts(client: OpenSearch, index_name: str, texts: List[str]) -> Set[str]:
+    '''
+    @brief Content-hash ids of the given texts that are indexed under any `_id`.
+
+    One `terms` aggregation on `text.keyword` (bucket keys are the texts found,
+    whatever the number of copies of each one).
+
+    @param client OpenSearch client.
+    @param index_name Name of the index where documents are stored (str).
+    @param texts Texts to look up (List[str]).
+    @return Set of `content_hash_id` of the texts found (Set[str]).
+    '''
+    resp = client.search(index=index_name, body={
+        "size": 0,
+        "query": {"terms": {"text.keyword": texts}},
+        "aggs": {"texts": {"terms": {"field": "text.keyword", "size": len(texts)}}},
+    })
+    buckets = resp.get("aggregations", {}).get("texts", {}).get("buckets", [])
+    return {content_hash_id(bucket["key"]) for bucket in buckets}
+
+
 def ensure_index_exists(host: str, port: int, index_name: str = "spacy_documents") -> None:
     '''
     @brief Ensure that the given OpenSearch index exists. If it does not exist, create it.
@@ -88,13 +228,7 @@ def ensure_index_exists(host: str, port: int, index_name: str = "spacy_documents
     @return None.
     '''
     try:
-        # Try to create OpenSearch client
-        client = OpenSearch(
-            hosts=[{"host": host, "port": port}],
-            http_compress=True,
-            use_ssl=False,
-            verify_certs=False,
-        )
+        client = get_opensearch_client(host, port)
         if not client.indices.exists(index=index_name):
             # Minimal mapping: text with keyword subfield so term query on text.keyword works
             body = {
@@ -119,4 +253,209 @@ def ensure_index_exists(host: str, port: int, index_name: str = "spacy_documents
             logger.info(f"Index '{index_name}' created in OpenSearch.")
     except Exception as e:
         logger.error(f"Error checking/creating index '{index_name}': {e}")
-        logger.error(f"Error checking/creating index '{index_name}': {e}")
\ No newline at end of file
+
+class BulkIndexer:
+    '''
+    @brief Buffered writer that indexes documents through the OpenSearch `_bulk` API.
+
+    Documents are buffered and flushed when `max_docs` documents or `max_bytes`
+    bytes are pending, or `flush_interval` seconds after the last flush (checked
+    by a daemon thread). Per-item failures reported by `_bulk` are logged, counted
+    and kept in the bounded `failures` queue.
+    '''
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        index_name: str,
+        max_docs: int = DEFAULT_BULK_MAX_DOCS,
+        max_bytes: int = DEFAULT_BULK_MAX_BYTES,
+        flush_interval: Optional[float] = DEFAULT_BULK_FLUSH_INTERVAL,
+    ) -> None:
+        '''
+        @brief Create an indexer for `index_name` on `host:port`.
+
+        @param host OpenSearch server IP or hostname (str).
+        @param port OpenSearch server port (int).
+        @param index_name Default target index (str).
+        @param max_docs Flush when this many documents are buffered (int).
+        @param max_bytes Flush when the buffered payload reaches this size (int).
+        @param flush_interval Seconds between time-based flushes; None disables them (float).
+        '''
+        self.host = host
+        self.port = port
+        self.index_name = index_name
+        self.max_docs = max(1, int(max_docs))
+        self.max_bytes = max(1, int(max_bytes))
+        self.flush_interval = flush_interval
+        self.indexed_count = 0
+        self.failed_count = 0
+        self.failures = deque(maxlen=1000)
+        self._buffer: List[str] = []
+        self._buffer_docs = 0
+        self._buffer_bytes = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def add(self, doc: dict, doc_id: Optional[str] = None, index_name: Optional[str] = None, op_type: str = "index") -> None:
+        '''
+        @brief Buffer one document, flushing if a size threshold is reached.
+
+        @param doc Document body (dict).
+        @param doc_id Optional document `_id` (str).
+        @param index_name Target index; defaults to the indexer's index (str).
+        @param op_type Bulk action, "index" or "create" (str).
+        @return None.
+        '''
+        meta = {"_index": index_name or self.index_name}
+        if doc_id is not None:
+            meta["_id"] = doc_id
+        payload = json.dumps({op_type: meta}) + "\n" + json.dumps(doc, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._buffer.append(payload)
+            self._buffer_docs += 1
+            self._buffer_bytes += len(payload.encode("utf-8"))
+            full = self._buffer_docs >= self.max_docs or self._buffer_bytes >= self.max_bytes
+            self._ensure_flusher()
+        if full:
+            self.flush()
+
+    def _ensure_flusher(self) -> None:
+        '''
+        @brief Start the time-based flush thread on first use. Caller holds `_lock`.
+
+        @return None.
+        '''
+        if self.flush_interval is None or self._flusher is not None or self._closed.is_set():
+            return
+        self._flusher = threading.Thread(target=self._flush_loop, name=f"bulk-{self.index_name}", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        '''
+        @brief Flush pending documents every `flush_interval` seconds until closed.
+
+        @return None.
+        '''
+        while not self._closed.wait(self.flush_interval):
+            if self._buffer_docs and time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def pending(self) -> int:
+        '''
+        @brief Number of buffered documents not sent yet.
+
+        @return Pending document count (int).
+        '''
+        return self._buffer_docs
+
+    def flush(self) -> Tuple[int, List[dict]]:
+        '''
+        @brief Send the buffered documents in a single `_bulk` request.
+
+        @return Tuple (number of documents indexed, list of per-item failures).
+        '''
+        with self._flush_lock:
+            with self._lock:
+                lines, count = self._buffer, self._buffer_docs
+                self._buffer, self._buffer_docs, self._buffer_bytes = [], 0, 0
+                self._last_flush = time.monotonic()
+            if not count:
+                return 0, []
+
+            failures: List[dict] = []
+            try:
+                response = get_opensearch_client(self.host, self.port).bulk(body="".join(lines))
+                items = response.get("items", [])
+                for item in items:
+                    result = next(iter(item.values()), {})
+                    if result.get("error") or result.get("status", 200) >= 300:
+                        failures.append({
+                            "_index": result.get("_index"),
+                            "_id": result.get("_id"),
+                            "status": result.get("status"),
+                            "error": result.get("error"),
+                        })
+                indexed = len(items) - len(failures)
+            except Exception as e:
+                logger.error(f"[Bulk] Error sending {count} documents to OpenSearch: {e}")
+                failures = [
+                    {"_index": self.index_name, "_id": None, "status": None, "error": str(e)}
+                    for _ in range(count)
+                ]
+                indexed = 0
+
+            self.indexed_count += indexed
+            self.failed_count += len(failures)
+            self.failures.extend(failures)
+            if failures:
+                logger.error(
+                    f"[Bulk] {len(failures)}/{count} documents failed for index '{self.index_name}'. "
+                    f"First error: {failures[0]['error']}"
+                )
+            else:
+                logger.info(f"[Bulk] Indexed {indexed} documents into '{self.index_name}'.")
+            return indexed, failures
+
+    def close(self) -> None:
+        '''
+        @brief Flush pending documents and stop the time-based flush thread.
+
+        @return None.
+        '''
+        self._closed.set()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+_indexers: Dict[tuple, BulkIndexer] = {}
+_indexers_lock = threading.Lock()
+
+
+def get_bulk_indexer(host: str, port: int, index_name: str) -> BulkIndexer:
+    '''
+    @brief Return the process-wide BulkIndexer for `index_name` on `host:port`.
+
+    All writers of the same index in a process share one buffer; pending
+    documents are flushed at interpreter exit.
+
+    @param host OpenSearch server IP or hostname (str).
+    @param port OpenSearch server port (int).
+    @param index_name Target index (str).
+    @return Shared BulkIndexer instance.
+    '''
+    key = (os.getpid(), host, str(port), index_name)
+    with _indexers_lock:
+        indexer = _indexers.get(key)
+        if indexer is None or indexer._closed.is_set():
+            indexer = BulkIndexer(host, port, index_name)
+            _indexers[key] = indexer
+        return indexer
+
+
+def close_bulk_indexers() -> None:
+    '''
+    @brief Flush and close every shared BulkIndexer of this process.
+
+    @return None.
+    '''
+    with _indexers_lock:
+        indexers = [i for k, i in _indexers.items() if k[0] == os.getpid()]
+        _indexers.clear()
+    for indexer in indexers:
+        try:
+            indexer.close()
+        except Exception as e:
+            logger.error(f"[Bulk] Error flushing indexer '{indexer.index_name}': {e}")
+
+
+atexit.register(close_bulk_indexers)
@@ -0,0 +1,494 @@
+"""
+@file result_store.py
+@author naflashDev
+@brief Append-only segmented store for scraped articles.
+@details Replaces the single `./outputs/result.json` array that every producer
+         used to rewrite. Records are appended as JSON lines to rotating segment
+         files under `./outputs/results/`, concurrent writers (the Scrapy spider
+         processes and the news search) are serialized with an OS-level file
+         lock, and an in-memory URL index lets writers skip duplicates without
+         re-reading the whole history. Readers stream records with
+         `iter_records`, which also understands the legacy array file.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from loguru import logger
+
+# Default location of the segmented store
+RESULT_STORE_DIR = "./outputs/results"
+# Legacy single-array file written by previous versions
+LEGACY_RESULT_FILE = "./outputs/result.json"
+# Segment rotation threshold
+DEFAULT_MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+LOCK_NAME = ".lock"
+
+
+@contextmanager
+def _os_file_lock(lock_path: str):
+    '''
+    @brief Hold an exclusive OS-level lock on `lock_path` for the duration of the block.
+
+    Uses `fcntl.flock` on POSIX and `msvcrt.locking` on Windows, so the kernel
+    releases the lock if the holder dies (unlike the old marker lockfile).
+
+    @param lock_path Path of the lock file (str).
+    @return Context manager.
+    '''
+    fh = open(lock_path, "a+b")
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ~10s; keep waiting
+                    continue
+        else:
+            import fcntl
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        yield
+    finally:
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            fh.close()
+
+
+def _segment_name(number: int) -> str:
+    '''
+    @brief Build the file name of segment `number`.
+
+    @param number Segment sequence number (int).
+    @return Segment file name (str).
+    '''
+    return f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}"
+
+
+class ResultStore:
+    '''
+    @brief Append-only JSONL store split into rotating segments.
+
+    Instances are cheap to create but hold the URL index in memory; use
+    `get_result_store()` to share one instance per directory inside a process.
+    '''
+
+    def __init__(
+        self,
+        root: str = RESULT_STORE_DIR,
+        legacy_file: Optional[str] = None,
+        max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+    ) -> None:
+        '''
+        @brief Create a store rooted at `root`.
+
+        @param root Directory holding the segment files (str).
+        @param legacy_file Optional legacy JSON array imported on first write (str).
+        @param max_segment_bytes Size after which a new segment is started (int).
+        '''
+        self.root = root
+        self.legacy_file = legacy_file
+        self.max_segment_bytes = max(1, int(max_segment_bytes))
+        self._thread_lock = threading.RLock()
+        self._urls: Set[str] = set()
+        # Bytes of each segment already folded into the URL index
+        self._indexed: Dict[str, int] = {}
+        self._legacy_checked = False
+
+    # ------------------------------------------------------------------ #
+    # Segments
+    # ------------------------------------------------------------------ #
+    def segments(self) -> List[str]:
+        '''
+        @brief List the segment file paths in write order.
+
+        @return Sorted list of segment paths (List[str]).
+        '''
+        if not os.path.isdir(self.root):
+            return []
+        names = sorted(
+            n for n in os.listdir(self.root)
+            if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX)
+        )
+        return [os.path.join(self.root, n) for n in names]
+
+    def exists(self) -> bool:
+        '''
+        @brief Tell whether the store (or a not yet imported legacy file) holds data.
+
+        @return True if there is something to read (bool).
+        '''
+        if self.legacy_file and os.path.exists(self.legacy_file):
+            return True
+        return bool(self.segments())
+
+    def _active_segment(self) -> str:
+        '''
+        @brief Return the segment new records go to, rotating when it is full.
+
+        Must be called with the store lock held.
+
+        @return Path of the writable segment (str).
+        '''
+        segments = self.segments()
+        if not segments:
+            return os.path.join(self.root, _segment_name(1))
+        last = segments[-1]
+        if os.path.getsize(last) < self.max_segment_bytes:
+            return last
+        return self._next_segment(last)
+
+    def _next_segment(self, segment: str) -> str:
+        '''
+        @brief Return the path of the segment that follows `segment`.
+
+        @param segment Path of a segment (str).
+        @return Path of the next segment (str).
+        '''
+        number = int(os.path.basename(segment)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+        return os.path.join(self.root, _segment_name(number + 1))
+
+    @contextmanager
+    def _locked(self):
+        '''
+        @brief Serialize writers across threads and processes.
+
+        @return Context manager holding both the thread and the OS file lock.
+        '''
+        with self._thread_lock:
+            os.makedirs(self.root, exist_ok=True)
+            with _os_file_lock(os.path.join(self.root, LOCK_NAME)):
+                yield
+
+    # ------------------------------------------------------------------ #
+    # URL index
+    # ------------------------------------------------------------------ #
+    def _refresh_index(self) -> None:
+        '''
+        @brief Fold lines appended since the last refresh (by any process) into the URL index.
+
+        @return None.
+        '''
+        for segment in self.segments():
+            start = self._indexed.get(segment, 0)
+            try:
+                size = os.path.getsize(segment)
+            except OSError:
+                continue
+            if size <= start:
+                continue
+            with open(segment, "rb") as f:
+                f.seek(start)
+                chunk = f.read(size - start)
+            # Ignore a trailing partial line; it will be picked up next time
+            complete = chunk[:chunk.rfind(b"\n") + 1]
+            for line in complete.splitlines():
+                url = _url_of_line(line)
+                if url:
+                    self._urls.add(url)
+            self._indexed[segment] = start + len(complete)
+
+    def contains_url(self, url: str) -> bool:
+        '''
+        @brief Check whether an article URL is already stored.
+
+        @param url Article URL (str).
+        @return True if a record with that URL exists (bool).
+        '''
+        with self._thread_lock:
+            self._refresh_index()
+            return url in self._urls
+
+    def urls(self) -> Set[str]:
+        '''
+        @brief Return a snapshot of every stored URL.
+
+        @return Set of URLs (Set[str]).
+        '''
+        with self._thread_lock:
+            self._refresh_index()
+            return set(self._urls)
+
+    # ------------------------------------------------------------------ #
+    # Writing
+    # ------------------------------------------------------------------ #
+    def append(self, record: dict, dedup: bool = True) -> bool:
+        '''
+        @brief Append one record to the active segment.
+
+        @param record Article dictionary; its "url" key is used for deduplication (dict).
+        @param dedup Skip the record if its URL is already stored (bool).
+        @return True if the record was written, False if it was a duplicate (bool).
+        '''
+        return self.append_many([record], dedup=dedup) == 1
+
+    def append_many(self, records: List[dict], dedup: bool = True) -> int:
+        '''
+        @brief Append several records under a single lock acquisition.
+
+        @param records Article dictionaries (List[dict]).
+        @param dedup Skip records whose URL is already stored (bool).
+        @return Number of records written (int).
+        '''
+        with self._locked():
+            self._import_legacy_locked()
+            self._refresh_index()
+            return self._write_locked(records, dedup)
+
+    def _write_locked(self, records: Iterable[dict], dedup: bool = True) -> int:
+        '''
+        @brief Write records to the active segment, rotating when it fills up; caller must hold the store lock.
+
+        @param records Article dictionaries (Iterable[dict]).
+        @param dedup Skip records whose URL is already stored (bool).
+        @return Number of records written (int).
+        '''
+        written = 0
+        segment = self._active_segment()
+        f = open(segment, "ab")
+        try:
+            for record in records:
+                url = record.get("url") if isinstance(record, dict) else None
+                if dedup and url and url in self._urls:
+                    continue
+                line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n").encode("utf-8")
+                # Rotate before a line that would overflow the segment, so every
+                # segment stays within max_segment_bytes (unless one line is larger)
+                if f.tell() > 0 and f.tell() + len(line) > self.max_segment_bytes:
+                    f.close()
+                    self._indexed[segment] = os.path.getsize(segment)
+                    segment = self._next_segment(segment)
+                    f = open(segment, "ab")
+                f.write(line)
+                if url:
+                    self._urls.add(url)
+                written += 1
+            f.flush()
+        finally:
+            f.close()
+        # Our own writes are already in the index
+        self._indexed[segment] = os.path.getsize(segment)
+        return written
+
+    def import_legacy(self, legacy_file: Optional[str] = None) -> int:
+        '''
+        @brief One-shot conversion of a legacy JSON array file into segments.
+
+        The legacy file is renamed to `<name>.imported` afterwards so the import
+        never runs twice.
+
+        @param legacy_file Legacy file to import; defaults to the store's legacy file (str).
+        @return Number of records imported (int).
+        '''
+        with self._locked():
+            return self._import_legacy_locked(legacy_file, force=True)
+
+    def _import_legacy_locked(self, legacy_file: Optional[str] = None, force: bool = False) -> int:
+        '''
+        @brief Import the legacy file; caller must hold the store lock.
+
+        @param legacy_file Legacy file to import (str).
+        @param force Import even if this instance already checked (bool).
+        @return Number of records imported (int).
+        '''
+        path = legacy_file or self.legacy_file
+        if not path or (self._legacy_checked and not force):
+            return 0
+        self._legacy_checked = True
+        if not os.path.exists(path):
+            return 0
+        records = list(_iter_legacy_file(path))
+        self._refresh_index()
+        imported = self._write_locked(records)
+        os.replace(path, f"{path}.imported")
+        logger.info(f"[ResultStore] Imported {imported} legacy records from {path}")
+        return imported
+
+    # ------------------------------------------------------------------ #
+    # Reading
+    # ------------------------------------------------------------------ #
+    def iter_records(self) -> Iterator[dict]:
+        '''
+        @brief Stream every stored record, oldest first.
+
+        A legacy file that has not been imported yet is read first.
+
+        @return Iterator over record dictionaries.
+        '''
+        if self.legacy_file and os.path.exists(self.legacy_file):
+            yield from _iter_legacy_file(self.legacy_file)
+        for segment in self.segments():
+            yield from _iter_jsonl_file(segment)
+
+    def iter_records_after(self, position: Optional[Tuple[str, int]] = None) -> Iterator[Tuple[dict, Tuple[str, int]]]:
+        '''
+        @brief Stream the records appended after `position`, with the position following each one.
+
+        A position is a `(segment file name, byte offset)` pair; feeding the last
+        yielded position back resumes exactly after that record. Legacy data must
+        be imported (`import_legacy`) to be visible here.
+
+        @param position Position to resume from, or None to start at the beginning (Tuple[str, int]).
+        @return Iterator over (record, position) tuples.
+        '''
+        start_segment, start_offset = position if position else ("", 0)
+        for segment in self.segments():
+            name = os.path.basename(segment)
+            if name < start_segment:
+                continue
+            offset = start_offset if name == start_segment else 0
+            with open(segment, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Record still being written by another process
+                        break
+                    offset += len(line)
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        logger.warning(f"[ResultStore] Skipping corrupt line in {segment}")
+                        continue
+                    yield record, (name, offset)
+
+    def has_position(self, position: Tuple[str, int]) -> bool:
+        '''
+        @brief Tell whether `position` still points inside an existing segment.
+
+        @param position (segment file name, byte offset) pair.
+        @return True if the segment exists and is at least that long (bool).
+        '''
+        path = os.path.join(self.root, position[0])
+        return os.path.exists(path) and os.path.getsize(path) >= position[1]
+
+
+def _url_of_line(line: bytes) -> Optional[str]:
+    '''
+    @brief Extract the "url" field of a JSONL line.
+
+    @param line Raw line (bytes).
+    @return URL or None (Optional[str]).
+    '''
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record.get("url") if isinstance(record, dict) else None
+
+
+def _iter_jsonl_file(path: str) -> Iterator[dict]:
+    '''
+    @brief Stream the records of a JSONL file, skipping corrupt or partial lines.
+
+    @param path JSONL file path (str).
+    @return Iterator over records.
+    '''
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                # Record still being written by another process
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"[ResultStore] Skipping corrupt line in {path}")
+
+
+def _iter_legacy_file(path: str) -> Iterator[dict]:
+    '''
+    @brief Read a legacy result file (JSON array or single object).
+
+    @param path Legacy JSON file path (str).
+    @return Iterator over records.
+    '''
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except ValueError:
+        logger.warning(f"[ResultStore] Legacy file {path} is corrupted; ignoring it.")
+        return
+    if isinstance(data, list):
+        yield from data
+    elif data:
+        yield data
+
+
+_stores: Dict[str, ResultStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_result_store(root: str = RESULT_STORE_DIR, legacy_file: Optional[str] = None) -> ResultStore:
+    '''
+    @brief Return the process-wide store for `root`, creating it on first use.
+
+    The default store imports `./outputs/result.json` the first time it is written to.
+
+    @param root Store directory (str).
+    @param legacy_file Legacy array file to import (str).
+    @return Shared ResultStore instance.
+    '''
+    key = os.path.abspath(root)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if legacy_file is None and key == os.path.abspath(RESULT_STORE_DIR):
+                legacy_file = LEGACY_RESULT_FILE
+            store = ResultStore(root, legacy_file=legacy_file)
+            _stores[key] = store
+        return store
+
+
+def is_store_path(path: str) -> bool:
+    '''
+    @brief Tell whether `path` names a store directory rather than a JSON/JSONL file.
+
+    @param path Source path (str).
+    @return True for store directories (bool).
+    '''
+    return os.path.isdir(path) or not (path.endswith(".json") or path.endswith(SEGMENT_SUFFIX))
+
+
+def has_results(path: str) -> bool:
+    '''
+    @brief Tell whether `path` (store directory or JSON/JSONL file) holds readable results.
+
+    @param path Store directory or result file (str).
+    @return True if there is data to process (bool).
+    '''
+    if not is_store_path(path):
+        return os.path.exists(path)
+    return get_result_store(path).exists()
+
+
+def iter_records(path: str) -> Iterator[dict]:
+    '''
+    @brief Stream records from a store directory, a JSONL file or a legacy JSON file.
+
+    @param path Source path (str).
+    @return Iterator over record dictionaries.
+    '''
+    if is_store_path(path):
+        return get_result_store(path).iter_records()
+    if path.endswith(SEGMENT_SUFFIX):
+        return _iter_jsonl_file(path)
+    return _iter_legacy_file(path)
@@ -5,12 +5,107 @@
 @details Provides data models and database functions to retrieve and insert RSS feeds, ensuring data integrity and supporting API endpoints.
 """
 
-from typing import List
+import re
+import weakref
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
 from asyncpg import Connection
 from fastapi import HTTPException
 
 from app.models.pydantic import FeedCreateRequest, FeedResponse
 
+# Login whose unread entries feed the dynamic spider
+ADMIN_LOGIN = "admin"
+
+# Category of the feeds discovered by the crawlers
+DEFAULT_CATEGORY = "Sin clasificar"
+# Length of ttrss_feeds.title (varchar)
+FEED_TITLE_MAX = 200
+
+# Default number of unread entries per keyset page
+UNREAD_BATCH_SIZE = 500
+
+# Channel notified by the optional trigger when unread user entries are inserted
+NEW_ENTRY_CHANNEL = "cybermind_new_entries"
+
+# owner_uid per login, per pool. Pools that support weak references are weak keys, so the
+# cache never keeps a pool alive; asyncpg.Pool defines __slots__ without __weakref__, so those
+# are kept by id() with the pool itself (a recycled id never matches) and dropped once closed
+_owner_uids: "weakref.WeakKeyDictionary[Any, Dict[str, int]]" = weakref.WeakKeyDictionary()
+_pinned_owner_uids: Dict[int, Tuple[Any, Dict[str, int]]] = {}
+
+
+def _owner_uid_cache(pool: Any) -> Dict[str, int]:
+    '''
+    @brief Return the owner_uid cache of a pool, creating it on first use.
+
+    Entries of pools without weak reference support are dropped when their pool is closing.
+
+    @param pool Connection pool (asyncpg.Pool).
+    @return Dict login -> owner_uid of the pool (Dict[str, int]).
+    '''
+    try:
+        return _owner_uids.setdefault(pool, {})
+    except TypeError:
+        pass
+    for key, (other, _) in list(_pinned_owner_uids.items()):
+        is_closing = getattr(other, "is_closing", None)
+        if callable(is_closing) and is_closing() is True:
+            del _pinned_owner_uids[key]
+    entry = _pinned_owner_uids.get(id(pool))
+    if entry is None or entry[0] is not pool:
+        entry = (pool, {})
+        _pinned_owner_uids[id(pool)] = entry
+    return entry[1]
+
+
+async def get_owner_uid(conn: Connection, login: str = ADMIN_LOGIN, pool: Any = None) -> int:
+    '''
+    @brief Return the id of a Tiny Tiny RSS user, cached per connection pool.
+
+    The lookup runs once per pool and login; later calls with the same pool skip the query.
+    The cache does not keep pools alive (weak references, or dropped once the pool is closed).
+
+    @param conn Active database connection (asyncpg.Connection).
+    @param login User login (str).
+    @param pool Pool the connection was acquired from, used as cache key (asyncpg.Pool). None disables caching.
+    @return User id (int). Raises ValueError if the user does not exist.
+    '''
+    cache = _owner_uid_cache(pool) if pool is not None else None
+    if cache is not None and login in cache:
+        return cache[login]
+    row = await conn.fetchrow(
+        "SELECT id FROM ttrss_users WHERE login = $1",
+        login
+    )
+    if not row:
+        raise ValueError("User not found")
+    if cache is not None:
+        cache[login] = row["id"]
+    return row["id"]
+
+
+def clear_owner_uid_cache() -> None:
+    '''
+    @brief Forget every cached owner_uid (e.g. after recreating the database).
+
+    @return None.
+    '''
+    _owner_uids.clear()
+    _pinned_owner_uids.clear()
+
+
+def _updated_rows(status: Any) -> int:
+    '''
+    @brief Parse the row count of an asyncpg command status such as "UPDATE 42".
+
+    @param status Status returned by `Connection.execute`.
+    @return Number of rows affected, 0 if unknown (int).
+    '''
+    try:
+        return int(str(status).rsplit(" ", 1)[-1])
+    except ValueError:
+        return 0
+
 
 async def get_feeds_from_db(
     conn: Connection,
@@ -87,27 +182,89 @@ async def insert_feed_to_db(
         )
 
 
-async def get_entry_links(conn: Connection) -> List[str]:
+async def get_default_category_id(conn: Connection, owner_uid: int, title: str = DEFAULT_CATEGORY) -> int:
+    '''
+    @brief Return the id of a feed category, creating it if it does not exist, in a single statement.
+
+    @param conn Active database connection (asyncpg.Connection).
+    @param owner_uid Owner of the category if it has to be created (int).
+    @param title Category title (str).
+    @return Category id (int).
+    '''
+    return await conn.fetchval("""
+        WITH existing AS (
+            SELECT id FROM ttrss_feed_categories WHERE title = $1 ORDER BY id LIMIT 1
+        ), created AS (
+            INSERT INTO ttrss_feed_categories (title, owner_uid)
+            SELECT $1, $2 WHERE NOT EXISTS (SELECT 1 FROM existing)
+            RETURNING id
+        )
+        SELECT id FROM existing UNION ALL SELECT id FROM created LIMIT 1
+    """, title, owner_uid)
+
+
+async def bulk_insert_feeds(
+    conn: Connection,
+    feeds: Sequence[FeedCreateRequest]
+) -> Dict[str, int]:
+    '''
+    @brief Insert many feeds into the ttrss_feeds table with one statement, skipping the ones already stored.
+
+    The 'Sin clasificar' category is resolved once for the whole batch, and
+    all the feeds are written by a single `INSERT ... SELECT FROM unnest(...)
+    ON CONFLICT DO NOTHING`, so a feed URL already in the table (or repeated
+    in the batch) is skipped instead of failing the insert.
+
+    @param conn Active database connection (asyncpg.Connection).
+    @param feeds Validated feeds to insert (Sequence[FeedCreateRequest]).
+    @return Dictionary with the number of feeds "inserted" and "skipped" (Dict[str, int]).
+            Raises HTTPException if the statement fails; nothing is inserted then.
+    '''
+    unique = {}
+    for feed in feeds:
+        unique.setdefault(str(feed.feed_url), feed)
+    if not unique:
+        return {"inserted": 0, "skipped": len(feeds)}
+    batch = list(unique.values())
+    try:
+        cat_id = await get_default_category_id(conn, batch[0].owner_uid)
+        rows = await conn.fetch("""
+            INSERT INTO ttrss_feeds (title, feed_url, site_url, owner_uid, cat_id)
+            SELECT left(f.title, $6), f.feed_url, f.site_url, f.owner_uid, $5
+            FROM unnest($1::text[], $2::text[], $3::text[], $4::int[])
+                AS f(title, feed_url, site_url, owner_uid)
+            ON CONFLICT DO NOTHING
+            RETURNING feed_url
+        """, [feed.title for feed in batch], list(unique), [feed.site_url for feed in batch],
+             [feed.owner_uid for feed in batch], cat_id, FEED_TITLE_MAX)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al insertar los feeds en la base de datos: {str(e)}"
+        )
+    return {"inserted": len(rows), "skipped": len(feeds) - len(rows)}
+
+
+async def get_entry_links(
+    conn: Connection,
+    with_ids: bool = False,
+    owner_uid: Optional[int] = None
+) -> Union[List[str], List[Tuple[int, str]]]:
     '''
     @brief Retrieve entry links that are unread (unread = true) for a specific user.
 
     Fetches all entry URLs that have not yet been viewed by the user 'admin'.
 
     @param conn Active database connection (asyncpg.Connection).
-    @return List of URLs not yet viewed by the user (List[str]).
+    @param with_ids Return (entry id, link) pairs so callers can update by primary key (bool).
+    @param owner_uid Id of the user, if already known (see `get_owner_uid`) (int).
+    @return List of URLs, or of (id, URL) pairs, not yet viewed by the user.
     '''
-    login = "admin"
-
-    row = await conn.fetchrow(
-        "SELECT id FROM ttrss_users WHERE login = $1",
-        login
-    )
-    if not row:
-        raise ValueError("User not found")
-    owner_uid = row["id"]
+    if owner_uid is None:
+        owner_uid = await get_owner_uid(conn)
     rows = await conn.fetch(
         """
-        SELECT e.link
+        SELECT e.id, e.link
         FROM ttrss_entries e
         JOIN ttrss_user_entries u ON u.ref_id = e.id
         WHERE e.link IS NOT NULL
@@ -116,40 +273,208 @@ async def get_entry_links(conn: Connection) -> List[str]:
         """,
         owner_uid
     )
+    if with_ids:
+        return [(row["id"], row["link"]) for row in rows]
     return [row["link"] for row in rows]
 
 
-async def mark_entry_as_viewed(conn: Connection, url: str) -> None:
+async def install_new_entry_trigger(conn: Connection, channel: str = NEW_ENTRY_CHANNEL) -> None:
+    '''
+    @brief Install (or replace) the trigger that notifies new unread entries on `channel`.
+
+    Statement-level AFTER INSERT trigger on ttrss_user_entries: one `pg_notify` per insert
+    statement that adds unread rows, with the number of rows as payload, so a feed update
+    costs a single notification. Requires PostgreSQL 10+ (transition tables; the trigger uses
+    `EXECUTE PROCEDURE`, also accepted by later versions) and rights to create triggers.
+
+    @param conn Active database connection (asyncpg.Connection).
+    @param channel LISTEN channel name, a plain SQL identifier (str).
+    @return None. Raises ValueError for an invalid channel name.
+    '''
+    if not re.fullmatch(r"[a-z_][a-z0-9_]*", channel):
+        raise ValueError(f"Invalid channel name: {channel}")
+    async with conn.transaction():
+        await conn.execute(f"""
+            CREATE OR REPLACE FUNCTION {channel}_notify() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            DECLARE
+                added integer;
+            BEGIN
+                SELECT count(*) INTO added FROM new_rows WHERE unread;
+                IF added > 0 THEN
+                    PERFORM pg_notify('{channel}', added::text);
+                END IF;
+                RETURN NULL;
+            END
+            $$;
+            DROP TRIGGER IF EXISTS {channel} ON ttrss_user_entries;
+            CREATE TRIGGER {channel}
+                AFTER INSERT ON ttrss_user_entries
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE PROCEDURE {channel}_notify();
+        """)
+
+
+async def uninstall_new_entry_trigger(conn: Connection, channel: str = NEW_ENTRY_CHANNEL) -> None:
+    '''
+    @brief Remove the trigger and function created by `install_new_entry_trigger`.
+
+    @param conn Active database connection (asyncpg.Connection).
+    @param channel LISTEN channel name used at install time (str).
+    @return None. Raises ValueError for an invalid channel name.
+    '''
+    if not re.fullmatch(r"[a-z_][a-z0-9_]*", channel):
+        raise ValueError(f"Invalid channel name: {channel}")
+    await conn.execute(f"""
+        DROP TRIGGER IF EXISTS {channel} ON ttrss_user_entries;
+        DROP FUNCTION IF EXISTS {channel}_notify();
+    """)
+
+
+async def iter_unread_entry_batches(
+    pool: Any,
+    owner_uid: Optional[int] = None,
+    batch_size: int = UNREAD_BATCH_SIZE,
+    after_id: int = 0,
+    with_content: bool = False
+) -> AsyncIterator[List[Tuple]]:
+    '''
+    @brief Stream the unread entries of the user in bounded batches ordered by entry id.
+
+    Keyset pagination (`e.id > last id ORDER BY e.id LIMIT n`): each page is a short query on
+    its own pooled connection, so no connection is held while the caller processes a batch and
+    a large backlog never has to fit in memory at once.
+
+    @param pool asyncpg pool used to acquire a connection per page (asyncpg.Pool).
+    @param owner_uid Id of the user, if already known; otherwise the admin id is looked up (int).
+    @param batch_size Maximum number of entries per batch (int).
+    @param after_id Only return entries with a greater id (int).
+    @param with_content Also return the title and the HTML content stored by Tiny Tiny RSS (bool).
+    @return Async iterator of lists of (entry id, link) pairs, or (entry id, link, title, content) tuples.
+    '''
+    columns = "e.id, e.link, e.title, e.content" if with_content else "e.id, e.link"
+    last_id = after_id
+    while True:
+        async with pool.acquire() as conn:
+            if owner_uid is None:
+                owner_uid = await get_owner_uid(conn, pool=pool)
+            rows = await conn.fetch(
+                f"""
+                SELECT {columns}
+                FROM ttrss_entries e
+                JOIN ttrss_user_entries u ON u.ref_id = e.id
+                WHERE e.link IS NOT NULL
+                  AND u.owner_uid = $1
+                  AND u.unread = TRUE
+                  AND e.id > $2
+                ORDER BY e.id
+                LIMIT $3
+                """,
+                owner_uid,
+                last_id,
+                batch_size
+            )
+        if not rows:
+            return
+        if with_content:
+            batch = [(row["id"], row["link"], row["title"], row["content"]) for row in rows]
+        else:
+            batch = [(row["id"], row["link"]) for row in rows]
+        yield batch
+        if len(batch) < batch_size:
+            return
+        last_id = batch[-1][0]
+
+
+async def mark_entry_as_viewed(conn: Connection, url: str, owner_uid: Optional[int] = None) -> None:
     '''
     @brief Mark an entry as viewed (unread = false) for the user with login "admin".
 
     Updates the database to mark the entry with the given URL as viewed for the user 'admin'.
+    To mark many entries use `mark_entries_as_viewed`, which needs a single round trip.
 
     @param conn Active database connection (asyncpg.Connection).
     @param url URL to mark as viewed (str).
+    @param owner_uid Id of the user, if already known (see `get_owner_uid`) (int).
     @return None.
     '''
-    login = "admin"
+    if owner_uid is None:
+        owner_uid = await get_owner_uid(conn)
+    await _update_links_viewed(conn, [url], owner_uid)
 
-    row = await conn.fetchrow(
-        "SELECT id FROM ttrss_users WHERE login = $1",
-        login
-    )
-    if not row:
-        raise ValueError("User not found")
-    owner_uid = row["id"]
 
-    await conn.execute(
+async def mark_entries_as_viewed(
+    conn: Connection,
+    entry_ids: Sequence[int],
+    owner_uid: Optional[int] = None
+) -> int:
+    '''
+    @brief Mark a batch of entries as viewed by primary key in one UPDATE and one transaction.
+
+    @param conn Active database connection (asyncpg.Connection).
+    @param entry_ids Ids of the ttrss_entries rows (Sequence[int]).
+    @param owner_uid Id of the user, if already known (see `get_owner_uid`) (int).
+    @return Number of user entries updated (int).
+    '''
+    if not entry_ids:
+        return 0
+    async with conn.transaction():
+        if owner_uid is None:
+            owner_uid = await get_owner_uid(conn)
+        status = await conn.execute(
+            """
+            UPDATE ttrss_user_entries
+            SET unread = FALSE
+            WHERE owner_uid = $1
+              AND ref_id = ANY($2::int[])
+              AND unread = TRUE
+            """,
+            owner_uid,
+            list(entry_ids)
+        )
+    return _updated_rows(status)
+
+
+async def _update_links_viewed(conn: Connection, urls: Sequence[str], owner_uid: int) -> int:
+    '''
+    @brief Run the UPDATE that marks the entries with the given links as viewed.
+
+    @param conn Active database connection (asyncpg.Connection).
+    @param urls Links of the entries (Sequence[str]).
+    @param owner_uid Id of the user (int).
+    @return Number of user entries updated (int).
+    '''
+    status = await conn.execute(
         """
         UPDATE ttrss_user_entries u
         SET unread = FALSE
         FROM ttrss_entries e
         WHERE u.ref_id = e.id
           AND u.owner_uid = $1
-          AND e.link = $2
+          AND e.link = ANY($2::text[])
         """,
         owner_uid,
-        url
+        list(urls)
     )
+    return _updated_rows(status)
+
 
+async def mark_links_as_viewed(
+    conn: Connection,
+    urls: Sequence[str],
+    owner_uid: Optional[int] = None
+) -> int:
+    '''
+    @brief Mark a batch of entries as viewed by link in one UPDATE and one transaction.
 
+    @param conn Active database connection (asyncpg.Connection).
+    @param urls Links of the entries (Sequence[str]).
+    @param owner_uid Id of the user, if already known (see `get_owner_uid`) (int).
+    @return Number of user entries updated (int).
+    '''
+    if not urls:
+        return 0
+    async with conn.transaction():
+        if owner_uid is None:
+            owner_uid = await get_owner_uid(conn)
+        return await _update_links_viewed(conn, urls, owner_uid)
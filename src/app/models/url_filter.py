@@ -0,0 +1,287 @@
+"""
+@file url_filter.py
+@author naflashDev
+@brief Persistent memory-mapped Bloom filter of crawled URLs.
+@details Remembers which article URLs were already fetched so the dynamic
+         spider and the news search skip them when they show up again in
+         another feed or search. URLs are canonicalized first
+         (`canonicalize_url`), hashed once with BLAKE2b and mapped to `k` bit
+         positions by double hashing. The bit array lives in a file mapped
+         with `mmap`, so it survives restarts and only the touched pages are
+         loaded: about 1.8 MB per million URLs at a 0.1 % false-positive
+         rate. A false positive only skips a URL that was never crawled; a
+         crawled URL is never reported as new. Writers in different processes
+         are serialized with the same OS-level file lock as the result store.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterable, Iterator, List
+from loguru import logger
+
+from app.models.result_store import _os_file_lock
+from app.utils.url_utils import canonicalize_url
+
+# Default location of the filter file
+URL_FILTER_PATH = "./outputs/url_filter.bloom"
+# URLs the default filter is sized for and target false-positive rate at that size
+DEFAULT_CAPACITY = 2_000_000
+DEFAULT_ERROR_RATE = 0.001
+
+_MAGIC = b"CMBLOOM1"
+# magic, bits, hash functions, capacity, error rate, URLs added
+_HEADER = struct.Struct("<8sQIQdQ")
+_HEADER_SIZE = 64
+_COUNT_OFFSET = _HEADER.size - 8
+
+
+def bloom_parameters(capacity: int, error_rate: float) -> tuple:
+    '''
+    @brief Optimal bit count and number of hash functions for a Bloom filter.
+
+    @param capacity Expected number of URLs (int).
+    @param error_rate Target false-positive rate at that size, 0 < rate < 1 (float).
+    @return Tuple (bits, hash functions) (tuple).
+    '''
+    if capacity <= 0 or not 0 < error_rate < 1:
+        raise ValueError("capacity must be positive and error_rate between 0 and 1")
+    bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+    bits = (bits + 7) // 8 * 8
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class UrlFilter:
+    '''
+    @brief Bloom filter of canonical URLs backed by a memory-mapped file.
+    '''
+
+    def __init__(
+        self,
+        path: str = URL_FILTER_PATH,
+        capacity: int = DEFAULT_CAPACITY,
+        error_rate: float = DEFAULT_ERROR_RATE,
+    ) -> None:
+        '''
+        @brief Open the filter file, creating it if missing or unreadable.
+
+        An existing file keeps the size it was created with; `capacity` and
+        `error_rate` only apply to new files.
+
+        @param path Filter file (str).
+        @param capacity Expected number of URLs (int).
+        @param error_rate Target false-positive rate at `capacity` URLs (float).
+        '''
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._lock = threading.Lock()
+        self._saturation_logged = False
+        self.created = False
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with _os_file_lock(self.lock_path):
+            if not self._read_header():
+                self._create(capacity, error_rate)
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), _HEADER_SIZE + self.bits // 8)
+
+    def _read_header(self) -> bool:
+        '''
+        @brief Load the parameters of an existing filter file.
+
+        @return True if the file exists and is a valid filter (bool).
+        '''
+        try:
+            with open(self.path, "rb") as fh:
+                header = fh.read(_HEADER_SIZE)
+                size = os.fstat(fh.fileno()).st_size
+        except FileNotFoundError:
+            return False
+        if len(header) < _HEADER.size:
+            logger.warning(f"[url_filter] {self.path} is truncated; recreating it.")
+            return False
+        magic, bits, hashes, capacity, error_rate, _ = _HEADER.unpack_from(header)
+        if magic != _MAGIC or not bits or bits % 8 or not hashes or size != _HEADER_SIZE + bits // 8:
+            logger.warning(f"[url_filter] {self.path} is not a valid URL filter; recreating it.")
+            return False
+        self.bits, self.hashes, self.capacity, self.error_rate = bits, hashes, capacity, error_rate
+        return True
+
+    def _create(self, capacity: int, error_rate: float) -> None:
+        '''
+        @brief Write an empty filter file sized for `capacity` URLs.
+
+        @param capacity Expected number of URLs (int).
+        @param error_rate Target false-positive rate (float).
+        @return None.
+        '''
+        self.bits, self.hashes = bloom_parameters(capacity, error_rate)
+        self.capacity, self.error_rate = capacity, error_rate
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(_HEADER.pack(_MAGIC, self.bits, self.hashes, capacity, error_rate, 0).ljust(_HEADER_SIZE, b"\0"))
+            fh.truncate(_HEADER_SIZE + self.bits // 8)
+        os.replace(tmp, self.path)
+        self.created = True
+        logger.info(
+            f"[url_filter] Created {self.path}: {self.bits // 8 / 1e6:.1f} MB for {capacity} URLs "
+            f"at {error_rate:.2%} false positives."
+        )
+
+    def _positions(self, url: str) -> Iterator[int]:
+        '''
+        @brief Bit positions of a URL (double hashing of one BLAKE2b digest).
+
+        @param url URL, canonicalized before hashing (str).
+        @return Iterator of bit indexes.
+        '''
+        digest = hashlib.blake2b(canonicalize_url(url).encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def _test(self, positions: Iterable[int]) -> bool:
+        data = self._map
+        return all(data[_HEADER_SIZE + p // 8] & (1 << (p % 8)) for p in positions)
+
+    def _set(self, positions: Iterable[int]) -> bool:
+        '''
+        @brief Set the bits of one URL; the caller holds the locks.
+
+        @return True if at least one bit was clear, i.e. the URL was new (bool).
+        '''
+        data = self._map
+        new = False
+        for p in positions:
+            index = _HEADER_SIZE + p // 8
+            byte = data[index]
+            mask = 1 << (p % 8)
+            if not byte & mask:
+                data[index] = byte | mask
+                new = True
+        return new
+
+    def __contains__(self, url: str) -> bool:
+        '''
+        @brief Tell whether a URL was (probably) added before.
+
+        @param url URL (str).
+        @return False if the URL is certainly new, True if it was probably seen (bool).
+        '''
+        return self._test(list(self._positions(url)))
+
+    @property
+    def count(self) -> int:
+        '''
+        @brief Number of distinct URLs added, shared by every process using the file.
+
+        @return Count (int).
+        '''
+        return struct.unpack_from("<Q", self._map, _COUNT_OFFSET)[0]
+
+    def add(self, url: str) -> bool:
+        '''
+        @brief Add a URL.
+
+        @param url URL (str).
+        @return True if the URL was new (bool).
+        '''
+        return self.add_many([url]) == 1
+
+    def add_many(self, urls: Iterable[str]) -> int:
+        '''
+        @brief Add several URLs under a single lock acquisition.
+
+        @param urls URLs (Iterable[str]).
+        @return Number of URLs that were new (int).
+        '''
+        positions = [list(self._positions(url)) for url in urls if url]
+        if not positions:
+            return 0
+        with self._lock, _os_file_lock(self.lock_path):
+            added = sum(1 for p in positions if self._set(p))
+            if added:
+                struct.pack_into("<Q", self._map, _COUNT_OFFSET, self.count + added)
+        if added and self.count > self.capacity and not self._saturation_logged:
+            self._saturation_logged = True
+            logger.warning(
+                f"[url_filter] {self.path} holds {self.count} URLs, above its capacity of {self.capacity}; "
+                f"false positives now around {self.expected_error_rate():.2%}."
+            )
+        return added
+
+    def filter_new(self, urls: Iterable[str]) -> List[str]:
+        '''
+        @brief Keep the URLs not seen before, also dropping canonical duplicates within the list.
+
+        @param urls Candidate URLs (Iterable[str]).
+        @return New URLs in their original order and spelling (List[str]).
+        '''
+        seen = set()
+        new = []
+        for url in urls:
+            key = canonicalize_url(url)
+            if key in seen:
+                continue
+            seen.add(key)
+            if url not in self:
+                new.append(url)
+        return new
+
+    def expected_error_rate(self) -> float:
+        '''
+        @brief Expected false-positive rate at the current fill.
+
+        @return Probability (float).
+        '''
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def flush(self) -> None:
+        '''
+        @brief Write dirty pages to disk.
+
+        @return None.
+        '''
+        self._map.flush()
+
+    def close(self) -> None:
+        '''
+        @brief Flush and unmap the file.
+
+        @return None.
+        '''
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+        self._file.close()
+
+
+_filters: Dict[str, UrlFilter] = {}
+_filters_lock = threading.Lock()
+
+
+def get_url_filter(
+    path: str = URL_FILTER_PATH,
+    capacity: int = DEFAULT_CAPACITY,
+    error_rate: float = DEFAULT_ERROR_RATE,
+) -> UrlFilter:
+    '''
+    @brief Return the process-wide filter for `path`, opening it on first use.
+
+    @param path Filter file (str).
+    @param capacity Expected number of URLs when the file is created (int).
+    @param error_rate Target false-positive rate when the file is created (float).
+    @return Shared UrlFilter instance.
+    '''
+    key = os.path.abspath(path)
+    with _filters_lock:
+        url_filter = _filters.get(key)
+        if url_filter is None:
+            url_filter = UrlFilter(path, capacity, error_rate)
+            _filters[key] = url_filter
+        return url_filter
@@ -0,0 +1,449 @@
+"""
+@file url_frontier.py
+@author naflashDev
+@brief Central SQLite URL frontier shared by every URL producer and crawler.
+@details Google Alerts (`fetch_and_save_alert_urls`), the dork feed search
+         (`run_dork_search_feed`) and the Tiny Tiny RSS entries used to
+         deduplicate against plain text files read into a set on every run,
+         and tracking parameters or `www.` variants slipped through as
+         different URLs. The frontier keeps one row per canonical URL
+         (`canonicalize_url`) and queue in an indexed SQLite table with its
+         first/last seen and last crawled times, plus per-domain crawl state.
+         Producers upsert in bulk and get back only the URLs that were new;
+         crawlers claim prioritized batches with a lease (at most a few URLs
+         per domain each) and report them as crawled or failed. Several
+         processes can share the database (WAL mode, claims taken under
+         `BEGIN IMMEDIATE`).
+         The feed discovery probes are also cached per site origin
+         (`origin_probes`): the feed URLs found, a fingerprint of the page's
+         feed `<link>` tags and the probe time, so a site already probed is
+         not crawled again until its probe expires.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+from loguru import logger
+
+from app.utils.url_utils import canonicalize_url
+
+# Default location of the frontier database
+URL_FRONTIER_PATH = "./data/url_frontier.db"
+
+# Pages scanned by the RSS extractor to discover feeds
+FEED_DISCOVERY_QUEUE = "feed_discovery"
+# Article pages crawled by the dynamic spider
+ARTICLE_QUEUE = "article"
+
+# Seconds a claimed URL stays reserved before another crawler may take it
+DEFAULT_LEASE = 3600.0
+# Failed claims after which a URL is no longer handed out
+MAX_ATTEMPTS = 3
+# SQLite limits the number of bound parameters per statement
+_CHUNK = 500
+
+
+def open_frontier(path: str = URL_FRONTIER_PATH) -> sqlite3.Connection:
+    '''
+    @brief Open (and create if needed) the URL frontier.
+
+    @param path Path to the SQLite database file (str).
+    @return Open SQLite connection with the schema in place (sqlite3.Connection).
+    '''
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS urls ("
+        " id INTEGER PRIMARY KEY,"
+        " queue TEXT NOT NULL,"
+        " url TEXT NOT NULL,"
+        " original TEXT NOT NULL,"
+        " domain TEXT NOT NULL,"
+        " source TEXT,"
+        " priority INTEGER NOT NULL DEFAULT 0,"
+        " first_seen REAL NOT NULL,"
+        " last_seen REAL NOT NULL,"
+        " last_crawled REAL,"
+        " claimed_until REAL,"
+        " attempts INTEGER NOT NULL DEFAULT 0,"
+        " UNIQUE (queue, url))"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS urls_claim ON urls (queue, last_crawled, priority DESC, id)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS domains ("
+        " domain TEXT PRIMARY KEY,"
+        " last_crawled REAL,"
+        " crawled INTEGER NOT NULL DEFAULT 0,"
+        " failures INTEGER NOT NULL DEFAULT 0)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS origin_probes ("
+        " origin TEXT PRIMARY KEY,"
+        " feeds TEXT NOT NULL,"
+        " fingerprint TEXT,"
+        " probed_at REAL NOT NULL,"
+        " changed_at REAL NOT NULL,"
+        " probes INTEGER NOT NULL DEFAULT 1)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS frontier_meta ("
+        " key TEXT PRIMARY KEY,"
+        " value TEXT)"
+    )
+    conn.commit()
+    return conn
+
+
+def _domain(canonical: str) -> str:
+    '''
+    @brief Host of a canonical URL (empty for values that are not URLs).
+
+    @param canonical Canonical URL (str).
+    @return Domain (str).
+    '''
+    try:
+        return urlsplit(canonical).hostname or ""
+    except ValueError:
+        return ""
+
+
+def site_origin(url: str) -> str:
+    '''
+    @brief Origin (scheme and host) of a URL, in canonical form, used as key of the probe cache.
+
+    @param url URL (str).
+    @return Origin such as "https://example.com", or "" for values that are not http(s) URLs (str).
+    '''
+    parts = urlsplit(canonicalize_url(url))
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return ""
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _chunks(items: List, size: int = _CHUNK) -> Iterable[List]:
+    '''
+    @brief Split a list into slices that fit the SQLite bound-parameter limit.
+
+    @param items Values to bind (List).
+    @param size Maximum values per slice (int).
+    @return Iterator of consecutive slices (Iterable[List]).
+    '''
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def upsert_urls(
+    conn: sqlite3.Connection,
+    urls: Iterable[str],
+    queue: str = FEED_DISCOVERY_QUEUE,
+    source: Optional[str] = None,
+    priority: int = 0,
+) -> List[str]:
+    '''
+    @brief Insert new URLs into a queue and refresh the last-seen time of known ones.
+
+    URLs are compared by canonical form; the first spelling seen is the one
+    handed to crawlers. A known URL keeps the highest priority it was given.
+
+    @param conn Open frontier connection (sqlite3.Connection).
+    @param urls URLs found by the producer (Iterable[str]).
+    @param queue Queue name, e.g. FEED_DISCOVERY_QUEUE (str).
+    @param source Producer name, stored for new URLs (str).
+    @param priority Claim priority, higher first (int).
+    @return URLs that were not in the queue yet, in their original spelling and order (List[str]).
+    '''
+    batch = {}
+    for url in urls:
+        url = (url or "").strip()
+        if url:
+            batch.setdefault(canonicalize_url(url), url)
+    if not batch:
+        return []
+    now = time.time()
+    keys = list(batch)
+    known = set()
+    for chunk in _chunks(keys):
+        marks = ",".join("?" * len(chunk))
+        rows = conn.execute(f"SELECT url FROM urls WHERE queue = ? AND url IN ({marks})", [queue, *chunk])
+        known.update(row[0] for row in rows)
+    new = [key for key in keys if key not in known]
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO urls (queue, url, original, domain, source, priority, first_seen, last_seen)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(queue, key, batch[key], _domain(key), source, priority, now, now) for key in new],
+        )
+        conn.executemany(
+            "UPDATE urls SET last_seen = ?, priority = MAX(priority, ?) WHERE queue = ? AND url = ?",
+            [(now, priority, queue, key) for key in known],
+        )
+    return [batch[key] for key in new]
+
+
+def known_urls(conn: sqlite3.Connection, urls: Iterable[str], queue: str = FEED_DISCOVERY_QUEUE) -> set:
+    '''
+    @brief Indexed lookup of the given URLs already in a queue.
+
+    @param conn Open frontier connection (sqlite3.Connection).
+    @param urls URLs to check (Iterable[str]).
+    @param queue Queue name (str).
+    @return Subset of `urls` (original spelling) already known (set).
+    '''
+    by_key = {}
+    for url in urls:
+        by_key.setdefault(canonicalize_url(url), []).append(url)
+    found = set()
+    keys = list(by_key)
+    for chunk in _chunks(keys):
+        marks = ",".join("?" * len(chunk))
+        for (key,) in conn.execute(f"SELECT url FROM urls WHERE queue = ? AND url IN ({marks})", [queue, *chunk]):
+            found.update(by_key[key])
+    return found
+
+
+def claim_batch(
+    conn: sqlite3.Connection,
+    queue: str = FEED_DISCOVERY_QUEUE,
+    limit: int = 100,
+    per_domain: int = 5,
+    lease: float = DEFAULT_LEASE,
+    recrawl_after: Optional[float] = None,
+) -> List[Tuple[int, str]]:
+    '''
+    @brief Reserve the next URLs to crawl, highest priority and oldest first.
+
+    A URL is claimable if it was never crawled (or, with `recrawl_after`, was
+    crawled that many seconds ago), is not leased to another crawler and has
+    failed fewer than MAX_ATTEMPTS times. At most `per_domain` URLs of the
+    same domain are taken so one large site does not fill the batch.
+
+    @param conn Open frontier connection (sqlite3.Connection).
+    @param queue Queue name (str).
+    @param limit Maximum URLs to claim (int).
+    @param per_domain Maximum URLs of one domain in the batch (int).
+    @param lease Seconds the claim is held before it expires (float).
+    @param recrawl_after Seconds after which crawled URLs become claimable again; None never (float).
+    @return List of (url id, original URL) pairs (List[Tuple[int, str]]).
+    '''
+    now = time.time()
+    cutoff = now - recrawl_after if recrawl_after is not None else None
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            "SELECT id, original, domain FROM urls"
+            " WHERE queue = ? AND (last_crawled IS NULL OR last_crawled < ?)"
+            " AND (claimed_until IS NULL OR claimed_until < ?) AND attempts < ?"
+            " ORDER BY priority DESC, id LIMIT ?",
+            (queue, cutoff if cutoff is not None else float("-inf"), now, MAX_ATTEMPTS, limit * per_domain),
+        ).fetchall()
+        taken = Counter()
+        claimed = []
+        for url_id, original, domain in rows:
+            if taken[domain] >= per_domain:
+                continue
+            taken[domain] += 1
+            claimed.append((url_id, original))
+            if len(claimed) >= limit:
+                break
+        conn.executemany(
+            "UPDATE urls SET claimed_until = ?, attempts = attempts + 1 WHERE id = ?",
+            [(now + lease, url_id) for url_id, _ in claimed],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return claimed
+
+
+def complete_urls(conn: sqlite3.Connection, ids: Iterable[int], ok: bool = True) -> int:
+    '''
+    @brief Release claimed URLs, recording them as crawled or failed, and update their domains.
+
+    Failed URLs become claimable again until they reach MAX_ATTEMPTS.
+
+    @param conn Open frontier connection (sqlite3.Connection).
+    @param ids Ids returned by `claim_batch` (Iterable[int]).
+    @param ok True if the URLs were crawled, False if the crawl failed (bool).
+    @return Number of URLs updated (int).
+    '''
+    ids = list(ids)
+    if not ids:
+        return 0
+    now = time.time()
+    domains = Counter()
+    with conn:
+        for chunk in _chunks(ids):
+            marks = ",".join("?" * len(chunk))
+            domains.update(
+                row[0] for row in conn.execute(f"SELECT domain FROM urls WHERE id IN ({marks})", chunk)
+            )
+            if ok:
+                conn.execute(
+                    f"UPDATE urls SET last_crawled = ?, claimed_until = NULL, attempts = 0 WHERE id IN ({marks})",
+                    [now, *chunk],
+                )
+            else:
+                conn.execute(f"UPDATE urls SET claimed_until = NULL WHERE id IN ({marks})", chunk)
+        conn.executemany(
+            "INSERT INTO domains (domain, last_crawled, crawled, failures) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(domain) DO UPDATE SET"
+            " last_crawled = COALESCE(excluded.last_crawled, last_crawled),"
+            " crawled = crawled + excluded.crawled, failures = failures + excluded.failures",
+            [
+                (domain, now if ok else None, count if ok else 0, 0 if ok else count)
+                for domain, count in domains.items()
+            ],
+        )
+    return len(ids)
+
+
+def record_crawled(
+    conn: sqlite3.Connection,
+    urls: Iterable[str],
+    queue: str = ARTICLE_QUEUE,
+    source: Optional[str] = None,
+) -> int:
+    '''
+    @brief Upsert URLs crawled outside the frontier (e.g. Tiny Tiny RSS entries) and mark them crawled.
+
+    @param conn Open frontier connection (sqlite3.Connection).
+    @param urls Crawled URLs (Iterable[str]).
+    @param queue Queue name (str).
+    @param source Producer name for new URLs (str).
+    @return Number of URLs recorded (int).
+    '''
+    urls = list(urls)
+    upsert_urls(conn, urls, queue=queue, source=source)
+    keys = list(dict.fromkeys(canonicalize_url(url) for url in urls if url and url.strip()))
+    ids = []
+    for chunk in _chunks(keys):
+        marks = ",".join("?" * len(chunk))
+        ids.extend(row[0] for row in conn.execute(f"SELECT id FROM urls WHERE queue = ? AND url IN ({marks})", [queue, *chunk]))
+    return complete_urls(conn, ids)
+
+
+def import_url_file(
+    conn: sqlite3.Connection,
+    path,
+    queue: str = FEED_DISCOVERY_QUEUE,
+    source: Optional[str] = None,
+) -> int:
+    '''
+    @brief Import a legacy one-URL-per-line file into a queue, once per file.
+
+    @param conn Open frontier connection (sqlite3.Connection).
+    @param path Text file of URLs (str | Path).
+    @param queue Queue name (str).
+    @param source Producer name for the imported URLs (str).
+    @return Number of new URLs imported; 0 if the file was imported before or is missing (int).
+    '''
+    path = path if isinstance(path, Path) else Path(path)
+    key = f"imported:{queue}:{os.path.abspath(str(path))}"
+    if conn.execute("SELECT 1 FROM frontier_meta WHERE key = ?", (key,)).fetchone():
+        return 0
+    added = []
+    if path.exists():
+        with path.open("r", encoding="utf-8") as fh:
+            added = upsert_urls(conn, (line.strip() for line in fh), queue=queue, source=source)
+        logger.info(f"[url_frontier] Imported {len(added)} URLs from {path}")
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO frontier_meta (key, value) VALUES (?, ?)", (key, str(time.time())))
+    return len(added)
+
+
+def fresh_origins(
+    conn: sqlite3.Connection,
+    origins: Iterable[str],
+    ttl: float,
+    now: Optional[float] = None,
+) -> Dict[str, List[str]]:
+    '''
+    @brief Origins probed for feeds less than `ttl` seconds ago, with the feeds found then.
+
+    @param conn Open frontier connection (sqlite3.Connection).
+    @param origins Site origins (Iterable[str]).
+    @param ttl Seconds a probe stays valid (float).
+    @param now Current time (float); time.time() when None.
+    @return Mapping origin -> cached feed URLs, for the fresh origins only (Dict[str, List[str]]).
+    '''
+    now = time.time() if now is None else now
+    keys = list(dict.fromkeys(origin for origin in origins if origin))
+    fresh = {}
+    for chunk in _chunks(keys):
+        marks = ",".join("?" * len(chunk))
+        rows = conn.execute(
+            f"SELECT origin, feeds FROM origin_probes WHERE origin IN ({marks}) AND probed_at > ?",
+            [*chunk, now - ttl],
+        )
+        fresh.update((origin, json.loads(feeds)) for origin, feeds in rows)
+    return fresh
+
+
+def record_probes(
+    conn: sqlite3.Connection,
+    probes: Iterable[Tuple[str, Sequence[str], Optional[str]]],
+    now: Optional[float] = None,
+) -> int:
+    '''
+    @brief Store the result of feed discovery probes, one per origin.
+
+    `changed_at` only moves when the fingerprint differs from the stored one.
+
+    @param conn Open frontier connection (sqlite3.Connection).
+    @param probes Tuples (origin, feed URLs found, fingerprint of the feed links) (Iterable[Tuple]).
+    @param now Current time (float); time.time() when None.
+    @return Number of probed origins whose feed links changed or were new (int).
+    '''
+    now = time.time() if now is None else now
+    rows = {}
+    for origin, feeds, fingerprint in probes:
+        if origin:
+            rows[origin] = (json.dumps(sorted(set(feeds))), fingerprint)
+    if not rows:
+        return 0
+    known = {}
+    for chunk in _chunks(list(rows)):
+        marks = ",".join("?" * len(chunk))
+        known.update(conn.execute(f"SELECT origin, fingerprint FROM origin_probes WHERE origin IN ({marks})", chunk))
+    changed = sum(1 for origin, (_, fingerprint) in rows.items() if origin not in known or known[origin] != fingerprint)
+    with conn:
+        conn.executemany(
+            "INSERT INTO origin_probes (origin, feeds, fingerprint, probed_at, changed_at) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(origin) DO UPDATE SET"
+            " changed_at = CASE WHEN fingerprint IS excluded.fingerprint THEN changed_at ELSE excluded.changed_at END,"
+            " feeds = excluded.feeds, fingerprint = excluded.fingerprint,"
+            " probed_at = excluded.probed_at, probes = probes + 1",
+            [(origin, feeds, fingerprint, now, now) for origin, (feeds, fingerprint) in rows.items()],
+        )
+    return changed
+
+
+def frontier_stats(conn: sqlite3.Connection, queue: str = FEED_DISCOVERY_QUEUE) -> dict:
+    '''
+    @brief Counters of a queue: total, pending, crawled and given up URLs, and domains.
+
+    @param conn Open frontier connection (sqlite3.Connection).
+    @param queue Queue name (str).
+    @return Dictionary of counters (dict).
+    '''
+    total, crawled, failed, domains = conn.execute(
+        "SELECT COUNT(*), COUNT(last_crawled),"
+        " SUM(CASE WHEN last_crawled IS NULL AND attempts >= ? THEN 1 ELSE 0 END),"
+        " COUNT(DISTINCT domain) FROM urls WHERE queue = ?",
+        (MAX_ATTEMPTS, queue),
+    ).fetchone()
+    failed = failed or 0
+    return {
+        "total": total, "pending": total - crawled - failed,
+        "crawled": crawled, "failed": failed, "domains": domains,
+    }
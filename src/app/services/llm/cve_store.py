@@ -0,0 +1,237 @@
+"""
+@file cve_store.py
+@author naflashDev
+@brief Persistent per-CVE record store used by the incremental CVE rebuild.
+@details Keeps the transformed instruction records of every cvelistV5 file in a
+         small SQLite database keyed by the file path relative to the repository
+         root, together with the last consolidated git commit (watermark). The
+         consolidated `cve_list.json` is exported from this store, so a weekly
+         run only has to re-transform the files git reports as changed. Rows
+         not written to the export yet are flagged; when a run only added
+         files they are appended to the existing JSON array in place, and the
+         file is only rewritten after modifications or deletions.
+"""
+
+import json
+import os
+import sqlite3
+from typing import Iterable, Optional, Tuple
+from loguru import logger
+
+WATERMARK_KEY = "last_commit"
+# Set when rows already exported were changed or removed: the export must be rewritten
+EXPORT_STALE_KEY = "export_stale"
+
+
+def open_store(store_path: str) -> sqlite3.Connection:
+    '''
+    @brief Open (and create if needed) the CVE record store.
+
+    @param store_path Path to the SQLite database file (str).
+    @return Open SQLite connection with the schema in place (sqlite3.Connection).
+    '''
+    os.makedirs(os.path.dirname(store_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(store_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cve_records ("
+        " path TEXT PRIMARY KEY,"
+        " records TEXT NOT NULL,"
+        " exported INTEGER NOT NULL DEFAULT 0)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS store_meta ("
+        " key TEXT PRIMARY KEY,"
+        " value TEXT)"
+    )
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(cve_records)")}
+    if "exported" not in columns:
+        # Store created before the export flags: the next export is a full rewrite
+        conn.execute("ALTER TABLE cve_records ADD COLUMN exported INTEGER NOT NULL DEFAULT 0")
+        _mark_export_stale(conn)
+    conn.commit()
+    return conn
+
+
+def _mark_export_stale(conn: sqlite3.Connection) -> None:
+    '''
+    @brief Flag the exported JSON as outdated, so the next `update_json` rewrites it.
+
+    The caller commits.
+
+    @param conn Open store connection (sqlite3.Connection).
+    @return None.
+    '''
+    conn.execute(
+        "INSERT INTO store_meta (key, value) VALUES (?, '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (EXPORT_STALE_KEY,),
+    )
+
+
+def get_watermark(conn: sqlite3.Connection) -> Optional[str]:
+    '''
+    @brief Return the commit the store was last consolidated at.
+
+    @param conn Open store connection (sqlite3.Connection).
+    @return Commit hash or None if the store was never completed (Optional[str]).
+    '''
+    row = conn.execute("SELECT value FROM store_meta WHERE key = ?", (WATERMARK_KEY,)).fetchone()
+    return row[0] if row and row[0] else None
+
+
+def set_watermark(conn: sqlite3.Connection, commit: Optional[str]) -> None:
+    '''
+    @brief Persist (or clear, when commit is None) the consolidation watermark.
+
+    @param conn Open store connection (sqlite3.Connection).
+    @param commit Commit hash to record, or None to invalidate the store (Optional[str]).
+    @return None.
+    '''
+    if commit is None:
+        conn.execute("DELETE FROM store_meta WHERE key = ?", (WATERMARK_KEY,))
+    else:
+        conn.execute(
+            "INSERT INTO store_meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (WATERMARK_KEY, commit),
+        )
+    conn.commit()
+
+
+def upsert_records(conn: sqlite3.Connection, items: Iterable[Tuple[str, list]]) -> int:
+    '''
+    @brief Insert or replace the transformed records of several files.
+
+    Files whose transformation produced no record are removed from the store so
+    a CVE that moves out of the PUBLISHED state disappears from the export.
+
+    @param conn Open store connection (sqlite3.Connection).
+    @param items Iterable of (relative path, records list) pairs.
+    @return Number of files written (int).
+    '''
+    count = 0
+    stale = False
+    for path, records in items:
+        row = conn.execute("SELECT exported FROM cve_records WHERE path = ?", (path,)).fetchone()
+        # Changing or removing a row already in the export needs a rewrite
+        stale = stale or bool(row and row[0])
+        if records:
+            conn.execute(
+                "INSERT INTO cve_records (path, records, exported) VALUES (?, ?, 0) "
+                "ON CONFLICT(path) DO UPDATE SET records = excluded.records, exported = 0",
+                (path, json.dumps(records, ensure_ascii=False)),
+            )
+        else:
+            conn.execute("DELETE FROM cve_records WHERE path = ?", (path,))
+        count += 1
+    if stale:
+        _mark_export_stale(conn)
+    conn.commit()
+    return count
+
+
+def delete_records(conn: sqlite3.Connection, paths: Iterable[str]) -> int:
+    '''
+    @brief Remove the records of deleted repository files.
+
+    @param conn Open store connection (sqlite3.Connection).
+    @param paths Relative paths of the removed files (Iterable[str]).
+    @return Number of rows removed (int).
+    '''
+    removed = 0
+    for path in paths:
+        removed += conn.execute("DELETE FROM cve_records WHERE path = ?", (path,)).rowcount
+    if removed:
+        _mark_export_stale(conn)
+    conn.commit()
+    return removed
+
+
+def clear_records(conn: sqlite3.Connection) -> None:
+    '''
+    @brief Drop every stored record and the watermark before a full rebuild.
+
+    @param conn Open store connection (sqlite3.Connection).
+    @return None.
+    '''
+    conn.execute("DELETE FROM cve_records")
+    conn.execute("DELETE FROM store_meta WHERE key = ?", (WATERMARK_KEY,))
+    _mark_export_stale(conn)
+    conn.commit()
+
+
+def export_json(conn: sqlite3.Connection, output_file: str) -> int:
+    '''
+    @brief Stream every stored record into a consolidated JSON array file.
+
+    The array is written to a temporary sibling file and swapped in atomically.
+
+    @param conn Open store connection (sqlite3.Connection).
+    @param output_file Destination path of the consolidated JSON list (str).
+    @return Number of records written (int).
+    '''
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    tmp_output = f"{output_file}.tmp"
+    written = 0
+    with open(tmp_output, "w", encoding="utf-8") as out:
+        out.write("[")
+        for (records_text,) in conn.execute("SELECT records FROM cve_records ORDER BY path"):
+            for record in json.loads(records_text):
+                out.write(",\n" if written else "\n")
+                out.write(json.dumps(record, ensure_ascii=False, indent=2))
+                written += 1
+        out.write("\n]" if written else "]")
+    os.replace(tmp_output, output_file)
+    conn.execute("UPDATE cve_records SET exported = 1 WHERE exported = 0")
+    conn.execute("DELETE FROM store_meta WHERE key = ?", (EXPORT_STALE_KEY,))
+    conn.commit()
+    logger.info(f"[CVEStore] Exported {written} records to {output_file}")
+    return written
+
+
+def update_json(conn: sqlite3.Connection, output_file: str) -> int:
+    '''
+    @brief Bring the consolidated JSON file up to date with the store, rewriting it only when needed.
+
+    Nothing is written when no row changed since the last export. Rows that
+    were only added are appended in place at the end of the existing array;
+    after modifications or deletions, or if the file is missing or does not
+    end like an exported array, the whole file is exported again.
+
+    @param conn Open store connection (sqlite3.Connection).
+    @param output_file Destination path of the consolidated JSON list (str).
+    @return Number of records written (int).
+    '''
+    stale = conn.execute("SELECT 1 FROM store_meta WHERE key = ?", (EXPORT_STALE_KEY,)).fetchone()
+    if stale or not os.path.exists(output_file):
+        return export_json(conn, output_file)
+    rows = conn.execute("SELECT path, records FROM cve_records WHERE exported = 0 ORDER BY path").fetchall()
+    if not rows:
+        logger.info(f"[CVEStore] {output_file} already up to date")
+        return 0
+    with open(output_file, "r+b") as out:
+        size = out.seek(0, os.SEEK_END)
+        out.seek(max(size - 2, 0))
+        tail = out.read()
+        if tail == b"\n]":
+            has_records = True
+        elif size == 2 and tail == b"[]":
+            has_records = False
+        else:
+            out.close()
+            return export_json(conn, output_file)
+        # Overwrite the closing bracket and append the new records
+        out.seek(size - (2 if has_records else 1))
+        out.truncate()
+        written = 0
+        for _, records_text in rows:
+            for record in json.loads(records_text):
+                out.write(b",\n" if has_records or written else b"\n")
+                out.write(json.dumps(record, ensure_ascii=False, indent=2).encode("utf-8"))
+                written += 1
+        out.write(b"\n]" if has_records or written else b"]")
+    conn.executemany("UPDATE cve_records SET exported = 1 WHERE path = ?", [(path,) for path, _ in rows])
+    conn.commit()
+    logger.info(f"[CVEStore] Appended {written} records to {output_file}")
+    return written
@@ -10,7 +10,9 @@
 import json
 import os
 from pathlib import Path
+from typing import Optional
 from loguru import logger
+from app.models.result_store import RESULT_STORE_DIR, has_results, iter_records
 
 
 def _load_json(path: str):
@@ -33,9 +35,46 @@ def _load_json(path: str):
         return None
 
 
+def _news_example(news_item) -> Optional[dict]:
+    '''
+    @brief Builds a summarization example from a scraped news article.
+
+    @param news_item Article dictionary with 'title' and 'p' keys (dict).
+    @return Instruction-style record, or None if the article has no body (Optional[dict]).
+    '''
+    if not isinstance(news_item, dict):
+        return None
+    title = news_item.get("title", "")
+    paragraphs = news_item.get("p", [])
+    if isinstance(paragraphs, list):
+        body = "\n".join(paragraphs)
+    else:
+        body = str(paragraphs)
+
+    if not body.strip():
+        return None
+
+    instruction = (
+        "Resume en tres frases en español la siguiente noticia de ciberseguridad."
+    )
+    input_text = f"Título: {title}\n\nContenido:\n{body}"
+    # Placeholder de output: puedes reemplazarlo por resúmenes generados
+    # y validados manualmente si lo deseas.
+    output_text = (
+        "Resumen no disponible en esta versión del pipeline. "
+        "Este campo puede ser completado con resúmenes generados previamente."
+    )
+    return {
+        "instruction": instruction,
+        "input": input_text,
+        "output": output_text,
+        "source": "news",
+    }
+
+
 def build_finetune_dataset(
     cve_path: str = "./data/cve_list.json",
-    news_path: str = "./outputs/result.json",
+    news_path: str = RESULT_STORE_DIR,
     output_path: str = "./outputs/finetune_data.jsonl",
 ) -> None:
     '''
@@ -44,14 +83,13 @@ def build_finetune_dataset(
     Reads CVE and news data, consolidates them into an instruction-style JSONL file for fine-tuning or evaluation.
 
     @param cve_path Path to consolidated CVE json file (str).
-    @param news_path Path to scraped news json file (str).
+    @param news_path Path to the result store directory or a scraped news json file (str).
     @param output_path Output JSONL path for the dataset (str).
     @return None.
     '''
     logger.info("[FinetuneBuilder] Building dataset (CVE + news)...")
 
     cve_data = _load_json(cve_path) or []
-    news_data = _load_json(news_path) or {}
 
     # Ensure parent directory exists.
     Path(os.path.dirname(output_path) or ".").mkdir(parents=True, exist_ok=True)
@@ -78,36 +116,20 @@ def build_finetune_dataset(
 
         # -----------------------------------------------------------------
         # News examples: simple summarization / explicación.
-        # news_data en tu result.json suele ser un dict con 'title' y 'p'.
+        # Cada artículo del result store (o del antiguo result.json) genera
+        # un ejemplo; se leen en streaming para no cargar todo en memoria.
         # -----------------------------------------------------------------
-        if isinstance(news_data, dict):
-            title = news_data.get("title", "")
-            paragraphs = news_data.get("p", [])
-            if isinstance(paragraphs, list):
-                body = "\n".join(paragraphs)
-            else:
-                body = str(paragraphs)
-
-            if body.strip():
-                instruction = (
-                    "Resume en tres frases en español la siguiente noticia de ciberseguridad."
-                )
-                input_text = f"Título: {title}\n\nContenido:\n{body}"
-                # Placeholder de output: puedes reemplazarlo por resúmenes generados
-                # y validados manualmente si lo deseas.
-                output_text = (
-                    "Resumen no disponible en esta versión del pipeline. "
-                    "Este campo puede ser completado con resúmenes generados previamente."
-                )
-
-                record = {
-                    "instruction": instruction,
-                    "input": input_text,
-                    "output": output_text,
-                    "source": "news",
-                }
-                fout.write(json.dumps(record, ensure_ascii=False) + "\n")
-                total_examples += 1
+        if has_results(news_path):
+            try:
+                for news_item in iter_records(news_path):
+                    record = _news_example(news_item)
+                    if record is not None:
+                        fout.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        total_examples += 1
+            except Exception as e:
+                logger.error(f"[FinetuneBuilder] Error reading news from {news_path}: {e}")
+        else:
+            logger.warning(f"[FinetuneBuilder] No news found at: {news_path}")
 
     logger.info(
         f"[FinetuneBuilder] Dataset built at {output_path} with {total_examples} examples."
@@ -25,13 +25,13 @@ def update_cve_repo(stop_event=None) -> None:
     '''
     @brief Update the CVE repository by cloning or pulling the latest data and rebuilding the list.
 
-    Calls the helper to update the CVE repo and build the consolidated list.
+    Calls the helper to update the CVE repo and build the consolidated list. Runs in incremental mode so only the CVE files changed since the previous cycle are re-transformed.
 
     @param stop_event Optional threading.Event to allow cancellation.
     @return None.
     '''
     logger.info("[LLM Trainer] Updating CVE list (clone/pull + build)...")
-    update_cve_repo_and_build_list(stop_event=stop_event)
+    update_cve_repo_and_build_list(stop_event=stop_event, incremental=True)
     logger.info("[LLM Trainer] CVE list updated successfully.")
 
 
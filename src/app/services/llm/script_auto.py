@@ -19,10 +19,9 @@ import sys
 from pathlib import Path
 from loguru import logger
 import multiprocessing
-import tempfile
 import time
-import signal
-import shutil
+
+from app.services.llm import cve_store
 
 
 def clone_repository(repo_url: str, repo_dir: str) -> None:
@@ -179,45 +178,127 @@ def process_file(file_path: Path, aggregated_data: list, lock: threading.Lock, s
         logger.error(f"Error processing {file_path}: {e}")
 
 
-def _process_file_worker(input_path: str, out_path: str) -> None:
+def _transform_file(input_path: str) -> list:
     '''
-    @brief Process a single JSON file inside a child process and write the transformed output to a temporary file.
+    @brief Load a single CVE JSON file and return its transformed records.
 
-    Child processes should not receive thread-local synchronization primitives from the parent (they are not picklable). Cancellation is handled by the parent which may terminate the child process if needed.
+    Errors are logged and swallowed so a single corrupt file never aborts a whole batch.
 
     @param input_path Path to the input JSON file (str).
-    @param out_path Path to the output temporary file (str).
-    @return None.
+    @return List of transformed records, empty when the file is skipped (list).
     '''
     try:
         with open(input_path, 'r', encoding='utf-8') as f:
-            text = f.read()
-            data = json.loads(text)
-        transformed = transform_json(data)
-        # write results
-        with open(out_path, 'w', encoding='utf-8') as of:
-            json.dump(transformed or [], of, ensure_ascii=False)
-    except Exception:
-        # ensure no partial corrupt file remains
-        try:
-            if os.path.exists(out_path):
-                os.remove(out_path)
-        except Exception:
-            pass
+            data = json.loads(f.read())
+        return transform_json(data) or []
+    except json.JSONDecodeError:
+        logger.warning(f"Warning: {input_path} is not valid JSON. Skipping.")
+    except Exception as e:
+        logger.error(f"Error processing {input_path}: {e}")
+    return []
+
+
+def _process_batch_worker(paths: list) -> tuple:
+    '''
+    @brief Transform a batch of CVE JSON files inside a pool worker process.
+
+    Child processes should not receive thread-local synchronization primitives from the parent (they are not picklable). Cancellation is handled by the parent which terminates the pool if needed.
 
+    @param paths List of input JSON file paths (list[str]).
+    @return Tuple (number of files processed, list of transformed records) (tuple).
+    '''
+    records = []
+    for input_path in paths:
+        records.extend(_transform_file(input_path))
+    return len(paths), records
+
+
+def _chunk(items: list, size: int) -> list:
+    '''
+    @brief Split a list into consecutive chunks of at most `size` elements.
+
+    @param items List to split (list).
+    @param size Maximum chunk length (int).
+    @return List of chunks (list[list]).
+    '''
+    size = max(1, int(size))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _process_keyed_batch_worker(items: list) -> tuple:
+    '''
+    @brief Transform a batch of (key, path) pairs keeping the per-file association.
 
-def consolidate_json(base_dir: str, output_file: str, stop_event: Optional[threading.Event] = None) -> None:
+    Used to (re)build the per-CVE record store, where each file's records are stored under its repository-relative path.
+
+    @param items List of (relative path, absolute path) tuples (list[tuple]).
+    @return Tuple (number of files processed, list of (relative path, records)) (tuple).
+    '''
+    return len(items), [(key, _transform_file(path)) for key, path in items]
+
+
+def _iter_pool_results(worker, batches: list, stop_event: Optional[threading.Event], max_workers: Optional[int]):
+    '''
+    @brief Run `worker` over `batches` in a persistent process pool and yield results as they complete.
+
+    The pool is terminated as soon as `stop_event` is set or the interpreter starts finalizing; results already yielded are kept by the caller.
+
+    @param worker Picklable module-level function applied to each batch.
+    @param batches List of batches (list).
+    @param stop_event Optional cancellation event (threading.Event).
+    @param max_workers Pool size; defaults to half the CPUs, capped at 8 (int).
+    @return Generator of worker results in completion order.
+    '''
+    if not batches:
+        return
+    is_finalizing = getattr(sys, "is_finalizing", lambda: False)
+    if max_workers is None:
+        max_workers = min(8, max(1, multiprocessing.cpu_count() // 2))
+    pool = multiprocessing.Pool(processes=max_workers)
+    try:
+        results = pool.imap_unordered(worker, batches)
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                logger.info("Stop event set during consolidation; terminating worker pool.")
+                break
+            if is_finalizing():
+                logger.warning("Interpreter is finalizing during consolidation loop; aborting.")
+                break
+            try:
+                # Short timeout keeps the loop responsive to stop_event
+                item = results.next(timeout=0.5)
+            except multiprocessing.TimeoutError:
+                continue
+            except StopIteration:
+                break
+            yield item
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def consolidate_json(
+    base_dir: str,
+    output_file: str,
+    stop_event: Optional[threading.Event] = None,
+    batch_size: int = 256,
+    max_workers: Optional[int] = None,
+) -> None:
     """
     @brief Consolidate multiple CVE JSON files from the repository into a single JSON file.
     @param base_dir Root directory where the repository JSON files are located.
     @param output_file Output file path for the consolidated JSON list.
+    @param stop_event Optional event; when set the pool is terminated and the records collected so far are written.
+    @param batch_size Number of file paths handed to a worker per task.
+    @param max_workers Size of the worker pool (defaults to half the CPUs, capped at 8).
     @details
         - Recursively finds all *.json files.
-        - Processes them in parallel using threads.
-        - Writes a list of transformed records to the output file.
+        - Feeds batches of paths to a persistent process pool (imap_unordered).
+        - Streams transformed records straight into the output JSON array.
+        - Logs throughput in files/sec.
     """
     try:
-        # If the interpreter is shutting down, avoid creating new threads which will
+        # If the interpreter is shutting down, avoid creating new processes which will
         # raise RuntimeError: "can't create new thread at interpreter shutdown".
         is_finalizing = getattr(sys, "is_finalizing", lambda: False)
         if is_finalizing():
@@ -230,100 +311,37 @@ def consolidate_json(base_dir: str, output_file: str, stop_event: Optional[threa
         root_dir = Path(base_dir)
 
         # Find all .json files under the repository root.
-        json_files = list(root_dir.rglob("*.json"))
+        json_files = [str(p) for p in root_dir.rglob("*.json")]
         total_files = len(json_files)
         logger.info(f"Processing {total_files} JSON files...")
 
-        aggregated_data: list = []
-        lock = multiprocessing.Manager().Lock()
-
-        # Use processes instead of threads to allow terminate() from caller
-        tempdir = tempfile.mkdtemp(prefix="cve_consolidate_")
-        processes = []
-        temp_outputs = []
-        try:
-            max_workers = min(8, max(1, multiprocessing.cpu_count() // 2))
-            active = []
-            for i, file_path in enumerate(json_files):
-                if is_finalizing():
-                    logger.warning("Interpreter is finalizing during consolidation loop; aborting process creation.")
-                    break
-                if stop_event is not None and stop_event.is_set():
-                    logger.info("Stop event set during consolidation; aborting process creation.")
-                    break
-
-                out_path = os.path.join(tempdir, f"out_{i}.json")
-                # Do not pass thread-based stop_event into child processes (not picklable on Windows)
-                p = multiprocessing.Process(target=_process_file_worker, args=(str(file_path), out_path))
-                processes.append(p)
-                temp_outputs.append(out_path)
-                p.start()
-                active.append(p)
-
-                while len(active) >= max_workers:
-                    for ap in active[:]:
-                        if not ap.is_alive():
-                            ap.join()
-                            active.remove(ap)
-                    if stop_event is not None and stop_event.is_set():
-                        break
-                    time.sleep(0.1)
-
-            # Wait for remaining processes
-            for ap in active:
-                while ap.is_alive():
-                    if stop_event is not None and stop_event.is_set():
-                        try:
-                            ap.terminate()
-                        except Exception:
-                            pass
-                        break
-                    time.sleep(0.1)
-                try:
-                    ap.join(timeout=2)
-                except Exception:
-                    pass
-
-            # If stop_event set, ensure termination
-            if stop_event is not None and stop_event.is_set():
-                for p in processes:
-                    if p.is_alive():
-                        try:
-                            p.terminate()
-                        except Exception:
-                            pass
-
-            # Collect outputs
-            for out in temp_outputs:
-                if os.path.exists(out):
-                    try:
-                        with open(out, 'r', encoding='utf-8') as f:
-                            part = json.load(f)
-                            if isinstance(part, list):
-                                aggregated_data.extend(part)
-                    except Exception:
-                        logger.warning(f"Failed reading partial output {out}")
-
-        finally:
-            for p in processes:
-                if p.is_alive():
-                    try:
-                        p.terminate()
-                    except Exception:
-                        pass
-            try:
-                shutil.rmtree(tempdir)
-            except Exception:
-                pass
+        batches = _chunk(json_files, batch_size)
 
         # Ensure output directory exists.
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-
-        # Save all processed data into the output JSON file.
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(aggregated_data, f, indent=2, ensure_ascii=False)
-
-        logger.info(f"\nConsolidation completed. Processed {total_files} JSON files.")
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+
+        started = time.monotonic()
+        processed_files = 0
+        written_records = 0
+        # Write into a sibling temp file and swap it in at the end so readers
+        # never observe a half-written array.
+        tmp_output = f"{output_file}.tmp"
+        with open(tmp_output, "w", encoding="utf-8") as out:
+            out.write("[")
+            for done, records in _iter_pool_results(_process_batch_worker, batches, stop_event, max_workers):
+                for record in records:
+                    out.write(",\n" if written_records else "\n")
+                    out.write(json.dumps(record, ensure_ascii=False, indent=2))
+                    written_records += 1
+                processed_files += done
+            out.write("\n]" if written_records else "]")
+        os.replace(tmp_output, output_file)
+
+        elapsed = max(time.monotonic() - started, 1e-9)
+        logger.info(
+            f"\nConsolidation completed. Processed {processed_files}/{total_files} JSON files "
+            f"in {elapsed:.1f}s ({processed_files / elapsed:.1f} files/sec)."
+        )
         logger.info(f"Output file saved as: {output_file}")
     except Exception as e:
         logger.error(f"Error during consolidation: {e}")
@@ -571,12 +589,157 @@ According to enrichment information (for example CISA ADP), the exploitation sta
     return records
 
 
+def _run_git(repo_dir: str, *args: str) -> Optional[str]:
+    '''
+    @brief Run a read-only git command inside the repository.
+
+    @param repo_dir Local repository directory (str).
+    @param args Git sub-command and arguments (str).
+    @return Standard output, or None if git failed or is unavailable (Optional[str]).
+    '''
+    try:
+        proc = subprocess.run(["git", "-C", repo_dir, *args], capture_output=True, text=True)
+    except Exception as e:
+        logger.warning(f"Could not run git {' '.join(args)}: {e}")
+        return None
+    if proc.returncode != 0:
+        return None
+    return proc.stdout
+
+
+def get_head_commit(repo_dir: str) -> Optional[str]:
+    '''
+    @brief Return the commit currently checked out in the repository.
+
+    @param repo_dir Local repository directory (str).
+    @return Full commit hash or None if it cannot be resolved (Optional[str]).
+    '''
+    out = _run_git(repo_dir, "rev-parse", "HEAD")
+    return out.strip() if out else None
+
+
+def get_changed_json_files(repo_dir: str, since_commit: str, head_commit: str) -> Optional[tuple]:
+    '''
+    @brief Ask git which *.json files changed between two commits.
+
+    Renames are reported as a deletion plus an addition so the store stays keyed by path.
+
+    @param repo_dir Local repository directory (str).
+    @param since_commit Last consolidated commit (watermark) (str).
+    @param head_commit Commit to diff against (str).
+    @return Tuple (changed paths, deleted paths) relative to the repository root, or None when the watermark is not an ancestor of HEAD (history diverged or commit unknown) (Optional[tuple]).
+    '''
+    if _run_git(repo_dir, "merge-base", "--is-ancestor", since_commit, head_commit) is None:
+        return None
+    out = _run_git(repo_dir, "diff", "--name-status", "--no-renames", since_commit, head_commit, "--", "*.json")
+    if out is None:
+        return None
+    changed, deleted = [], []
+    for line in out.splitlines():
+        parts = line.split("\t")
+        if len(parts) < 2:
+            continue
+        status, path = parts[0], parts[-1]
+        if status.startswith("D"):
+            deleted.append(path)
+        else:
+            changed.append(path)
+    return changed, deleted
+
+
+def rebuild_cve_store(
+    repo_dir: str,
+    store_path: str,
+    stop_event: Optional[threading.Event] = None,
+    batch_size: int = 256,
+    max_workers: Optional[int] = None,
+) -> bool:
+    '''
+    @brief Full rebuild of the per-CVE record store from every JSON file in the repository.
+
+    @param repo_dir Local repository directory (str).
+    @param store_path Path to the SQLite record store (str).
+    @param stop_event Optional cancellation event (threading.Event).
+    @param batch_size Number of files per pool task (int).
+    @param max_workers Pool size (int).
+    @return True if the rebuild completed and the watermark was recorded, False otherwise (bool).
+    '''
+    root_dir = Path(repo_dir)
+    items = [(p.relative_to(root_dir).as_posix(), str(p)) for p in root_dir.rglob("*.json")]
+    logger.info(f"[CVEStore] Full rebuild: transforming {len(items)} JSON files...")
+    head = get_head_commit(repo_dir)
+    conn = cve_store.open_store(store_path)
+    try:
+        cve_store.clear_records(conn)
+        started = time.monotonic()
+        processed = 0
+        for done, keyed in _iter_pool_results(_process_keyed_batch_worker, _chunk(items, batch_size), stop_event, max_workers):
+            cve_store.upsert_records(conn, keyed)
+            processed += done
+        elapsed = max(time.monotonic() - started, 1e-9)
+        logger.info(f"[CVEStore] Full rebuild processed {processed}/{len(items)} files ({processed / elapsed:.1f} files/sec).")
+        if processed < len(items):
+            logger.warning("[CVEStore] Rebuild interrupted; watermark not recorded, next run will rebuild again.")
+            return False
+        cve_store.set_watermark(conn, head)
+        return True
+    finally:
+        conn.close()
+
+
+def incremental_update_cve_store(
+    repo_dir: str,
+    store_path: str,
+    stop_event: Optional[threading.Event] = None,
+) -> Optional[bool]:
+    '''
+    @brief Patch the per-CVE record store with the files changed since the last consolidated commit.
+
+    @param repo_dir Local repository directory (str).
+    @param store_path Path to the SQLite record store (str).
+    @param stop_event Optional cancellation event (threading.Event).
+    @return True when the store is up to date, False if stopped midway, None when a full rebuild is required (missing watermark, unknown HEAD or diverged history) (Optional[bool]).
+    '''
+    head = get_head_commit(repo_dir)
+    if head is None:
+        logger.warning("[CVEStore] Cannot resolve HEAD; incremental update unavailable.")
+        return None
+    conn = cve_store.open_store(store_path)
+    try:
+        watermark = cve_store.get_watermark(conn)
+        if watermark is None:
+            logger.info("[CVEStore] No watermark recorded; full rebuild required.")
+            return None
+        if watermark == head:
+            logger.info(f"[CVEStore] Store already at {head[:12]}; nothing to do.")
+            return True
+        diff = get_changed_json_files(repo_dir, watermark, head)
+        if diff is None:
+            logger.warning(f"[CVEStore] Watermark {watermark[:12]} is not an ancestor of {head[:12]}; full rebuild required.")
+            return None
+        changed, deleted = diff
+        logger.info(f"[CVEStore] Incremental update {watermark[:12]}..{head[:12]}: {len(changed)} changed, {len(deleted)} deleted files.")
+        cve_store.delete_records(conn, deleted)
+        root_dir = Path(repo_dir)
+        for path in changed:
+            if stop_event is not None and stop_event.is_set():
+                logger.info("[CVEStore] Stop event set during incremental update; watermark left unchanged.")
+                return False
+            cve_store.upsert_records(conn, [(path, _transform_file(str(root_dir / path)))])
+        cve_store.set_watermark(conn, head)
+        return True
+    finally:
+        conn.close()
+
+
 def update_cve_repo_and_build_list(
     repo_url: str = "https://github.com/CVEProject/cvelistV5.git",
     repo_dir: str = "./data/cvelistV5-main",
     output_dir: str = "./data",
     output_file_name: str = "cve_list.json",
     stop_event: Optional[threading.Event] = None,
+    incremental: bool = False,
+    store_file_name: str = "cve_store.db",
 ) -> None:
     """
     @brief High-level helper to update the local CVE repository and rebuild the consolidated JSON file.
@@ -584,10 +747,17 @@ def update_cve_repo_and_build_list(
     @param repo_dir Local directory where the repository is stored/cloned.
     @param output_dir Directory where the consolidated JSON file will be created.
     @param output_file_name Name of the consolidated JSON file.
+    @param incremental When True, only files changed since the last consolidated commit are re-transformed.
+    @param store_file_name Name of the per-CVE record store (inside output_dir) used by the incremental mode.
     @details
         - If the repository directory does not exist, it will be cloned.
         - If it exists, a git pull will be executed.
-        - Finally, all JSON CVE records will be consolidated into one file.
+        - Full mode: all JSON CVE records are consolidated into one file.
+        - Incremental mode: the record store is patched from `git diff` against the
+          stored watermark (falling back to a full store rebuild when the watermark is
+          missing or the history diverged) and the JSON file is updated from the store:
+          untouched when nothing changed, new records appended in place, and only
+          rewritten after modifications or deletions.
     """
     full_output_path = os.path.join(output_dir, output_file_name)
 
@@ -599,6 +769,26 @@ def update_cve_repo_and_build_list(
         logger.info("Repository found, running git pull...")
         update_repository(repo_dir)
 
-    # Consolidate all JSON files from the repository.
-    logger.info("\nConsolidating JSON files from repository...")
-    consolidate_json(repo_dir, full_output_path, stop_event=stop_event)
+    if not incremental:
+        # Consolidate all JSON files from the repository.
+        logger.info("\nConsolidating JSON files from repository...")
+        consolidate_json(repo_dir, full_output_path, stop_event=stop_event)
+        return
+
+    if stop_event is not None and stop_event.is_set():
+        logger.info("Stop event is set; skipping consolidation.")
+        return
+    store_path = os.path.join(output_dir, store_file_name)
+    logger.info("\nUpdating CVE record store incrementally...")
+    status = incremental_update_cve_store(repo_dir, store_path, stop_event=stop_event)
+    if status is None:
+        status = rebuild_cve_store(repo_dir, store_path, stop_event=stop_event)
+    if not status:
+        logger.info("CVE store update did not complete; keeping previous consolidated file.")
+        return
+    conn = cve_store.open_store(store_path)
+    try:
+        # Appends the added files in place; rewrites the file only after changes or deletions
+        cve_store.update_json(conn, full_output_path)
+    finally:
+        conn.close()
@@ -0,0 +1,456 @@
+"""
+@file crawler_service.py
+@author naflashDev
+@brief Long-lived Scrapy crawler subprocess fed through an IPC queue.
+@details Spawning a `multiprocessing.Process` with a fresh `CrawlerProcess` for
+         every batch re-imports Scrapy and starts a new Twisted reactor each
+         time. `CrawlerService` starts one subprocess that runs the reactor once
+         and keeps a `CrawlerRunner` alive; URL batches are sent over a command
+         queue and scraped items plus progress events are streamed back on an
+         event queue. The service exposes `terminate()` so it can be registered
+         through the existing `register_process` hooks and stopped from the UI.
+         Concurrency and politeness come from a crawl profile (`CRAWL_PROFILES`):
+         Scrapy applies concurrency and delay per download slot, i.e. per
+         domain, so a batch spread over many hosts is crawled in parallel
+         while each host still sees a throttled request rate. The profile is
+         chosen per worker with `CRAWL_PROFILE_<WORKER>` (or `CRAWL_PROFILE`)
+         and each finished batch reports its pages/minute.
+"""
+
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from multiprocessing import Process, Queue
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from loguru import logger
+
+# Settings shared by every spider run in the crawler subprocess
+CRAWLER_SETTINGS: Dict[str, Any] = {
+    "LOG_ENABLED": False,
+    "USER_AGENT": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/113.0.0.0 Safari/537.36"
+    ),
+    "AUTOTHROTTLE_ENABLED": True,  # Adjusts delay based on load
+    "RETRY_ENABLED": True,
+    "RETRY_TIMES": 5,  # Retry failed requests up to 5 times
+    "RETRY_HTTP_CODES": [429, 500, 502, 503, 504],
+    # Use whatever reactor the subprocess installs; it is started only once
+    "TWISTED_REACTOR": None,
+}
+
+# Crawl profiles layered over CRAWLER_SETTINGS. Delay and per-domain concurrency
+# apply to each domain separately; CONCURRENT_REQUESTS bounds the whole crawl.
+CRAWL_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Former behaviour: 2 seconds between requests, Scrapy default concurrency
+    "polite": {
+        "CONCURRENT_REQUESTS": 16,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 1,
+        "DOWNLOAD_DELAY": 2.0,
+        "AUTOTHROTTLE_TARGET_CONCURRENCY": 1.0,
+        "AUTOTHROTTLE_MAX_DELAY": 60.0,
+        "DNSCACHE_ENABLED": True,
+        "DOWNLOAD_MAXSIZE": 10 * 1024 * 1024,
+        "DOWNLOAD_WARNSIZE": 2 * 1024 * 1024,
+        "DOWNLOAD_TIMEOUT": 60,
+    },
+    # Many domains in parallel, each one still throttled
+    "balanced": {
+        "CONCURRENT_REQUESTS": 64,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 2,
+        "DOWNLOAD_DELAY": 1.0,
+        "AUTOTHROTTLE_TARGET_CONCURRENCY": 2.0,
+        "AUTOTHROTTLE_MAX_DELAY": 30.0,
+        "DNSCACHE_ENABLED": True,
+        "DNSCACHE_SIZE": 10000,
+        "REACTOR_THREADPOOL_MAXSIZE": 20,  # DNS lookups run in the reactor thread pool
+        "DOWNLOAD_MAXSIZE": 5 * 1024 * 1024,
+        "DOWNLOAD_WARNSIZE": 1024 * 1024,
+        "DOWNLOAD_TIMEOUT": 30,
+    },
+    # Large backlogs spread over hundreds of domains
+    "fast": {
+        "CONCURRENT_REQUESTS": 128,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 4,
+        "DOWNLOAD_DELAY": 0.5,
+        "AUTOTHROTTLE_TARGET_CONCURRENCY": 4.0,
+        "AUTOTHROTTLE_MAX_DELAY": 20.0,
+        "DNSCACHE_ENABLED": True,
+        "DNSCACHE_SIZE": 20000,
+        "REACTOR_THREADPOOL_MAXSIZE": 40,
+        "DOWNLOAD_MAXSIZE": 5 * 1024 * 1024,
+        "DOWNLOAD_WARNSIZE": 1024 * 1024,
+        "DOWNLOAD_TIMEOUT": 20,
+    },
+}
+
+DEFAULT_CRAWL_PROFILE = "balanced"
+
+def crawl_profile_for(worker: str) -> str:
+    '''
+    @brief Name of the crawl profile selected for a worker.
+
+    Reads `CRAWL_PROFILE_<WORKER>` (e.g. CRAWL_PROFILE_DYNAMIC), then `CRAWL_PROFILE`,
+    then falls back to DEFAULT_CRAWL_PROFILE.
+
+    @param worker Worker name, e.g. "dynamic" or "rss" (str).
+    @return Profile name (str).
+    '''
+    name = os.getenv(f"CRAWL_PROFILE_{worker.upper()}") or os.getenv("CRAWL_PROFILE") or DEFAULT_CRAWL_PROFILE
+    return name.strip().lower()
+
+
+def crawl_profile_settings(profile: Optional[str] = None) -> Dict[str, Any]:
+    '''
+    @brief Scrapy settings of a crawl profile merged over CRAWLER_SETTINGS.
+
+    @param profile Profile name; None or an unknown name uses DEFAULT_CRAWL_PROFILE (str).
+    @return Settings dictionary (dict).
+    '''
+    name = profile or DEFAULT_CRAWL_PROFILE
+    if name not in CRAWL_PROFILES:
+        logger.warning(f"[CrawlerService] Unknown crawl profile '{name}'; using '{DEFAULT_CRAWL_PROFILE}'.")
+        name = DEFAULT_CRAWL_PROFILE
+    return dict(CRAWLER_SETTINGS, **CRAWL_PROFILES[name])
+
+
+def pages_per_minute(pages: int, seconds: float) -> float:
+    '''
+    @brief Crawl rate of a finished batch.
+
+    @param pages Responses received (int).
+    @param seconds Wall time of the batch (float).
+    @return Pages per minute, 0.0 when nothing was timed (float).
+    '''
+    return pages * 60.0 / seconds if seconds > 0 else 0.0
+
+
+# Seconds the subprocess waits on the command queue before checking its parent
+_POLL_INTERVAL = 0.5
+
+
+def _build_spider(kind: str, urls: List[str], args: Any):
+    '''
+    @brief Build the spider class for a batch inside the crawler subprocess.
+
+    @param kind Spider kind: "dynamic" (article scraper) or "rss" (feed discovery) (str).
+    @param urls URLs of the batch (List[str]).
+    @param args Extra spider arguments (OpenSearch parameters for "dynamic").
+    @return Scrapy Spider class.
+    '''
+    if kind == "dynamic":
+        from app.services.scraping.spider_factory import create_dynamic_spider
+        return create_dynamic_spider(urls, args)
+    if kind == "rss":
+        from app.services.scraping.spider_rss import create_rss_spider
+        return create_rss_spider(urls, [])
+    raise ValueError(f"Unknown spider kind: {kind}")
+
+
+def _crawler_main(commands, events, settings: Dict[str, Any]) -> None:
+    '''
+    @brief Entry point of the crawler subprocess: run one reactor and crawl batches until stopped.
+
+    @param commands Queue of batch commands (dict) or None to stop (Queue).
+    @param events Queue receiving ready/item/progress/done events (Queue).
+    @param settings Scrapy settings for the shared CrawlerRunner (dict).
+    @return None.
+    '''
+    from scrapy import signals
+    from scrapy.crawler import CrawlerRunner
+    from scrapy.utils.log import configure_logging
+    from twisted.internet import reactor, threads
+
+    configure_logging(install_root_handler=False)
+    logging.getLogger('scrapy').propagate = False
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    runner = CrawlerRunner(settings)
+    parent = os.getppid()
+    state = {"stopping": False}
+
+    def wait_command():
+        # Runs in a reactor thread; returns None when asked (or forced) to stop
+        while True:
+            try:
+                return commands.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if state["stopping"] or os.getppid() != parent:
+                    return None
+
+    def next_command():
+        threads.deferToThread(wait_command).addCallback(handle)
+
+    def handle(command):
+        if not command:
+            state["stopping"] = True
+            reactor.stop()
+            return
+        batch = command["batch"]
+        urls = command["urls"]
+        try:
+            spider = _build_spider(command["kind"], urls, command.get("args"))
+            crawler = runner.create_crawler(spider)
+        except Exception as e:
+            events.put({"type": "done", "batch": batch, "error": str(e), "items": 0, "pages": 0, "seconds": 0.0})
+            next_command()
+            return
+
+        counts = {"items": 0, "responses": 0}
+        started = time.monotonic()
+
+        def on_item(item, response, spider):
+            counts["items"] += 1
+            events.put({"type": "item", "batch": batch, "item": dict(item)})
+
+        def on_response(response, request, spider):
+            counts["responses"] += 1
+            events.put({
+                "type": "progress", "batch": batch, "url": response.url,
+                "status": response.status, "done": counts["responses"], "total": len(urls),
+            })
+
+        # weak=False: the receivers are closures that would otherwise be collected
+        crawler.signals.connect(on_item, signal=signals.item_scraped, weak=False)
+        crawler.signals.connect(on_response, signal=signals.response_received, weak=False)
+
+        def finished(result):
+            error = None
+            if result is not None and hasattr(result, "getErrorMessage"):
+                error = result.getErrorMessage()
+            events.put({
+                "type": "done", "batch": batch, "error": error, "items": counts["items"],
+                "pages": counts["responses"], "seconds": time.monotonic() - started,
+            })
+            next_command()
+
+        runner.crawl(crawler).addBoth(finished)
+
+    events.put({"type": "ready", "pid": os.getpid()})
+    next_command()
+    reactor.run(installSignalHandlers=False)
+
+
+class CrawlerService:
+    '''
+    @brief Parent-side handle of the long-lived crawler subprocess.
+
+    Batches are crawled one at a time; `crawl()` starts (or restarts) the
+    subprocess on demand, so a crash only costs one batch.
+    '''
+
+    def __init__(
+        self,
+        settings: Optional[Dict[str, Any]] = None,
+        start_timeout: float = 60.0,
+        profile: Optional[str] = None,
+    ) -> None:
+        '''
+        @brief Create the service; the subprocess is started lazily.
+
+        @param settings Scrapy settings overriding the crawl profile (dict).
+        @param start_timeout Seconds to wait for the subprocess to become ready (float).
+        @param profile Crawl profile name from CRAWL_PROFILES; None uses DEFAULT_CRAWL_PROFILE (str).
+        '''
+        self.profile = profile if profile in CRAWL_PROFILES else DEFAULT_CRAWL_PROFILE
+        self.settings = dict(crawl_profile_settings(profile), **(settings or {}))
+        # Figures of the last finished batch: pages, items, seconds, pages_per_minute
+        self.last_stats: Dict[str, Any] = {}
+        self.start_timeout = start_timeout
+        self._process: Optional[Process] = None
+        self._commands = None
+        self._events = None
+        self._batch_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def pid(self) -> Optional[int]:
+        '''
+        @brief PID of the crawler subprocess, if running.
+
+        @return Process id or None.
+        '''
+        return self._process.pid if self._process is not None else None
+
+    def is_alive(self) -> bool:
+        '''
+        @brief Tell whether the crawler subprocess is running.
+
+        @return True if alive (bool).
+        '''
+        return self._process is not None and self._process.is_alive()
+
+    def start(self) -> None:
+        '''
+        @brief Start the crawler subprocess if it is not running and wait until its reactor is up.
+
+        @return None.
+        '''
+        if self.is_alive():
+            return
+        self._commands = Queue()
+        self._events = Queue()
+        self._process = Process(
+            target=_crawler_main,
+            args=(self._commands, self._events, self.settings),
+            daemon=True,
+        )
+        self._process.start()
+        deadline = time.monotonic() + self.start_timeout
+        while time.monotonic() < deadline:
+            try:
+                event = self._events.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    break
+                continue
+            if event.get("type") == "ready":
+                logger.info(f"[CrawlerService] Crawler subprocess ready (pid {event.get('pid')}).")
+                return
+        self.terminate()
+        raise RuntimeError("Crawler subprocess failed to start")
+
+    def iter_batch(
+        self,
+        kind: str,
+        urls: List[str],
+        args: Any = None,
+        stop_event=None,
+    ) -> Iterator[Dict[str, Any]]:
+        '''
+        @brief Send a URL batch to the subprocess and stream its events until it is done.
+
+        Yields "item" and "progress" events and finally the "done" event. If
+        `stop_event` is set while waiting, the subprocess is terminated and the
+        iteration ends.
+
+        @param kind Spider kind, see `_build_spider` (str).
+        @param urls URLs to crawl (List[str]).
+        @param args Extra spider arguments.
+        @param stop_event Optional threading.Event used to abort (Event).
+        @return Iterator over event dictionaries.
+        '''
+        with self._lock:
+            self.start()
+            batch = next(self._batch_ids)
+            self._commands.put({"batch": batch, "kind": kind, "urls": list(urls), "args": args})
+            while True:
+                if stop_event is not None and getattr(stop_event, 'is_set', lambda: False)():
+                    logger.info("[CrawlerService] stop_event set; terminating crawler subprocess.")
+                    self.terminate()
+                    return
+                try:
+                    event = self._events.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    if not self.is_alive():
+                        yield {"type": "done", "batch": batch, "error": "crawler subprocess died", "items": 0, "pages": 0, "seconds": 0.0}
+                        return
+                    continue
+                if event.get("batch") != batch:
+                    continue
+                yield event
+                if event.get("type") == "done":
+                    return
+
+    def crawl(
+        self,
+        kind: str,
+        urls: List[str],
+        args: Any = None,
+        stop_event=None,
+        on_item: Optional[Callable[[dict], None]] = None,
+        on_progress: Optional[Callable[[dict], None]] = None,
+    ) -> List[dict]:
+        '''
+        @brief Crawl a URL batch and return the scraped items (blocking).
+
+        @param kind Spider kind, see `_build_spider` (str).
+        @param urls URLs to crawl (List[str]).
+        @param args Extra spider arguments.
+        @param stop_event Optional threading.Event used to abort (Event).
+        @param on_item Optional callback for each streamed item.
+        @param on_progress Optional callback for each progress event.
+        @return List of scraped items (List[dict]).
+        '''
+        items: List[dict] = []
+        for event in self.iter_batch(kind, urls, args, stop_event):
+            if event["type"] == "item":
+                items.append(event["item"])
+                if on_item is not None:
+                    on_item(event["item"])
+            elif event["type"] == "progress":
+                if on_progress is not None:
+                    on_progress(event)
+            elif event["type"] == "done":
+                pages = event.get("pages", 0)
+                seconds = event.get("seconds", 0.0)
+                self.last_stats = {
+                    "pages": pages, "items": event.get("items", 0), "seconds": seconds,
+                    "pages_per_minute": pages_per_minute(pages, seconds),
+                }
+                if event.get("error"):
+                    logger.error(f"[CrawlerService] Batch {event['batch']} failed: {event['error']}")
+                else:
+                    logger.info(
+                        f"[CrawlerService] Batch {event['batch']} done ({self.profile} profile): {len(urls)} URLs, "
+                        f"{pages} pages, {event['items']} items in {seconds:.1f}s "
+                        f"({self.last_stats['pages_per_minute']:.1f} pages/min)."
+                    )
+        return items
+
+    def stop(self, timeout: float = 10.0) -> None:
+        '''
+        @brief Ask the subprocess to stop its reactor, terminating it if it does not exit in time.
+
+        @param timeout Seconds to wait for a graceful exit (float).
+        @return None.
+        '''
+        if self._process is None:
+            return
+        if self._process.is_alive():
+            try:
+                self._commands.put(None)
+            except Exception:
+                pass
+            self._process.join(timeout)
+        self.terminate()
+
+    def terminate(self) -> None:
+        '''
+        @brief Kill the subprocess immediately (used by the UI stop hooks).
+
+        @return None.
+        '''
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            if process.is_alive():
+                process.terminate()
+            process.join(5)
+        except Exception:
+            logger.exception("[CrawlerService] Error terminating crawler subprocess")
+
+
+_services: Dict[str, CrawlerService] = {}
+_services_lock = threading.Lock()
+
+
+def get_crawler_service(name: str = "default") -> CrawlerService:
+    '''
+    @brief Return the shared crawler service registered under `name`.
+
+    The service uses the crawl profile selected for the worker (see `crawl_profile_for`).
+
+    @param name Service name, one per independent worker (str).
+    @return CrawlerService instance.
+    '''
+    with _services_lock:
+        service = _services.get(name)
+        if service is None:
+            service = CrawlerService(profile=crawl_profile_for(name))
+            _services[name] = service
+        return service
@@ -0,0 +1,370 @@
+"""
+@file feed_service.py
+@author naflashDev
+@brief Asynchronous RSS/Atom feed fetching and parsing.
+@details `feedparser.parse(url)` downloads the feed itself with blocking I/O:
+         it stalled the event loop in the save-feed endpoint, made Google
+         Alerts read its feeds one by one and ran inside `extract_rss_and_save`
+         while a pooled database connection was held. The feed service
+         downloads with a pooled `httpx.AsyncClient` (keep-alive, HTTP/2 when
+         available), fetches many feeds at once under a global concurrency
+         limit and per-host politeness limits (`HostLimiter`), and parses the
+         downloaded bytes with `feedparser` in the shared parse pool of
+         `news_gd`. Conditional requests send the `ETag`/`Last-Modified`
+         validators stored in the feed registry, so feeds that did not change
+         answer `304 Not Modified` and are skipped without being parsed.
+         Every poll also updates the health statistics of the feed in the
+         registry (new items, failures), which schedule its next poll; with
+         `due_only` only the feeds whose next poll time has passed are fetched.
+"""
+
+import asyncio
+import calendar
+import hashlib
+import time
+from collections import Counter
+from contextlib import aclosing, nullcontext
+from typing import Iterable, List, Optional, Tuple
+import feedparser
+import httpx
+from loguru import logger
+from app.models.feed_registry import FEED_REGISTRY_PATH, open_feed_registry, get_validators, record_fetches, due_feeds
+from app.services.scraping.news_gd import HostLimiter, http2_available, run_in_parse_pool
+
+# Feeds downloaded at once, and per host
+FEED_FETCH_CONCURRENCY = 16
+FEED_PER_HOST_CONCURRENCY = 2
+# Minimum seconds between two requests to the same host
+FEED_PER_HOST_DELAY = 0.5
+FEED_FETCH_TIMEOUT = 20.0
+# Larger responses are abandoned (not a feed, or a runaway one)
+FEED_MAX_BYTES = 10 * 1024 * 1024
+
+FEED_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/122.0.0.0 Safari/537.36"
+    ),
+    "Accept": "application/rss+xml, application/atom+xml, application/xml;q=0.9, text/xml;q=0.9, */*;q=0.8",
+}
+
+
+class FeedResult:
+    '''
+    @brief Outcome of one feed request.
+
+    `status` is "ok" (downloaded and parsed), "not_modified" (304 to a
+    conditional request), "timeout" or "error".
+    '''
+
+    def __init__(
+        self,
+        url: str,
+        status: str,
+        http_status: Optional[int] = None,
+        parsed=None,
+        etag: Optional[str] = None,
+        modified: Optional[str] = None,
+        error: Optional[str] = None,
+        latency: Optional[float] = None,
+    ) -> None:
+        '''
+        @param url Requested feed URL (str).
+        @param status "ok", "not_modified", "timeout" or "error" (str).
+        @param http_status HTTP status code, None if no response (int).
+        @param parsed Result of `feedparser.parse` (FeedParserDict).
+        @param etag ETag of the response (str).
+        @param modified Last-Modified of the response (str).
+        @param error Error message (str).
+        @param latency Seconds until the body was read (float).
+        '''
+        self.url = url
+        self.status = status
+        self.http_status = http_status
+        self.parsed = parsed
+        self.etag = etag
+        self.modified = modified
+        self.error = error
+        self.latency = latency
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == "not_modified"
+
+    @property
+    def entries(self) -> list:
+        '''
+        @brief Entries of the parsed feed (empty unless the feed was downloaded).
+
+        @return List of entries (list).
+        '''
+        return list(getattr(self.parsed, "entries", None) or [])
+
+    @property
+    def info(self) -> dict:
+        '''
+        @brief Channel metadata of the parsed feed (title, link, ...).
+
+        @return Dictionary (dict).
+        '''
+        return getattr(self.parsed, "feed", None) or {}
+
+    def __repr__(self) -> str:
+        return f"FeedResult({self.url!r}, {self.status!r}, http_status={self.http_status})"
+
+
+def entry_keys(entries) -> List[Tuple[str, Optional[float]]]:
+    '''
+    @brief Stable key and publication time of each feed entry, used to recognise new items.
+
+    The key hashes the entry id, or its link or title when the feed has no ids.
+
+    @param entries Entries of a parsed feed (list).
+    @return List of (key, UTC timestamp or None) pairs (List[Tuple[str, Optional[float]]]).
+    '''
+    keys = []
+    for entry in entries:
+        if not hasattr(entry, "get"):
+            continue
+        ident = entry.get("id") or entry.get("link") or entry.get("title")
+        if not ident:
+            continue
+        published = entry.get("published_parsed") or entry.get("updated_parsed")
+        try:
+            timestamp = float(calendar.timegm(published)) if published else None
+        except (TypeError, ValueError, OverflowError):
+            timestamp = None
+        keys.append((hashlib.blake2b(str(ident).encode("utf-8"), digest_size=8).hexdigest(), timestamp))
+    return keys
+
+
+def parse_feed_bytes(content: bytes, url: str, content_type: Optional[str] = None):
+    '''
+    @brief Parse a downloaded feed; runs in the shared parse pool.
+
+    The parser exception kept in `bozo_exception` is replaced by its message
+    so the result can be sent back from a worker process.
+
+    @param content Response body (bytes).
+    @param url Final URL of the feed, used to resolve relative links (str).
+    @param content_type Content-Type header, used for the encoding (str).
+    @return Parsed feed (FeedParserDict).
+    '''
+    headers = {"content-location": url}
+    if content_type:
+        headers["content-type"] = content_type
+    parsed = feedparser.parse(content, response_headers=headers)
+    if "bozo_exception" in parsed:
+        parsed["bozo_exception"] = str(parsed["bozo_exception"])
+    return parsed
+
+
+def create_feed_client(max_connections: int = FEED_FETCH_CONCURRENCY) -> httpx.AsyncClient:
+    '''
+    @brief Pooled HTTP client for feed downloads (keep-alive, TLS reuse, HTTP/2 if available).
+
+    @param max_connections Size of the connection pool (int).
+    @return httpx.AsyncClient to be closed by the caller.
+    '''
+    return httpx.AsyncClient(
+        headers=FEED_HEADERS,
+        timeout=FEED_FETCH_TIMEOUT,
+        follow_redirects=True,
+        http2=http2_available(),
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    )
+
+
+async def _read_limited(response: httpx.Response, max_bytes: int) -> bytes:
+    '''
+    @brief Read a streamed body, giving up above `max_bytes`.
+
+    @param response Open streamed response (httpx.Response).
+    @param max_bytes Size limit (int).
+    @return Body (bytes).
+    '''
+    declared = response.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise ValueError(f"feed larger than {max_bytes} bytes")
+    chunks = []
+    size = 0
+    async with aclosing(response.aiter_bytes()) as body:
+        async for chunk in body:
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError(f"feed larger than {max_bytes} bytes")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def fetch_feed(
+    url: str,
+    client: Optional[httpx.AsyncClient] = None,
+    validators: Optional[Tuple[Optional[str], Optional[str]]] = None,
+    limiter: Optional[HostLimiter] = None,
+) -> FeedResult:
+    '''
+    @brief Download and parse one feed without blocking the event loop.
+
+    @param url Feed URL (str).
+    @param client Shared HTTP client; a temporary one is created when None (httpx.AsyncClient).
+    @param validators (etag, last_modified) of a previous response, sent as a conditional request (Tuple).
+    @param limiter Per-host politeness limits (HostLimiter).
+    @return FeedResult; errors are reported in it, never raised.
+    '''
+    if client is None:
+        async with create_feed_client(1) as own_client:
+            return await fetch_feed(url, own_client, validators, limiter)
+
+    headers = {}
+    etag, modified = validators or (None, None)
+    if etag:
+        headers["If-None-Match"] = etag
+    if modified:
+        headers["If-Modified-Since"] = modified
+
+    start = time.perf_counter()
+    http_status = None
+    try:
+        async with limiter.slot(url) if limiter is not None else nullcontext():
+            async with client.stream("GET", url, headers=headers) as response:
+                http_status = response.status_code
+                if http_status == 304:
+                    return FeedResult(url, "not_modified", 304, latency=time.perf_counter() - start)
+                response.raise_for_status()
+                content = await _read_limited(response, FEED_MAX_BYTES)
+                final_url = str(response.url)
+                content_type = response.headers.get("content-type")
+                etag = response.headers.get("etag")
+                modified = response.headers.get("last-modified")
+        latency = time.perf_counter() - start
+        parsed = await run_in_parse_pool(parse_feed_bytes, content, final_url, content_type)
+        return FeedResult(url, "ok", http_status, parsed, etag, modified, latency=latency)
+    except httpx.TimeoutException as e:
+        return FeedResult(url, "timeout", http_status, error=str(e) or "timeout", latency=time.perf_counter() - start)
+    except Exception as e:
+        return FeedResult(url, "error", http_status, error=str(e) or type(e).__name__, latency=time.perf_counter() - start)
+
+
+async def fetch_feeds(
+    urls: Iterable[str],
+    conditional: bool = True,
+    concurrency: int = FEED_FETCH_CONCURRENCY,
+    client: Optional[httpx.AsyncClient] = None,
+    limiter: Optional[HostLimiter] = None,
+    registry_path: str = FEED_REGISTRY_PATH,
+    due_only: bool = False,
+    record: bool = True,
+) -> List[FeedResult]:
+    '''
+    @brief Download and parse many feeds concurrently with one pooled client.
+
+    With `conditional`, the validators stored in the feed registry are sent
+    and the outcome of every request is recorded back with the entries seen,
+    so unchanged feeds come back as "not_modified" on the next run and each
+    feed gets its next poll time. With `due_only`, feeds not due yet are
+    skipped and get no result. Callers that persist the entries themselves
+    pass `record=False` and call `record_feed_results` once they are saved,
+    so a failed save does not turn the next poll into "not_modified".
+
+    @param urls Feed URLs; duplicates are fetched once (Iterable[str]).
+    @param conditional Use and update the feed registry validators (bool).
+    @param concurrency Maximum concurrent downloads (int).
+    @param client Shared HTTP client; one is created for the call when None (httpx.AsyncClient).
+    @param limiter Per-host politeness limits; FEED_PER_HOST_* limits when None (HostLimiter).
+    @param registry_path Feed registry database (str).
+    @param due_only Only fetch the feeds whose next poll time has passed; needs `conditional` (bool).
+    @param record Record the outcomes in the feed registry before returning; needs `conditional` (bool).
+    @return One FeedResult per distinct URL fetched, in input order (List[FeedResult]).
+    '''
+    urls = list(dict.fromkeys(url for url in urls if url))
+    if not urls:
+        return []
+
+    registry = None
+    validators = {}
+    if conditional:
+        try:
+            registry = open_feed_registry(registry_path)
+            if due_only:
+                due = due_feeds(registry, urls)
+                if len(due) < len(urls):
+                    logger.info(f"[feeds] {len(urls) - len(due)} of {len(urls)} feeds not due yet.")
+                urls = due
+            validators = get_validators(registry, urls)
+        except Exception as e:
+            logger.warning(f"[feeds] Feed registry not available; fetching without validators: {e}")
+            registry = None
+    if not urls:
+        if registry is not None:
+            registry.close()
+        return []
+
+    limiter = limiter or HostLimiter(FEED_PER_HOST_CONCURRENCY, FEED_PER_HOST_DELAY)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(shared: httpx.AsyncClient, url: str) -> FeedResult:
+        async with semaphore:
+            return await fetch_feed(url, shared, validators.get(url), limiter)
+
+    start = time.perf_counter()
+    if client is None:
+        async with create_feed_client(concurrency) as own_client:
+            results = await asyncio.gather(*(fetch(own_client, url) for url in urls))
+    else:
+        results = await asyncio.gather(*(fetch(client, url) for url in urls))
+
+    if registry is not None:
+        if record:
+            _record_results(registry, results)
+        registry.close()
+
+    counts = Counter(result.status for result in results)
+    logger.info(f"[feeds] Fetched {len(results)} feeds in {time.perf_counter() - start:.1f}s: {dict(counts)}")
+    return list(results)
+
+
+def _record_results(registry, results: Iterable[FeedResult]) -> None:
+    '''
+    @brief Record fetch outcomes on an open feed registry connection, logging errors.
+
+    @param registry Feed registry connection (sqlite3.Connection).
+    @param results Fetch results (Iterable[FeedResult]).
+    @return None.
+    '''
+    try:
+        record_fetches(
+            registry, [(r.url, r.http_status, r.etag, r.modified, r.status, entry_keys(r.entries)) for r in results]
+        )
+    except Exception as e:
+        logger.warning(f"[feeds] Could not update the feed registry: {e}")
+
+
+def record_feed_results(results: Iterable[FeedResult], registry_path: str = FEED_REGISTRY_PATH) -> None:
+    '''
+    @brief Record in the feed registry the outcome of feeds fetched with `record=False`.
+
+    Stores the validators, entries seen and next poll time of each feed; call
+    it once the entries of `results` have been saved.
+
+    @param results Results returned by `fetch_feeds` (Iterable[FeedResult]).
+    @param registry_path Feed registry database (str).
+    @return None.
+    '''
+    results = list(results)
+    if not results:
+        return
+    try:
+        registry = open_feed_registry(registry_path)
+    except Exception as e:
+        logger.warning(f"[feeds] Feed registry not available; outcomes not recorded: {e}")
+        return
+    try:
+        _record_results(registry, results)
+    finally:
+        registry.close()
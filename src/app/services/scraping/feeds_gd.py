@@ -5,11 +5,13 @@
 @details Provides asynchronous functions to perform Google Dork searches and store results for cybersecurity-related RSS/Atom feeds.
 """
 import asyncio
-import random
+from contextlib import aclosing
 from pathlib import Path
 from googlesearch import search
 from loguru import logger
 from concurrent.futures import ThreadPoolExecutor
+from app.models.url_frontier import open_frontier, import_url_file, upsert_urls, FEED_DISCOVERY_QUEUE
+from app.services.scraping.search_scheduler import get_search_scheduler
 
 USER_AGENTS = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
@@ -30,9 +32,6 @@ DORKS = [
     '"information security" "Atom feed"',
 ]
 
-MAX_SEARCHES_PER_MINUTE = 6
-MIN_SECONDS_BETWEEN_SEARCHES = 60 / MAX_SEARCHES_PER_MINUTE
-
 executor = ThreadPoolExecutor()
 
 OUTPUT_FILE = Path("./data/urls_cybersecurity_ot_it.txt")
@@ -58,7 +57,7 @@ async def run_dork_search_feed():
     '''
     @brief Perform Google Dork queries and write results incrementally to a file.
 
-    Executes a list of predefined search queries related to cybersecurity topics. Each valid, non-duplicate result is written immediately to a local file. Includes randomized delays to reduce risk of throttling by Google.
+    Executes a list of predefined search queries related to cybersecurity topics. The queries are queued in the process-wide search scheduler, which paces them with the token bucket shared with the news search and reuses recent results. The results of each query are upserted in bulk into the URL frontier and the ones it did not know yet are written immediately to a local file.
 
     @return None. The function writes output to a file and logs progress.
     '''
@@ -68,46 +67,43 @@ async def run_dork_search_feed():
     else:
         logger.info("Starting search for cybersecurity-related URLs...")
 
-    existing_urls = set()
-    if OUTPUT_FILE.exists():
-        with OUTPUT_FILE.open("r", encoding="utf-8") as f:
-            existing_urls = {line.strip() for line in f if line.strip()}
-
-    for dork in DORKS:
-        if asyncio.iscoroutinefunction(getattr(logger, "info", None)):
-            await logger.info(f"🔎 Searching with dork: {dork}")
-        else:
-            logger.info(f"🔎 Searching with dork: {dork}")
-        try:
-            results = await search_async(dork, num_results=15)
-            for url in results:
-                if not url.startswith("http"):
-                    continue
-                if url in existing_urls:
-                    continue
-                if asyncio.iscoroutinefunction(getattr(logger, "success", None)):
-                    await logger.success(f"Found URL: {url}")
+    # Deduplicate against the URL frontier (canonical URLs, indexed lookups);
+    # the output file is only imported the first time
+    conn = open_frontier()
+    try:
+        import_url_file(conn, OUTPUT_FILE, source="urls_file")
+
+        scheduler = get_search_scheduler()
+        async with aclosing(scheduler.iter_searches(DORKS, 15, backend=search_async)) as searches:
+            async for dork, results in searches:
+                if asyncio.iscoroutinefunction(getattr(logger, "info", None)):
+                    await logger.info(f"🔎 Searched with dork: {dork}")
                 else:
-                    logger.success(f"Found URL: {url}")
-                with OUTPUT_FILE.open("a", encoding="utf-8") as f:
-                    f.write(url + "\n")
-                existing_urls.add(url)
-                await asyncio.sleep(random.uniform(1, 2))
-        except Exception as e:
-            if asyncio.iscoroutinefunction(getattr(logger, "error", None)):
-                await logger.error(f"Error while searching with dork '{dork}': {e}")
-            else:
-                logger.error(f"Error while searching with dork '{dork}': {e}")
-        sleep_time = random.uniform(
-            MIN_SECONDS_BETWEEN_SEARCHES * 0.8, MIN_SECONDS_BETWEEN_SEARCHES * 1.5
-        )
-        if asyncio.iscoroutinefunction(getattr(logger, "info", None)):
-            await logger.info(f"Waiting {sleep_time:.2f} seconds before next search...")
-        else:
-            logger.info(f"Waiting {sleep_time:.2f} seconds before next search...")
-        await asyncio.sleep(sleep_time)
+                    logger.info(f"🔎 Searched with dork: {dork}")
+                try:
+                    if isinstance(results, Exception):
+                        raise results
+                    new_urls = upsert_urls(
+                        conn, [url for url in results if url.startswith("http")], FEED_DISCOVERY_QUEUE, source="dork_feed"
+                    )
+                    if new_urls:
+                        with OUTPUT_FILE.open("a", encoding="utf-8") as f:
+                            for url in new_urls:
+                                f.write(url + "\n")
+                    for url in new_urls:
+                        if asyncio.iscoroutinefunction(getattr(logger, "success", None)):
+                            await logger.success(f"Found URL: {url}")
+                        else:
+                            logger.success(f"Found URL: {url}")
+                except Exception as e:
+                    if asyncio.iscoroutinefunction(getattr(logger, "error", None)):
+                        await logger.error(f"Error while searching with dork '{dork}': {e}")
+                    else:
+                        logger.error(f"Error while searching with dork '{dork}': {e}")
+    finally:
+        conn.close()
 
     if asyncio.iscoroutinefunction(getattr(logger, "info", None)):
-        await logger.info("Finished all dork searches.")
+        await logger.info(f"Finished all dork searches. Search stats: {scheduler.summary()}")
     else:
-        logger.info("Finished all dork searches.")
+        logger.info(f"Finished all dork searches. Search stats: {scheduler.summary()}")
@@ -4,7 +4,6 @@
 @brief Extracts real URLs from Google Alerts RSS feeds.
 @details Automates extraction and cleaning of URLs from Google Alerts RSS feeds, saving results to a file for further processing. Includes logging for monitoring.
 """
-import feedparser
 # @ Author: RootAnto
 # @ Project: Cebolla
 # @ Create Time: 2025-05-20 10:30:50
@@ -13,10 +12,13 @@ import feedparser
 # redirected links to get the actual URLs, and saves them to an output file.
 # Logging with loguru is included for monitoring the process.
 
-import feedparser
+import asyncio
 import urllib.parse
 from loguru import logger
 import os
+from app.models.url_frontier import open_frontier, import_url_file, upsert_urls, FEED_DISCOVERY_QUEUE
+from app.models.feed_registry import FEED_POLL_MIN, FEED_POLL_MAX, open_feed_registry, seconds_until_due
+from app.services.scraping.feed_service import fetch_feeds, record_feed_results
 
 # Path to the file containing Google Alerts RSS feed URLs
 FEEDS_FILE_PATH = "./data/google_alert_rss.txt"
@@ -40,17 +42,36 @@ def clean_google_redirect_url(url: str) -> str:
     return real_url
 
 
+def next_alert_delay(feed_urls) -> float:
+    '''
+    @brief Seconds until the next Google Alerts feed is due, according to the feed registry.
+
+    @param feed_urls Google Alerts feed URLs (list).
+    @return Delay clamped between FEED_POLL_MIN and FEED_POLL_MAX; FEED_POLL_MAX if the registry cannot be read (float).
+    '''
+    try:
+        conn = open_feed_registry()
+        try:
+            delay = seconds_until_due(conn, feed_urls)
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"Could not read the feed registry: {e}")
+        return float(FEED_POLL_MAX)
+    return float(min(max(delay, FEED_POLL_MIN), FEED_POLL_MAX))
+
+
 def fetch_and_save_alert_urls():
     '''
     @brief Parses Google Alerts RSS feeds and extracts the real destination URLs.
 
-    Reads RSS feed URLs from a file, parses each feed using `feedparser`, and extracts the actual destination URLs from redirect links (typical in Google Alerts). Removes any redirect/tracking wrappers, cleans the URLs, and writes the final list to a specified output file.
+    Reads RSS feed URLs from a file, downloads concurrently with the feed service the ones that are due (each feed is polled at its own adaptive interval, and conditional requests skip feeds unchanged since the last run), and extracts the actual destination URLs from redirect links (typical in Google Alerts). Removes any redirect/tracking wrappers, upserts the URLs into the URL frontier and appends the ones it did not know yet to the output file. The feed registry is only updated once the URLs are in the frontier, so after a failed update the feeds are downloaded in full again instead of answering "not modified".
 
-    @return None. The function writes output to a file and logs progress.
+    @return Seconds until the next feed is due, to schedule the next run (float).
     '''
     if not os.path.exists(FEEDS_FILE_PATH):
         logger.error(f"Feeds file not found: {FEEDS_FILE_PATH}")
-        return
+        return float(FEED_POLL_MAX)
 
     os.makedirs(os.path.dirname(URLS_FILE_PATH), exist_ok=True)
 
@@ -66,10 +87,16 @@ def fetch_and_save_alert_urls():
             url_only = line.split('|')[0].strip()
             feed_urls.append(url_only)
 
-    for feed_url in feed_urls:
-        logger.info(f"Reading feed: {feed_url}")
-        feed = feedparser.parse(feed_url)
-
+    # Called from a worker thread: run the concurrent fetch in its own event loop
+    feeds = asyncio.run(fetch_feeds(feed_urls, due_only=True, record=False))
+    for feed in feeds:
+        feed_url = feed.url
+        if feed.not_modified:
+            logger.info(f"Feed not modified since the last run: {feed_url}")
+            continue
+        if feed.error:
+            logger.warning(f"Could not read feed {feed_url}: {feed.error}")
+            continue
         if not feed.entries:
             logger.warning(f"No entries found in: {feed_url}")
             continue
@@ -82,33 +109,33 @@ def fetch_and_save_alert_urls():
 
     if not total_urls:
         logger.warning("No valid URLs were extracted from any feed.")
-        return
+        record_feed_results(feeds)
+        return next_alert_delay(feed_urls)
 
-    # ensure we do not duplicate existing entries
-    existing = set()
-    if os.path.exists(URLS_FILE_PATH):
+    # Deduplicate against the URL frontier (canonical URLs, indexed lookups)
+    # instead of reading the whole URL file into a set on every run
+    try:
+        conn = open_frontier()
         try:
-            with open(URLS_FILE_PATH, "r", encoding="utf-8") as f:
-                existing = {line.strip() for line in f if line.strip()}
-        except Exception:
-            existing = set()
-
-    # filter out urls already present and dedupe within this batch
-    new_urls = []
-    seen = set()
-    for url in total_urls:
-        u = url.strip()
-        if not u or u in existing or u in seen:
-            continue
-        seen.add(u)
-        new_urls.append(u)
+            import_url_file(conn, URLS_FILE_PATH, source="urls_file")
+            new_urls = upsert_urls(conn, total_urls, FEED_DISCOVERY_QUEUE, source="google_alerts")
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.error(f"Could not update the URL frontier: {e}")
+        return next_alert_delay(feed_urls)
+
+    # The entries are saved: store the validators and next poll times
+    record_feed_results(feeds)
+    delay = next_alert_delay(feed_urls)
 
     if not new_urls:
         logger.info("No new unique URLs to add to %s", URLS_FILE_PATH)
-        return
+        return delay
 
     with open(URLS_FILE_PATH, "a", encoding="utf-8") as f:
         for url in new_urls:
             f.write(url + "\n")
 
     logger.info(f"{len(new_urls)} new URLs saved to {URLS_FILE_PATH}")
+    return delay
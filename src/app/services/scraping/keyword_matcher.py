@@ -0,0 +1,180 @@
+"""
+@file keyword_matcher.py
+@author naflashDev
+@brief Compiled multi-keyword matcher used to filter relevant articles.
+@details The scrapers used to test every keyword with a separate substring scan
+         (and `news_gd` lowercased the whole article once per keyword), with
+         plain substring semantics ("apt" matched "adapt"). A `KeywordMatcher`
+         compiles the keyword list once: every keyword gets a word-bounded
+         regex and the text is lowercased a single time. Regexes only run for
+         keywords that pass a cheap prefilter, chosen by list size:
+           - up to `SCAN_MAX_PROBES` keywords, a substring probe per keyword
+             (CPython's substring search is faster than tokenizing the text);
+           - above that, the text is split into words once and single-word
+             keywords are resolved with set/counter lookups, while multi-word
+             keywords only run when their first word is present, so the cost
+             no longer grows with the number of keywords.
+         Matching is case-insensitive and respects word boundaries ("ataque"
+         does not match "ataques"); whitespace inside a multi-word keyword
+         matches any run of whitespace. Every keyword is counted
+         independently, so "cyber threat" also counts as an occurrence of
+         "threat".
+"""
+
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern, Tuple
+
+# Word tokens, consistent with the regex word boundaries used for phrases
+_WORD = re.compile(r"\w+")
+
+# Largest keyword list checked with substring probes instead of the word index
+SCAN_MAX_PROBES = 100
+
+
+def _normalize(keyword: str) -> str:
+    '''
+    @brief Lowercase a keyword and collapse its inner whitespace.
+
+    @param keyword Keyword as configured (str).
+    @return Normalized form (str).
+    '''
+    return " ".join(keyword.lower().split())
+
+
+def _keyword_regex(normalized: str) -> Pattern:
+    '''
+    @brief Compile the word-bounded regex of a keyword.
+
+    @param normalized Normalized keyword (str).
+    @return Compiled pattern to run on lowercased text (Pattern).
+    '''
+    body = r"\s+".join(re.escape(part) for part in normalized.split(" "))
+    return re.compile(r"(?<!\w)" + body + r"(?!\w)")
+
+
+class KeywordMatcher:
+    '''
+    @brief Keyword list compiled once into word-bounded regexes plus a prefilter index.
+    '''
+
+    def __init__(self, keywords: Iterable[str], scan: Optional[bool] = None) -> None:
+        '''
+        @brief Compile the keyword list.
+
+        @param keywords Keywords to look for; case and inner whitespace are ignored (Iterable[str]).
+        @param scan Prefilter with substring probes (True) or the word index (False); None picks by list size.
+        '''
+        # Normalized form -> keyword as given (first spelling wins)
+        self._keywords: Dict[str, str] = {}
+        for keyword in keywords:
+            normalized = _normalize(keyword)
+            if normalized:
+                self._keywords.setdefault(normalized, keyword)
+        # Single-word keywords, looked up directly among the words of the text
+        self._words: Dict[str, str] = {}
+        # Other keywords grouped by their first word ("" when they have none)
+        self._phrases: Dict[str, List[Tuple[str, Pattern]]] = {}
+        # Every keyword grouped by the fragment every match starts with
+        self._probes: Dict[str, List[Tuple[str, Pattern]]] = {}
+        for normalized, keyword in self._keywords.items():
+            entry = (keyword, _keyword_regex(normalized))
+            self._probes.setdefault(normalized.split(" ")[0], []).append(entry)
+            words = _WORD.findall(normalized)
+            if words == [normalized]:
+                self._words[normalized] = keyword
+            else:
+                self._phrases.setdefault(words[0] if words else "", []).append(entry)
+        self._always = self._phrases.get("", [])
+        self.scan = len(self._probes) <= SCAN_MAX_PROBES if scan is None else scan
+
+    @property
+    def keywords(self) -> List[str]:
+        '''
+        @brief Keywords of the matcher, as given and without duplicates.
+
+        @return List of keywords (List[str]).
+        '''
+        return list(self._keywords.values())
+
+    def _candidate_phrases(self, present) -> List[Tuple[str, Pattern]]:
+        '''
+        @brief Select the multi-word keywords whose first word occurs in the text.
+
+        @param present Words of the text (set or dict keys view).
+        @return List of (keyword, pattern) pairs to verify.
+        '''
+        candidates = list(self._always)
+        for first in present & self._phrases.keys():
+            candidates.extend(self._phrases[first])
+        return candidates
+
+    def _probed(self, lowered: str) -> Iterator[Tuple[str, Pattern, int]]:
+        '''
+        @brief Yield the keywords whose leading fragment occurs in the text.
+
+        @param lowered Lowercased text (str).
+        @return Iterator of (keyword, pattern, first position of the fragment) to verify.
+        '''
+        for probe, entries in self._probes.items():
+            start = lowered.find(probe)
+            if start >= 0:
+                for keyword, pattern in entries:
+                    yield keyword, pattern, start
+
+    def search(self, text: str) -> bool:
+        '''
+        @brief Tell whether the text contains at least one keyword.
+
+        @param text Text to scan (str).
+        @return True if any keyword is found (bool).
+        '''
+        if not text:
+            return False
+        lowered = text.lower()
+        if self.scan:
+            return any(pattern.search(lowered, start) for _, pattern, start in self._probed(lowered))
+        present = set(_WORD.findall(lowered))
+        if not present.isdisjoint(self._words):
+            return True
+        return any(pattern.search(lowered) for _, pattern in self._candidate_phrases(present))
+
+    def count(self, text: str) -> Dict[str, int]:
+        '''
+        @brief Count the occurrences of each keyword in the text.
+
+        @param text Text to scan (str).
+        @return Mapping keyword -> occurrences, only for keywords found (Dict[str, int]).
+        '''
+        if not text:
+            return {}
+        lowered = text.lower()
+        counts: Dict[str, int] = {}
+        if self.scan:
+            candidates = self._probed(lowered)
+        else:
+            words = Counter(_WORD.findall(lowered))
+            for word in words.keys() & self._words.keys():
+                counts[self._words[word]] = words[word]
+            candidates = ((keyword, pattern, 0) for keyword, pattern in self._candidate_phrases(words.keys()))
+        for keyword, pattern, start in candidates:
+            found = len(pattern.findall(lowered, start))
+            if found:
+                counts[keyword] = found
+        return counts
+
+
+@lru_cache(maxsize=32)
+def _cached_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+
+def get_keyword_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    '''
+    @brief Return the shared matcher compiled for a keyword list.
+
+    @param keywords Keywords to match (Iterable[str]).
+    @return KeywordMatcher instance, compiled once per distinct list.
+    '''
+    return _cached_matcher(tuple(keywords))
@@ -5,15 +5,25 @@
 @details Provides asynchronous search utilities to find cybersecurity-related news feeds using Google Dorks and store results for further processing.
 """
 import asyncio
-import asyncio
-import json
-import random
-from pathlib import Path
-from typing import List, Dict, Optional
+import importlib.util
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import aclosing, asynccontextmanager
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlsplit
 import httpx
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml.etree import ParserError
 from googlesearch import search
 from loguru import logger
+from app.models import result_store
+from app.models.url_filter import get_url_filter
+from app.models.near_duplicates import article_signature, near_duplicate_of, register_article
+from app.services.scraping.keyword_matcher import get_keyword_matcher
+from app.services.scraping.search_scheduler import get_search_scheduler
 
 HEADERS = {
     'User-Agent': (
@@ -35,72 +45,392 @@ DORKS = [
 ]
 
 KEYWORDS = [
-    'vulnerability', 'exploit', 'SCADA', 'ICS', 'OT security',
-    'IT security', 'malware', 'vulnerabilidad', 'ciberseguridad'
+    'vulnerability', 'vulnerabilities', 'exploit', 'exploits', 'SCADA', 'ICS',
+    'OT security', 'IT security', 'malware', 'vulnerabilidad', 'vulnerabilidades',
+    'ciberseguridad'
 ]
 
-OUTPUT_FILE = Path("./outputs/result.json")
+# Directory of the shared segmented result store
+RESULT_STORE_DIR = result_store.RESULT_STORE_DIR
+
+# Article fetch stage: concurrent requests, per-host politeness and request timeout
+FETCH_CONCURRENCY = 8
+PER_HOST_CONCURRENCY = 2
+PER_HOST_DELAY = 1.0
+FETCH_TIMEOUT = 10.0
+
+# Article HTML is parsed in a shared pool of this many workers
+PARSE_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+# Tags extracted from article pages, in the order of the news dict
+NEWS_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6", "p")
+# Elements whose text BeautifulSoup's get_text() leaves out
+_NON_TEXT_TAGS = frozenset({"script", "style", "template", "rt", "rp"})
+
+
+def match_keywords(text: str, keywords: List[str] = KEYWORDS) -> Dict[str, int]:
+    '''
+    @brief Count the relevant keywords found in an article.
+
+    Uses the shared compiled matcher (case-insensitive, whole words) so the text is scanned once for all keywords.
+
+    @param text Full text content of the article (str).
+    @param keywords List of keywords to check against (List[str]).
+    @return Mapping keyword -> occurrences for the keywords found (Dict[str, int]).
+    '''
+    return get_keyword_matcher(keywords).count(text)
 
 
 def is_relevant(text: str, keywords: List[str] = KEYWORDS) -> bool:
     '''
     @brief Check if the article contains any relevant keyword.
 
-    Evaluates whether the given text includes at least one of the defined keywords (case-insensitive).
+    Evaluates whether the given text includes at least one of the defined keywords (case-insensitive, whole words).
 
     @param text Full text content of the article (str).
     @param keywords List of keywords to check against (List[str]).
     @return True if any keyword is found, False otherwise (bool).
     '''
-    return any(k.lower() in text.lower() for k in keywords)
+    return get_keyword_matcher(keywords).search(text)
+
+
+class FetchStats:
+    '''
+    @brief Per-URL latency and status counters of an article fetch run.
+    '''
+
+    def __init__(self) -> None:
+        # Outcome -> URLs: HTTP status code, "timeout", "error" or "deadline"
+        self.statuses: Counter = Counter()
+        # URL -> seconds until the response (or the failure) arrived
+        self.latencies: Dict[str, float] = {}
+
+    def record(self, url: str, status, latency: Optional[float] = None) -> None:
+        '''
+        @brief Record the outcome of one URL.
+
+        @param url Fetched URL (str).
+        @param status HTTP status code (int) or outcome name (str).
+        @param latency Seconds spent, if a request was made (float).
+        '''
+        self.statuses[status] += 1
+        if latency is not None:
+            self.latencies[url] = latency
+
+    def summary(self) -> Dict:
+        '''
+        @brief Aggregate counters for logging.
+
+        @return Dictionary with fetched URLs, outcome counts and p50/p95/max latency in seconds (Dict).
+        '''
+        ordered = sorted(self.latencies.values())
+
+        def percentile(q: float) -> float:
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+        return {
+            "fetched": sum(self.statuses.values()),
+            "statuses": {str(k): v for k, v in self.statuses.items()},
+            "p50": round(percentile(0.5), 3),
+            "p95": round(percentile(0.95), 3),
+            "max": round(ordered[-1], 3) if ordered else 0.0,
+        }
+
+
+class HostLimiter:
+    '''
+    @brief Per-host politeness: bounded concurrent requests and a minimum delay between request starts.
+    '''
+
+    def __init__(self, per_host: int = PER_HOST_CONCURRENCY, delay: float = PER_HOST_DELAY) -> None:
+        '''
+        @param per_host Concurrent requests allowed per host (int).
+        @param delay Minimum seconds between two requests to the same host (float).
+        '''
+        self.per_host = per_host
+        self.delay = delay
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._next_start: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        '''
+        @brief Hold a request slot of the URL's host, waiting for its politeness delay.
+
+        @param url URL about to be requested (str).
+        @return Async context manager.
+        '''
+        host = urlsplit(url).hostname or ""
+        semaphore = self._slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with semaphore:
+            async with lock:
+                loop = asyncio.get_running_loop()
+                wait = self._next_start.get(host, 0.0) - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_start[host] = loop.time() + self.delay
+            yield
+
+
+def http2_available() -> bool:
+    '''
+    @brief Tell whether httpx can negotiate HTTP/2 (the optional `h2` package is installed).
+
+    @return True if HTTP/2 can be enabled (bool).
+    '''
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_http_client(max_connections: int = FETCH_CONCURRENCY) -> httpx.AsyncClient:
+    '''
+    @brief Pooled HTTP client shared by every article fetch of a run (keep-alive, TLS reuse, HTTP/2 if available).
+
+    @param max_connections Size of the connection pool (int).
+    @return httpx.AsyncClient to be closed by the caller.
+    '''
+    return httpx.AsyncClient(
+        headers=HEADERS,
+        timeout=FETCH_TIMEOUT,
+        follow_redirects=True,
+        http2=http2_available(),
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    )
+
+
+def _element_text(element) -> str:
+    '''
+    @brief Text of an element as `BeautifulSoup.get_text(strip=True)` returns it.
+
+    Every text fragment of the subtree is stripped and the fragments are
+    concatenated without separator; comments and the contents of script,
+    style, template and ruby annotation elements are left out.
+
+    @param element lxml element (HtmlElement).
+    @return Concatenated text (str).
+    '''
+    parts = []
+
+    def walk(node):
+        if node.text:
+            parts.append(node.text.strip())
+        for child in node:
+            # Comments and processing instructions have a non-string tag
+            if isinstance(child.tag, str) and child.tag not in _NON_TEXT_TAGS:
+                walk(child)
+            if child.tail:
+                parts.append(child.tail.strip())
+
+    walk(element)
+    return "".join(parts)
+
+
+def extract_news_texts(root) -> Dict[str, List[str]]:
+    '''
+    @brief Collect the text of every h1-h6 and p element in a single traversal of an lxml tree.
+
+    @param root Parsed document (HtmlElement).
+    @return Mapping tag -> texts in document order, for every tag of NEWS_TAGS (Dict[str, List[str]]).
+    '''
+    texts: Dict[str, List[str]] = {tag: [] for tag in NEWS_TAGS}
+    for element in root.iter(*NEWS_TAGS):
+        # Text inside <template> is not part of the page
+        inert = next(element.iterancestors("template"), None) is not None
+        texts[element.tag].append("" if inert else _element_text(element))
+    return texts
+
+
+def parse_news_html(url: str, html: str) -> Optional[Dict]:
+    '''
+    @brief Extract the article structure from its HTML and keep it only if relevant.
+
+    Parses the page once with lxml and reads every heading/paragraph in a
+    single traversal. Runs in the parse pool (see `parse_news_html_async`).
+
+    @param url URL of the article (str).
+    @param html Page HTML (str).
+    @return Dictionary containing article metadata or None if irrelevant (Optional[Dict]).
+    '''
+    try:
+        root = lxml.html.document_fromstring(html)
+    except ValueError:
+        # Unicode input with an XML encoding declaration must be parsed as bytes
+        root = lxml.html.document_fromstring(html.encode("utf-8"))
+    except ParserError:
+        # Empty document: nothing to extract
+        return None
+
+    title = next(root.iter("title"), None)
+    texts = extract_news_texts(root)
+    news = {
+        "url": url,
+        "title": (title.text or "").strip() if title is not None and len(title) == 0 else "",
+        **texts,
+    }
+
+    full_text = " ".join(news["p"])
+    matches = match_keywords(full_text)
+    if not matches:
+        return None
+    logger.debug(f"Relevant article {url} (keywords: {matches})")
+    return news
+
+
+_parse_pool: Optional[Executor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> Executor:
+    '''
+    @brief Return the shared pool that parses article HTML and feeds off the event loop.
+
+    A process pool is created on first use (parsing is CPU-bound and would hold
+    the GIL in a thread); a thread pool is used if processes cannot be started.
+
+    @return Executor instance.
+    '''
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            try:
+                _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"Process pool not available for HTML parsing, using threads: {e}")
+                _parse_pool = ThreadPoolExecutor(max_workers=PARSE_WORKERS)
+        return _parse_pool
+
+
+def shutdown_parse_pool() -> None:
+    '''
+    @brief Stop the shared parse pool; the next parse creates a new one.
+
+    @return None.
+    '''
+    global _parse_pool
+    with _parse_pool_lock:
+        pool, _parse_pool = _parse_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_in_parse_pool(func, *args):
+    '''
+    @brief Run a picklable parsing function in the shared parse pool.
+
+    @param func Module-level function (Callable).
+    @param args Picklable arguments.
+    @return Result of `func(*args)`.
+    '''
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_parse_pool(), func, *args)
+    except BrokenExecutor as e:
+        # A worker died; start a fresh pool next time and parse this one in a thread
+        logger.warning(f"Parse pool broken ({e}); restarting it.")
+        shutdown_parse_pool()
+        return await asyncio.to_thread(func, *args)
+
+
+async def parse_news_html_async(url: str, html: str) -> Optional[Dict]:
+    '''
+    @brief Run `parse_news_html` in the shared parse pool so large pages do not stall the event loop.
+
+    @param url URL of the article (str).
+    @param html Page HTML (str).
+    @return Same result as `parse_news_html` (Optional[Dict]).
+    '''
+    return await run_in_parse_pool(parse_news_html, url, html)
 
 
-async def extract_news_structure(url: str) -> Optional[Dict]:
+async def extract_news_structure(
+    url: str,
+    client: Optional[httpx.AsyncClient] = None,
+    stats: Optional[FetchStats] = None,
+) -> Optional[Dict]:
     '''
     @brief Extract structured content from a news article URL.
 
     Fetches and parses the HTML of the given URL to extract article content and metadata. Only returns the result if it's considered relevant.
 
     @param url URL of the article (str).
+    @param client Shared HTTP client; a temporary one is created when None (httpx.AsyncClient).
+    @param stats Optional counters receiving the status and latency of the request (FetchStats).
     @return Dictionary containing article metadata or None if irrelevant or error occurs (Optional[Dict]).
     '''
+    start = time.perf_counter()
+    recorded = False
     try:
-        async with httpx.AsyncClient(
-            headers=HEADERS, timeout=10, follow_redirects=True
-        ) as client:
+        if client is None:
+            async with httpx.AsyncClient(
+                headers=HEADERS, timeout=FETCH_TIMEOUT, follow_redirects=True
+            ) as own_client:
+                response = await own_client.get(url)
+        else:
             response = await client.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            def extract_all(tag: str) -> List[str]:
-                '''
-                @brief Extract all text content for a given HTML tag from the soup.
-
-                @param tag HTML tag to search for (str).
-                @return List of text content for the given tag (List[str]).
-                '''
-                return [e.get_text(strip=True) for e in soup.find_all(tag)]
-
-            news = {
-                "url": url,
-                "title": soup.title.string.strip() if soup.title else "",
-                "h1": extract_all("h1"),
-                "h2": extract_all("h2"),
-                "h3": extract_all("h3"),
-                "h4": extract_all("h4"),
-                "h5": extract_all("h5"),
-                "h6": extract_all("h6"),
-                "p": extract_all("p"),
-            }
-
-            full_text = " ".join(news["p"])
-            return news if is_relevant(full_text) else None
+        if stats is not None:
+            stats.record(url, response.status_code, time.perf_counter() - start)
+            recorded = True
+        response.raise_for_status()
+        return await parse_news_html_async(url, response.text)
 
     except Exception as e:
+        if stats is not None and not recorded:
+            outcome = "timeout" if isinstance(e, httpx.TimeoutException) else "error"
+            stats.record(url, outcome, time.perf_counter() - start)
         logger.warning(f"Error processing {url}: {e}")
         return None
 
 
+async def fetch_articles(
+    urls: List[str],
+    client: httpx.AsyncClient,
+    concurrency: int = FETCH_CONCURRENCY,
+    limiter: Optional[HostLimiter] = None,
+    deadline: Optional[float] = None,
+    stats: Optional[FetchStats] = None,
+) -> List[Tuple[str, Optional[Dict]]]:
+    '''
+    @brief Fetch and parse several articles concurrently with the shared client.
+
+    At most `concurrency` requests run at once and each host is limited by
+    `limiter`. Fetches still running when the deadline passes are cancelled
+    and counted as "deadline".
+
+    @param urls Article URLs (List[str]).
+    @param client Shared HTTP client (httpx.AsyncClient).
+    @param concurrency Maximum concurrent requests (int).
+    @param limiter Per-host politeness limits; a default HostLimiter when None (HostLimiter).
+    @param deadline Event-loop time (`loop.time()`) after which pending fetches are abandoned (float).
+    @param stats Optional counters (FetchStats).
+    @return List of (url, article or None) pairs for the fetches that finished, in input order.
+    '''
+    if not urls:
+        return []
+    limiter = limiter or HostLimiter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(url: str):
+        async with semaphore:
+            async with limiter.slot(url):
+                return await extract_news_structure(url, client=client, stats=stats)
+
+    tasks = {asyncio.ensure_future(fetch(url)): url for url in urls}
+    timeout = None if deadline is None else max(0.0, deadline - asyncio.get_running_loop().time())
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+        if stats is not None:
+            stats.record(tasks[task], "deadline")
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning(f"News fetch deadline reached; {len(pending)} URLs abandoned.")
+    results = []
+    for task, url in tasks.items():
+        if task in done and not task.cancelled() and task.exception() is None:
+            results.append((url, task.result()))
+    return results
+
+
 async def async_search(query: str, num_results: int = 5) -> List[str]:
     '''
     @brief Perform Google search asynchronously.
@@ -119,82 +449,120 @@ async def async_search(query: str, num_results: int = 5) -> List[str]:
 
 def load_existing_urls() -> set:
     '''
-    @brief Load existing URLs from the result file.
+    @brief Load existing URLs from the result store.
 
-    Reads existing URLs from the JSON file to avoid duplication.
+    Returns a snapshot of the store's in-memory URL index, which is built once and then kept up to date incrementally.
 
     @return Set of existing URLs (set).
     '''
-    if OUTPUT_FILE.exists():
-        try:
-            with OUTPUT_FILE.open("r", encoding="utf-8") as f:
-                existing_news = json.load(f)
-                return {item["url"] for item in existing_news}
-        except json.JSONDecodeError:
-            logger.warning("JSON file is corrupted. Starting with an empty set.")
-            return set()
-    return set()
+    try:
+        return result_store.get_result_store(RESULT_STORE_DIR).urls()
+    except Exception as e:
+        logger.warning(f"Could not read result store; starting with an empty set: {e}")
+        return set()
 
 
-def append_news_item(news_item: Dict):
+def open_url_filter():
     '''
-    @brief Append a single news item to the result file.
+    @brief Open the persistent URL filter shared with the dynamic spider.
 
-    Loads existing items, appends a new one, and writes back to disk.
+    The first time the filter file is created it is seeded with the URLs already in the result store.
 
-    @param news_item Dictionary with structured news content (Dict).
-    @return None.
+    @return UrlFilter instance, or None if it cannot be opened (UrlFilter | None).
     '''
     try:
-        if OUTPUT_FILE.exists():
-            with OUTPUT_FILE.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-        else:
-            data = []
+        url_filter = get_url_filter()
+        if url_filter.created:
+            url_filter.created = False
+            url_filter.add_many(load_existing_urls())
+        return url_filter
+    except Exception as e:
+        logger.warning(f"URL filter not available; using the result store index: {e}")
+        return None
 
-        data.append(news_item)
 
-        with OUTPUT_FILE.open("w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+def append_news_item(news_item: Dict) -> Optional[bool]:
+    '''
+    @brief Append a single news item to the result store.
 
+    Appends one JSON line to the active segment instead of rewriting the whole result file.
+    A near-duplicate of a stored article (the same story under another URL) is not stored,
+    only linked to it; a stored item is registered in the near-duplicate index after the append.
+
+    @param news_item Dictionary with structured news content (Dict).
+    @return True if the item was stored, False if it was skipped as a duplicate or near-duplicate, None if the append failed (Optional[bool]).
+    '''
+    signature = article_signature(news_item)
+    original = near_duplicate_of(news_item, signature)
+    if original:
+        register_article(news_item, signature, duplicate_of=original)
+        logger.info(f"Near-duplicate of {original}, skipped: {news_item.get('url')}")
+        return False
+    try:
+        stored = result_store.get_result_store(RESULT_STORE_DIR).append(news_item)
     except Exception as e:
         logger.error(f"Failed to append news item: {e}")
+        return None
+    if stored:
+        register_article(news_item, signature)
+    return stored
 
 
-async def run_news_search():
+async def run_news_search(deadline: Optional[float] = None):
     '''
     @brief Main routine to search and collect cybersecurity news articles.
 
-    Iterates over predefined dorks, searches via Google, extrae y filtra artículos relevantes y escribe cada artículo relevante en un archivo JSON inmediatamente.
+    Queues the predefined dorks in the process-wide search scheduler, which
+    paces them with the token bucket shared with the feed search and reuses
+    recent results, so the next search waits for its token while the articles
+    of the previous one are being fetched. The new results of each dork are
+    fetched concurrently with one pooled HTTP client for the whole run
+    (bounded by FETCH_CONCURRENCY and per-host politeness limits), and each
+    relevant article is written to the result store immediately. Latency,
+    status and search counters are logged at the end.
 
+    @param deadline Optional overall time budget of the run in seconds (float).
     @return None.
     '''
     logger.info("Starting news search...")
 
-    seen_urls = load_existing_urls()
-
-    for dork in DORKS:
-        logger.info(f"Searching with dork: {dork}")
-        try:
-            results = await async_search(dork, num_results=5)
-            for url in results:
-                if not url.startswith("http") or url in seen_urls:
-                    continue
-
-                news_item = await extract_news_structure(url)
-                if news_item:
-                    append_news_item(news_item)
-                    seen_urls.add(url)
-                    logger.success(f"Added news from {url}")
-
-                await asyncio.sleep(random.uniform(2, 5))
-
-        except Exception as e:
-            logger.error(f"rror during search with dork '{dork}': {e}")
-
-        sleep_time = random.randint(20, 35)
-        logger.info(f"Waiting {sleep_time} seconds before next dork...")
-        await asyncio.sleep(sleep_time)
-
-    logger.info("Finished news collection.")
+    # Persistent Bloom filter of canonical URLs (survives restarts); the set of
+    # stored URLs is only used when the filter file cannot be opened
+    seen_urls = open_url_filter()
+    if seen_urls is None:
+        seen_urls = load_existing_urls()
 
+    loop = asyncio.get_running_loop()
+    ends_at = loop.time() + deadline if deadline is not None else None
+    stats = FetchStats()
+    limiter = HostLimiter()
+    scheduler = get_search_scheduler()
+
+    async with create_http_client() as client, aclosing(
+        scheduler.iter_searches(DORKS, 5, backend=async_search)
+    ) as searches:
+        async for dork, results in searches:
+            if ends_at is not None and loop.time() >= ends_at:
+                logger.warning("News search deadline reached; skipping the remaining dorks.")
+                break
+            logger.info(f"Searched with dork: {dork}")
+            try:
+                if isinstance(results, Exception):
+                    raise results
+                urls = [url for url in dict.fromkeys(results) if url.startswith("http")]
+                # The URL filter also drops canonical duplicates within the results
+                urls = seen_urls.filter_new(urls) if hasattr(seen_urls, "filter_new") else [u for u in urls if u not in seen_urls]
+                for url, news_item in await fetch_articles(urls, client, limiter=limiter, deadline=ends_at, stats=stats):
+                    if news_item:
+                        stored = append_news_item(news_item)
+                        if stored is None:
+                            # Not in the URL filter, so a later search retries it
+                            continue
+                        seen_urls.add(url)
+                        if stored:
+                            logger.success(f"Added news from {url}")
+
+            except Exception as e:
+                logger.error(f"Error during search with dork '{dork}': {e}")
+
+    logger.info(f"Finished news collection. Fetch stats: {stats.summary()} | Search stats: {scheduler.summary()}")
@@ -0,0 +1,322 @@
+"""
+@file search_scheduler.py
+@author naflashDev
+@brief Process-wide scheduler of Google Dork searches.
+@details `run_dork_search_feed` and `run_news_search` used to run their dorks
+         one after another with fixed random sleeps (20-35 s, plus 1-2 s per
+         URL), each worker pacing itself on its own. The scheduler replaces
+         those sleeps with one token bucket shared by every search of the
+         process, so the quota (`SEARCH_RATE_PER_MINUTE`) holds even when both
+         workers run at once. `iter_searches` queues all the dorks of a run at
+         once: every query reserves its token in order and searches as soon as
+         the token is available, while the caller is still fetching the
+         articles of the previous results. Recent results are kept in a TTL
+         cache, so a query repeated within `SEARCH_CACHE_TTL` seconds costs no
+         search. The search itself is a pluggable backend, any coroutine
+         function `(query, num_results) -> List[str]`; Google (`googlesearch`)
+         is the default and a local stand-in can drive benchmarks.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from googlesearch import search
+from loguru import logger
+
+SearchBackend = Callable[[str, int], Awaitable[List[str]]]
+
+# Searches allowed per minute for the whole process and tokens available at once
+SEARCH_RATE_PER_MINUTE = 6.0
+SEARCH_BURST = 2
+# Seconds the results of a query are reused
+SEARCH_CACHE_TTL = 3600.0
+SEARCH_CACHE_SIZE = 256
+# Random extra wait, as a fraction of the token wait, so searches are not evenly spaced
+SEARCH_JITTER = 0.25
+
+
+async def google_search(query: str, num_results: int) -> List[str]:
+    '''
+    @brief Default backend: Google search run in a worker thread.
+
+    @param query Search query (str).
+    @param num_results Number of results to retrieve (int).
+    @return List of result URLs (List[str]).
+    '''
+    return await asyncio.to_thread(lambda: list(search(query, num_results=num_results)))
+
+
+class TokenBucket:
+    '''
+    @brief Thread-safe token bucket handing out reservations in FIFO order.
+
+    Tokens are refilled at `rate_per_minute` up to `burst`. A reservation
+    always takes a token, letting the balance go negative, and returns how long
+    the caller must wait, so waiting callers are served in reservation order.
+    '''
+
+    def __init__(self, rate_per_minute: float, burst: int = 1, clock: Callable[[], float] = time.monotonic) -> None:
+        '''
+        @brief Create a full bucket.
+
+        @param rate_per_minute Tokens added per minute (float).
+        @param burst Maximum tokens stored (int).
+        @param clock Monotonic clock in seconds (Callable).
+        '''
+        if rate_per_minute <= 0 or burst < 1:
+            raise ValueError("rate_per_minute must be positive and burst at least 1")
+        self.interval = 60.0 / rate_per_minute
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) / self.interval)
+        self._updated = now
+
+    def reserve(self) -> float:
+        '''
+        @brief Take a token.
+
+        @return Seconds to wait before using it (float).
+        '''
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens * self.interval
+
+    def refund(self) -> None:
+        '''
+        @brief Give back a reserved token that was not used.
+
+        @return None.
+        '''
+        with self._lock:
+            self._refill()
+            self._tokens = min(float(self.burst), self._tokens + 1)
+
+    async def acquire(self, jitter: float = 0.0) -> float:
+        '''
+        @brief Wait for a token.
+
+        @param jitter Random extra wait as a fraction of the wait (float).
+        @return Seconds waited (float).
+        '''
+        wait = self.reserve()
+        if wait > 0:
+            wait += random.uniform(0, wait * jitter)
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.refund()
+                raise
+        return wait
+
+
+class SearchScheduler:
+    '''
+    @brief Rate-limited, cached search queue shared by the dork workers.
+    '''
+
+    def __init__(
+        self,
+        backend: Optional[SearchBackend] = None,
+        rate_per_minute: float = SEARCH_RATE_PER_MINUTE,
+        burst: int = SEARCH_BURST,
+        cache_ttl: float = SEARCH_CACHE_TTL,
+        cache_size: int = SEARCH_CACHE_SIZE,
+        jitter: float = SEARCH_JITTER,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        '''
+        @brief Create a scheduler.
+
+        @param backend Coroutine function (query, num_results) -> URLs; Google when None (SearchBackend).
+        @param rate_per_minute Searches allowed per minute (float).
+        @param burst Searches allowed back to back (int).
+        @param cache_ttl Seconds the results of a query are reused; 0 disables the cache (float).
+        @param cache_size Maximum cached queries (int).
+        @param jitter Random extra wait as a fraction of each token wait (float).
+        @param clock Monotonic clock in seconds (Callable).
+        '''
+        self.backend = backend or google_search
+        self.bucket = TokenBucket(rate_per_minute, burst, clock)
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.jitter = jitter
+        self._clock = clock
+        self._cache: "OrderedDict[Tuple[str, int], Tuple[float, List[str]]]" = OrderedDict()
+        self._pending: deque = deque()
+        self._lock = threading.Lock()
+        self.stats = {"searches": 0, "cache_hits": 0, "errors": 0, "waited": 0.0}
+
+    def cached(self, query: str, num_results: int) -> Optional[List[str]]:
+        '''
+        @brief Cached results of a query, if still fresh.
+
+        @param query Search query (str).
+        @param num_results Number of results requested (int).
+        @return Copy of the URLs or None (List[str] | None).
+        '''
+        key = (query, num_results)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if self._clock() - entry[0] > self.cache_ttl:
+                del self._cache[key]
+                return None
+            return list(entry[1])
+
+    def _store(self, query: str, num_results: int, urls: List[str]) -> None:
+        if self.cache_ttl <= 0 or not urls:
+            return
+        with self._lock:
+            self._cache[(query, num_results)] = (self._clock(), list(urls))
+            self._cache.move_to_end((query, num_results))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def pending(self) -> List[str]:
+        '''
+        @brief Queries waiting for a search token, oldest first.
+
+        @return List of queries (List[str]).
+        '''
+        with self._lock:
+            return list(self._pending)
+
+    async def search(self, query: str, num_results: int, backend: Optional[SearchBackend] = None) -> List[str]:
+        '''
+        @brief Run one search when the rate limit allows it, or answer it from the cache.
+
+        @param query Search query (str).
+        @param num_results Number of results to retrieve (int).
+        @param backend Backend for this call; the scheduler backend when None (SearchBackend).
+        @return List of result URLs (List[str]).
+        '''
+        urls = self.cached(query, num_results)
+        if urls is not None:
+            self.stats["cache_hits"] += 1
+            return urls
+        with self._lock:
+            self._pending.append(query)
+        try:
+            waited = await self.bucket.acquire(self.jitter)
+        finally:
+            with self._lock:
+                self._pending.remove(query)
+        self.stats["waited"] += waited
+        if waited:
+            logger.debug(f"[search] Waited {waited:.1f}s for a search token: {query}")
+        self.stats["searches"] += 1
+        try:
+            urls = list(await (backend or self.backend)(query, num_results))
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        self._store(query, num_results, urls)
+        return urls
+
+    async def iter_searches(
+        self,
+        queries: Iterable[str],
+        num_results: int,
+        backend: Optional[SearchBackend] = None,
+    ) -> AsyncIterator[Tuple[str, Union[List[str], Exception]]]:
+        '''
+        @brief Queue several queries at once and yield their results in order.
+
+        Every query is scheduled immediately, so the next search waits for its
+        token while the caller processes the current results. Closing the
+        iterator early (e.g. with `contextlib.aclosing` and `break`) cancels the
+        queued searches and gives their tokens back.
+
+        @param queries Search queries (Iterable[str]).
+        @param num_results Number of results per query (int).
+        @param backend Backend for these searches; the scheduler backend when None (SearchBackend).
+        @return Async iterator of (query, URLs or the exception raised by the search).
+        '''
+        tasks = [(query, asyncio.ensure_future(self.search(query, num_results, backend))) for query in queries]
+        try:
+            for query, task in tasks:
+                try:
+                    yield query, await task
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    yield query, e
+        finally:
+            pending = [task for _, task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def summary(self) -> Dict:
+        '''
+        @brief Counters of the scheduler.
+
+        @return Dict with searches, cache hits, errors and seconds waited for tokens.
+        '''
+        return {**self.stats, "waited": round(self.stats["waited"], 1)}
+
+
+_scheduler: Optional[SearchScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def _env_float(name: str, default: float) -> float:
+    '''
+    @brief Read a numeric option from the environment.
+
+    @param name Variable name (str).
+    @param default Value when unset or invalid (float).
+    @return Value (float).
+    '''
+    value = os.getenv(name, "").strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"[search] Invalid {name}={value!r}; using {default}.")
+        return default
+
+
+def get_search_scheduler() -> SearchScheduler:
+    '''
+    @brief Return the process-wide scheduler, creating it on first use.
+
+    Rate, burst and cache TTL come from `SEARCH_RATE_PER_MINUTE`,
+    `SEARCH_BURST` and `SEARCH_CACHE_TTL` in the environment.
+
+    @return Shared SearchScheduler instance.
+    '''
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = SearchScheduler(
+                rate_per_minute=_env_float("SEARCH_RATE_PER_MINUTE", SEARCH_RATE_PER_MINUTE),
+                burst=max(1, int(_env_float("SEARCH_BURST", SEARCH_BURST))),
+                cache_ttl=_env_float("SEARCH_CACHE_TTL", SEARCH_CACHE_TTL),
+            )
+        return _scheduler
+
+
+def reset_search_scheduler() -> None:
+    '''
+    @brief Forget the process-wide scheduler (its bucket, queue and cache).
+
+    @return None.
+    '''
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = None
@@ -3,21 +3,36 @@
 @brief Dynamic Scrapy spider factory and runner.
 @details Creates a dynamic Scrapy `Spider` class from a list of URLs and
 provides helpers to run the spider either once (`run_dynamic_spider`) or
-continuously by polling a PostgreSQL database (`run_dynamic_spider_from_db`).
-The module writes results to a local JSON file and registers spawned
+continuously by polling a PostgreSQL database (`run_dynamic_spider_from_db`),
+optionally woken up by LISTEN/NOTIFY when Tiny Tiny RSS stores new unread entries.
+The module appends results to the shared segmented result store and registers spawned
 processes so the application UI can terminate them via a stop event.
 @author naflashDev
 """
+import lxml.html
 from scrapy.spiders import Spider
 from scrapy.crawler import CrawlerProcess
-from app.models.ttrss_postgre_db import get_entry_links,mark_entry_as_viewed
+from app.models.ttrss_postgre_db import (
+    NEW_ENTRY_CHANNEL,
+    UNREAD_BATCH_SIZE,
+    get_owner_uid,
+    install_new_entry_trigger,
+    iter_unread_entry_batches,
+    mark_entries_as_viewed,
+)
 from app.utils.utils import get_connection_parameters,create_config_file
-from app.models.opensearh_db import store_in_opensearch
-from multiprocessing import Process
+from app.models.opensearh_db import get_bulk_indexer
+from app.models.result_store import get_result_store
+from app.models.near_duplicates import article_signature, near_duplicate_of, register_article
+from app.models.url_filter import get_url_filter
+from app.models.url_frontier import open_frontier, record_crawled, ARTICLE_QUEUE
+from app.services.scraping.crawler_service import CrawlerService, crawl_profile_for, crawl_profile_settings
+from app.services.scraping.keyword_matcher import get_keyword_matcher
 import asyncio
 import logging
 from scrapy.utils.log import configure_logging
-from typing import Type, Coroutine, Any
+from itertools import chain
+from typing import Type, Coroutine, Any, Dict, List, Optional, Tuple
 from loguru import logger
 import os
 from dotenv import load_dotenv
@@ -28,14 +43,11 @@ if env_test.exists():
     load_dotenv(dotenv_path=env_test)
 else:
     load_dotenv()
-# Lock file name to manage concurrent write access to JSON output
-LOCKFILE = "result.json.lock"
-# Output JSON file name
-OUTPUT_FILE = "./outputs/result.json"
 
 CYBERSECURITY_KEYWORDS = [
     "ciberseguridad", "cybersecurity", "malware", "ransomware", "phishing",
-    "hacking", "vulnerabilidad", "vulnerability", "ataque", "ataques", "exploit",
+    "hacking", "vulnerabilidad", "vulnerabilidades", "vulnerability", "vulnerabilities",
+    "ataque", "ataques", "exploit", "exploits",
     "seguridad informática", "seguridad digital", "threat", "threats", "spyware",
     "breach", "data leak", "cyber attack", "ddos","firewall", "intrusion",
     "encryption", "cyber defense", "cyber threat", "zero-day", "botnet",
@@ -45,66 +57,143 @@ CYBERSECURITY_KEYWORDS = [
     , "cross-site scripting"
 ]
 
-def write_json_array_with_lock(data, filename=OUTPUT_FILE, lockfile=LOCKFILE):
+# Content-first mode: stored entry content shorter than this (in characters of
+# extracted text) or ending with an ellipsis is treated as a truncated summary
+STORED_CONTENT_MIN_CHARS = 600
+TRUNCATION_MARKERS = ("...", "…", "[...]", "[…]")
+
+# Trigger mode: seconds without new notifications before a burst is crawled,
+# and maximum seconds a burst may delay the crawl
+TRIGGER_DEBOUNCE = 5.0
+TRIGGER_MAX_DELAY = 60.0
+
+# Tags whose text is extracted from each page, in the order of the output dict
+TEXT_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6", "p")
+
+
+def extract_tag_texts(root, title: str) -> Tuple[Dict[str, List[str]], str]:
     '''
-    @brief Writes data into a single JSON array file with each JSON object on one line, using file-based locking.
+    @brief Extract the text of the heading and paragraph tags in a single traversal of the document.
 
-    If the file does not exist, creates it with an array containing the first data object. If the file exists, inserts the new data before the closing bracket with a comma separator.
+    Equivalent to running `response.css(f"{tag}::text").getall()` for every tag in TEXT_TAGS
+    (direct text nodes of each element, stripped, empty ones dropped), but walks the parsed
+    lxml tree once instead of evaluating one selector per tag.
 
-    @param data The scraped data to write (dict).
-    @param filename Path to the JSON file (str).
-    @param lockfile Path to the lock file (str).
-    @return None.
+    @param root Root lxml element of the parsed page (`response.selector.root`).
+    @param title Page title (str).
+    @return Tuple (texts per tag in TEXT_TAGS order, lowercase full text: title followed by every bucket).
+    '''
+    buckets: Dict[str, List[str]] = {tag: [] for tag in TEXT_TAGS}
+    for element in root.iter(*TEXT_TAGS):
+        bucket = buckets[element.tag]
+        # Direct text nodes: the leading text plus the tail of every child
+        for text in chain((element.text,), (child.tail for child in element)):
+            if text:
+                text = text.strip()
+                if text:
+                    bucket.append(text)
+    full_text = " ".join(chain((title,), chain.from_iterable(buckets.values()))).lower()
+    return buckets, full_text
+
+
+def store_if_relevant(data: Dict[str, Any], full_text: str, parameters) -> bool:
     '''
-    import os
-    import time
-    import json
+    @brief Keep an article if it matches the cybersecurity keywords.
 
-    while os.path.exists(lockfile):
-        time.sleep(0.1)
+    Relevant articles not yet in the result store are appended to it and queued in the
+    `scrapy_documents` bulk indexer (the caller flushes it). Near-duplicates of a stored
+    article (the same story under another URL) are only linked to it in the near-duplicate index.
 
-    with open(lockfile, "w") as f_lock:
-        f_lock.write("locked")
+    @param data Article dict (url, title, h1-h6, p) (dict).
+    @param full_text Lowercase text used for the relevance check (str).
+    @param parameters Tuple of parameters for OpenSearch connection (tuple).
+    @return True if the article is relevant (bool).
+    '''
+    # Match all cybersecurity keywords in a single pass over the text
+    matches = get_keyword_matcher(CYBERSECURITY_KEYWORDS).count(full_text)
+    if not matches:
+        logger.info(f"Descartada (no relevante): {data['url']}")
+        return False
+    signature = article_signature(data)
+    original = near_duplicate_of(data, signature)
+    if original:
+        register_article(data, signature, duplicate_of=original)
+        logger.info(f"Casi duplicado de {original}, se omite: {data['url']}")
+    elif get_result_store().append(data):
+        # Registered as an original only once it is stored
+        register_article(data, signature)
+        get_bulk_indexer(parameters[0],parameters[1],"scrapy_documents").add(data)
+        logger.info(f"URL relacionada con ciberseguridad: {data['url']} (keywords: {matches})")
+    else:
+        logger.info(f"URL ya almacenada, se omite: {data['url']}")
+    return True
+
+
+def stored_entry_document(link: str, title: Optional[str], content: Optional[str], min_chars: int = STORED_CONTENT_MIN_CHARS):
+    '''
+    @brief Build the article dict from the HTML content Tiny Tiny RSS stored for an entry.
 
+    @param link Entry link (str).
+    @param title Entry title (str).
+    @param content Stored HTML content of the entry (str).
+    @param min_chars Minimum extracted text length to trust the stored content (int).
+    @return Tuple (article dict, lowercase full text), or None if the content is empty or truncated.
+    '''
+    if not content or not content.strip():
+        return None
     try:
-        if not os.path.exists(filename):
-            with open(filename, "w", encoding="utf8") as f:
-                f.write("[\n")
-                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
-                f.write("\n]")
-        else:
-            with open(filename, "r+", encoding="utf8") as f:
-                f.seek(0, os.SEEK_END)
-                pos = f.tell() - 1
-
-                while pos > 0:
-                    f.seek(pos)
-                    char = f.read(1)
-                    if char == ']':
-                        break
-                    pos -= 1
-
-                if pos <= 0:
-                    # Malformed file fallback
-                    f.seek(0, os.SEEK_END)
-                    f.write(",\n")
-                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
-                    f.write("\n]")
-                else:
-                    f.seek(pos)
-                    f.truncate()
-                    f.write(",\n")
-                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
-                    f.write("\n]")
-    finally:
-        os.remove(lockfile)
+        root = lxml.html.fragment_fromstring(content, create_parent="div")
+    except Exception:
+        return None
+    title = (title or "").strip() or "Untitled"
+    buckets, full_text = extract_tag_texts(root, title)
+    body = " ".join(chain.from_iterable(buckets.values()))
+    if not body:
+        # Feeds often store bare text or <div>/<br> markup without paragraphs
+        body = " ".join(root.text_content().split())
+        if body:
+            buckets["p"] = [body]
+            full_text = f"{title} {body}".lower()
+    if len(body) < min_chars or body.endswith(TRUNCATION_MARKERS):
+        return None
+    data = {"url": link, "title": title}
+    data.update(buckets)
+    return data, full_text
+
+
+def ingest_stored_entries(entries, parameters, min_chars: int = STORED_CONTENT_MIN_CHARS) -> Tuple[List[str], int]:
+    '''
+    @brief Content-first ingestion: filter and store entries from their stored content.
+
+    Entries whose stored content is empty or truncated are returned so they can be
+    crawled live; the rest go through the same relevance filter and storage as the spider.
+
+    @param entries List of (id, link, title, content) tuples (list).
+    @param parameters Tuple of parameters for OpenSearch connection (tuple).
+    @param min_chars Minimum extracted text length to trust the stored content (int).
+    @return Tuple (links that need a live fetch, number of entries processed from stored content).
+    '''
+    to_fetch: List[str] = []
+    processed = 0
+    relevant = 0
+    for _, link, title, content in entries:
+        document = stored_entry_document(link, title, content, min_chars)
+        if document is None:
+            to_fetch.append(link)
+            continue
+        processed += 1
+        if store_if_relevant(document[0], document[1], parameters):
+            relevant += 1
+    if relevant:
+        get_bulk_indexer(parameters[0],parameters[1],"scrapy_documents").flush()
+    return to_fetch, processed
 
 
 def create_dynamic_spider(urls,parameters) -> Type[Spider]:
     '''
     @brief Creates a dynamic Scrapy spider class for extracting content from a list of URLs.
 
-    Defines and returns a custom Scrapy Spider class that processes each URL, extracts content, writes data to a JSON file, and marks the URL as scraped in the database.
+    Defines and returns a custom Scrapy Spider class that processes each URL, extracts content, appends new articles to the result store, queues them for bulk indexing in OpenSearch, and marks the URL as scraped in the database.
 
     @param urls List of URLs to crawl (list[str]).
     @param parameters Tuple of parameters for OpenSearch connection (tuple).
@@ -120,26 +209,21 @@ def create_dynamic_spider(urls,parameters) -> Type[Spider]:
                 "url": response.url,
                 "title": response.css("title::text").get(default="Untitled")
             }
-            full_text = data["title"].lower()
-            for tag in ["h1", "h2", "h3", "h4", "h5", "h6", "p"]:
-                elements = response.css(f"{tag}::text").getall()
-                clean_elements = [e.strip() for e in elements if e.strip()]
-                data[tag] = clean_elements
-                full_text += " " + " ".join(clean_elements).lower()
-
-            # Check if any cybersecurity keyword is in the text
-            if any(keyword in full_text for keyword in CYBERSECURITY_KEYWORDS):
-                write_json_array_with_lock(data)
-                store_in_opensearch(data,parameters[0],parameters[1],"scrapy_documents")
-                logger.info(f"URL relacionada con ciberseguridad: {response.url}")
+            # One pass over the parsed document fills every tag bucket
+            buckets, full_text = extract_tag_texts(response.selector.root, data["title"])
+            data.update(buckets)
+
+            if store_if_relevant(data, full_text, parameters):
                 yield data
-            else:
-                logger.info(f"Descartada (no relevante): {response.url}")
             logger.info(f"URL: {response.url} scrapeada")
 
 
             yield data
 
+        def closed(self, reason):
+            # Send the documents still buffered for the bulk indexer
+            get_bulk_indexer(parameters[0],parameters[1],"scrapy_documents").flush()
+
 
     return DynamicSpider
 
@@ -160,167 +244,437 @@ def run_dynamic_spider(urls,parameters) -> None:
 
     DynamicSpider = create_dynamic_spider(urls,parameters)
 
-    process = CrawlerProcess(settings={
-        "LOG_ENABLED": False,
-        "USER_AGENT": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-            "(KHTML, like Gecko) Chrome/113.0.0.0 Safari/537.36"
-        ),
-        "DOWNLOAD_DELAY": 2.0,  # 2 seconds between requests
-        "AUTOTHROTTLE_ENABLED": True,  # Adjusts delay based on load
-        "RETRY_ENABLED": True,
-        "RETRY_TIMES": 5,  # Retry failed requests up to 5 times
-        "RETRY_HTTP_CODES": [429, 500, 502, 503, 504],
-        # No FEEDS or ITEM_PIPELINES used here because writing is manual
-    })
+    # Concurrency, per-domain delay, DNS cache and size cap come from the crawl profile
+    settings = crawl_profile_settings(crawl_profile_for("dynamic"))
+    settings.pop("TWISTED_REACTOR", None)
+    # No FEEDS or ITEM_PIPELINES used here because writing is manual
+    process = CrawlerProcess(settings=settings)
 
     process.crawl(DynamicSpider)
     process.start()
     logger.info("Urls scrapeadas")
 
 
+def _record_crawled_urls(url_filter, links: List[str]) -> None:
+    '''
+    @brief Remember the URLs of a processed batch in the URL filter and the URL frontier.
+
+    The frontier keeps their first-seen/last-crawled times and the per-domain crawl state.
+
+    @param url_filter Persistent URL filter, or None when deduplication is off (UrlFilter).
+    @param links URLs of the processed entries (List[str]).
+    @return None.
+    '''
+    if not links:
+        return
+    if url_filter is not None:
+        url_filter.add_many(links)
+    try:
+        conn = open_frontier()
+        try:
+            record_crawled(conn, links, ARTICLE_QUEUE, source="ttrss")
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"[dynamic_spider] Could not record the batch in the URL frontier: {e}")
+
+
+def _log_progress(event) -> None:
+    '''
+    @brief Log a progress event streamed by the crawler subprocess.
+
+    @param event Progress event with "done", "total" and "url" keys (dict).
+    @return None.
+    '''
+    logger.debug(f"Dynamic spider progress {event['done']}/{event['total']}: {event['url']}")
+
+
+def _opensearch_parameters():
+    '''
+    @brief Read the OpenSearch connection parameters from cfg.ini, recreating the file if needed.
+
+    @return Tuple (host, port), or None if the configuration file cannot be created.
+    '''
+    # Obtain the parameters for the OpenSearch database
+    # Default parameters for OpenSearch connection
+    parameters: tuple = (
+        'localhost',
+        9200
+    )
+    file_name: str = 'cfg.ini'
+    file_content: list[str] = [
+        '# Configuration file.\n',
+        '# This file contains the parameters for connecting to the opensearch database server.\n',
+        '# ONLY one uncommented line is allowed.\n',
+        '# The valid line format is: server_ip=valor;server_port=valor\n',
+        'server_ip=localhost;server_port=9200\n'
+    ]
+
+    # Get the connection parameters or assign default ones
+    retorno_otros = get_connection_parameters(file_name)
+    logger.info(retorno_otros[1])
+
+    if retorno_otros[0] != 0:
+        logger.info('Recreating configuration file...')
+        retorno_otros = create_config_file(file_name, file_content)
+        logger.info(retorno_otros[1])
+        # If the file had to be recreated, default values will be used
+        if retorno_otros[0] != 0:
+            logger.error('Configuration file missing. Execution cannot continue without a configuration file.')
+            return None
+        else:
+            # Intentar leer de nuevo tras crear el archivo
+            retorno_otros = get_connection_parameters(file_name)
+            logger.info(retorno_otros[1])
+            if retorno_otros[0] == 0:
+                parameters = retorno_otros[2]
+    else:
+        parameters = retorno_otros[2]  # Get parameters read from the config file
+
+    return parameters
+
+
+def _env_flag(name: str) -> bool:
+    '''
+    @brief Read a boolean option of the dynamic spider from the environment.
+
+    @param name Environment variable (str).
+    @return True if set to 1/true/yes/on (bool).
+    '''
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class EntryNotificationListener:
+    '''
+    @brief LISTEN on the new-entry channel and debounce notifications into micro-batches.
+
+    Holds one pooled connection while active. Notifications only wake the spider loop;
+    the entries themselves are always read from the database, so a lost notification
+    is recovered by the next notification or by the fallback poll.
+    '''
+
+    def __init__(
+        self,
+        pool,
+        channel: str = NEW_ENTRY_CHANNEL,
+        debounce: float = TRIGGER_DEBOUNCE,
+        max_delay: float = TRIGGER_MAX_DELAY,
+    ) -> None:
+        '''
+        @brief Create the listener; call `start()` to begin listening.
+
+        @param pool asyncpg pool to take the listening connection from.
+        @param channel Channel notified by the trigger (str).
+        @param debounce Quiet seconds that end a burst of notifications (float).
+        @param max_delay Maximum seconds a burst may be extended (float).
+        '''
+        self.pool = pool
+        self.channel = channel
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.pending = 0
+        self._conn = None
+        self._event = asyncio.Event()
+
+    @property
+    def active(self) -> bool:
+        '''
+        @brief Tell whether the listening connection is open.
+
+        @return True if listening (bool).
+        '''
+        return self._conn is not None and not self._conn.is_closed()
+
+    def _on_notify(self, conn, pid, channel, payload) -> None:
+        try:
+            self.pending += int(payload)
+        except (TypeError, ValueError):
+            self.pending += 1
+        self._event.set()
+
+    def _on_terminate(self, conn) -> None:
+        logger.warning("[dynamic_spider] LISTEN connection lost; falling back to polling until it is restored.")
+        self._conn = None
+
+    async def start(self) -> bool:
+        '''
+        @brief Acquire a connection and LISTEN on the channel.
+
+        @return True if listening, False on error (bool).
+        '''
+        try:
+            conn = await self.pool.acquire()
+        except Exception as e:
+            logger.warning(f"[dynamic_spider] Could not acquire a LISTEN connection: {e}")
+            return False
+        try:
+            await conn.add_listener(self.channel, self._on_notify)
+            conn.add_termination_listener(self._on_terminate)
+        except Exception as e:
+            logger.warning(f"[dynamic_spider] LISTEN {self.channel} failed: {e}")
+            await self.pool.release(conn)
+            return False
+        self._conn = conn
+        logger.info(f"[dynamic_spider] Listening for new entries on '{self.channel}'.")
+        return True
+
+    async def close(self) -> None:
+        '''
+        @brief Stop listening and return the connection to the pool.
+
+        @return None.
+        '''
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            await conn.remove_listener(self.channel, self._on_notify)
+            conn.remove_termination_listener(self._on_terminate)
+            await self.pool.release(conn)
+        except Exception as e:
+            logger.debug(f"[dynamic_spider] Error closing LISTEN connection: {e}")
+
+    async def wait(self, timeout: float) -> int:
+        '''
+        @brief Wait up to `timeout` seconds for notifications, then debounce the burst.
+
+        Once a notification arrives, keeps waiting while more arrive less than
+        `debounce` seconds apart, for at most `max_delay` seconds.
+
+        @param timeout Seconds to wait for the first notification (float).
+        @return Number of new unread entries notified, 0 on timeout (int).
+        '''
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return 0
+        loop = asyncio.get_running_loop()
+        limit = loop.time() + self.max_delay
+        while True:
+            self._event.clear()
+            remaining = limit - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._event.wait(), min(self.debounce, remaining))
+            except asyncio.TimeoutError:
+                break
+        self._event.clear()
+        pending, self.pending = self.pending, 0
+        return max(pending, 1)
+
+
+async def _wait_for_next_run(
+    total_sleep: float,
+    check_interval: float,
+    stop_event=None,
+    listener: Optional[EntryNotificationListener] = None,
+) -> None:
+    '''
+    @brief Wait for the next lap: a debounced notification, the fallback poll interval or a stop request.
+
+    @param total_sleep Fallback poll interval in seconds (float).
+    @param check_interval Seconds between stop_event checks (float).
+    @param stop_event Optional event to signal stopping the loop.
+    @param listener Optional active notification listener.
+    @return None.
+    '''
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + total_sleep
+    while True:
+        if stop_event is not None and getattr(stop_event, 'is_set', lambda: False)():
+            logger.info("Dynamic spider stop_event detected during sleep; exiting loop.")
+            return
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return
+        timeout = min(check_interval, remaining)
+        if listener is None or not listener.active:
+            await asyncio.sleep(timeout)
+            continue
+        notified = await listener.wait(timeout)
+        if notified:
+            logger.info(f"[dynamic_spider] {notified} new unread entries notified; starting a run.")
+            return
+
+
 async def run_dynamic_spider_from_db(
     pool,
     stop_event=None,
     register_process=None,
     total_sleep: int = 93600,
     check_interval: int = 5,
-    max_laps: int = None
+    max_laps: int = None,
+    batch_size: int = UNREAD_BATCH_SIZE,
+    trigger_mode: Optional[bool] = None,
+    content_first: Optional[bool] = None,
+    crawl_profile: Optional[str] = None,
+    dedup_urls: bool = True
 ) -> Coroutine[Any, Any, None]:
     '''
     @brief Continuously runs the dynamic Scrapy spider, polling URLs from the database and launching scraping processes.
 
-    Periodically acquires URLs from a PostgreSQL connection pool, spawns a separate process to run a Scrapy spider, and waits before repeating the process. Responds to stop events for graceful shutdown.
+    Periodically streams the unread entries from a PostgreSQL connection pool in keyset-paginated batches ordered by entry id, sends each batch to a long-lived crawler subprocess (reactor started once, items and progress streamed back) as soon as it is read, marks the batch as viewed once crawled, and waits before repeating the process (in trigger mode the wait ends as soon as a debounced burst of new-entry notifications arrives). Responds to stop events for graceful shutdown; a batch interrupted by a stop stays unread.
 
     @param pool The asyncpg connection pool for database access.
     @param stop_event Optional event to signal stopping the loop.
-    @param register_process Optional callback to register the spawned process.
+    @param register_process Optional callback to register the crawler service (exposes terminate()).
+    @param batch_size Maximum number of entries crawled and committed per batch (int).
+    @param trigger_mode Wake up on PostgreSQL NOTIFY from the new-entry trigger instead of only
+           polling; `total_sleep` becomes the fallback poll. None reads DYNAMIC_SPIDER_TRIGGER_MODE (bool).
+    @param content_first Build articles from the content Tiny Tiny RSS already stored and only crawl
+           entries whose stored content is empty or truncated. None reads DYNAMIC_SPIDER_CONTENT_FIRST (bool).
+    @param crawl_profile Crawl profile of the crawler subprocess (see crawler_service.CRAWL_PROFILES).
+           None reads CRAWL_PROFILE_DYNAMIC / CRAWL_PROFILE (str).
+    @param dedup_urls Skip entries whose canonical URL is already in the persistent URL filter
+           (`url_filter.py`) and add every processed URL to it (bool).
     @return None (asynchronous coroutine).
     '''
     number = 0
     laps = 0
-    while True:
-        # For testing: break after max_laps if set
-        if max_laps is not None and laps >= max_laps:
-            logger.info(f"Max laps ({max_laps}) reached; exiting run loop.")
-            break
-        # Respect immediate stop requests
-        if stop_event is not None and getattr(stop_event, 'is_set', lambda: False)():
-            logger.info("Dynamic spider stop_event detected; exiting run loop.")
-            break
-
-        # Ensure we have a valid asyncpg pool; try to create one on-demand
-        if pool is None:
-            try:
-                import asyncpg
-                pool = await asyncpg.create_pool(
-                    user=os.getenv("POSTGRES_USER"),
-                    password=os.getenv("POSTGRES_PASSWORD"),
-                    database=os.getenv("POSTGRES_DB"),
-                    host=os.getenv("POSTGRES_HOST"),
-                    port=int(os.getenv("POSTGRES_PORT", 5432)),
-                    min_size=1,
-                    max_size=5,
-                )
-                logger.info("Created PostgreSQL pool on-demand in spider_factory.")
-            except Exception as e:
-                logger.warning(f"DB pool not available; will retry later: {e}")
-                # back off briefly but remain responsive to stop_event
-                await asyncio.sleep(5)
-                continue
-
+    service = None
+    listener = None
+    url_filter = None
+    if dedup_urls:
         try:
-            async with pool.acquire() as conn:
-                urls = await get_entry_links(conn)
+            url_filter = get_url_filter()
+        except Exception as e:
+            logger.warning(f"[dynamic_spider] URL filter not available; crawling without it: {e}")
+    if trigger_mode is None:
+        trigger_mode = _env_flag("DYNAMIC_SPIDER_TRIGGER_MODE")
+    if content_first is None:
+        content_first = _env_flag("DYNAMIC_SPIDER_CONTENT_FIRST")
+    try:
+        while True:
+            # For testing: break after max_laps if set
+            if max_laps is not None and laps >= max_laps:
+                logger.info(f"Max laps ({max_laps}) reached; exiting run loop.")
+                break
+            # Respect immediate stop requests
+            if stop_event is not None and getattr(stop_event, 'is_set', lambda: False)():
+                logger.info("Dynamic spider stop_event detected; exiting run loop.")
+                break
 
-                # Process retrieved URLs (if any) while connection still held
-                if not urls:
-                    # No work — use debug level to avoid console spam
-                    logger.debug("No URLs found to process.")
-                else:
-                    # Only increment and log when there is actual work
-                    number += 1
-                    laps += 1
-                    logger.info(f"Scraped lap {number}: {len(urls)} URLs to process")
-                    # Obtain the parameters for the OpenSearch database
-                    # Default parameters for OpenSearch connection
-                    parameters: tuple = (
-                        'localhost',
-                        9200
+            # Ensure we have a valid asyncpg pool; try to create one on-demand
+            if pool is None:
+                try:
+                    import asyncpg
+                    pool = await asyncpg.create_pool(
+                        user=os.getenv("POSTGRES_USER"),
+                        password=os.getenv("POSTGRES_PASSWORD"),
+                        database=os.getenv("POSTGRES_DB"),
+                        host=os.getenv("POSTGRES_HOST"),
+                        port=int(os.getenv("POSTGRES_PORT", 5432)),
+                        min_size=1,
+                        max_size=5,
                     )
-                    file_name: str = 'cfg.ini'
-                    file_content: list[str] = [
-                        '# Configuration file.\n',
-                        '# This file contains the parameters for connecting to the opensearch database server.\n',
-                        '# ONLY one uncommented line is allowed.\n',
-                        '# The valid line format is: server_ip=valor;server_port=valor\n',
-                        'server_ip=localhost;server_port=9200\n'
-                    ]
-
-                    # Get the connection parameters or assign default ones
-                    retorno_otros = get_connection_parameters(file_name)
-                    logger.info(retorno_otros[1])
-
-                    if retorno_otros[0] != 0:
-                        logger.info('Recreating configuration file...')
-                        retorno_otros = create_config_file(file_name, file_content)
-                        logger.info(retorno_otros[1])
-                        # If the file had to be recreated, default values will be used
-                        if retorno_otros[0] != 0:
-                            logger.error('Configuration file missing. Execution cannot continue without a configuration file.')
-                            return
-                        else:
-                            # Intentar leer de nuevo tras crear el archivo
-                            retorno_otros = get_connection_parameters(file_name)
-                            logger.info(retorno_otros[1])
-                            if retorno_otros[0] == 0:
-                                parameters = retorno_otros[2]
-                    else:
-                        parameters = retorno_otros[2]  # Get parameters read from the config file
-
-                    for url in urls:
-                        await mark_entry_as_viewed(conn, url)
-                    urls_def = []
-                    urls_def = urls_def + [url for url in urls if url not in urls_def]
+                    logger.info("Created PostgreSQL pool on-demand in spider_factory.")
+                except Exception as e:
+                    logger.warning(f"DB pool not available; will retry later: {e}")
+                    # back off briefly but remain responsive to stop_event
+                    await asyncio.sleep(5)
+                    continue
+
+            parameters = None
+            batches = 0
+            try:
+                async with pool.acquire() as conn:
+                    # owner_uid is looked up once per pool
+                    owner_uid = await get_owner_uid(conn, pool=pool)
+
+                # Keyset pages of unread entries: each batch is crawled and its viewed
+                # flag committed before the next page is read, so progress is kept
+                async for entries in iter_unread_entry_batches(pool, owner_uid, batch_size=batch_size, with_content=content_first):
                     # Before launching, check stop_event
                     if stop_event is not None and getattr(stop_event, 'is_set', lambda: False)():
                         logger.info("Dynamic spider stop_event set; aborting launch.")
                         break
-                    # Run the spider in a separate process (avoids signal issues)
-                    p = Process(target=run_dynamic_spider, args=(urls, parameters))
-                    p.start()
-                    # allow caller to keep reference to process so UI can terminate it
-                    if callable(register_process):
+                    if parameters is None:
+                        # Only increment and log when there is actual work
+                        number += 1
+                        laps += 1
+                        parameters = _opensearch_parameters()
+                        if parameters is None:
+                            return
+                    batches += 1
+                    entry_ids = [entry[0] for entry in entries]
+                    if url_filter is not None:
+                        # Drop URLs crawled in earlier runs (other feeds, re-flagged entries)
+                        fresh = set(url_filter.filter_new([entry[1] for entry in entries]))
+                        if len(fresh) < len(entries):
+                            logger.info(f"Scraped lap {number}, batch {batches}: {len(entries) - len(fresh)} URLs already crawled, skipped")
+                        entries = [entry for entry in entries if entry[1] in fresh]
+                    links = [entry[1] for entry in entries]
+                    items = []
+                    if content_first:
+                        # Use the stored content and crawl only empty/truncated entries
+                        links, stored = await asyncio.to_thread(ingest_stored_entries, entries, parameters)
+                        logger.info(f"Scraped lap {number}, batch {batches}: {stored} entries from stored content")
+                    urls_def = list(dict.fromkeys(links))
+                    logger.info(f"Scraped lap {number}, batch {batches}: {len(urls_def)} URLs to process")
+
+                    if urls_def:
+                        # Crawl in the long-lived crawler subprocess (avoids signal issues
+                        # and a new reactor per batch); started lazily on the first batch
+                        if service is None:
+                            service = CrawlerService(profile=crawl_profile or crawl_profile_for("dynamic"))
+                            # allow caller to keep reference to the service so UI can terminate it
+                            if callable(register_process):
+                                try:
+                                    register_process(service)
+                                except Exception:
+                                    pass
                         try:
-                            register_process(p)
-                        except Exception:
-                            pass
+                            items = await asyncio.to_thread(
+                                service.crawl, "dynamic", urls_def, parameters, stop_event, None, _log_progress
+                            )
+                        except Exception as e:
+                            # Leave the batch unread so the next lap retries it
+                            logger.exception(f"Error running dynamic spider batch: {e}")
+                            break
+                        if stop_event is not None and getattr(stop_event, 'is_set', lambda: False)():
+                            logger.info("Dynamic spider stopped during a batch; its entries stay unread.")
+                            break
+
+                    await asyncio.to_thread(_record_crawled_urls, url_filter, [entry[1] for entry in entries])
+                    # Commit the viewed flag of the whole batch in a single UPDATE by entry id
+                    async with pool.acquire() as conn:
+                        marked = await mark_entries_as_viewed(conn, entry_ids, owner_uid)
+                    logger.info(f"Scraped lap {number}, batch {batches} finished: {len(items)} items, {marked} entries marked as viewed")
+
+                if batches == 0:
+                    # No work — use debug level to avoid console spam
+                    logger.debug("No URLs found to process.")
 
-                    # If stop_event set while process running, try to terminate process
-                    if stop_event is not None and getattr(stop_event, 'is_set', lambda: False)():
-                        try:
-                            p.terminate()
-                            logger.info("Dynamic spider process terminated due to stop_event.")
-                        except Exception:
-                            logger.exception("Error terminating dynamic spider process")
-        except Exception as e:
-            logger.exception(f"Error acquiring DB connection from pool or processing URLs: {e}")
-            # drop the pool reference so we attempt to recreate it next loop
-            try:
-                pool = None
-            except Exception:
-                pass
-            await asyncio.sleep(5)
-            continue
+            except Exception as e:
+                logger.exception(f"Error acquiring DB connection from pool or processing URLs: {e}")
+                # drop the pool reference so we attempt to recreate it next loop
+                try:
+                    pool = None
+                except Exception:
+                    pass
+                await asyncio.sleep(5)
+                continue
 
-        logger.debug("Waiting for next run...")
-        # sleep in small increments so we can respond to stop_event quickly
-        slept = 0
-        while slept < total_sleep:
-            if stop_event is not None and getattr(stop_event, 'is_set', lambda: False)():
-                logger.info("Dynamic spider stop_event detected during sleep; exiting loop.")
-                break
-            to_sleep = min(check_interval, total_sleep - slept)
-            await asyncio.sleep(to_sleep)
-            slept += to_sleep
-        
\ No newline at end of file
+            if trigger_mode and (listener is None or not listener.active):
+                if listener is None:
+                    listener = EntryNotificationListener(pool)
+                    try:
+                        async with pool.acquire() as conn:
+                            await install_new_entry_trigger(conn)
+                    except Exception as e:
+                        logger.warning(f"[dynamic_spider] Could not install the new-entry trigger ({e}); it must be installed manually.")
+                else:
+                    listener.pool = pool
+                await listener.start()
+
+            logger.debug("Waiting for next run...")
+            # wait in small increments so we can respond to stop_event quickly;
+            # in trigger mode a notification ends the wait and total_sleep is only the fallback poll
+            await _wait_for_next_run(total_sleep, check_interval, stop_event, listener)
+    finally:
+        if listener is not None:
+            await listener.close()
+        # Stop the crawler subprocess together with the loop
+        if service is not None:
+            await asyncio.to_thread(service.stop)
@@ -7,16 +7,29 @@
 
 
 
-import feedparser
 import asyncio
+import hashlib
 from scrapy.crawler import CrawlerProcess
 from scrapy.spiders import Spider
-from app.models.ttrss_postgre_db import insert_feed_to_db, FeedCreateRequest
-from multiprocessing import Process, Queue
+from app.models.ttrss_postgre_db import bulk_insert_feeds, FeedCreateRequest
+from app.services.scraping.crawler_service import get_crawler_service, crawl_profile_for, crawl_profile_settings
+from app.models.url_frontier import (
+    open_frontier, upsert_urls, claim_batch, complete_urls, FEED_DISCOVERY_QUEUE,
+    site_origin, fresh_origins, record_probes,
+)
+from app.services.scraping.feed_service import fetch_feeds
 from scrapy.utils.log import configure_logging
-from typing import List, Type
+from typing import Dict, List, Type
 from loguru import logger
 
+# Pages claimed from the URL frontier per crawl batch, and per domain within a batch
+RSS_CLAIM_LIMIT = 200
+RSS_CLAIM_PER_DOMAIN = 5
+# Seconds after which a page already scanned for feeds is scanned again
+RSS_RECRAWL_AFTER = 30 * 24 * 3600
+# Seconds the feeds found on a site origin are trusted before the site is probed again
+RSS_PROBE_TTL = 7 * 24 * 3600
+
 def read_urls_from_file(file_path) -> List[str] | List:
     '''
     @brief Reads a list of URLs from a text file.
@@ -33,11 +46,20 @@ def read_urls_from_file(file_path) -> List[str] | List:
         logger.error(f"Error reading file: {e}")
         return []
 
+def feed_links_fingerprint(feeds: List[str]) -> str:
+    '''
+    @brief Fingerprint of the feed links of a page, to tell whether they changed since the last probe.
+
+    @param feeds Feed URLs linked from the page (List[str]).
+    @return Hex digest (str).
+    '''
+    return hashlib.blake2b("\n".join(sorted(set(feeds))).encode("utf-8"), digest_size=16).hexdigest()
+
 def create_rss_spider(urls, results)-> Type[Spider]:
     '''
     @brief Dynamically creates a Scrapy spider class to extract RSS/Atom/XML feed links from a list of URLs.
 
-    Defines and returns a custom Scrapy Spider class that will visit each URL in the provided `urls` list, inspect <link> tags in the HTML response, identify links with RSS, Atom, or XML MIME types, and collect unique feed URLs into the shared `results` list.
+    Defines and returns a custom Scrapy Spider class that will visit each URL in the provided `urls` list, inspect <link> tags in the HTML response, identify links with RSS, Atom, or XML MIME types, collect unique feed URLs into the shared `results` list and yield them as `{"feed_url": ...}` items. Every page also yields one `{"probe_url": ..., "feeds": [...], "fingerprint": ...}` item with the requested URL, all the feeds it links to and the fingerprint of its feed links, for the probe cache.
 
     @param urls List of web page URLs to scan for RSS feeds (List[str]).
     @param results Mutable list to which discovered feed URLs will be appended (List[str]).
@@ -48,16 +70,25 @@ def create_rss_spider(urls, results)-> Type[Spider]:
         start_urls = urls
 
         def parse(self, response):
+            feeds = []
             for link in response.css("link"):
                 href = link.attrib.get("href", "")
                 type_ = link.attrib.get("type", "")
                 if "rss" in type_ or "atom" in type_ or "application/xml" in type_:
                     full_url = response.urljoin(href)
+                    if full_url not in feeds:
+                        feeds.append(full_url)
                     if full_url not in results:
                         results.append(full_url)
                         logger.info(f"RSS found: {full_url}")
-            # Para compatibilidad con Scrapy, siempre retornamos un iterable
-            yield from ()
+                        # Streamed back to the parent by the crawler service
+                        yield {"feed_url": full_url}
+            yield {
+                # URL requested before redirects, so the probe is stored under the claimed origin
+                "probe_url": (getattr(response, "meta", None) or {}).get("redirect_urls", [response.url])[0],
+                "feeds": feeds,
+                "fingerprint": feed_links_fingerprint(feeds),
+            }
     return RSSSpider
 
 def run_rss_spider(urls, queue) -> None:
@@ -75,75 +106,175 @@ def run_rss_spider(urls, queue) -> None:
     results = []
     spider = create_rss_spider(urls, results)
 
-    process = CrawlerProcess(settings={
-        "USER_AGENT": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/122.0.0.0 Safari/537.36"
-        ),
-        "DOWNLOAD_DELAY": 2.0,
-        "AUTOTHROTTLE_ENABLED": True,
-        "RETRY_ENABLED": True,
-        "RETRY_TIMES": 5,
-        "RETRY_HTTP_CODES": [429, 500, 502, 503, 504],
-        "LOG_ENABLED": False
-    })
+    # Concurrency, per-domain delay, DNS cache and size cap come from the crawl profile
+    settings = crawl_profile_settings(crawl_profile_for("rss"))
+    settings.pop("TWISTED_REACTOR", None)
+    settings["USER_AGENT"] = (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/122.0.0.0 Safari/537.36"
+    )
+    process = CrawlerProcess(settings=settings)
 
     process.crawl(spider)
     process.start()
     queue.put(results)
 
-async def extract_rss_and_save(pool, file_path) -> None:
+async def extract_rss_and_save(pool, file_path) -> Dict[str, int]:
     '''
     @brief Extracts RSS/Atom feed URLs from a list of websites and stores valid feeds in a PostgreSQL database.
 
-    Reads website URLs from a local file, uses a multiprocessing Scrapy spider to discover RSS/Atom feeds, parses each discovered feed using `feedparser`, extracts metadata, constructs a `FeedCreateRequest` and inserts the feed into the database via `insert_feed_to_db`.
+    Reads website URLs from a local file and upserts them into the URL frontier, then claims prioritized batches of pages not scanned yet (or scanned more than `RSS_RECRAWL_AFTER` seconds ago) and discovers their RSS/Atom feeds with the shared long-lived crawler subprocess. Only one page per site origin is probed, and origins probed less than `RSS_PROBE_TTL` seconds ago are not crawled at all (probe cache in the URL frontier: feeds found, fingerprint of the feed links and probe time), so the cost of a run follows the new sites only. The discovered feeds are downloaded concurrently and parsed off the event loop by the feed service before a database connection is taken (full downloads without the feed registry validators); origins probed recently contribute the feeds found by their last probe; the metadata of each valid feed is extracted into a `FeedCreateRequest` and all of them are written with a single statement via `bulk_insert_feeds` (one category lookup, feeds already stored are skipped). The probes and the claimed pages are only recorded in the frontier after the insert: the origins with a feed that could not be downloaded or inserted are left unrecorded and their pages released as failed, so the next run discovers them again. If the frontier cannot be opened, every URL of the file is crawled as before.
 
     @param pool asyncpg.pool.Pool object used to acquire database connections.
     @param file_path File path containing a list of website URLs to process (str).
-    @return None. Performs the feed extraction and saving process asynchronously.
+    @return Number of feeds "inserted", "skipped" (already stored, unchanged or without entries) and "failed" (Dict[str, int]).
     '''
+    counts = {"inserted": 0, "skipped": 0, "failed": 0}
     urls = read_urls_from_file(file_path)
-    if not urls:
-        logger.info("No URLs found to process.")
-        return
-
-    # Run the blocking multiprocessing spider in a thread to avoid
-    # blocking the asyncio event loop. The helper runs the Process,
-    # waits for it to finish and returns the results from the queue.
-    def _run_process_and_get_results(urls_list):
-        q = Queue()
-        proc = Process(target=run_rss_spider, args=(urls_list, q))
-        proc.start()
-        proc.join()
-        try:
-            return q.get()
-        except Exception:
-            return []
 
-    results = await asyncio.to_thread(_run_process_and_get_results, urls)
+    # Crawl in the long-lived crawler subprocess (reactor started once and
+    # reused across runs). The blocking wait runs in a thread so the asyncio
+    # event loop stays responsive.
+    def _crawl(urls_list):
+        return get_crawler_service("rss").crawl("rss", urls_list)
 
-    async with pool.acquire() as conn:
-        for feed_url in results:
-            try:
-                feed = feedparser.parse(feed_url)
-                if not feed.entries:
-                    logger.warning(f"⚠️  No entries found in {feed_url}")
-                    continue
-
-                title = feed.feed.get("title", "Untitled")
-                site_url = feed.feed.get("link", "No site")
-
-                feed_data = FeedCreateRequest(
-                    title=title,
-                    feed_url=feed_url,
-                    site_url=site_url,
-                    owner_uid=1,
-                    cat_id=0
+    def _feed_urls(items):
+        return [item["feed_url"] for item in items if item.get("feed_url")]
+
+    def _crawl_feeds(urls_list):
+        # Feeds found, feeds per origin (probed now or cached), probes and claimed pages;
+        # the probes and pages are only recorded once the feeds are stored (_finish_discovery)
+        discovery = {"feeds": [], "origins": {}, "probes": [], "pages": [], "cached": 0}
+        try:
+            conn = open_frontier()
+        except Exception as e:
+            logger.warning(f"URL frontier not available; crawling the whole URL file: {e}")
+            conn = None
+        try:
+            if conn is None:
+                if urls_list:
+                    discovery["feeds"].extend(_feed_urls(_crawl(urls_list)))
+                return discovery
+            upsert_urls(conn, urls_list, FEED_DISCOVERY_QUEUE, source="urls_file")
+            while True:
+                batch = claim_batch(
+                    conn, FEED_DISCOVERY_QUEUE, limit=RSS_CLAIM_LIMIT,
+                    per_domain=RSS_CLAIM_PER_DOMAIN, recrawl_after=RSS_RECRAWL_AFTER,
                 )
+                if not batch:
+                    break
+                ids = [url_id for url_id, _ in batch]
+                # One probe per site origin; origins probed within RSS_PROBE_TTL are not crawled
+                # again and contribute the feeds found by their last probe
+                origins = {url: site_origin(url) or url for _, url in batch}
+                cached = fresh_origins(conn, origins.values(), RSS_PROBE_TTL)
+                first_pages = {}
+                for url, origin in origins.items():
+                    if origin not in cached:
+                        first_pages.setdefault(origin, url)
+                probe = list(first_pages.values())
+                discovery["cached"] += sum(1 for origin in origins.values() if origin in cached)
+                try:
+                    items = _crawl(probe) if probe else []
+                except Exception:
+                    complete_urls(conn, ids, ok=False)
+                    raise
+                discovery["pages"].extend((url_id, origins[url]) for url_id, url in batch)
+                for origin, feeds in cached.items():
+                    discovery["origins"][origin] = list(feeds)
+                    discovery["feeds"].extend(feeds)
+                discovery["feeds"].extend(_feed_urls(items))
+                for item in items:
+                    if item.get("probe_url"):
+                        origin = site_origin(item["probe_url"])
+                        discovery["origins"][origin] = list(item.get("feeds", []))
+                        discovery["probes"].append((origin, item.get("feeds", []), item.get("fingerprint")))
+        except Exception as e:
+            logger.error(f"Error running RSS crawler: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+        discovery["feeds"] = list(dict.fromkeys(discovery["feeds"]))
+        return discovery
 
-                await insert_feed_to_db(conn, feed_data)
-                logger.info(f"✅ Feed inserted: {feed_url}")
+    def _finish_discovery(discovery, failed):
+        # Origins with a feed that could not be downloaded or stored are neither recorded
+        # as probed nor their pages as crawled, so the next run discovers them again
+        if not discovery["pages"]:
+            return
+        try:
+            conn = open_frontier()
+            try:
+                retry = {origin for origin, feeds in discovery["origins"].items() if failed.intersection(feeds)}
+                changed = record_probes(conn, [probe for probe in discovery["probes"] if probe[0] not in retry])
+                complete_urls(conn, [url_id for url_id, origin in discovery["pages"] if origin not in retry])
+                complete_urls(conn, [url_id for url_id, origin in discovery["pages"] if origin in retry], ok=False)
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"Could not update the URL frontier: {e}")
+            return
+        logger.info(
+            f"RSS discovery: {len(discovery['probes'])} origins probed ({changed} new or changed), "
+            f"{discovery['cached']} pages of recently probed origins skipped, {len(retry)} origins to retry"
+        )
+
+    discovery = await asyncio.to_thread(_crawl_feeds, urls)
+    results = discovery["feeds"]
+    if not results:
+        logger.info("No new feeds found to process.")
+        await asyncio.to_thread(_finish_discovery, discovery, set())
+        return counts
 
+    # Discovery validates the feeds in full: the poll validators are left to the
+    # pollers, so a failed insert does not turn the next attempt into a 304
+    feeds = await fetch_feeds(results, conditional=False)
+
+    # The feeds were downloaded and parsed concurrently; keep the valid ones
+    valid = []
+    failed = set()
+    for feed in feeds:
+        feed_url = feed.url
+        if feed.not_modified:
+            logger.debug(f"Feed not modified since the last run: {feed_url}")
+            counts["skipped"] += 1
+            continue
+        if feed.error:
+            logger.error(f"❌ Error processing {feed_url}: {feed.error}")
+            counts["failed"] += 1
+            failed.add(feed_url)
+            continue
+        if not feed.entries:
+            logger.warning(f"⚠️  No entries found in {feed_url}")
+            counts["skipped"] += 1
+            continue
+        try:
+            valid.append(FeedCreateRequest(
+                title=feed.info.get("title", "Untitled"),
+                feed_url=feed_url,
+                site_url=feed.info.get("link", "No site"),
+                owner_uid=1,
+                cat_id=0
+            ))
+        except Exception as e:
+            logger.error(f"❌ Error processing {feed_url}: {e}")
+            counts["failed"] += 1
+
+    if valid:
+        async with pool.acquire() as conn:
+            try:
+                written = await bulk_insert_feeds(conn, valid)
+                counts["inserted"] += written["inserted"]
+                counts["skipped"] += written["skipped"]
             except Exception as e:
-                logger.error(f"❌ Error processing {feed_url}: {e}")
+                logger.error(f"❌ Error inserting {len(valid)} feeds: {e}")
+                counts["failed"] += len(valid)
+                failed.update(feed.url for feed in feeds if not feed.error)
+
+    await asyncio.to_thread(_finish_discovery, discovery, failed)
+
+    logger.info(
+        f"✅ Feeds inserted: {counts['inserted']}, skipped: {counts['skipped']}, failed: {counts['failed']}"
+    )
+    return counts
@@ -10,10 +10,13 @@
 import spacy
 import json
 import os
+from contextlib import nullcontext
 from langdetect import detect
 from loguru import logger
 from app.utils.utils import get_connection_parameters,create_config_file
-from app.models.opensearh_db import store_in_opensearch,text_exists_in_opensearch,ensure_index_exists
+from app.models.opensearh_db import get_bulk_indexer,existing_ids_in_opensearch,content_hash_id,ensure_index_exists
+from app.models.result_store import iter_records, is_store_path, get_result_store
+from app.models.near_duplicates import register_near_duplicate
 
 # Lazy-loaded spaCy models container. Models will be loaded on first use to
 # avoid expensive work at import time (which causes slow startup and issues
@@ -24,6 +27,14 @@ _models = {}
 # Keep `_models` as the internal lazy container; `models` points to the same dict.
 models = _models
 
+# Number of unique texts whose existence is checked in a single OpenSearch request
+TEXT_BATCH_SIZE = 500
+# Number of texts spaCy processes together in nlp.pipe
+TAG_BATCH_SIZE = 64
+# Pipeline components entity recognition does not use; tag_texts disables them.
+# Everything else (tok2vec, ner, entity rulers) stays enabled.
+NON_NER_COMPONENTS = ("tagger", "morphologizer", "parser", "senter", "attribute_ruler", "lemmatizer", "trainable_lemmatizer", "textcat", "textcat_multilabel")
+
 def _get_model(lang_code: str):
     '''
     @brief Return a spaCy model for the requested language, loading it on first use.
@@ -95,6 +106,52 @@ def tag_text(text):
         return [], language
     return [(ent.text, ent.label_) for ent in doc.ents], language
 
+def _ner_pipes_only(model):
+    '''
+    @brief Context manager that disables the pipeline components NER does not need.
+
+    @param model Loaded spaCy model.
+    @return Context manager from `select_pipes`, or a no-op one if the model does not support it.
+    '''
+    try:
+        disabled = [name for name in model.pipe_names if name in NON_NER_COMPONENTS]
+        return model.select_pipes(disable=disabled)
+    except Exception:
+        return nullcontext()
+
+def tag_texts(texts, batch_size=TAG_BATCH_SIZE, n_process=1):
+    '''
+    @brief Tags named entities in many texts at once, batching them per language.
+
+    Detects the language of every text, groups the texts by language and streams each group through `nlp.pipe` with only the NER components enabled. Results keep the input order and the same shape as `tag_text`.
+
+    @param texts Texts to process (list[str]).
+    @param batch_size Number of texts spaCy processes together (int).
+    @param n_process Number of worker processes used by `nlp.pipe` (int).
+    @return List of tuples (entities [(text, type)], detected language), one per input text (list).
+    '''
+    results = [None] * len(texts)
+    groups: dict[str, list[int]] = {}
+    for index, text in enumerate(texts):
+        language = detect_language(text)
+        if not text:
+            results[index] = ([], language)
+            continue
+        groups.setdefault(language, []).append(index)
+
+    for language, indices in groups.items():
+        model = _get_model(language)
+        if not model:
+            for index in indices:
+                results[index] = ([], language)
+            continue
+        with _ner_pipes_only(model):
+            docs = model.pipe((texts[i] for i in indices), batch_size=batch_size, n_process=n_process)
+            for index, doc in zip(indices, docs):
+                ents = getattr(doc, 'ents', None) or []
+                results[index] = ([(ent.text, ent.label_) for ent in ents], language)
+    return results
+
 def extract_texts(data):
     '''
     @brief Extracts relevant text strings from the input JSON data.
@@ -117,22 +174,147 @@ def extract_texts(data):
 
     return texts
 
-def process_json(input_path, output_path):
+def _iter_text_batches(records, batch_size):
     '''
-    @brief Processes an input JSON file, tagging texts by language, and saves the results to another JSON.
+    @brief Groups the texts of the records into batches of unique (content id, text) pairs.
 
-    Loads an input JSON file, extracts texts, tags them by language, stores results in OpenSearch, and saves the results to another JSON file.
+    Empty texts and texts already seen in this run are dropped.
 
-    @param input_path Path to the input JSON file (str).
-    @param output_path Path where the result JSON file will be saved (str).
-    @return List of results with text, language, tags, and relevance (number of tags) (list).
+    @param records Iterable of article dictionaries.
+    @param batch_size Maximum number of texts per batch (int).
+    @return Iterator over lists of (id, text) tuples.
+    '''
+    seen: set[str] = set()
+    batch: list[tuple] = []
+    for record in records:
+        for text in extract_texts(record):
+            if not text.strip():
+                continue
+            doc_id = content_hash_id(text)
+            # Skip duplicates inside the same run
+            if doc_id in seen:
+                continue
+            seen.add(doc_id)
+            batch.append((doc_id, text))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def _skip_near_duplicates(records, skipped):
+    '''
+    @brief Yields the records that are not near-duplicates of another article (syndicated copies).
+
+    Records stored before the near-duplicate index existed are registered on the way.
+
+    @param records Iterable of article dictionaries.
+    @param skipped Dict whose "count" key counts the records dropped (dict).
+    @return Iterator over records.
+    '''
+    for record in records:
+        if register_near_duplicate(record):
+            skipped["count"] += 1
+            continue
+        yield record
+
+def _watermark_path(output_path):
+    '''
+    @brief Path of the file holding the result store position already labeled into `output_path`.
+
+    @param output_path Labels output file (str).
+    @return Watermark file path (str).
+    '''
+    return os.path.splitext(output_path)[0] + ".watermark.json"
+
+def _load_watermark(path):
+    '''
+    @brief Reads a saved result store position.
+
+    @param path Watermark file path (str).
+    @return Tuple (segment name, byte offset) or None if missing or invalid.
+    '''
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return (str(data["segment"]), int(data["offset"]))
+    except Exception:
+        return None
+
+def _save_watermark(path, position):
     '''
-    with open(input_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    @brief Atomically persists the last labeled result store position.
 
-    # The input data can be either a dict or a list of dicts; normalize to a list
-    records = data if isinstance(data, list) else [data]
+    @param path Watermark file path (str).
+    @param position Tuple (segment name, byte offset).
+    @return None.
+    '''
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"segment": position[0], "offset": position[1]}, f)
+    os.replace(tmp_path, path)
+
+def _track_position(pairs, progress):
+    '''
+    @brief Yields the records of (record, position) pairs, remembering the last position.
+
+    @param pairs Iterator from `ResultStore.iter_records_after`.
+    @param progress Dict whose "position" key is updated (dict).
+    @return Iterator over records.
+    '''
+    for record, position in pairs:
+        progress["position"] = position
+        yield record
+
+def _append_json_array(path, docs):
+    '''
+    @brief Appends documents to an existing JSON array file without rewriting it.
 
+    Truncates the closing bracket and writes the new items after the existing ones. Falls back to writing a fresh array if the file does not end with an array.
+
+    @param path JSON array file (str).
+    @param docs Documents to append (list).
+    @return None.
+    '''
+    if not docs:
+        return
+    items = ",\n".join(json.dumps(doc, ensure_ascii=False, indent=4) for doc in docs)
+    with open(path, "r+b") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        # Find the closing bracket and the last significant character before it
+        tail_size = min(end, 4096)
+        f.seek(end - tail_size)
+        tail = f.read(tail_size).rstrip()
+        if tail.endswith(b"]"):
+            close_at = end - tail_size + len(tail) - 1
+            empty = tail[:-1].rstrip().endswith(b"[")
+            f.seek(close_at)
+            f.truncate()
+            f.write((("\n" if empty else ",\n") + items + "\n]").encode("utf-8"))
+            return
+    logger.warning(f"[SpaCy] {path} is not a JSON array; rewriting it with the new results only.")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(docs, f, ensure_ascii=False, indent=4)
+
+def process_json(input_path, output_path, upsert=False, batch_size=TEXT_BATCH_SIZE, tag_batch_size=TAG_BATCH_SIZE, n_process=1, incremental=False):
+    '''
+    @brief Processes scraped articles, tagging texts by language, and saves the results to another JSON.
+
+    Streams the records of the result store (or of a legacy JSON file), extracts texts, tags them by language, stores results in OpenSearch, and saves the results to another JSON file.
+    When the input is the result store, the position reached is saved next to the output file once every document was indexed (after an indexing failure the position is kept, so the records are processed again); in `incremental` mode the next run resumes from it and appends its results (sorted by relevance within the run) to the existing output instead of rebuilding it.
+    Near-duplicate articles (the same story stored under another URL) are skipped before tagging.
+    Documents are indexed under a content-hash `_id`. By default texts already indexed are skipped with one batched `mget` per batch (plus one exact-text lookup of the ids not found, for documents indexed before the content-hash `_id`); with `upsert` (SPACY_UPSERT in the 24h worker) the pre-check is skipped and every text is re-tagged and overwritten in place.
+
+    @param input_path Path to the result store directory or to a JSON/JSONL file (str).
+    @param output_path Path where the result JSON file will be saved (str).
+    @param upsert Skip the existence check and overwrite documents by id (bool).
+    @param batch_size Number of unique texts checked against OpenSearch and tagged at once (int).
+    @param tag_batch_size Batch size passed to spaCy's `nlp.pipe` (int).
+    @param n_process Number of spaCy worker processes (int).
+    @param incremental Only label the records appended to the result store since the last run and append them to `output_path` (bool).
+    @return List of results with text, language, tags, and relevance (number of tags) (list).
+    '''
     results: list[dict] = []
 
     # Default OpenSearch connection parameters (will be overridden if cfg.ini exists)
@@ -165,28 +347,41 @@ def process_json(input_path, output_path):
         parameters = retorno_otros[2]  # Parameters read from the config file
 
 
-    # Local set to avoid duplicate texts within the same execution
-    processed_texts: set[str] = set()
-
     #Ensure the index exists in OpenSearch
     ensure_index_exists(parameters[0], parameters[1], "spacy_documents")
 
-    for record in records:
-        texts = extract_texts(record)
-        for text in texts:
-            if not text.strip():
-                continue
-
-            # Skip duplicates inside the same run
-            if text in processed_texts:
-                continue
-
-            if text_exists_in_opensearch(text, parameters[0], parameters[1], "spacy_documents"):
-                continue
-
-            processed_texts.add(text)
-
-            tags, detected_language = tag_text(text)
+    # Records are streamed; with the result store the position reached is tracked
+    progress = {"position": None}
+    append_output = False
+    if is_store_path(input_path):
+        store = get_result_store(input_path)
+        # Make a pending legacy result.json visible to position-based reads
+        store.import_legacy()
+        position = _load_watermark(_watermark_path(output_path)) if incremental else None
+        if position is not None and os.path.exists(output_path) and store.has_position(position):
+            append_output = True
+            progress["position"] = position
+            logger.info(f"[SpaCy] Incremental run from {position[0]}:{position[1]}")
+        else:
+            position = None
+        records = _track_position(store.iter_records_after(position), progress)
+    else:
+        records = iter_records(input_path)
+
+    skipped = {"count": 0}
+    records = _skip_near_duplicates(records, skipped)
+    for batch in _iter_text_batches(records, batch_size):
+        if not upsert:
+            # One mget per batch instead of one search per text; the texts let it
+            # also match documents indexed before the content-hash _id
+            existing = existing_ids_in_opensearch(
+                [doc_id for doc_id, _ in batch], parameters[0], parameters[1], "spacy_documents",
+                texts=dict(batch),
+            )
+            batch = [(doc_id, text) for doc_id, text in batch if doc_id not in existing]
+
+        tagged = tag_texts([text for _, text in batch], batch_size=tag_batch_size, n_process=n_process)
+        for (_, text), (tags, detected_language) in zip(batch, tagged):
             doc = {
                 "text": text,
                 "language": detected_language,
@@ -195,15 +390,34 @@ def process_json(input_path, output_path):
             }
             results.append(doc)
 
+    if skipped["count"]:
+        logger.info(f"[SpaCy] {skipped['count']} near-duplicate articles skipped")
+
     # Sort results by number of named entities (relevance) in descending order
     results.sort(key=lambda x: x["relevance"], reverse=True)
 
     # Save results to the output JSON file
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=4)
+    if append_output:
+        _append_json_array(output_path, results)
+    else:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
 
-    # Store each new document in OpenSearch
+    # Store the new documents in OpenSearch through the shared bulk indexer.
+    # The content-hash _id makes re-indexing an idempotent overwrite.
+    indexer = get_bulk_indexer(parameters[0], parameters[1], "spacy_documents")
+    failed_before = indexer.failed_count
     for doc in results:
-        store_in_opensearch(doc, parameters[0], parameters[1], "spacy_documents")
+        indexer.add(doc, doc_id=content_hash_id(doc["text"]))
+    indexer.flush()
+    # Counts the failures of the automatic flushes inside add() too
+    failed = indexer.failed_count != failed_before
+
+    if progress["position"] is not None:
+        if failed:
+            # Keep the previous position so the next run indexes these records again
+            logger.warning("[SpaCy] Some documents could not be indexed; watermark not advanced")
+        else:
+            _save_watermark(_watermark_path(output_path), progress["position"])
 
     return results
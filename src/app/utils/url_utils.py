@@ -0,0 +1,75 @@
+"""
+@file url_utils.py
+@author naflashDev
+@brief URL canonicalization shared by the crawlers and URL stores.
+@details The same article reaches the pipeline through several feeds and
+         searches with different spellings: tracking parameters, `www.`
+         prefixes, default ports, fragments or a different query order.
+         `canonicalize_url` maps those variants to one key so deduplication
+         works on the article rather than on the exact string. The canonical
+         form is only used as a key; requests keep the original URL.
+"""
+
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only carry campaign or click tracking
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "ref_src", "spm",
+})
+# Parameter prefixes treated as tracking (utm_source, utm_medium, ...)
+TRACKING_PREFIXES = ("utm_",)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _is_tracking_param(name: str) -> bool:
+    '''
+    @brief Tell whether a query parameter only carries tracking data.
+
+    @param name Parameter name (str).
+    @return True for tracking parameters (bool).
+    '''
+    lowered = name.lower()
+    return lowered in TRACKING_PARAMS or lowered.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    '''
+    @brief Canonical form of an http(s) URL used as deduplication key.
+
+    Lowercases scheme and host, drops a leading `www.`, the default port, the
+    fragment, tracking parameters and a trailing slash, and sorts the query
+    parameters. Values that are not http(s) URLs are returned stripped.
+
+    @param url URL as found in a feed or search result (str).
+    @return Canonical URL (str).
+    '''
+    url = (url or "").strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    host = parts.hostname.rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    if ":" in host:
+        host = f"[{host}]"
+    if port is not None and port != _DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    if parts.username is not None:
+        credentials = parts.username + (f":{parts.password}" if parts.password is not None else "")
+        host = f"{credentials}@{host}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking_param(k)]
+    query.sort()
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
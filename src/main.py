@@ -49,6 +49,8 @@ from app.controllers.routes import (
 from app.controllers.routes.hashed_controller import router as hashed_router
 from app.controllers.routes.config_controller import router as config_controller_router
 from app.utils.worker_control import load_worker_settings, save_worker_settings
+from app.models.result_store import RESULT_STORE_DIR, has_results
+from app.services.scraping.news_gd import shutdown_parse_pool
 from app.controllers.routes.scrapy_news_controller import (
     recurring_google_alert_scraper,
     background_scraping_feeds,
@@ -220,6 +222,11 @@ async def lifespan(app: FastAPI):
             logger.info("[Shutdown] PostgreSQL pool closed.")
         except Exception:
             logger.exception("[Shutdown] Error closing PostgreSQL pool.")
+    # Stop the worker processes that parse news article HTML
+    try:
+        shutdown_parse_pool()
+    except Exception:
+        logger.exception("[Shutdown] Error stopping the news parse pool.")
     # Attempt to gracefully shut down external services (compose stacks, Ollama)
     try:
         project_root = Path(__file__).resolve().parents[3]
@@ -302,7 +309,7 @@ async def initialize_background_tasks(app: FastAPI):
     # Required paths
     google_alerts_path = "./data/google_alert_rss.txt"
     urls_path = "./data/urls_cybersecurity_ot_it.txt"
-    input_path = "./outputs/result.json"
+    input_path = RESULT_STORE_DIR
     output_path = "./outputs/labels_result.json"
 
     # Load persisted worker preferences
@@ -382,7 +389,7 @@ async def initialize_background_tasks(app: FastAPI):
 
     # NLP processing (spaCy)
     # spaCy NLP
-    if settings.get("spacy_nlp", True) and os.path.exists(input_path):
+    if settings.get("spacy_nlp", True) and has_results(input_path):
         app.state.worker_status["spacy_nlp"] = True
         evt = threading.Event()
         app.state.worker_stop_events["spacy_nlp"] = evt
@@ -397,7 +404,7 @@ async def initialize_background_tasks(app: FastAPI):
         logger.info("[UI-init] spaCy NLP labeling scheduled every 24h.")
     else:
         app.state.worker_status["spacy_nlp"] = False
-        logger.warning("[UI-init] result.json not found or worker disabled in settings. NLP not launched.")
+        logger.warning("[UI-init] No scraped results found or worker disabled in settings. NLP not launched.")
 
     # LLM CVE + dataset updater (every 7 days)
     # LLM updater (already accepts stop_event)
@@ -155,6 +155,7 @@ import os
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from src.app.controllers.routes.scrapy_news_controller import router as scrapy_router
+from src.app.services.scraping.feed_service import FeedResult
 
 # Instancia mínima de FastAPI para pruebas de endpoints
 app = FastAPI()
@@ -164,14 +165,18 @@ def test_guardar_link_no_entries(monkeypatch):
     class DummyFeed:
         entries = []
         feed = {}
-    monkeypatch.setattr("src.app.controllers.routes.scrapy_news_controller.feedparser.parse", lambda url: DummyFeed())
+    async def fake_fetch_feed(url):
+        return FeedResult(url, "ok", 200, parsed=DummyFeed())
+    monkeypatch.setattr("src.app.controllers.routes.scrapy_news_controller.fetch_feed", fake_fetch_feed)
     client = TestClient(app)
     resp = client.post("/newsSpider/save-feed-google-alerts", json={"feed_url": "http://bad.com/rss"})
     assert resp.status_code == 400
     assert "Error validating the feed" in resp.text
 
 def test_guardar_link_exception(monkeypatch):
-    monkeypatch.setattr("src.app.controllers.routes.scrapy_news_controller.feedparser.parse", lambda url: (_ for _ in ()).throw(Exception("fail")))
+    async def fake_fetch_feed(url):
+        return FeedResult(url, "error", error="fail")
+    monkeypatch.setattr("src.app.controllers.routes.scrapy_news_controller.fetch_feed", fake_fetch_feed)
     client = TestClient(app)
     resp = client.post("/newsSpider/save-feed-google-alerts", json={"feed_url": "http://fail.com/rss"})
     assert resp.status_code == 400
@@ -190,14 +195,14 @@ from unittest.mock import patch, MagicMock, AsyncMock
 from src.app.controllers.routes import scrapy_news_controller
 
 @pytest.mark.asyncio
-@patch("src.app.controllers.routes.scrapy_news_controller.feedparser.parse")
+@patch("src.app.controllers.routes.scrapy_news_controller.fetch_feed", new_callable=AsyncMock)
 @patch("src.app.controllers.routes.scrapy_news_controller.SaveLinkResponse")
-async def test_guardar_link_success(mock_save, mock_parse):
+async def test_guardar_link_success(mock_save, mock_fetch):
     # Simula un feed válido con entradas
     mock_feed = MagicMock()
     mock_feed.entries = ["entry1"]
     mock_feed.feed = {"title": "Test Feed"}
-    mock_parse.return_value = mock_feed
+    mock_fetch.return_value = FeedResult("http://test.com/rss", "ok", 200, parsed=mock_feed)
     mock_save.return_value = MagicMock()
     class DummyReq:
         feed_url = "http://test.com/rss"
@@ -0,0 +1,80 @@
+"""
+@file test_feed_registry.py
+@author naflashDev
+@brief Unit tests for feed_registry.py
+@details Tests the SQLite feed registry: stored HTTP validators, replaced on changed feeds and kept on 304 or failed requests, and the adaptive poll schedule driven by new items and failures.
+"""
+from src.app.models import feed_registry
+
+
+def test_record_fetches_keeps_validators_until_the_feed_changes(tmp_path):
+    '''
+    @brief Should store validators of changed feeds and keep them on 304 and errors.
+    '''
+    conn = feed_registry.open_feed_registry(str(tmp_path / "feeds.db"))
+    feed_registry.record_fetches(conn, [
+        ("https://a.com/rss", 200, '"v1"', "Mon, 01 Jan 2024 00:00:00 GMT", "ok", []),
+        ("https://b.com/rss", 200, None, None, "ok", []),
+        ("https://c.com/rss", None, None, None, "error", []),
+    ])
+    assert feed_registry.get_validators(conn, ["https://a.com/rss", "https://b.com/rss", "https://c.com/rss", "https://a.com/rss"]) == {
+        "https://a.com/rss": ('"v1"', "Mon, 01 Jan 2024 00:00:00 GMT"),
+    }
+    feed_registry.record_fetches(conn, [("https://a.com/rss", 304, None, None, "not_modified", [])])
+    assert feed_registry.get_validators(conn, ["https://a.com/rss"]) == {"https://a.com/rss": ('"v1"', "Mon, 01 Jan 2024 00:00:00 GMT")}
+    assert conn.execute("SELECT last_status FROM feeds WHERE url = 'https://a.com/rss'").fetchone() == (304,)
+    feed_registry.record_fetches(conn, [("https://a.com/rss", 200, '"v2"', None, "ok", [])])
+    assert feed_registry.get_validators(conn, ["https://a.com/rss"]) == {"https://a.com/rss": ('"v2"', None)}
+    conn.close()
+
+
+def test_poll_interval_follows_the_publication_rate(tmp_path):
+    '''
+    @brief Should poll a busy feed often, a quiet one rarely, and only return feeds that are due.
+    '''
+    conn = feed_registry.open_feed_registry(str(tmp_path / "feeds.db"))
+    now = 1_000_000.0
+    busy = [(f"b{i}", now - i * 3600) for i in range(5)]
+    quiet = [(f"q{i}", now - i * 3 * 86400) for i in range(3)]
+    feed_registry.record_fetches(conn, [
+        ("https://busy.com/rss", 200, None, None, "ok", busy),
+        ("https://quiet.com/rss", 200, None, None, "ok", quiet),
+    ], now=now)
+    intervals = dict(conn.execute("SELECT url, poll_interval FROM feeds"))
+    assert intervals == {"https://busy.com/rss": 1800.0, "https://quiet.com/rss": feed_registry.FEED_POLL_MAX}
+
+    urls = ["https://busy.com/rss", "https://quiet.com/rss", "https://new.com/rss"]
+    assert feed_registry.due_feeds(conn, urls, now=now + 1800) == ["https://busy.com/rss", "https://new.com/rss"]
+    assert feed_registry.seconds_until_due(conn, urls[:2], now=now) == 1800.0
+    assert feed_registry.seconds_until_due(conn, urls, now=now) == 0.0
+
+    # One new item an hour later: counted, and the busy feed keeps its cadence
+    feed_registry.record_fetches(
+        conn, [("https://busy.com/rss", 200, None, None, "ok", [("b-new", now + 3600)] + busy)], now=now + 3600
+    )
+    new_items, last_new_item, mean_interval, poll_interval = conn.execute(
+        "SELECT new_items, last_new_item, mean_interval, poll_interval FROM feeds WHERE url = 'https://busy.com/rss'"
+    ).fetchone()
+    assert (new_items, last_new_item, mean_interval, poll_interval) == (1, now + 3600, 3600.0, 1800.0)
+    conn.close()
+
+
+def test_failing_feed_backs_off_and_is_reported_dead(tmp_path):
+    '''
+    @brief Should double the interval of a failing feed, report it dead after DEAD_FEED_FAILURES and recover on success.
+    '''
+    conn = feed_registry.open_feed_registry(str(tmp_path / "feeds.db"))
+    url = "https://broken.com/rss"
+    intervals = []
+    for attempt in range(feed_registry.DEAD_FEED_FAILURES):
+        feed_registry.record_fetches(conn, [(url, 500, None, None, "error", [])], now=1000.0 * attempt)
+        intervals.append(conn.execute("SELECT poll_interval FROM feeds").fetchone()[0])
+    assert intervals == [1800.0, 3600.0, 7200.0, 14400.0, 28800.0]
+    health = feed_registry.feed_health(conn)
+    assert health["dead"] == [url]
+    assert health["outcomes"] == {"error": 1}
+
+    feed_registry.record_fetches(conn, [(url, 200, None, None, "ok", [("a", None)])], now=10_000.0)
+    assert conn.execute("SELECT failures, last_outcome FROM feeds").fetchone() == (0, "ok")
+    assert feed_registry.feed_health(conn)["dead"] == []
+    conn.close()
@@ -0,0 +1,79 @@
+"""
+@file test_near_duplicates.py
+@author naflashDev
+@brief Unit tests for near_duplicates.py
+@details Tests the MinHash signature of article texts and the SQLite LSH index: syndicated copies linked to the first article, unrelated and short articles kept, and the shared index.
+"""
+import os
+
+from src.app.models import near_duplicates
+
+STORY = (
+    "Investigadores de seguridad han descubierto una vulnerabilidad critica en los controladores industriales "
+    "de varios fabricantes que permite a un atacante remoto ejecutar codigo arbitrario sin autenticacion. "
+    "El fallo afecta a miles de dispositivos expuestos en internet en plantas de energia, agua y manufactura. "
+    "Los fabricantes han publicado parches y recomiendan aislar las redes de control, revisar los registros "
+    "y aplicar las actualizaciones cuanto antes para evitar la explotacion activa que ya se ha observado."
+)
+OTHER = (
+    "Un grupo de ransomware ha reivindicado el ataque contra una cadena hospitalaria que obligo a desviar "
+    "ambulancias y aplazar operaciones durante varios dias mientras los equipos restauraban las copias. "
+    "Las autoridades investigan el origen de la intrusion, que habria comenzado con un correo de phishing "
+    "dirigido al personal administrativo, y piden a otros centros que refuercen la autenticacion multifactor "
+    "y segmenten sus redes para limitar el movimiento lateral de los atacantes en incidentes similares."
+)
+
+
+def test_minhash_is_similar_for_copies_and_not_for_other_stories():
+    '''
+    @brief Should estimate a high similarity for syndicated copies, a low one for other stories, and skip short texts.
+    '''
+    copy = STORY.replace("Investigadores de seguridad", "Segun informa la agencia, investigadores de seguridad") + " Fuente: agencias."
+    a, b, c = near_duplicates.minhash(STORY), near_duplicates.minhash(copy), near_duplicates.minhash(OTHER)
+    assert len(a) == near_duplicates.MINHASH_PERMUTATIONS
+    assert near_duplicates.similarity(a, b) >= near_duplicates.NEAR_DUPLICATE_THRESHOLD
+    assert near_duplicates.similarity(a, c) < 0.2
+    assert near_duplicates.minhash("breve nota") is None
+
+
+def test_register_links_copies_to_the_first_article(tmp_path):
+    '''
+    @brief Should link a near-duplicate under another URL to the first copy and keep new and short articles.
+    '''
+    index = near_duplicates.NearDuplicateIndex(str(tmp_path / "dups.db"))
+    copy = {"url": "https://b.com/2", "title": "Otro titular", "p": [STORY + " Fuente: agencias."]}
+    assert index.register("https://a.com/1", STORY) is None
+    assert index.register("https://c.com/3", OTHER) is None
+    assert index.register(copy["url"], near_duplicates.article_text(copy)) == "https://a.com/1"
+    # Seen again: still the same answer
+    assert index.register("https://b.com/2", STORY) == "https://a.com/1"
+    assert index.register("https://a.com/1", STORY) is None
+    assert index.register("https://d.com/4", "breve nota") is None
+    assert index.register("https://e.com/5", "breve nota") is None
+    assert index.duplicates("https://a.com/1") == ["https://b.com/2"]
+    assert index.stats() == {"articles": 5, "duplicates": 1}
+    index.close()
+
+
+def test_near_duplicate_of_uses_the_shared_index():
+    '''
+    @brief Should only report copies of registered articles, never an article as a copy of itself.
+    '''
+    index = near_duplicates.get_near_duplicate_index()
+    assert index is near_duplicates.get_near_duplicate_index()
+    # Keyed by process, so a forked worker opens its own connection
+    assert near_duplicates._indexes[(os.getpid(), os.path.abspath(near_duplicates.NEAR_DUPLICATES_PATH))] is index
+    story = {"url": "https://a.com/1", "p": [STORY]}
+    copy = {"url": "https://b.com/2", "p": [STORY]}
+    # Looking up does not register: an article that was never stored is not an original
+    assert near_duplicates.near_duplicate_of(story) is None
+    assert near_duplicates.near_duplicate_of(copy) is None
+    signature = near_duplicates.article_signature(story)
+    near_duplicates.register_article(story, signature)
+    assert near_duplicates.near_duplicate_of(story, signature) is None
+    assert near_duplicates.near_duplicate_of(copy) == "https://a.com/1"
+    near_duplicates.register_article(copy, duplicate_of="https://a.com/1")
+    assert index.duplicates("https://a.com/1") == ["https://b.com/2"]
+    assert near_duplicates.register_near_duplicate({"url": "https://c.com/3", "p": [STORY]}) == "https://a.com/1"
+    assert near_duplicates.near_duplicate_of({"title": "sin url"}) is None
+    assert index.stats() == {"articles": 3, "duplicates": 2}
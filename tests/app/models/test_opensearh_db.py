@@ -82,3 +82,152 @@ def test_ensure_index_exists_handles_transport_error():
         mock_os.return_value = mock_client
         opensearh_db.ensure_index_exists("localhost", 9200, "idx")
         assert mock_logger.error.called
+
+
+def test_get_opensearch_client_is_pooled():
+    '''
+    @brief Should build one client per host/port and reuse it.
+    '''
+    with patch("src.app.models.opensearh_db.OpenSearch") as mock_os:
+        first = opensearh_db.get_opensearch_client("localhost", 9200)
+        second = opensearh_db.get_opensearch_client("localhost", 9200)
+        other = opensearh_db.get_opensearch_client("otherhost", 9200)
+        assert first is second
+        assert mock_os.call_count == 2
+        assert other is mock_os.return_value
+
+def test_bulk_indexer_flushes_by_count():
+    '''
+    @brief Should send a single _bulk request once max_docs documents are buffered.
+    '''
+    with patch("src.app.models.opensearh_db.OpenSearch") as mock_os:
+        mock_client = MagicMock()
+        mock_client.bulk.return_value = {"errors": False, "items": [{"index": {"status": 201}}] * 2}
+        mock_os.return_value = mock_client
+        indexer = opensearh_db.BulkIndexer("localhost", 9200, "idx", max_docs=2, flush_interval=None)
+        indexer.add({"text": "a"})
+        assert not mock_client.bulk.called
+        indexer.add({"text": "b"}, doc_id="b-id")
+        assert mock_client.bulk.call_count == 1
+        body = mock_client.bulk.call_args.kwargs["body"].splitlines()
+        assert len(body) == 4
+        assert '"_id": "b-id"' in body[2]
+        assert indexer.indexed_count == 2 and indexer.pending() == 0
+
+def test_bulk_indexer_flushes_by_bytes():
+    '''
+    @brief Should flush when the buffered payload exceeds max_bytes.
+    '''
+    with patch("src.app.models.opensearh_db.OpenSearch") as mock_os:
+        mock_os.return_value.bulk.return_value = {"items": [{"index": {"status": 201}}]}
+        indexer = opensearh_db.BulkIndexer("localhost", 9200, "idx", max_bytes=10, flush_interval=None)
+        indexer.add({"text": "long enough"})
+        assert mock_os.return_value.bulk.call_count == 1
+
+def test_bulk_indexer_flushes_by_time():
+    '''
+    @brief Should flush pending documents after flush_interval seconds.
+    '''
+    import time
+    with patch("src.app.models.opensearh_db.OpenSearch") as mock_os:
+        mock_os.return_value.bulk.return_value = {"items": [{"index": {"status": 201}}]}
+        indexer = opensearh_db.BulkIndexer("localhost", 9200, "idx", flush_interval=0.05)
+        indexer.add({"text": "a"})
+        deadline = time.time() + 2
+        while indexer.pending() and time.time() < deadline:
+            time.sleep(0.02)
+        indexer.close()
+        assert mock_os.return_value.bulk.call_count == 1
+
+def test_bulk_indexer_reports_item_failures():
+    '''
+    @brief Should surface per-item failures returned by _bulk.
+    '''
+    with patch("src.app.models.opensearh_db.OpenSearch") as mock_os, \
+         patch("src.app.models.opensearh_db.logger") as mock_logger:
+        mock_os.return_value.bulk.return_value = {"errors": True, "items": [
+            {"index": {"_id": "1", "status": 201}},
+            {"index": {"_id": "2", "status": 400, "error": {"type": "mapper_parsing_exception"}}},
+        ]}
+        indexer = opensearh_db.BulkIndexer("localhost", 9200, "idx", flush_interval=None)
+        indexer.add({"text": "ok"})
+        indexer.add({"text": "bad"})
+        indexed, failures = indexer.flush()
+        assert indexed == 1
+        assert failures[0]["_id"] == "2" and failures[0]["status"] == 400
+        assert indexer.failed_count == 1 and list(indexer.failures) == failures
+        assert mock_logger.error.called
+
+def test_bulk_indexer_transport_error_counts_all_as_failed():
+    '''
+    @brief Should mark the whole batch as failed if the request raises.
+    '''
+    with patch("src.app.models.opensearh_db.OpenSearch") as mock_os:
+        mock_os.return_value.bulk.side_effect = Exception("down")
+        indexer = opensearh_db.BulkIndexer("localhost", 9200, "idx", flush_interval=None)
+        indexer.add({"text": "a"})
+        indexer.add({"text": "b"})
+        indexed, failures = indexer.flush()
+        assert indexed == 0 and len(failures) == 2
+        assert indexer.flush() == (0, [])
+
+def test_get_bulk_indexer_is_shared():
+    '''
+    @brief Writers of the same index should share one indexer.
+    '''
+    first = opensearh_db.get_bulk_indexer("localhost", 9200, "idx")
+    assert first is opensearh_db.get_bulk_indexer("localhost", 9200, "idx")
+    assert first is not opensearh_db.get_bulk_indexer("localhost", 9200, "other")
+    first.close()
+    assert opensearh_db.get_bulk_indexer("localhost", 9200, "idx") is not first
+
+
+def test_content_hash_id_is_deterministic():
+    '''
+    @brief Same text should always map to the same id.
+    '''
+    assert opensearh_db.content_hash_id("foo") == opensearh_db.content_hash_id("foo")
+    assert opensearh_db.content_hash_id("foo") != opensearh_db.content_hash_id("bar")
+    assert len(opensearh_db.content_hash_id("foo")) == 64
+
+def test_existing_ids_in_opensearch_batches_mget():
+    '''
+    @brief Should check ids in mget batches and return only the found ones.
+    '''
+    with patch("src.app.models.opensearh_db.OpenSearch") as mock_os:
+        mock_client = MagicMock()
+        def fake_mget(index, body, _source):
+            return {"docs": [{"_id": i, "found": i in ("a", "c")} for i in body["ids"]]}
+        mock_client.mget.side_effect = fake_mget
+        mock_os.return_value = mock_client
+        found = opensearh_db.existing_ids_in_opensearch(["a", "b", "c", "a"], "localhost", 9200, "idx", batch_size=2)
+        assert found == {"a", "c"}
+        assert mock_client.mget.call_count == 2
+
+def test_existing_ids_in_opensearch_matches_legacy_documents_by_text():
+    '''
+    @brief Ids not found by mget should be matched by exact text, for documents indexed with automatic ids.
+    '''
+    texts = {opensearh_db.content_hash_id(t): t for t in ("nuevo", "antiguo", "indexado")}
+    indexed = opensearh_db.content_hash_id("indexado")
+    with patch("src.app.models.opensearh_db.OpenSearch") as mock_os:
+        mock_client = MagicMock()
+        mock_client.mget.return_value = {"docs": [{"_id": i, "found": i == indexed} for i in texts]}
+        mock_client.search.return_value = {"aggregations": {"texts": {"buckets": [{"key": "antiguo", "doc_count": 2}]}}}
+        mock_os.return_value = mock_client
+        found = opensearh_db.existing_ids_in_opensearch(list(texts), "localhost", 9200, "idx", texts=texts)
+    assert found == {indexed, opensearh_db.content_hash_id("antiguo")}
+    # A single text lookup, only for the ids mget did not find
+    body = mock_client.search.call_args.kwargs["body"]
+    assert sorted(body["query"]["terms"]["text.keyword"]) == ["antiguo", "nuevo"]
+
+def test_existing_ids_in_opensearch_handles_errors():
+    '''
+    @brief Missing index or connection errors should report nothing as existing.
+    '''
+    with patch("src.app.models.opensearh_db.OpenSearch") as mock_os:
+        mock_os.return_value.mget.side_effect = opensearh_db.NotFoundError(404, "index_not_found_exception", {})
+        assert opensearh_db.existing_ids_in_opensearch(["a"], "localhost", 9200, "idx") == set()
+        mock_os.return_value.mget.side_effect = Exception("down")
+        assert opensearh_db.existing_ids_in_opensearch(["a"], "localhost", 9200, "idx") == set()
+    assert opensearh_db.existing_ids_in_opensearch([], "localhost", 9200, "idx") == set()
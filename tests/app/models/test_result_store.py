@@ -0,0 +1,160 @@
+"""
+@file test_result_store.py
+@author naflashDev
+@brief Unit tests for result_store.py
+@details Tests for the append-only segmented result store: deduplication, segment rotation, index refresh across instances, legacy import and streaming readers.
+"""
+import json
+import os
+from src.app.models import result_store
+
+
+def test_append_and_dedup(tmp_path):
+    '''
+    @brief Should append JSON lines and skip URLs already stored.
+    '''
+    store = result_store.ResultStore(str(tmp_path / "results"))
+    assert store.append({"url": "a", "title": "A"}) is True
+    assert store.append({"url": "a", "title": "A again"}) is False
+    assert store.append_many([{"url": "b"}, {"url": "c"}, {"url": "b"}]) == 2
+    assert store.urls() == {"a", "b", "c"}
+    assert [r["url"] for r in store.iter_records()] == ["a", "b", "c"]
+
+
+def test_segment_rotation(tmp_path):
+    '''
+    @brief Should start a new segment once the active one is full.
+    '''
+    store = result_store.ResultStore(str(tmp_path / "results"), max_segment_bytes=64)
+    for i in range(6):
+        store.append({"url": f"http://example.com/{i}", "p": ["x" * 20]})
+    segments = store.segments()
+    assert len(segments) > 1
+    assert segments[0].endswith("segment-00000001.jsonl")
+    assert len(list(store.iter_records())) == 6
+
+
+def test_append_many_rotates_within_a_batch(tmp_path):
+    '''
+    @brief A large batch should be split over new segments, each within max_segment_bytes.
+    '''
+    store = result_store.ResultStore(str(tmp_path / "results"), max_segment_bytes=200)
+    store.append({"url": "http://example.com/first"})
+    records = [{"url": f"http://example.com/{i}", "p": ["x" * 40]} for i in range(20)]
+    assert store.append_many(records) == 20
+    segments = store.segments()
+    assert len(segments) > 5
+    assert all(os.path.getsize(segment) <= 200 for segment in segments)
+    assert [r["url"] for r in store.iter_records()][1:] == [r["url"] for r in records]
+
+
+def test_index_sees_writes_of_other_instances(tmp_path):
+    '''
+    @brief Should refresh the URL index with lines appended by another writer.
+    '''
+    root = str(tmp_path / "results")
+    first = result_store.ResultStore(root)
+    second = result_store.ResultStore(root)
+    assert first.append({"url": "a"})
+    assert second.contains_url("a")
+    assert second.append({"url": "a"}) is False
+
+
+def test_partial_trailing_line_is_ignored(tmp_path):
+    '''
+    @brief Should not read a record that is still being written.
+    '''
+    root = tmp_path / "results"
+    root.mkdir()
+    (root / "segment-00000001.jsonl").write_text(json.dumps({"url": "a"}) + "\n" + '{"url": "b"', encoding="utf-8")
+    store = result_store.ResultStore(str(root))
+    assert store.urls() == {"a"}
+    assert [r["url"] for r in store.iter_records()] == ["a"]
+
+
+def test_legacy_import_on_first_write(tmp_path):
+    '''
+    @brief Should import the legacy array once and rename it.
+    '''
+    legacy = tmp_path / "result.json"
+    legacy.write_text(json.dumps([{"url": "old1"}, {"url": "old2"}]), encoding="utf-8")
+    store = result_store.ResultStore(str(tmp_path / "results"), legacy_file=str(legacy))
+    # Readers see the legacy data before any write
+    assert store.exists()
+    assert [r["url"] for r in store.iter_records()] == ["old1", "old2"]
+    assert store.append({"url": "old1"}) is False
+    assert store.append({"url": "new"}) is True
+    assert not legacy.exists()
+    assert (tmp_path / "result.json.imported").exists()
+    assert [r["url"] for r in store.iter_records()] == ["old1", "old2", "new"]
+
+
+def test_import_legacy_rotates_segments(tmp_path):
+    '''
+    @brief A large legacy array should be split over segments, each within max_segment_bytes.
+    '''
+    legacy = tmp_path / "result.json"
+    records = [{"url": f"http://example.com/{i}", "p": ["x" * 40]} for i in range(20)]
+    legacy.write_text(json.dumps(records), encoding="utf-8")
+    store = result_store.ResultStore(str(tmp_path / "results"), max_segment_bytes=200)
+    assert store.import_legacy(str(legacy)) == 20
+    segments = store.segments()
+    assert len(segments) > 5
+    assert all(os.path.getsize(segment) <= 200 for segment in segments)
+    assert [r["url"] for r in store.iter_records()] == [r["url"] for r in records]
+    # The index covers every imported segment
+    assert store.append({"url": "http://example.com/3"}) is False
+
+
+def test_import_legacy_corrupted_file(tmp_path):
+    '''
+    @brief Should ignore a corrupted legacy file.
+    '''
+    legacy = tmp_path / "result.json"
+    legacy.write_text("not a json", encoding="utf-8")
+    store = result_store.ResultStore(str(tmp_path / "results"))
+    assert store.import_legacy(str(legacy)) == 0
+
+
+def test_iter_records_and_has_results(tmp_path):
+    '''
+    @brief Module helpers should accept store directories, JSONL and legacy JSON files.
+    '''
+    root = tmp_path / "results"
+    assert result_store.has_results(str(root)) is False
+    result_store.get_result_store(str(root)).append({"url": "a"})
+    assert result_store.has_results(str(root)) is True
+    assert [r["url"] for r in result_store.iter_records(str(root))] == ["a"]
+
+    legacy = tmp_path / "single.json"
+    assert result_store.has_results(str(legacy)) is False
+    legacy.write_text(json.dumps({"url": "one"}), encoding="utf-8")
+    assert [r["url"] for r in result_store.iter_records(str(legacy))] == ["one"]
+
+    segment = result_store.get_result_store(str(root)).segments()[0]
+    assert [r["url"] for r in result_store.iter_records(segment)] == ["a"]
+
+
+def test_get_result_store_is_shared(tmp_path):
+    '''
+    @brief Should return the same instance for the same directory.
+    '''
+    root = str(tmp_path / "results")
+    assert result_store.get_result_store(root) is result_store.get_result_store(root)
+
+
+def test_iter_records_after_resumes_from_position(tmp_path):
+    '''
+    @brief Should resume exactly after the last returned position, across segments.
+    '''
+    store = result_store.ResultStore(str(tmp_path / "results"), max_segment_bytes=40)
+    store.append_many([{"url": f"u{i}", "p": ["x" * 10]} for i in range(3)])
+    pairs = list(store.iter_records_after(None))
+    assert [r["url"] for r, _ in pairs] == ["u0", "u1", "u2"]
+    position = pairs[-1][1]
+    assert store.has_position(position)
+    assert list(store.iter_records_after(position)) == []
+    store.append({"url": "u3"})
+    assert [r["url"] for r, _ in store.iter_records_after(position)] == ["u3"]
+    assert [r["url"] for r, _ in store.iter_records_after(pairs[0][1])] == ["u1", "u2", "u3"]
+    assert not store.has_position(("segment-99999999.jsonl", 0))
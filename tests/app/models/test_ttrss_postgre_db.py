@@ -4,6 +4,7 @@
 @brief Unit tests for ttrss_postgre_db.py
 @details Tests for feed retrieval, insertion, and entry marking (mocks, no real DB).
 """
+import gc
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 from src.app.models import ttrss_postgre_db
@@ -47,6 +48,32 @@ async def test_insert_feed_to_db_raises_on_error():
     with pytest.raises(Exception):
         await ttrss_postgre_db.insert_feed_to_db(conn, feed)
 
+@pytest.mark.asyncio
+async def test_bulk_insert_feeds_single_statement_skips_existing():
+    '''
+    @brief Should resolve the category once, insert the batch in one statement and count the skipped feeds.
+    '''
+    conn = AsyncMock()
+    conn.fetchval.return_value = 7
+    conn.fetch.return_value = [{"feed_url": "http://a.com/rss"}]
+    feeds = [
+        FeedCreateRequest(title="a", feed_url="http://a.com/rss", site_url="http://a.com", owner_uid=1, cat_id=0),
+        FeedCreateRequest(title="b", feed_url="http://b.com/rss", site_url="http://b.com", owner_uid=1, cat_id=0),
+        FeedCreateRequest(title="a2", feed_url="http://a.com/rss", site_url="http://a.com", owner_uid=1, cat_id=0),
+    ]
+    assert await ttrss_postgre_db.bulk_insert_feeds(conn, feeds) == {"inserted": 1, "skipped": 2}
+    assert conn.fetchval.await_count == 1
+    assert conn.fetch.await_count == 1
+    query, titles, urls = conn.fetch.call_args.args[:3]
+    assert "ON CONFLICT DO NOTHING" in query and "unnest" in query
+    assert titles == ["a", "b"] and urls == ["http://a.com/rss", "http://b.com/rss"]
+    assert conn.fetch.call_args.args[5] == 7
+    assert await ttrss_postgre_db.bulk_insert_feeds(conn, []) == {"inserted": 0, "skipped": 0}
+    assert conn.fetch.await_count == 1
+    conn.fetch.side_effect = Exception("fail")
+    with pytest.raises(Exception):
+        await ttrss_postgre_db.bulk_insert_feeds(conn, feeds[:1])
+
 @pytest.mark.asyncio
 async def test_get_entry_links_returns_links():
     '''
@@ -67,3 +94,153 @@ async def test_mark_entry_as_viewed_executes():
     conn.fetchrow.return_value = {"id": 1}
     await ttrss_postgre_db.mark_entry_as_viewed(conn, "url")
     assert conn.execute.called
+
+@pytest.mark.asyncio
+async def test_get_owner_uid_cached_per_pool():
+    '''
+    @brief Should query the user id once per pool, without keeping the pool alive.
+    '''
+    class DummyPool:
+        pass
+
+    ttrss_postgre_db.clear_owner_uid_cache()
+    conn = AsyncMock()
+    conn.fetchrow.return_value = {"id": 3}
+    pool = DummyPool()
+    assert await ttrss_postgre_db.get_owner_uid(conn, pool=pool) == 3
+    assert await ttrss_postgre_db.get_owner_uid(conn, pool=pool) == 3
+    assert conn.fetchrow.await_count == 1
+    assert await ttrss_postgre_db.get_owner_uid(conn, pool=DummyPool()) == 3
+    assert conn.fetchrow.await_count == 2
+    del pool
+    gc.collect()
+    assert len(ttrss_postgre_db._owner_uids) == 0
+    conn.fetchrow.return_value = None
+    with pytest.raises(ValueError):
+        await ttrss_postgre_db.get_owner_uid(conn)
+    ttrss_postgre_db.clear_owner_uid_cache()
+
+@pytest.mark.asyncio
+async def test_get_owner_uid_drops_closed_pools_without_weakrefs():
+    '''
+    @brief Pools with __slots__ (like asyncpg.Pool) should be cached until they are closed.
+    '''
+    class SlottedPool:
+        __slots__ = ("closing",)
+
+        def __init__(self):
+            self.closing = False
+
+        def is_closing(self):
+            return self.closing
+
+    ttrss_postgre_db.clear_owner_uid_cache()
+    conn = AsyncMock()
+    conn.fetchrow.return_value = {"id": 3}
+    pool = SlottedPool()
+    assert await ttrss_postgre_db.get_owner_uid(conn, pool=pool) == 3
+    assert await ttrss_postgre_db.get_owner_uid(conn, pool=pool) == 3
+    assert conn.fetchrow.await_count == 1
+    pool.closing = True
+    assert await ttrss_postgre_db.get_owner_uid(conn, pool=SlottedPool()) == 3
+    assert all(entry[0] is not pool for entry in ttrss_postgre_db._pinned_owner_uids.values())
+    ttrss_postgre_db.clear_owner_uid_cache()
+
+@pytest.mark.asyncio
+async def test_get_entry_links_with_ids():
+    '''
+    @brief Should return (id, link) pairs without looking up a known owner_uid.
+    '''
+    conn = AsyncMock()
+    conn.fetch.return_value = [{"id": 1, "link": "a"}, {"id": 2, "link": "b"}]
+    assert await ttrss_postgre_db.get_entry_links(conn, with_ids=True, owner_uid=5) == [(1, "a"), (2, "b")]
+    assert not conn.fetchrow.called
+    assert conn.fetch.call_args.args[1] == 5
+
+@pytest.mark.asyncio
+async def test_mark_entries_as_viewed_single_update():
+    '''
+    @brief Should mark a batch in one UPDATE inside a transaction and return the row count.
+    '''
+    conn = MagicMock()
+    conn.transaction.return_value.__aenter__ = AsyncMock()
+    conn.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+    conn.execute = AsyncMock(return_value="UPDATE 2")
+    conn.fetchrow = AsyncMock(return_value={"id": 1})
+    assert await ttrss_postgre_db.mark_entries_as_viewed(conn, [10, 11]) == 2
+    assert conn.execute.await_count == 1
+    assert "ANY($2::int[])" in conn.execute.call_args.args[0]
+    assert conn.execute.call_args.args[1:] == (1, [10, 11])
+    assert conn.transaction.called
+    assert await ttrss_postgre_db.mark_entries_as_viewed(conn, []) == 0
+
+@pytest.mark.asyncio
+async def test_mark_links_as_viewed_single_update():
+    '''
+    @brief Should mark a batch of links in one UPDATE with ANY.
+    '''
+    conn = MagicMock()
+    conn.transaction.return_value.__aenter__ = AsyncMock()
+    conn.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+    conn.execute = AsyncMock(return_value="UPDATE 1")
+    assert await ttrss_postgre_db.mark_links_as_viewed(conn, ["a", "b"], owner_uid=4) == 1
+    assert "e.link = ANY($2::text[])" in conn.execute.call_args.args[0]
+    assert conn.execute.call_args.args[1:] == (4, ["a", "b"])
+
+@pytest.mark.asyncio
+async def test_iter_unread_entry_batches_keyset_pages():
+    '''
+    @brief Should page by entry id with a short query per page until a page is not full.
+    '''
+    conn = AsyncMock()
+    conn.fetchrow.return_value = {"id": 9}
+    conn.fetch.side_effect = [
+        [{"id": 1, "link": "a"}, {"id": 4, "link": "b"}],
+        [{"id": 7, "link": "c"}],
+    ]
+    cm = AsyncMock()
+    cm.__aenter__.return_value = conn
+    cm.__aexit__.return_value = None
+    pool = MagicMock()
+    pool.acquire.return_value = cm
+    ttrss_postgre_db.clear_owner_uid_cache()
+    batches = [b async for b in ttrss_postgre_db.iter_unread_entry_batches(pool, batch_size=2)]
+    assert batches == [[(1, "a"), (4, "b")], [(7, "c")]]
+    assert [c.args[1:] for c in conn.fetch.call_args_list] == [(9, 0, 2), (9, 4, 2)]
+    assert "ORDER BY e.id" in conn.fetch.call_args.args[0]
+    assert pool.acquire.call_count == 2
+    ttrss_postgre_db.clear_owner_uid_cache()
+
+@pytest.mark.asyncio
+async def test_install_new_entry_trigger_sql():
+    '''
+    @brief Should create a statement-level trigger notifying the channel, and reject unsafe channel names.
+    '''
+    conn = MagicMock()
+    conn.transaction.return_value.__aenter__ = AsyncMock()
+    conn.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+    conn.execute = AsyncMock()
+    await ttrss_postgre_db.install_new_entry_trigger(conn)
+    sql = conn.execute.call_args.args[0]
+    assert "pg_notify('cybermind_new_entries'" in sql
+    assert "FOR EACH STATEMENT" in sql and "AFTER INSERT ON ttrss_user_entries" in sql
+    await ttrss_postgre_db.uninstall_new_entry_trigger(conn)
+    assert "DROP TRIGGER IF EXISTS cybermind_new_entries" in conn.execute.call_args.args[0]
+    with pytest.raises(ValueError):
+        await ttrss_postgre_db.install_new_entry_trigger(conn, "x'; DROP TABLE y; --")
+
+@pytest.mark.asyncio
+async def test_iter_unread_entry_batches_with_content():
+    '''
+    @brief Should also select the stored title and content when requested.
+    '''
+    conn = AsyncMock()
+    conn.fetch.return_value = [{"id": 1, "link": "a", "title": "T", "content": "<p>c</p>"}]
+    cm = AsyncMock()
+    cm.__aenter__.return_value = conn
+    cm.__aexit__.return_value = None
+    pool = MagicMock()
+    pool.acquire.return_value = cm
+    batches = [b async for b in ttrss_postgre_db.iter_unread_entry_batches(pool, owner_uid=1, batch_size=5, with_content=True)]
+    assert batches == [[(1, "a", "T", "<p>c</p>")]]
+    assert "e.title, e.content" in conn.fetch.call_args.args[0]
@@ -0,0 +1,87 @@
+"""
+@file test_url_filter.py
+@author naflashDev
+@brief Unit tests for url_filter.py
+@details Tests the memory-mapped Bloom filter of crawled URLs: sizing, canonical membership, persistence across instances, corrupt files and the false-positive rate.
+"""
+import os
+
+import pytest
+
+from src.app.models import url_filter
+
+
+def test_bloom_parameters_sizes_the_filter():
+    '''
+    @brief Should stay at a few megabytes for millions of URLs.
+    '''
+    bits, hashes = url_filter.bloom_parameters(2_000_000, 0.001)
+    assert 3_000_000 < bits // 8 < 4_000_000 and hashes == 10
+    with pytest.raises(ValueError):
+        url_filter.bloom_parameters(0, 0.01)
+
+
+def test_add_and_membership_use_canonical_urls(tmp_path):
+    '''
+    @brief Should report added URLs and their canonical variants as seen.
+    '''
+    f = url_filter.UrlFilter(str(tmp_path / "urls.bloom"), capacity=1000, error_rate=0.01)
+    assert f.created and f.count == 0
+    assert "https://example.com/a" not in f
+    assert f.add("https://example.com/a?utm_source=rss") is True
+    assert f.add("https://www.example.com/a#top") is False
+    assert "http://other.com/" not in f and "https://example.com/a" in f
+    assert f.add_many(["https://b.com/", "https://c.com/", "https://b.com"]) == 2
+    assert f.count == 3
+    assert f.filter_new(["https://c.com/x", "https://b.com/", "https://c.com/x?utm_medium=1", "https://d.com/"]) == [
+        "https://c.com/x", "https://d.com/",
+    ]
+    f.close()
+
+
+def test_filter_survives_restarts(tmp_path):
+    '''
+    @brief Should reopen an existing file with its own parameters and content.
+    '''
+    path = str(tmp_path / "urls.bloom")
+    first = url_filter.UrlFilter(path, capacity=1000, error_rate=0.01)
+    first.add("https://example.com/a")
+    size = os.path.getsize(path)
+    first.close()
+    second = url_filter.UrlFilter(path, capacity=50_000, error_rate=0.0001)
+    assert not second.created and second.capacity == 1000 and second.count == 1
+    assert "https://example.com/a" in second
+    assert os.path.getsize(path) == size
+    second.close()
+
+
+def test_invalid_file_is_recreated(tmp_path):
+    '''
+    @brief Should replace a file that is not a valid filter.
+    '''
+    path = tmp_path / "urls.bloom"
+    path.write_bytes(b"garbage" * 20)
+    f = url_filter.UrlFilter(str(path), capacity=100, error_rate=0.01)
+    assert f.created and f.count == 0
+    f.close()
+
+
+def test_false_positive_rate_stays_near_target(tmp_path):
+    '''
+    @brief Should keep the false-positive rate close to the configured one at capacity.
+    '''
+    f = url_filter.UrlFilter(str(tmp_path / "urls.bloom"), capacity=5000, error_rate=0.01)
+    f.add_many(f"https://site{i}.com/article" for i in range(5000))
+    assert all(f"https://site{i}.com/article" in f for i in range(5000))
+    false_positives = sum(f"https://other{i}.org/page" in f for i in range(20000))
+    assert false_positives / 20000 < 0.02
+    assert 0.005 < f.expected_error_rate() < 0.015
+    f.close()
+
+
+def test_get_url_filter_is_shared(tmp_path):
+    '''
+    @brief Should return one filter per path.
+    '''
+    path = str(tmp_path / "shared.bloom")
+    assert url_filter.get_url_filter(path, capacity=100) is url_filter.get_url_filter(path)
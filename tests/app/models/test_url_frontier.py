@@ -0,0 +1,106 @@
+"""
+@file test_url_frontier.py
+@author naflashDev
+@brief Unit tests for url_frontier.py
+@details Tests the SQLite URL frontier: canonical bulk upserts, indexed lookups, prioritized claims with per-domain caps and leases, crawl completion, failures, per-domain state, the one-time import of URL files and the feed discovery probe cache per site origin.
+"""
+import time
+
+from src.app.models import url_frontier
+
+
+def _open(tmp_path):
+    return url_frontier.open_frontier(str(tmp_path / "frontier.db"))
+
+
+def test_upsert_returns_only_new_canonical_urls(tmp_path):
+    '''
+    @brief Should insert new URLs once per canonical form and refresh known ones.
+    '''
+    conn = _open(tmp_path)
+    assert url_frontier.upsert_urls(conn, ["https://a.com/x?utm_source=1", "https://www.a.com/x", "", "https://b.com/"]) == [
+        "https://a.com/x?utm_source=1", "https://b.com/",
+    ]
+    assert url_frontier.upsert_urls(conn, ["https://A.com/x#top", "https://c.com/"], priority=5) == ["https://c.com/"]
+    assert url_frontier.known_urls(conn, ["https://a.com/x", "https://d.com/"]) == {"https://a.com/x"}
+    # Queues are independent
+    assert url_frontier.upsert_urls(conn, ["https://a.com/x"], queue=url_frontier.ARTICLE_QUEUE) == ["https://a.com/x"]
+    row = conn.execute("SELECT priority, domain, first_seen <= last_seen FROM urls WHERE url = 'https://a.com/x' AND queue = ?",
+                       (url_frontier.FEED_DISCOVERY_QUEUE,)).fetchone()
+    assert row == (5, "a.com", 1)
+    conn.close()
+
+
+def test_claim_batch_orders_caps_domains_and_leases(tmp_path):
+    '''
+    @brief Should claim by priority, cap URLs per domain and not hand out leased URLs twice.
+    '''
+    conn = _open(tmp_path)
+    url_frontier.upsert_urls(conn, [f"https://big.com/{i}" for i in range(5)])
+    url_frontier.upsert_urls(conn, ["https://small.com/a"])
+    url_frontier.upsert_urls(conn, ["https://urgent.com/a"], priority=10)
+    batch = url_frontier.claim_batch(conn, limit=4, per_domain=2)
+    assert [url for _, url in batch] == ["https://urgent.com/a", "https://big.com/0", "https://big.com/1", "https://small.com/a"]
+    second = url_frontier.claim_batch(conn, limit=10, per_domain=10)
+    assert [url for _, url in second] == ["https://big.com/2", "https://big.com/3", "https://big.com/4"]
+    assert url_frontier.claim_batch(conn) == []
+    conn.close()
+
+
+def test_complete_and_retry(tmp_path):
+    '''
+    @brief Should mark crawled URLs done, retry failed ones up to MAX_ATTEMPTS and track domains.
+    '''
+    conn = _open(tmp_path)
+    url_frontier.upsert_urls(conn, ["https://ok.com/a", "https://bad.com/a"])
+    batch = dict((url, url_id) for url_id, url in url_frontier.claim_batch(conn))
+    assert url_frontier.complete_urls(conn, [batch["https://ok.com/a"]]) == 1
+    url_frontier.complete_urls(conn, [batch["https://bad.com/a"]], ok=False)
+    for _ in range(url_frontier.MAX_ATTEMPTS - 1):
+        claimed = url_frontier.claim_batch(conn)
+        assert [url for _, url in claimed] == ["https://bad.com/a"]
+        url_frontier.complete_urls(conn, [claimed[0][0]], ok=False)
+    assert url_frontier.claim_batch(conn) == []
+    assert url_frontier.frontier_stats(conn) == {"total": 2, "pending": 0, "crawled": 1, "failed": 1, "domains": 2}
+    domains = dict((d, (c, f)) for d, c, f in conn.execute("SELECT domain, crawled, failures FROM domains"))
+    assert domains == {"ok.com": (1, 0), "bad.com": (0, url_frontier.MAX_ATTEMPTS)}
+    # Crawled URLs come back once recrawl_after has elapsed
+    time.sleep(0.01)
+    assert [url for _, url in url_frontier.claim_batch(conn, recrawl_after=0.001)] == ["https://ok.com/a"]
+    conn.close()
+
+
+def test_record_crawled_and_import_url_file(tmp_path):
+    '''
+    @brief Should record externally crawled URLs and import a URL file only once.
+    '''
+    conn = _open(tmp_path)
+    assert url_frontier.record_crawled(conn, ["https://a.com/1", "https://a.com/1?utm_medium=x"], source="ttrss") == 1
+    assert url_frontier.frontier_stats(conn, url_frontier.ARTICLE_QUEUE)["crawled"] == 1
+    urls_file = tmp_path / "urls.txt"
+    urls_file.write_text("https://x.com/\n\nhttps://y.com/\n", encoding="utf-8")
+    assert url_frontier.import_url_file(conn, str(urls_file)) == 2
+    urls_file.write_text("https://z.com/\n", encoding="utf-8")
+    assert url_frontier.import_url_file(conn, str(urls_file)) == 0
+    assert url_frontier.import_url_file(conn, str(tmp_path / "missing.txt")) == 0
+    conn.close()
+
+
+def test_probe_cache_per_origin_expires_and_tracks_changes(tmp_path):
+    '''
+    @brief Should key probes by canonical origin, report them fresh until the TTL and count changed fingerprints.
+    '''
+    conn = _open(tmp_path)
+    assert url_frontier.site_origin("https://www.Example.com:443/post/1?utm_source=x") == "https://example.com"
+    assert url_frontier.site_origin("not a url") == ""
+    probes = [("https://a.com", ["https://a.com/feed"], "f1"), ("https://b.com", [], "f0")]
+    assert url_frontier.record_probes(conn, probes, now=1000.0) == 2
+    assert url_frontier.fresh_origins(conn, ["https://a.com", "https://b.com", "https://c.com"], ttl=100, now=1050.0) == {
+        "https://a.com": ["https://a.com/feed"], "https://b.com": [],
+    }
+    assert url_frontier.fresh_origins(conn, ["https://a.com"], ttl=100, now=1101.0) == {}
+    # Re-probed: a.com unchanged, b.com now links a feed
+    assert url_frontier.record_probes(conn, [("https://a.com", ["https://a.com/feed"], "f1"), ("https://b.com", ["https://b.com/rss"], "f2")], now=1200.0) == 1
+    rows = {origin: (changed_at, probes) for origin, changed_at, probes in conn.execute("SELECT origin, changed_at, probes FROM origin_probes")}
+    assert rows == {"https://a.com": (1000.0, 2), "https://b.com": (1200.0, 2)}
+    conn.close()
@@ -0,0 +1,164 @@
+"""
+@file test_cve_store.py
+@author naflashDev
+@brief Tests para cve_store.py y el modo incremental de script_auto.py.
+@details Usa un repositorio git local temporal para validar el watermark, el diff de ficheros JSON y el fallback a reconstrucción completa.
+"""
+import json
+import subprocess
+import pytest
+from src.app.services.llm import cve_store, script_auto
+
+
+def _cve(cve_id, state="PUBLISHED", desc="desc"):
+    return {
+        "cveMetadata": {"state": state, "cveId": cve_id},
+        "containers": {"cna": {"descriptions": [{"lang": "en", "value": desc}]}},
+    }
+
+
+def _git(repo, *args):
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+
+def _commit(repo, message):
+    _git(repo, "add", "-A")
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", message)
+
+
+@pytest.fixture
+def cve_repo(tmp_path):
+    repo = tmp_path / "cvelist"
+    (repo / "cves").mkdir(parents=True)
+    _git(repo, "init", "-q")
+    for i in range(3):
+        (repo / "cves" / f"CVE-2024-000{i}.json").write_text(json.dumps(_cve(f"CVE-2024-000{i}")), encoding="utf-8")
+    _commit(repo, "initial")
+    return repo
+
+
+@pytest.fixture
+def inline_pool(monkeypatch):
+    # Ejecuta los lotes en el mismo proceso para que el test sea rápido y determinista
+    def fake_iter(worker, batches, stop_event, max_workers):
+        for batch in batches:
+            yield worker(batch)
+    monkeypatch.setattr(script_auto, "_iter_pool_results", fake_iter)
+
+
+def _ids(path):
+    return sorted(r["instruction"].split()[-1] for r in json.loads(path.read_text(encoding="utf-8")))
+
+
+def test_store_roundtrip(tmp_path):
+    conn = cve_store.open_store(str(tmp_path / "s.db"))
+    assert cve_store.get_watermark(conn) is None
+    cve_store.upsert_records(conn, [("a.json", [{"x": 1}]), ("b.json", [{"x": 2}])])
+    cve_store.set_watermark(conn, "abc")
+    assert cve_store.get_watermark(conn) == "abc"
+    # Empty records remove the entry (CVE no longer published)
+    cve_store.upsert_records(conn, [("a.json", [])])
+    assert cve_store.delete_records(conn, ["b.json", "missing.json"]) == 1
+    out = tmp_path / "out.json"
+    assert cve_store.export_json(conn, str(out)) == 0
+    assert json.loads(out.read_text(encoding="utf-8")) == []
+    cve_store.clear_records(conn)
+    assert cve_store.get_watermark(conn) is None
+    conn.close()
+
+
+def test_update_json_appends_additions_and_rewrites_after_changes(tmp_path, monkeypatch):
+    conn = cve_store.open_store(str(tmp_path / "s.db"))
+    out = tmp_path / "out.json"
+    cve_store.upsert_records(conn, [("b.json", [{"x": 2}])])
+    # No export yet: full export
+    assert cve_store.update_json(conn, str(out)) == 1
+    before = out.read_bytes()
+    assert cve_store.update_json(conn, str(out)) == 0
+    assert out.read_bytes() == before
+    # Only additions: appended in place at the end of the array
+    cve_store.upsert_records(conn, [("a.json", [{"x": 1}]), ("c.json", [{"x": 3}, {"x": 4}])])
+    real_export = cve_store.export_json
+    monkeypatch.setattr(cve_store, "export_json", lambda *a: pytest.fail("unexpected rewrite"))
+    assert cve_store.update_json(conn, str(out)) == 3
+    monkeypatch.setattr(cve_store, "export_json", real_export)
+    assert json.loads(out.read_text(encoding="utf-8")) == [{"x": 2}, {"x": 1}, {"x": 3}, {"x": 4}]
+    # A modified file forces a full rewrite, in path order
+    cve_store.upsert_records(conn, [("b.json", [{"x": 20}])])
+    assert cve_store.update_json(conn, str(out)) == 4
+    assert json.loads(out.read_text(encoding="utf-8")) == [{"x": 1}, {"x": 20}, {"x": 3}, {"x": 4}]
+    # And so does a deletion
+    cve_store.delete_records(conn, ["c.json"])
+    assert cve_store.update_json(conn, str(out)) == 2
+    assert json.loads(out.read_text(encoding="utf-8")) == [{"x": 1}, {"x": 20}]
+    conn.close()
+
+
+def test_update_json_appends_to_an_empty_export(tmp_path):
+    conn = cve_store.open_store(str(tmp_path / "s.db"))
+    out = tmp_path / "out.json"
+    assert cve_store.export_json(conn, str(out)) == 0
+    cve_store.upsert_records(conn, [("a.json", [{"x": 1}])])
+    assert cve_store.update_json(conn, str(out)) == 1
+    assert json.loads(out.read_text(encoding="utf-8")) == [{"x": 1}]
+    conn.close()
+
+
+def test_incremental_without_watermark_falls_back_to_full_rebuild(cve_repo, tmp_path, inline_pool):
+    out_dir = tmp_path / "data"
+    script_auto.update_cve_repo_and_build_list(repo_dir=str(cve_repo), output_dir=str(out_dir), incremental=True)
+    assert _ids(out_dir / "cve_list.json") == ["CVE-2024-0000", "CVE-2024-0001", "CVE-2024-0002"]
+    conn = cve_store.open_store(str(out_dir / "cve_store.db"))
+    assert cve_store.get_watermark(conn) == script_auto.get_head_commit(str(cve_repo))
+    conn.close()
+
+
+def test_incremental_applies_only_git_changes(cve_repo, tmp_path, inline_pool, monkeypatch):
+    out_dir = tmp_path / "data"
+    script_auto.update_cve_repo_and_build_list(repo_dir=str(cve_repo), output_dir=str(out_dir), incremental=True)
+
+    (cve_repo / "cves" / "CVE-2024-0000.json").unlink()
+    (cve_repo / "cves" / "CVE-2024-0001.json").write_text(json.dumps(_cve("CVE-2024-0001", desc="updated")), encoding="utf-8")
+    (cve_repo / "cves" / "CVE-2024-0009.json").write_text(json.dumps(_cve("CVE-2024-0009")), encoding="utf-8")
+    _commit(cve_repo, "weekly update")
+
+    transformed = []
+    real_transform = script_auto._transform_file
+    def tracking_transform(path):
+        transformed.append(path)
+        return real_transform(path)
+    monkeypatch.setattr(script_auto, "_transform_file", tracking_transform)
+    monkeypatch.setattr(script_auto, "rebuild_cve_store", lambda *a, **kw: pytest.fail("unexpected full rebuild"))
+
+    script_auto.update_cve_repo_and_build_list(repo_dir=str(cve_repo), output_dir=str(out_dir), incremental=True)
+    assert sorted(p.rsplit("/", 1)[-1] for p in transformed) == ["CVE-2024-0001.json", "CVE-2024-0009.json"]
+    assert _ids(out_dir / "cve_list.json") == ["CVE-2024-0001", "CVE-2024-0002", "CVE-2024-0009"]
+    assert "updated" in (out_dir / "cve_list.json").read_text(encoding="utf-8")
+
+
+def test_incremental_diverged_history_triggers_rebuild(cve_repo, tmp_path, inline_pool):
+    store_path = str(tmp_path / "s.db")
+    conn = cve_store.open_store(store_path)
+    cve_store.set_watermark(conn, "0" * 40)
+    conn.close()
+    assert script_auto.incremental_update_cve_store(str(cve_repo), store_path) is None
+    assert script_auto.rebuild_cve_store(str(cve_repo), store_path) is True
+
+
+def test_incremental_stop_event_keeps_watermark(cve_repo, tmp_path, inline_pool):
+    import threading
+    store_path = str(tmp_path / "s.db")
+    assert script_auto.rebuild_cve_store(str(cve_repo), store_path)
+    old_head = script_auto.get_head_commit(str(cve_repo))
+    (cve_repo / "cves" / "CVE-2024-0005.json").write_text(json.dumps(_cve("CVE-2024-0005")), encoding="utf-8")
+    _commit(cve_repo, "more")
+    evt = threading.Event()
+    evt.set()
+    assert script_auto.incremental_update_cve_store(str(cve_repo), store_path, stop_event=evt) is False
+    conn = cve_store.open_store(store_path)
+    assert cve_store.get_watermark(conn) == old_head
+    conn.close()
+
+
+def test_get_head_commit_not_a_repo(tmp_path):
+    assert script_auto.get_head_commit(str(tmp_path)) is None
@@ -31,46 +31,88 @@ def test_consolidate_json_is_finalizing(monkeypatch, tmp_path):
         script_auto.consolidate_json(str(d), str(tmp_path / "out4.json"))
         assert mock_logger.warning.called
 
-def test_consolidate_json_active_processes(monkeypatch, tmp_path):
+class DummyResults:
+    """In-process stand-in for the iterator returned by Pool.imap_unordered."""
+    def __init__(self, func, batches):
+        self._it = (func(batch) for batch in batches)
+    def next(self, timeout=None):
+        return next(self._it)
+
+
+class DummyPool:
+    """In-process stand-in for multiprocessing.Pool so mocks stay visible."""
+    instances = []
+    def __init__(self, processes=None):
+        self.processes = processes
+        self.batches = []
+        self.terminated = False
+        DummyPool.instances.append(self)
+    def imap_unordered(self, func, batches):
+        self.batches = list(batches)
+        return DummyResults(func, self.batches)
+    def terminate(self): self.terminated = True
+    def join(self): pass
+
+
+def test_consolidate_json_pool_batches(monkeypatch, tmp_path):
     d = tmp_path / "repo5"
     d.mkdir()
-    for i in range(2):
+    for i in range(5):
         (d / f"f{i}.json").write_text(json.dumps({"cveMetadata": {"state": "PUBLISHED", "cveId": f"CVE-{i}"}}), encoding="utf-8")
-    # DummyProc simula procesos activos y join/terminate
-    class DummyProc:
-        def __init__(self, target, args): self._alive = True; self._target = target; self._args = args
-        def start(self): self._target(*self._args); self._alive = False
-        def is_alive(self): return self._alive
-        def join(self, timeout=None): self._alive = False
-        def terminate(self): self._alive = False
-    monkeypatch.setattr(script_auto, "_process_file_worker", lambda i, o: open(o, "w").write("[]"))
-    monkeypatch.setattr(script_auto.multiprocessing, "Process", DummyProc)
-    monkeypatch.setattr(script_auto.multiprocessing, "Manager", lambda: type("M", (), {"Lock": staticmethod(lambda: type("L", (), {"__enter__": lambda s: None, "__exit__": lambda s,a,b,c: None})())})())
+    DummyPool.instances = []
+    monkeypatch.setattr(script_auto.multiprocessing, "Pool", DummyPool)
     out_file = tmp_path / "out5.json"
-    script_auto.consolidate_json(str(d), str(out_file))
-    assert out_file.exists()
-
-def test_consolidate_json_warning_partial(monkeypatch, tmp_path):
+    script_auto.consolidate_json(str(d), str(out_file), batch_size=2, max_workers=3)
+    pool = DummyPool.instances[0]
+    assert pool.processes == 3
+    assert sorted(len(b) for b in pool.batches) == [1, 2, 2]
+    assert pool.terminated
+    assert len(json.loads(out_file.read_text(encoding="utf-8"))) == 5
+    assert not (tmp_path / "out5.json.tmp").exists()
+
+def test_consolidate_json_skips_invalid_file(monkeypatch, tmp_path):
     d = tmp_path / "repo6"
     d.mkdir()
-    (d / "f0.json").write_text(json.dumps({"cveMetadata": {"state": "PUBLISHED"}}), encoding="utf-8")
-    # Fuerza excepción al leer parcial
-    import builtins
-    real_open = builtins.open
-    def fake_open(*a, **kw):
-        # Solo lanza excepción al leer el archivo parcial, no al escribir
-        if a[0].endswith("out_0.json") and (len(a) > 1 and a[1] == "r"):
-            raise Exception("fail read")
-        return real_open(*a, **kw)
-    monkeypatch.setattr(script_auto, "_process_file_worker", lambda i, o: open(o, "w").write("[]"))
-    monkeypatch.setattr(script_auto.multiprocessing, "Process", lambda target, args: type("P", (), {"start": lambda s: target(*args), "is_alive": lambda s: False, "join": lambda s, timeout=None: None, "terminate": lambda s: None})())
-    monkeypatch.setattr(script_auto.multiprocessing, "Manager", lambda: type("M", (), {"Lock": staticmethod(lambda: type("L", (), {"__enter__": lambda s: None, "__exit__": lambda s,a,b,c: None})())})())
-    monkeypatch.setattr("builtins.open", fake_open)
+    (d / "f0.json").write_text("{not json}", encoding="utf-8")
+    (d / "f1.json").write_text(json.dumps({"cveMetadata": {"state": "PUBLISHED", "cveId": "CVE-1"}}), encoding="utf-8")
+    monkeypatch.setattr(script_auto.multiprocessing, "Pool", DummyPool)
     with patch("src.app.services.llm.script_auto.logger") as mock_logger:
         out_file = tmp_path / "out6.json"
         script_auto.consolidate_json(str(d), str(out_file))
-        # Solo debe verificar que el warning fue emitido
         assert mock_logger.warning.called
+    assert len(json.loads(out_file.read_text(encoding="utf-8"))) == 1
+
+def test_consolidate_json_stop_event_midway(monkeypatch, tmp_path):
+    d = tmp_path / "repo7"
+    d.mkdir()
+    for i in range(4):
+        (d / f"f{i}.json").write_text(json.dumps({"cveMetadata": {"state": "PUBLISHED", "cveId": f"CVE-{i}"}}), encoding="utf-8")
+    import threading
+    evt = threading.Event()
+    real_worker = script_auto._process_batch_worker
+    def stopping_worker(paths):
+        evt.set()
+        return real_worker(paths)
+    DummyPool.instances = []
+    monkeypatch.setattr(script_auto, "_process_batch_worker", stopping_worker)
+    monkeypatch.setattr(script_auto.multiprocessing, "Pool", DummyPool)
+    out_file = tmp_path / "out7.json"
+    script_auto.consolidate_json(str(d), str(out_file), stop_event=evt, batch_size=1)
+    # The first batch is consumed, then the pool is torn down and a valid partial array is written
+    data = json.loads(out_file.read_text(encoding="utf-8"))
+    assert len(data) == 1
+    assert DummyPool.instances[0].terminated
+
+def test_consolidate_json_real_pool(tmp_path):
+    d = tmp_path / "repo8"
+    (d / "sub").mkdir(parents=True)
+    for i in range(3):
+        (d / "sub" / f"f{i}.json").write_text(json.dumps({"cveMetadata": {"state": "PUBLISHED", "cveId": f"CVE-{i}"}}), encoding="utf-8")
+    out_file = tmp_path / "nested" / "out8.json"
+    script_auto.consolidate_json(str(d), str(out_file), batch_size=2, max_workers=1)
+    data = json.loads(out_file.read_text(encoding="utf-8"))
+    assert sorted(r["instruction"][-5:] for r in data) == ["CVE-0", "CVE-1", "CVE-2"]
+
 def test_clone_repository_git_error(tmp_path):
     repo_dir = tmp_path / "repo3"
     # Garantiza entorno de test para evitar ejecución real de git
@@ -167,15 +209,16 @@ def test_process_file_unexpected_error(tmp_path):
         script_auto.process_file(file, agg, lock)
         assert mock_logger.error.called
 
-def test__process_file_worker_error(tmp_path):
+def test__process_batch_worker_error(tmp_path):
     file = tmp_path / "input2.json"
     file.write_text(json.dumps({"cveMetadata": {"state": "PUBLISHED"}}), encoding="utf-8")
-    out = tmp_path / "out2.json"
     # Fuerza excepción en transformación
-    with patch("src.app.services.llm.script_auto.transform_json", side_effect=Exception("fail")):
-        script_auto._process_file_worker(str(file), str(out))
-    # El archivo de salida no debe existir
-    assert not out.exists()
+    with patch("src.app.services.llm.script_auto.transform_json", side_effect=Exception("fail")), \
+         patch("src.app.services.llm.script_auto.logger") as mock_logger:
+        done, records = script_auto._process_batch_worker([str(file)])
+    assert done == 1
+    assert records == []
+    assert mock_logger.error.called
 
 def test_consolidate_json_error(monkeypatch, tmp_path):
     d = tmp_path / "repo2"
@@ -361,17 +404,18 @@ def test_transform_json_with_adp_and_solutions():
     assert "solution" in result[0]["input"].lower() or "mitigation" in result[0]["input"].lower()
 
 
-def test__process_file_worker_creates_output(tmp_path):
+def test__process_batch_worker_returns_records(tmp_path):
     '''
-    @brief Should write transformed output to file.
+    @brief Should return the transformed records of every file in the batch.
     '''
-    file = tmp_path / "input.json"
-    file.write_text(json.dumps({"cveMetadata": {"state": "PUBLISHED", "cveId": "CVE-1"}}), encoding="utf-8")
-    out = tmp_path / "out.json"
-    script_auto._process_file_worker(str(file), str(out))
-    assert out.exists()
-    data = json.loads(out.read_text(encoding="utf-8"))
-    assert isinstance(data, list)
+    paths = []
+    for i in range(2):
+        file = tmp_path / f"input{i}.json"
+        file.write_text(json.dumps({"cveMetadata": {"state": "PUBLISHED", "cveId": f"CVE-{i}"}}), encoding="utf-8")
+        paths.append(str(file))
+    done, records = script_auto._process_batch_worker(paths)
+    assert done == 2
+    assert len(records) == 2
 
 
 def test_consolidate_json_runs(monkeypatch, tmp_path):
@@ -385,35 +429,23 @@ def test_consolidate_json_runs(monkeypatch, tmp_path):
         (d / f"f{i}.json").write_text(json.dumps({"cveMetadata": {"state": "PUBLISHED", "cveId": f"CVE-{i}"}}), encoding="utf-8")
 
     # Parchear multiprocessing para ejecución rápida (sin procesos)
-    # Simula la creación de archivos de salida como lo haría _process_file_worker
-    outputs = {}
-    def fake_process_file_worker(input_path, out_path):
-        with open(input_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        with open(out_path, 'w', encoding='utf-8') as of:
-            json.dump([{"instruction": "dummy"}], of)
-        outputs[out_path] = True
-    class DummyProc:
-        def __init__(self, target, args):
-            self._alive = False
-            self._target = target
-            self._args = args
-        def start(self):
-            self._target(*self._args)
-            self._alive = False
-        def is_alive(self): return self._alive
-        def join(self, timeout=None): pass
-        def terminate(self): self._alive = False
-    monkeypatch.setattr(script_auto, "_process_file_worker", fake_process_file_worker)
-    monkeypatch.setattr(script_auto.multiprocessing, "Process", DummyProc)
-    monkeypatch.setattr(script_auto.multiprocessing, "Manager", lambda: type("M", (), {"Lock": staticmethod(lambda: type("L", (), {"__enter__": lambda s: None, "__exit__": lambda s,a,b,c: None})())})())
-    monkeypatch.setattr(script_auto, "time", script_auto.time)
+    monkeypatch.setattr(script_auto.multiprocessing, "Pool", DummyPool)
     out_file = tmp_path / "out.json"
-    script_auto.consolidate_json(str(d), str(out_file))
+    with patch("src.app.services.llm.script_auto.logger") as mock_logger:
+        script_auto.consolidate_json(str(d), str(out_file))
     assert out_file.exists()
     data = json.loads(out_file.read_text(encoding="utf-8"))
     assert isinstance(data, list)
     assert len(data) == 3
+    assert any("files/sec" in str(c) for c in mock_logger.info.call_args_list)
+
+
+def test_consolidate_json_empty_repo(tmp_path):
+    d = tmp_path / "empty"
+    d.mkdir()
+    out_file = tmp_path / "out_empty.json"
+    script_auto.consolidate_json(str(d), str(out_file))
+    assert json.loads(out_file.read_text(encoding="utf-8")) == []
 
 
 def test_update_cve_repo_and_build_list(monkeypatch, tmp_path):
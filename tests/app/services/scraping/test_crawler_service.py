@@ -0,0 +1,143 @@
+"""
+@file test_crawler_service.py
+@author naflashDev
+@brief Unit tests for crawler_service.py
+@details Tests the long-lived crawler subprocess: batches crawled through the same process, unknown spider kinds, stop events, termination and crawl profiles.
+"""
+import http.server
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from src.app.services.scraping import crawler_service
+
+
+class _FeedHandler(http.server.BaseHTTPRequestHandler):
+    '''
+    @brief Serve a page linking to an RSS feed.
+    '''
+    def do_GET(self):
+        body = b'<html><head><link rel="alternate" type="application/rss+xml" href="/feed.xml"></head></html>'
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def service():
+    svc = crawler_service.CrawlerService(settings={"DOWNLOAD_DELAY": 0, "AUTOTHROTTLE_ENABLED": False, "RETRY_ENABLED": False})
+    yield svc
+    svc.terminate()
+
+
+def test_batches_reuse_the_subprocess(service, http_server):
+    '''
+    @brief Should crawl consecutive batches in the same subprocess and stream items and progress.
+    '''
+    progress = []
+    items = service.crawl("rss", [http_server + "/a"], on_progress=progress.append)
+    pid = service.pid
+    assert [item for item in items if "feed_url" in item] == [{"feed_url": http_server + "/feed.xml"}]
+    # One probe item per page for the discovery probe cache
+    assert [item["probe_url"] for item in items if "probe_url" in item] == [http_server + "/a"]
+    assert progress and progress[-1]["done"] == 1 and progress[-1]["total"] == 1
+    second = service.crawl("rss", [http_server + "/b"])
+    assert [item for item in second if "feed_url" in item] == [{"feed_url": http_server + "/feed.xml"}]
+    assert service.pid == pid and service.is_alive()
+    assert service.last_stats["pages"] == 1 and service.last_stats["items"] == 2
+    assert service.last_stats["pages_per_minute"] > 0
+    service.stop()
+    assert not service.is_alive()
+
+
+def test_unknown_kind_reports_error(service):
+    '''
+    @brief Should finish the batch with an error and keep the subprocess alive.
+    '''
+    events = list(service.iter_batch("unknown", ["http://127.0.0.1:1"]))
+    assert events[-1]["type"] == "done"
+    assert "Unknown spider kind" in events[-1]["error"]
+    assert service.is_alive()
+
+
+def test_stop_event_terminates_subprocess(service):
+    '''
+    @brief Should terminate the subprocess when the stop event is set while waiting.
+    '''
+    service.start()
+    stop_event = threading.Event()
+    stop_event.set()
+    assert service.crawl("rss", ["http://127.0.0.1:1"], stop_event=stop_event) == []
+    assert service.pid is None
+
+
+def test_start_failure_raises(service):
+    '''
+    @brief Should raise if the subprocess never reports ready.
+    '''
+    service.start_timeout = 0.2
+    with patch.object(crawler_service, "_crawler_main", lambda *a: None):
+        with pytest.raises(RuntimeError):
+            service.start()
+    assert service.pid is None
+
+
+def test_get_crawler_service_is_shared():
+    '''
+    @brief Should return one service per name.
+    '''
+    assert crawler_service.get_crawler_service("x") is crawler_service.get_crawler_service("x")
+    assert crawler_service.get_crawler_service("x") is not crawler_service.get_crawler_service("y")
+
+
+def test_crawl_profile_settings_and_fallback():
+    '''
+    @brief Should layer the profile over the shared settings and fall back to the default profile.
+    '''
+    fast = crawler_service.crawl_profile_settings("fast")
+    assert fast["CONCURRENT_REQUESTS_PER_DOMAIN"] == 4 and fast["DNSCACHE_ENABLED"]
+    assert fast["RETRY_TIMES"] == crawler_service.CRAWLER_SETTINGS["RETRY_TIMES"]
+    default = crawler_service.crawl_profile_settings(crawler_service.DEFAULT_CRAWL_PROFILE)
+    assert crawler_service.crawl_profile_settings("missing") == default
+    assert crawler_service.crawl_profile_settings(None) == default
+    for settings in crawler_service.CRAWL_PROFILES.values():
+        assert {"CONCURRENT_REQUESTS", "CONCURRENT_REQUESTS_PER_DOMAIN", "DOWNLOAD_DELAY",
+                "AUTOTHROTTLE_TARGET_CONCURRENCY", "DNSCACHE_ENABLED", "DOWNLOAD_MAXSIZE"} <= settings.keys()
+
+
+def test_crawl_profile_for_reads_worker_then_global_env(monkeypatch):
+    '''
+    @brief Should prefer CRAWL_PROFILE_<WORKER> over CRAWL_PROFILE and the default.
+    '''
+    monkeypatch.delenv("CRAWL_PROFILE", raising=False)
+    monkeypatch.delenv("CRAWL_PROFILE_RSS", raising=False)
+    assert crawler_service.crawl_profile_for("rss") == crawler_service.DEFAULT_CRAWL_PROFILE
+    monkeypatch.setenv("CRAWL_PROFILE", "polite")
+    assert crawler_service.crawl_profile_for("rss") == "polite"
+    monkeypatch.setenv("CRAWL_PROFILE_RSS", " Fast ")
+    assert crawler_service.crawl_profile_for("rss") == "fast"
+    service = crawler_service.CrawlerService(profile=crawler_service.crawl_profile_for("rss"), settings={"DOWNLOAD_DELAY": 0})
+    assert service.profile == "fast" and service.settings["CONCURRENT_REQUESTS"] == 128
+    assert service.settings["DOWNLOAD_DELAY"] == 0
+
+
+def test_pages_per_minute():
+    '''
+    @brief Should compute the crawl rate and avoid dividing by zero.
+    '''
+    assert crawler_service.pages_per_minute(30, 15.0) == 120.0
+    assert crawler_service.pages_per_minute(5, 0) == 0.0
@@ -0,0 +1,166 @@
+"""
+@file test_feed_service.py
+@author naflashDev
+@brief Unit tests for feed_service.py
+@details Tests concurrent feed downloads against a local HTTP server: parsing off the event loop, conditional requests with ETag/Last-Modified, polling only due feeds, per-host limits and errors reported in the result.
+"""
+import asyncio
+import http.server
+import pickle
+import threading
+
+import pytest
+
+from src.app.services.scraping import feed_service
+
+RSS = b"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0"><channel><title>Feed \xc3\xa1</title><link>https://site.example/</link>
+<item><title>One</title><link>/post/1</link></item>
+<item><title>Two</title><link>https://site.example/post/2</link></item>
+</channel></rss>"""
+
+
+class _FeedHandler(http.server.BaseHTTPRequestHandler):
+    '''
+    @brief Serve a feed with an ETag, answering 304 to a matching If-None-Match.
+    '''
+    requests = []
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests.append((self.path, self.headers.get("If-None-Match")))
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            if self.path == "/missing":
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if self.path.startswith("/slow"):
+                threading.Event().wait(0.1)
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml; charset=utf-8")
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(RSS)))
+            self.end_headers()
+            self.wfile.write(RSS)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def feed_server():
+    _FeedHandler.requests = []
+    _FeedHandler.active = _FeedHandler.peak = 0
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _FeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_fetch_feeds_parses_and_skips_unchanged_feeds(feed_server, tmp_path):
+    '''
+    @brief Should parse downloaded feeds and get 304 for unchanged ones on the next conditional run.
+    '''
+    registry = str(tmp_path / "feeds.db")
+    urls = [f"{feed_server}/a.xml", f"{feed_server}/b.xml", f"{feed_server}/a.xml"]
+    first = await feed_service.fetch_feeds(urls, registry_path=registry)
+    assert [(r.url, r.status, r.http_status) for r in first] == [(urls[0], "ok", 200), (urls[1], "ok", 200)]
+    assert first[0].info["title"] == "Feed á"
+    assert [entry.link for entry in first[0].entries] == [f"{feed_server}/post/1", "https://site.example/post/2"]
+    assert first[0].etag == '"v1"'
+
+    second = await feed_service.fetch_feeds(urls[:1], registry_path=registry)
+    assert second[0].not_modified and second[0].entries == []
+    # Without the registry the full feed is downloaded again
+    third = await feed_service.fetch_feeds(urls[:1], conditional=False, registry_path=registry)
+    assert third[0].ok
+    assert [header for _, header in _FeedHandler.requests] == [None, None, '"v1"', None]
+
+
+@pytest.mark.asyncio
+async def test_fetch_feeds_due_only_skips_feeds_polled_recently(feed_server, tmp_path):
+    '''
+    @brief Should record the entries seen and skip the feed with `due_only` until its next poll time.
+    '''
+    registry = str(tmp_path / "feeds.db")
+    url = f"{feed_server}/a.xml"
+    first = await feed_service.fetch_feeds([url], registry_path=registry, due_only=True)
+    assert first[0].ok
+    assert [key for key, _ in feed_service.entry_keys(first[0].entries)] == [
+        key for key, _ in feed_service.entry_keys([{"link": f"{feed_server}/post/1"}, {"link": "https://site.example/post/2"}])
+    ]
+    assert await feed_service.fetch_feeds([url], registry_path=registry, due_only=True) == []
+    assert len(_FeedHandler.requests) == 1
+    conn = feed_service.open_feed_registry(registry)
+    assert feed_service.due_feeds(conn, [url], now=conn.execute("SELECT next_poll FROM feeds").fetchone()[0]) == [url]
+    conn.close()
+
+
+@pytest.mark.asyncio
+async def test_fetch_feeds_record_false_defers_the_registry_update(feed_server, tmp_path):
+    '''
+    @brief With `record=False` the feed is fetched in full again until `record_feed_results` stores its outcome.
+    '''
+    registry = str(tmp_path / "feeds.db")
+    url = f"{feed_server}/a.xml"
+    first = await feed_service.fetch_feeds([url], registry_path=registry, due_only=True, record=False)
+    assert first[0].ok
+    again = await feed_service.fetch_feeds([url], registry_path=registry, due_only=True, record=False)
+    assert again[0].ok
+    feed_service.record_feed_results(again, registry_path=registry)
+    assert await feed_service.fetch_feeds([url], registry_path=registry, due_only=True) == []
+    assert [header for _, header in _FeedHandler.requests] == [None, None]
+
+
+@pytest.mark.asyncio
+async def test_fetch_feed_reports_errors_and_size_limit(feed_server, monkeypatch):
+    '''
+    @brief Should return error results (HTTP status, connection errors, oversized bodies) instead of raising.
+    '''
+    missing = await feed_service.fetch_feed(f"{feed_server}/missing")
+    assert (missing.status, missing.http_status, missing.entries) == ("error", 404, [])
+    refused = await feed_service.fetch_feed("http://127.0.0.1:9/rss")
+    assert refused.status == "error" and refused.error
+    monkeypatch.setattr(feed_service, "FEED_MAX_BYTES", 100)
+    large = await feed_service.fetch_feed(f"{feed_server}/a.xml")
+    assert large.status == "error" and "larger than" in large.error
+
+
+@pytest.mark.asyncio
+async def test_fetch_feeds_limits_requests_per_host(feed_server, tmp_path):
+    '''
+    @brief Should download concurrently but never exceed the per-host limit.
+    '''
+    urls = [f"{feed_server}/slow{i}" for i in range(6)]
+    limiter = feed_service.HostLimiter(per_host=2, delay=0)
+    results = await feed_service.fetch_feeds(urls, conditional=False, limiter=limiter)
+    assert all(result.ok for result in results)
+    assert _FeedHandler.peak == 2
+
+
+def test_parse_feed_bytes_result_crosses_process_boundary():
+    '''
+    @brief Should replace the parser exception of a malformed feed so the result can be pickled.
+    '''
+    parsed = feed_service.parse_feed_bytes(RSS[:-20], "https://site.example/rss", "application/rss+xml")
+    assert parsed.bozo and isinstance(parsed.bozo_exception, str)
+    restored = pickle.loads(pickle.dumps(parsed))
+    assert restored.feed.title == "Feed á"
+    assert restored.entries[0].link == "https://site.example/post/1"
@@ -0,0 +1,77 @@
+"""
+@file test_keyword_matcher.py
+@author naflashDev
+@brief Unit tests for keyword_matcher.py
+@details Tests case-insensitive whole-word matching, multi-word keywords, occurrence counts and the shared matcher cache.
+"""
+import pytest
+
+from src.app.services.scraping import keyword_matcher
+
+# Both prefilter strategies must give the same results
+STRATEGIES = pytest.mark.parametrize("scan", [True, False])
+
+
+@STRATEGIES
+def test_count_whole_words_case_insensitive(scan):
+    '''
+    @brief Should count whole-word occurrences ignoring case.
+    '''
+    matcher = keyword_matcher.KeywordMatcher(["APT", "malware", "ataque"], scan=scan)
+    text = "APT29 is not an apt? Yes: APT. Malware, MALWARE and adapt; ataques"
+    assert matcher.count(text) == {"APT": 2, "malware": 2}
+
+
+@STRATEGIES
+def test_multi_word_and_hyphenated_keywords(scan):
+    '''
+    @brief Should match phrases across any whitespace and count nested keywords independently.
+    '''
+    matcher = keyword_matcher.KeywordMatcher(["cyber threat", "threat", "zero-day", "seguridad informática"], scan=scan)
+    text = "A Cyber\n  Threat exploiting a zero-day; Seguridad Informática. zero-days"
+    assert matcher.count(text) == {
+        "cyber threat": 1, "threat": 1, "zero-day": 1, "seguridad informática": 1,
+    }
+    assert matcher.search("new ZERO-DAY found")
+    assert matcher.count("cyber-threat") == {"threat": 1}
+
+
+@STRATEGIES
+def test_search_without_matches(scan):
+    '''
+    @brief Should return False/empty for irrelevant or empty text.
+    '''
+    matcher = keyword_matcher.KeywordMatcher(["ransomware", "data leak"], scan=scan)
+    assert not matcher.search("")
+    assert not matcher.search("data about a leak")
+    assert matcher.count("nothing here") == {}
+
+
+@STRATEGIES
+def test_non_word_keywords(scan):
+    '''
+    @brief Should handle keywords with symbols or without word characters.
+    '''
+    matcher = keyword_matcher.KeywordMatcher(["c++", "++"], scan=scan)
+    assert matcher.count("c++ and ++") == {"c++": 1, "++": 1}
+
+
+def test_duplicates_and_shared_instance():
+    '''
+    @brief Should drop duplicated keywords and reuse the compiled matcher per list.
+    '''
+    matcher = keyword_matcher.KeywordMatcher(["Malware", "malware", " data  leak "])
+    assert matcher.keywords == ["Malware", " data  leak "]
+    keywords = ["a", "b"]
+    assert keyword_matcher.get_keyword_matcher(keywords) is keyword_matcher.get_keyword_matcher(list(keywords))
+
+
+def test_strategy_follows_list_size():
+    '''
+    @brief Should use substring probes for short lists and the word index for long ones.
+    '''
+    assert keyword_matcher.KeywordMatcher(["a", "b"]).scan is True
+    many = [f"kw{i}" for i in range(keyword_matcher.SCAN_MAX_PROBES + 1)]
+    matcher = keyword_matcher.KeywordMatcher(many)
+    assert matcher.scan is False
+    assert matcher.count("KW1 kw1 kw10x") == {"kw1": 2}
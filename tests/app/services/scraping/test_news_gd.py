@@ -63,52 +63,75 @@ async def test_extract_news_structure_irrelevant(monkeypatch):
 
 def test_load_existing_urls(tmp_path, monkeypatch):
     '''
-    @brief Should load URLs from file.
+    @brief Should load URLs from the result store segments.
     '''
-    file = tmp_path / "result.json"
-    file.write_text(json.dumps([{"url": "a"}, {"url": "b"}]), encoding="utf-8")
-    monkeypatch.setattr(news_gd, "OUTPUT_FILE", file)
+    store_dir = tmp_path / "results"
+    store_dir.mkdir()
+    (store_dir / "segment-00000001.jsonl").write_text(
+        json.dumps({"url": "a"}) + "\n" + json.dumps({"url": "b"}) + "\n", encoding="utf-8"
+    )
+    monkeypatch.setattr(news_gd, "RESULT_STORE_DIR", str(store_dir))
     urls = news_gd.load_existing_urls()
     assert "a" in urls and "b" in urls
 
 def test_append_news_item(tmp_path, monkeypatch):
     '''
-    @brief Should append news item to file.
+    @brief Should append news item to the result store and skip duplicates.
     '''
-    file = tmp_path / "result.json"
-    monkeypatch.setattr(news_gd, "OUTPUT_FILE", file)
-    news_gd.append_news_item({"url": "c", "title": "t"})
-    data = json.loads(file.read_text(encoding="utf-8"))
-    assert any(item["url"] == "c" for item in data)
+    store_dir = tmp_path / "results"
+    monkeypatch.setattr(news_gd, "RESULT_STORE_DIR", str(store_dir))
+    assert news_gd.append_news_item({"url": "c", "title": "t"}) is True
+    assert news_gd.append_news_item({"url": "c", "title": "t"}) is False
+    lines = (store_dir / "segment-00000001.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["url"] for line in lines] == ["c"]
+    assert "c" in news_gd.load_existing_urls()
 
 
 def test_load_existing_urls_json_error(tmp_path, monkeypatch):
     '''
-    @brief Should handle JSON decode error and return empty set.
+    @brief Should skip corrupt lines and keep the valid URLs.
     '''
-    file = tmp_path / "result.json"
-    file.write_text("not a json", encoding="utf-8")
-    monkeypatch.setattr(news_gd, "OUTPUT_FILE", file)
+    store_dir = tmp_path / "results"
+    store_dir.mkdir()
+    (store_dir / "segment-00000001.jsonl").write_text(
+        "not a json\n" + json.dumps({"url": "a"}) + "\n", encoding="utf-8"
+    )
+    monkeypatch.setattr(news_gd, "RESULT_STORE_DIR", str(store_dir))
     urls = news_gd.load_existing_urls()
-    assert urls == set()
+    assert urls == {"a"}
 
 
-def test_append_news_item_error(monkeypatch):
+def test_append_news_item_error(tmp_path, monkeypatch):
     '''
     @brief Should handle exception in append_news_item.
     '''
-    import tempfile
-    from pathlib import Path
     import builtins
-    # Creamos un Path temporal y parcheamos 'open' global
-    with tempfile.TemporaryDirectory() as tmpdir:
-        fake_file = Path(tmpdir) / "result.json"
-        monkeypatch.setattr(news_gd, "OUTPUT_FILE", fake_file)
-        def fail_open(*a, **kw):
-            raise IOError("fail")
-        monkeypatch.setattr(builtins, "open", fail_open)
-        # Should not raise
-        news_gd.append_news_item({"url": "x", "title": "fail"})
+    monkeypatch.setattr(news_gd, "RESULT_STORE_DIR", str(tmp_path / "results"))
+    def fail_open(*a, **kw):
+        raise IOError("fail")
+    monkeypatch.setattr(builtins, "open", fail_open)
+    # Should not raise; None tells a failed append from a skipped duplicate
+    assert news_gd.append_news_item({"url": "x", "title": "fail"}) is None
+
+
+def test_append_news_item_failed_append_is_not_an_original(tmp_path, monkeypatch):
+    '''
+    @brief A story whose append failed is not registered, so a later copy under another URL is stored.
+    '''
+    monkeypatch.setattr(news_gd, "RESULT_STORE_DIR", str(tmp_path / "results"))
+    story = " ".join(f"palabra{i} de la noticia" for i in range(40))
+
+    class BrokenStore:
+        def append(self, record):
+            raise OSError("disk full")
+
+    real_store = news_gd.result_store.get_result_store
+    monkeypatch.setattr(news_gd.result_store, "get_result_store", lambda path: BrokenStore())
+    assert news_gd.append_news_item({"url": "https://a.com/1", "p": [story]}) is None
+    monkeypatch.setattr(news_gd.result_store, "get_result_store", real_store)
+    assert news_gd.append_news_item({"url": "https://b.com/2", "p": [story]}) is True
+    # The stored copy is now the original
+    assert news_gd.append_news_item({"url": "https://c.com/3", "p": [story]}) is False
 
 
 import asyncio
@@ -144,15 +167,14 @@ async def test_run_news_search(monkeypatch, tmp_path):
     '''
     # Patch dorks to a single value for speed
     monkeypatch.setattr(news_gd, "DORKS", ["testdork"])
-    # Patch OUTPUT_FILE to temp
-    file = tmp_path / "result.json"
-    monkeypatch.setattr(news_gd, "OUTPUT_FILE", file)
+    # Patch the result store to temp
+    monkeypatch.setattr(news_gd, "RESULT_STORE_DIR", str(tmp_path / "results"))
     # Patch async_search to return two urls
     async def fake_async_search(q, num_results=5):
         return ["http://ok.com", "nothttp", "http://dup.com", "http://ok.com"]
     monkeypatch.setattr(news_gd, "async_search", fake_async_search)
     # Patch extract_news_structure to return dict for ok.com, None for dup.com
-    async def fake_extract(url):
+    async def fake_extract(url, client=None, stats=None):
         if url == "http://ok.com":
             return {"url": url, "title": "t"}
         return None
@@ -192,3 +214,226 @@ async def test_run_news_search_error(monkeypatch):
         return None
     monkeypatch.setattr(news_gd.asyncio, "sleep", fake_sleep)
     await news_gd.run_news_search()
+
+def test_match_keywords_counts_and_whole_words():
+    '''
+    @brief Should return keyword counts and ignore partial words.
+    '''
+    assert news_gd.match_keywords("SCADA y scada: vulnerabilidades en ICS") == {
+        "SCADA": 2, "vulnerabilidades": 1, "ICS": 1,
+    }
+    assert not news_gd.is_relevant("physics and topics")
+
+
+@pytest.mark.asyncio
+async def test_run_news_search_skips_urls_in_url_filter(monkeypatch):
+    '''
+    @brief Should seed the new URL filter from the store and skip URLs crawled before, in any spelling.
+    '''
+    monkeypatch.setattr(news_gd, "DORKS", ["dork"])
+    monkeypatch.setattr(news_gd, "load_existing_urls", lambda: {"https://stored.com/a"})
+    async def fake_async_search(q, num_results=5):
+        return ["https://www.stored.com/a?utm_source=x", "https://new.com/b", "https://new.com/b#top"]
+    monkeypatch.setattr(news_gd, "async_search", fake_async_search)
+    fetched = []
+    async def fake_extract(url, client=None, stats=None):
+        fetched.append(url)
+        return {"url": url}
+    monkeypatch.setattr(news_gd, "extract_news_structure", fake_extract)
+    monkeypatch.setattr(news_gd, "append_news_item", lambda item: True)
+    async def fake_sleep(s):
+        return None
+    monkeypatch.setattr(news_gd.asyncio, "sleep", fake_sleep)
+    await news_gd.run_news_search()
+    assert fetched == ["https://new.com/b"]
+    assert "https://new.com/b" in news_gd.get_url_filter()
+
+
+@pytest.mark.asyncio
+async def test_run_news_search_failed_append_is_not_added_to_url_filter(monkeypatch):
+    '''
+    @brief A URL whose append failed should stay out of the URL filter; skipped duplicates go in.
+    '''
+    monkeypatch.setattr(news_gd, "DORKS", ["dork"])
+    monkeypatch.setattr(news_gd, "load_existing_urls", lambda: set())
+    async def fake_async_search(q, num_results=5):
+        return ["https://fail.com/a", "https://copy.com/b"]
+    monkeypatch.setattr(news_gd, "async_search", fake_async_search)
+    async def fake_extract(url, client=None, stats=None):
+        return {"url": url}
+    monkeypatch.setattr(news_gd, "extract_news_structure", fake_extract)
+    monkeypatch.setattr(news_gd, "append_news_item", lambda item: None if "fail" in item["url"] else False)
+    successes = []
+    monkeypatch.setattr(news_gd.logger, "success", lambda message, *a, **k: successes.append(message))
+    await news_gd.run_news_search()
+    assert "https://fail.com/a" not in news_gd.get_url_filter()
+    assert "https://copy.com/b" in news_gd.get_url_filter()
+    assert successes == []
+
+
+@pytest.mark.asyncio
+async def test_fetch_articles_concurrent_with_host_limits_and_stats():
+    '''
+    @brief Should fetch concurrently with one client, respect the per-host limit and record statuses and latencies.
+    '''
+    active = {"a.com": 0, "b.com": 0}
+    peak = {"a.com": 0, "b.com": 0}
+    html = "<html><head><title>T</title></head><body><p>nueva vulnerabilidad</p></body></html>"
+
+    class FakeResponse:
+        def __init__(self, status):
+            self.status_code = status
+            self.text = html
+        def raise_for_status(self):
+            if self.status_code >= 400:
+                raise Exception(f"HTTP {self.status_code}")
+
+    class FakeClient:
+        async def get(self, url):
+            host = url.split("/")[2]
+            active[host] += 1
+            peak[host] = max(peak[host], active[host])
+            await asyncio.sleep(0.02)
+            active[host] -= 1
+            return FakeResponse(404 if url.endswith("missing") else 200)
+
+    urls = [f"http://a.com/{i}" for i in range(4)] + ["http://b.com/1", "http://b.com/missing"]
+    stats = news_gd.FetchStats()
+    limiter = news_gd.HostLimiter(per_host=1, delay=0)
+    results = await news_gd.fetch_articles(urls, FakeClient(), concurrency=4, limiter=limiter, stats=stats)
+    assert [url for url, _ in results] == urls
+    assert [bool(item) for _, item in results] == [True] * 5 + [False]
+    assert peak == {"a.com": 1, "b.com": 1}
+    summary = stats.summary()
+    assert summary["fetched"] == 6 and summary["statuses"] == {"200": 5, "404": 1}
+    assert len(stats.latencies) == 6 and summary["p50"] > 0
+
+
+@pytest.mark.asyncio
+async def test_fetch_articles_deadline_and_host_delay():
+    '''
+    @brief Should space requests to the same host and abandon fetches still running at the deadline.
+    '''
+    starts = []
+
+    class FakeResponse:
+        status_code = 200
+        text = "<p>malware</p>"
+        def raise_for_status(self):
+            pass
+
+    class FakeClient:
+        async def get(self, url):
+            starts.append(asyncio.get_running_loop().time())
+            if url.endswith("slow"):
+                await asyncio.sleep(5)
+            return FakeResponse()
+
+    limiter = news_gd.HostLimiter(per_host=2, delay=0.05)
+    stats = news_gd.FetchStats()
+    await news_gd.fetch_articles(["http://a.com/1", "http://a.com/2"], FakeClient(), limiter=limiter, stats=stats)
+    assert starts[1] - starts[0] >= 0.04
+    deadline = asyncio.get_running_loop().time() + 0.1
+    results = await news_gd.fetch_articles(["http://c.com/slow", "http://d.com/fast"], FakeClient(), deadline=deadline, stats=stats)
+    assert [url for url, _ in results] == ["http://d.com/fast"]
+    assert stats.statuses["deadline"] == 1
+
+
+@pytest.mark.asyncio
+async def test_extract_news_structure_records_errors():
+    '''
+    @brief Should record timeouts and errors of the shared client in the stats.
+    '''
+    import httpx
+
+    class FakeClient:
+        async def get(self, url):
+            if "timeout" in url:
+                raise httpx.ReadTimeout("slow")
+            raise Exception("boom")
+
+    stats = news_gd.FetchStats()
+    assert await news_gd.extract_news_structure("http://timeout.com", client=FakeClient(), stats=stats) is None
+    assert await news_gd.extract_news_structure("http://error.com", client=FakeClient(), stats=stats) is None
+    assert stats.statuses == {"timeout": 1, "error": 1}
+
+
+def test_create_http_client_uses_pool_and_http2_when_available(monkeypatch):
+    '''
+    @brief Should build one pooled client and only enable HTTP/2 when h2 is installed.
+    '''
+    captured = {}
+    monkeypatch.setattr(news_gd.httpx, "AsyncClient", lambda **kwargs: captured.update(kwargs) or "client")
+    monkeypatch.setattr(news_gd, "http2_available", lambda: False)
+    assert news_gd.create_http_client(max_connections=3) == "client"
+    assert captured["http2"] is False and captured["limits"].max_connections == 3
+
+
+TRICKY_HTML = """<?xml version="1.0" encoding="utf-8"?><html><head><title> Alerta &amp; parche </title>
+<script>var t = "<p>no</p>";</script></head><body>
+<h1>Nuevo <b>exploit</b> activo</h1><p>Hola <a href=x>mundo</a>!<!-- c --> fin malware <script>var x=1;</script><style>.a{}</style></p>
+<p>   </p><p>a<br>b</p><div><p>fuera <span><p>dentro</p></span></p></div><h2>x<noscript>ns</noscript></h2><p>&nbsp;nb&nbsp;</p>
+<p>tab\tsep  <i> cursiva </i>\n línea</p><template><p>plantilla</p></template><p>a<ruby>漢<rp>(</rp><rt>kan</rt><rp>)</rp></ruby>b</p>
+<h3>uno</h3><h4></h4><h5>cinco</h5><h6>seis <em>6</em></h6></body></html>"""
+
+
+def _soup_news(url, html):
+    # Former BeautifulSoup extraction, kept as reference for the lxml extractor
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    news = {"url": url, "title": soup.title.string.strip() if soup.title else ""}
+    for tag in news_gd.NEWS_TAGS:
+        news[tag] = [e.get_text(strip=True) for e in soup.find_all(tag)]
+    return news
+
+
+def test_parse_news_html_matches_former_beautifulsoup_dict():
+    '''
+    @brief The lxml extractor should return the same news dict as the former BeautifulSoup extraction.
+    '''
+    news = news_gd.parse_news_html("http://t.com", TRICKY_HTML)
+    assert news == _soup_news("http://t.com", TRICKY_HTML)
+    assert list(news) == ["url", "title", "h1", "h2", "h3", "h4", "h5", "h6", "p"]
+    assert news["title"] == "Alerta & parche" and news["p"][0] == "Holamundo!fin malware"
+    assert news_gd.parse_news_html("http://t.com", "") is None
+    assert news_gd.parse_news_html("http://t.com", "<html><title></title><p>malware</p></html>")["title"] == ""
+
+
+@pytest.mark.asyncio
+async def test_parse_news_html_async_uses_pool_and_recovers(monkeypatch):
+    '''
+    @brief Should parse in the shared pool and fall back to a thread when the pool is broken.
+    '''
+    from concurrent.futures import BrokenExecutor, ThreadPoolExecutor
+    monkeypatch.setattr(news_gd, "_parse_pool", ThreadPoolExecutor(max_workers=1))
+    assert await news_gd.parse_news_html_async("http://t.com", TRICKY_HTML) == news_gd.parse_news_html("http://t.com", TRICKY_HTML)
+
+    class BrokenPool:
+        def submit(self, *a, **k):
+            raise BrokenExecutor("dead worker")
+        def shutdown(self, *a, **k):
+            pass
+    monkeypatch.setattr(news_gd, "_parse_pool", BrokenPool())
+    assert (await news_gd.parse_news_html_async("http://t.com", TRICKY_HTML))["h1"] == ["Nuevoexploitactivo"]
+    assert news_gd._parse_pool is None
+
+
+@pytest.mark.asyncio
+async def test_run_news_search_reuses_cached_search_results(monkeypatch):
+    '''
+    @brief Should queue the dorks in the shared scheduler and answer a repeated run from its cache.
+    '''
+    monkeypatch.setattr(news_gd, "DORKS", ["dork a", "dork b"])
+    monkeypatch.setattr(news_gd, "load_existing_urls", lambda: set())
+    searched = []
+    async def fake_async_search(q, num_results=5):
+        searched.append(q)
+        return [f"https://news{len(searched)}.com/a"]
+    monkeypatch.setattr(news_gd, "async_search", fake_async_search)
+    async def fake_extract(url, client=None, stats=None):
+        return None
+    monkeypatch.setattr(news_gd, "extract_news_structure", fake_extract)
+    await news_gd.run_news_search()
+    await news_gd.run_news_search()
+    assert searched == ["dork a", "dork b"]
+    assert news_gd.get_search_scheduler().summary()["cache_hits"] == 2
@@ -0,0 +1,134 @@
+"""
+@file test_search_scheduler.py
+@author naflashDev
+@brief Unit tests for search_scheduler.py
+@details Tests the token bucket, the result cache, the queue of pending searches, the overlap of searches with result processing and the process-wide scheduler (local backends, no real Google search).
+"""
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+from src.app.services.scraping import search_scheduler
+
+
+class FakeClock:
+    '''
+    @brief Manually advanced monotonic clock.
+    '''
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_reservations_are_fifo_and_refill():
+    '''
+    @brief Should serve the burst at once, queue later reservations one interval apart and refill over time.
+    '''
+    clock = FakeClock()
+    bucket = search_scheduler.TokenBucket(rate_per_minute=6, burst=2, clock=clock)
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 10.0, 20.0]
+    clock.now += 40
+    assert bucket.reserve() == 0.0
+    bucket.refund()
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 10.0]
+    with pytest.raises(ValueError):
+        search_scheduler.TokenBucket(rate_per_minute=0)
+
+
+@pytest.mark.asyncio
+async def test_search_uses_cache_until_ttl_and_does_not_cache_failures():
+    '''
+    @brief Should answer repeated queries from the cache within the TTL and retry failed searches.
+    '''
+    clock = FakeClock()
+    calls = []
+
+    async def backend(query, num_results):
+        calls.append(query)
+        if query == "fail":
+            raise RuntimeError("blocked")
+        return [f"http://{query}.com/{i}" for i in range(num_results)]
+
+    scheduler = search_scheduler.SearchScheduler(backend, rate_per_minute=6000, burst=10, cache_ttl=60, clock=clock)
+    first = await scheduler.search("q", 2)
+    first.append("mutated")
+    assert await scheduler.search("q", 2) == ["http://q.com/0", "http://q.com/1"]
+    assert await scheduler.search("q", 3) == ["http://q.com/0", "http://q.com/1", "http://q.com/2"]
+    clock.now += 61
+    await scheduler.search("q", 2)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await scheduler.search("fail", 2)
+    assert calls == ["q", "q", "q", "fail", "fail"]
+    assert scheduler.summary() == {"searches": 5, "cache_hits": 1, "errors": 2, "waited": 0.0}
+
+
+@pytest.mark.asyncio
+async def test_iter_searches_overlaps_next_search_with_processing():
+    '''
+    @brief Should search the next query while the caller is still processing the previous results, in query order.
+    '''
+    started = []
+
+    async def backend(query, num_results):
+        started.append(query)
+        return [query]
+
+    scheduler = search_scheduler.SearchScheduler(backend, rate_per_minute=600, burst=1, jitter=0)
+    seen = []
+    async for query, results in scheduler.iter_searches(["a", "b", "c"], 5):
+        seen.append((query, results))
+        if query == "a":
+            # Processing the first results takes longer than one token interval (0.1 s)
+            await asyncio.sleep(0.25)
+            assert started[:2] == ["a", "b"]
+    assert seen == [("a", ["a"]), ("b", ["b"]), ("c", ["c"])]
+    assert scheduler.summary()["waited"] > 0
+
+
+@pytest.mark.asyncio
+async def test_iter_searches_yields_errors_and_closing_cancels_queued_searches():
+    '''
+    @brief Should yield a failed search as its exception, and cancel the queued ones when closed early.
+    '''
+    started = []
+
+    async def backend(query, num_results):
+        started.append(query)
+        if query == "bad":
+            raise RuntimeError("boom")
+        return [query]
+
+    scheduler = search_scheduler.SearchScheduler(backend, rate_per_minute=60, burst=2, jitter=0)
+    results = []
+    async with aclosing(scheduler.iter_searches(["bad", "ok", "late1", "late2"], 5)) as searches:
+        async for query, value in searches:
+            results.append((query, value))
+            if query == "ok":
+                assert scheduler.pending() == ["late1", "late2"]
+                break
+    assert isinstance(results[0][1], RuntimeError)
+    assert results[1] == ("ok", ["ok"])
+    assert started == ["bad", "ok"]
+    assert scheduler.pending() == []
+    # The cancelled reservations were given back
+    assert scheduler.bucket.reserve() < 2.0
+
+
+def test_get_search_scheduler_is_shared_and_reads_environment(monkeypatch):
+    '''
+    @brief Should build one scheduler per process from the SEARCH_* variables, falling back to defaults.
+    '''
+    monkeypatch.setenv("SEARCH_RATE_PER_MINUTE", "3")
+    monkeypatch.setenv("SEARCH_BURST", "4")
+    monkeypatch.setenv("SEARCH_CACHE_TTL", "not-a-number")
+    scheduler = search_scheduler.get_search_scheduler()
+    assert search_scheduler.get_search_scheduler() is scheduler
+    assert scheduler.bucket.interval == 20.0
+    assert scheduler.bucket.burst == 4
+    assert scheduler.cache_ttl == search_scheduler.SEARCH_CACHE_TTL
+    search_scheduler.reset_search_scheduler()
+    assert search_scheduler.get_search_scheduler() is not scheduler
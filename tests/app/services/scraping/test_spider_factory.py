@@ -2,41 +2,23 @@
 @file test_spider_factory.py
 @author naflashDev
 @brief Unit tests for spider_factory.py
-@details Tests for dynamic spider creation, JSON writing, and spider runner logic (mocks, no real Scrapy run).
+@details Tests for dynamic spider creation, result store writes, and spider runner logic (mocks, no real Scrapy run).
 """
+import threading
+
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
+from scrapy.http import HtmlResponse
 from src.app.services.scraping import spider_factory
 
 
-def test_write_json_array_with_lock_creates_file(tmp_path):
+def _html_page(url, text):
     '''
-    @brief Should create a new JSON file with array.
+    @brief Build an HTML response whose title and h1-h6/p elements contain `text`.
     '''
-    data = {"foo": "bar"}
-    file = tmp_path / "out.json"
-    lock = tmp_path / "lock.lck"
-    spider_factory.write_json_array_with_lock(data, str(file), str(lock))
-    content = file.read_text(encoding="utf-8")
-    assert content.startswith("[") and content.endswith("]")
-    assert "foo" in content
-
-
-def test_write_json_array_with_lock_appends(tmp_path):
-    '''
-    @brief Should append to existing JSON array.
-    '''
-    data1 = {"a": 1}
-    data2 = {"b": 2}
-    file = tmp_path / "out.json"
-    lock = tmp_path / "lock.lck"
-    # First write
-    spider_factory.write_json_array_with_lock(data1, str(file), str(lock))
-    # Second write
-    spider_factory.write_json_array_with_lock(data2, str(file), str(lock))
-    content = file.read_text(encoding="utf-8")
-    assert content.count("{") == 2
-    assert content.count("]") == 1
+    tags = "".join(f"<{tag}>{text}</{tag}>" for tag in spider_factory.TEXT_TAGS)
+    body = f"<html><head><title>{text}</title></head><body>{tags}</body></html>"
+    return HtmlResponse(url=url, body=body.encode("utf-8"), encoding="utf-8")
 
 
 def test_create_dynamic_spider_yields_data():
@@ -47,18 +29,14 @@ def test_create_dynamic_spider_yields_data():
     params = ("localhost", 9200)
     # Patch Scrapy response and dependencies
     with patch("src.app.services.scraping.spider_factory.store_in_opensearh_db", create=True), \
-         patch("src.app.services.scraping.spider_factory.write_json_array_with_lock"), \
+         patch("src.app.services.scraping.spider_factory.get_result_store"), \
+         patch("src.app.services.scraping.spider_factory.get_bulk_indexer"), \
          patch("src.app.services.scraping.spider_factory.logger"):
         SpiderClass = spider_factory.create_dynamic_spider(urls, params)
         spider = SpiderClass()
-        # Fake response with cybersecurity keyword
-        class FakeResponse:
-            url = "http://test.com"
-            def css(self, sel):
-                if sel == "title::text":
-                    return AsyncMock(get=lambda default=None: "Ciberseguridad")
-                return AsyncMock(getall=lambda: ["Ciberseguridad"])
-        results = list(spider.parse(FakeResponse()))
+        # Response with cybersecurity keyword
+        response = _html_page("http://test.com", "Ciberseguridad")
+        results = list(spider.parse(response))
         assert any("url" in r for r in results)
 
 
@@ -73,22 +51,76 @@ def test_create_dynamic_spider_discards_irrelevant():
     urls = ["http://irrelevante.com"]
     params = ("localhost", 9200)
     with patch("src.app.services.scraping.spider_factory.store_in_opensearh_db", create=True), \
-         patch("src.app.services.scraping.spider_factory.write_json_array_with_lock"), \
+         patch("src.app.services.scraping.spider_factory.get_result_store"), \
+         patch("src.app.services.scraping.spider_factory.get_bulk_indexer"), \
          patch("src.app.services.scraping.spider_factory.logger"):
         SpiderClass = spider_factory.create_dynamic_spider(urls, params)
         spider = SpiderClass()
-        class FakeResponse:
-            url = "http://irrelevante.com"
-            def css(self, sel):
-                if sel == "title::text":
-                    return AsyncMock(get=lambda default=None: "Sin relación")
-                return AsyncMock(getall=lambda: ["Sin relación"])
-        results = list(spider.parse(FakeResponse()))
+        response = _html_page("http://irrelevante.com", "Sin relación")
+        results = list(spider.parse(response))
         # Solo se debe yield una vez (por la última línea del parse)
         assert len(results) == 1
         assert "url" in results[0]
 
 
+def test_create_dynamic_spider_skips_stored_url():
+    '''
+    @brief Should not index again a URL the result store already holds.
+    '''
+    urls = ["http://test.com"]
+    params = ("localhost", 9200)
+    store = MagicMock()
+    store.append.return_value = False
+    with patch("src.app.services.scraping.spider_factory.get_bulk_indexer") as mock_indexer, \
+         patch("src.app.services.scraping.spider_factory.get_result_store", return_value=store), \
+         patch("src.app.services.scraping.spider_factory.logger"):
+        SpiderClass = spider_factory.create_dynamic_spider(urls, params)
+        spider = SpiderClass()
+        response = _html_page("http://test.com", "Malware")
+        list(spider.parse(response))
+        assert store.append.called
+        assert not mock_indexer.return_value.add.called
+
+
+def test_create_dynamic_spider_bulk_indexes_and_flushes_on_close():
+    '''
+    @brief Should queue new articles in the shared bulk indexer and flush it when the spider closes.
+    '''
+    params = ("localhost", 9200)
+    with patch("src.app.services.scraping.spider_factory.get_bulk_indexer") as mock_indexer, \
+         patch("src.app.services.scraping.spider_factory.get_result_store"), \
+         patch("src.app.services.scraping.spider_factory.logger"):
+        SpiderClass = spider_factory.create_dynamic_spider(["http://test.com"], params)
+        spider = SpiderClass()
+        response = _html_page("http://test.com", "Malware")
+        list(spider.parse(response))
+        spider.closed("finished")
+        mock_indexer.assert_called_with("localhost", 9200, "scrapy_documents")
+        assert mock_indexer.return_value.add.call_count == 1
+        assert mock_indexer.return_value.flush.called
+
+
+
+def test_extract_tag_texts_matches_css_selectors():
+    '''
+    @brief Single-pass extraction should equal one `::text` selector per tag.
+    '''
+    body = (
+        "<html><head><title>T</title></head><body>"
+        "<H1> Uno <b>negrita</b> dos </H1><h2>\n</h2><p>a<!-- c -->b<span>x</span> c </p>"
+        "<div><p>  </p><p>Malware <a href='#'>link</a> tail<br>fin</p></div><h3>h3</h3><h6>seis</h6>"
+        "</body></html>"
+    )
+    response = HtmlResponse(url="http://test.com", body=body.encode("utf-8"), encoding="utf-8")
+    buckets, full_text = spider_factory.extract_tag_texts(response.selector.root, "Título")
+    expected = {}
+    for tag in spider_factory.TEXT_TAGS:
+        expected[tag] = [t.strip() for t in response.css(f"{tag}::text").getall() if t.strip()]
+    assert buckets == expected
+    assert list(buckets) == list(spider_factory.TEXT_TAGS)
+    assert full_text == "título uno dos h3 seis a b c malware tail fin"
+
+
 # --- run_dynamic_spider ---
 @patch("src.app.services.scraping.spider_factory.CrawlerProcess")
 def test_run_dynamic_spider_runs(mock_crawler):
@@ -99,46 +131,6 @@ def test_run_dynamic_spider_runs(mock_crawler):
 
 
 # --- Cobertura de errores y ramas adicionales ---
-import tempfile
-import os
-
-def test_write_json_array_with_lock_lockfile_wait(monkeypatch):
-    '''
-    @brief Debe esperar si el lockfile existe y luego escribir correctamente.
-    '''
-    data = {"foo": "bar"}
-    with tempfile.TemporaryDirectory() as tmpdir:
-        file = os.path.join(tmpdir, "out.json")
-        lock = os.path.join(tmpdir, "lock.lck")
-        # Crear lockfile antes de llamar
-        with open(lock, "w") as f:
-            f.write("locked")
-        # Lanzar en segundo plano la eliminación del lockfile
-        import threading, time
-        def remove_lock():
-            time.sleep(0.2)
-            os.remove(lock)
-        t = threading.Thread(target=remove_lock)
-        t.start()
-        spider_factory.write_json_array_with_lock(data, file, lock)
-        t.join()
-        content = open(file, encoding="utf-8").read()
-        assert "foo" in content
-
-def test_write_json_array_with_lock_malformed_file(tmp_path):
-    '''
-    @brief Debe manejar archivo malformado y seguir escribiendo.
-    '''
-    file = tmp_path / "out.json"
-    lock = tmp_path / "lock.lck"
-    # Crear archivo malformado
-    file.write_text("MALFORMED", encoding="utf-8")
-    data = {"x": 1}
-    # No debe lanzar excepción
-    spider_factory.write_json_array_with_lock(data, str(file), str(lock))
-    content = file.read_text(encoding="utf-8")
-    assert "x" in content
-
 import types
 import pytest
 
@@ -190,17 +182,13 @@ def test_create_dynamic_spider_configuracion_keywords():
     urls = ["http://test.com"]
     params = ("localhost", 9200)
     with patch("src.app.services.scraping.spider_factory.store_in_opensearch", create=True), \
-         patch("src.app.services.scraping.spider_factory.write_json_array_with_lock"), \
+         patch("src.app.services.scraping.spider_factory.get_result_store"), \
+         patch("src.app.services.scraping.spider_factory.get_bulk_indexer"), \
          patch("src.app.services.scraping.spider_factory.logger") as mock_logger:
         SpiderClass = spider_factory.create_dynamic_spider(urls, params)
         spider = SpiderClass()
-        class FakeResponse:
-            url = "http://test.com"
-            def css(self, sel):
-                if sel == "title::text":
-                    return MagicMock(get=lambda default=None: "Malware")
-                return MagicMock(getall=lambda: ["Malware"])
-        results = list(spider.parse(FakeResponse()))
+        response = _html_page("http://test.com", "Malware")
+        results = list(spider.parse(response))
         assert any("url" in r for r in results)
         assert mock_logger.info.called
 
@@ -211,17 +199,13 @@ def test_create_dynamic_spider_configuracion_no_keywords():
     urls = ["http://test.com"]
     params = ("localhost", 9200)
     with patch("src.app.services.scraping.spider_factory.store_in_opensearch", create=True), \
-         patch("src.app.services.scraping.spider_factory.write_json_array_with_lock"), \
+         patch("src.app.services.scraping.spider_factory.get_result_store"), \
+         patch("src.app.services.scraping.spider_factory.get_bulk_indexer"), \
          patch("src.app.services.scraping.spider_factory.logger") as mock_logger:
         SpiderClass = spider_factory.create_dynamic_spider(urls, params)
         spider = SpiderClass()
-        class FakeResponse:
-            url = "http://test.com"
-            def css(self, sel):
-                if sel == "title::text":
-                    return MagicMock(get=lambda default=None: "Sin relación")
-                return MagicMock(getall=lambda: ["Sin relación"])
-        results = list(spider.parse(FakeResponse()))
+        response = _html_page("http://test.com", "Sin relación")
+        results = list(spider.parse(response))
         assert any("url" in r for r in results)
         assert mock_logger.info.called
 
@@ -229,15 +213,21 @@ def test_create_dynamic_spider_configuracion_no_keywords():
 import asyncio
 @pytest.mark.asyncio
 
-@patch("asyncpg.create_pool")
-@patch("src.app.services.scraping.spider_factory.get_entry_links", new_callable=AsyncMock)
-@patch("src.app.services.scraping.spider_factory.run_dynamic_spider")
-@patch("src.app.services.scraping.spider_factory.Process")
-async def test_run_dynamic_spider_from_db_runs(mock_process, mock_run, mock_get_entry_links, mock_pool):
+def _batches(*pages):
     '''
-    @brief Test run_dynamic_spider_from_db avoiding multiprocessing pickling issues.
+    @brief Build a fake `iter_unread_entry_batches` yielding the given pages and recording its calls.
     '''
-    # Create a mock connection object
+    calls = []
+
+    async def fake(pool, owner_uid=None, batch_size=500, after_id=0, with_content=False):
+        calls.append((owner_uid, batch_size) + ((True,) if with_content else ()))
+        for page in pages:
+            yield page
+    fake.calls = calls
+    return fake
+
+
+def _mock_pool():
     mock_conn = AsyncMock()
     # Create a mock pool with acquire() supporting async context manager
     mock_acquire_cm = AsyncMock()
@@ -245,16 +235,294 @@ async def test_run_dynamic_spider_from_db_runs(mock_process, mock_run, mock_get_
     mock_acquire_cm.__aexit__.return_value = None
     pool = MagicMock()
     pool.acquire.return_value = mock_acquire_cm
-    # Set AsyncMock return value for get_entry_links
-    mock_get_entry_links.return_value = ["http://test.com"]
-    # Mock the process so it does not actually start
-    mock_proc_instance = MagicMock()
-    mock_process.return_value = mock_proc_instance
+    return pool, mock_conn
+
+
+@pytest.mark.asyncio
+@patch("asyncpg.create_pool")
+@patch("src.app.services.scraping.spider_factory.get_owner_uid", new_callable=AsyncMock, return_value=7)
+@patch("src.app.services.scraping.spider_factory.mark_entries_as_viewed", new_callable=AsyncMock)
+@patch("src.app.services.scraping.spider_factory.CrawlerService")
+async def test_run_dynamic_spider_from_db_runs(mock_service, mock_mark, mock_owner, mock_pool):
+    '''
+    @brief Test run_dynamic_spider_from_db crawls each keyset batch as it arrives, commits it and stops the service on exit.
+    '''
+    pool, mock_conn = _mock_pool()
+    pages = _batches([(1, "http://test.com"), (2, "http://test.com")], [(3, "http://other.com")])
+    # Mock the crawler service so no subprocess is started
+    service = mock_service.return_value
+    service.crawl.return_value = [{"url": "http://test.com"}]
+    registered = []
     # Usar tiempos mínimos y max_laps=1 para evitar bloqueos
-    await spider_factory.run_dynamic_spider_from_db(
-        pool,
-        total_sleep=0.01,
-        check_interval=0.01,
-        max_laps=1
+    with patch("src.app.services.scraping.spider_factory.iter_unread_entry_batches", pages):
+        await spider_factory.run_dynamic_spider_from_db(
+            pool,
+            register_process=registered.append,
+            total_sleep=0.01,
+            check_interval=0.01,
+            max_laps=1,
+            batch_size=2
+        )
+    assert pages.calls == [(7, 2)]
+    assert [c.args[:2] for c in service.crawl.call_args_list] == [
+        ("dynamic", ["http://test.com"]), ("dynamic", ["http://other.com"]),
+    ]
+    assert registered == [service]
+    assert service.stop.called
+    # One batched update per batch by entry id with the cached owner_uid
+    mock_owner.assert_awaited_with(mock_conn, pool=pool)
+    assert [c.args for c in mock_mark.await_args_list] == [(mock_conn, [1, 2], 7), (mock_conn, [3], 7)]
+
+
+@pytest.mark.asyncio
+@patch("src.app.services.scraping.spider_factory.get_owner_uid", new_callable=AsyncMock, return_value=7)
+@patch("src.app.services.scraping.spider_factory.mark_entries_as_viewed", new_callable=AsyncMock)
+@patch("src.app.services.scraping.spider_factory.CrawlerService")
+async def test_run_dynamic_spider_from_db_stop_keeps_batch_unread(mock_service, mock_mark, mock_owner):
+    '''
+    @brief A batch interrupted by the stop event must not be marked as viewed.
+    '''
+    pool, _ = _mock_pool()
+    stop_event = threading.Event()
+
+    def crawl(*args):
+        stop_event.set()
+        return []
+    mock_service.return_value.crawl.side_effect = crawl
+    pages = _batches([(1, "http://a.com")], [(2, "http://b.com")])
+    with patch("src.app.services.scraping.spider_factory.iter_unread_entry_batches", pages):
+        await spider_factory.run_dynamic_spider_from_db(
+            pool, stop_event=stop_event, total_sleep=0.01, check_interval=0.01, max_laps=1
+        )
+    assert mock_service.return_value.crawl.call_count == 1
+    assert not mock_mark.called
+
+
+# --- trigger mode (LISTEN/NOTIFY) ---
+class _ListenConn:
+    '''
+    @brief Minimal asyncpg connection double supporting LISTEN callbacks.
+    '''
+    def __init__(self):
+        self.listeners = {}
+        self.closed = False
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    async def remove_listener(self, channel, callback):
+        self.listeners.pop(channel, None)
+
+    def add_termination_listener(self, callback):
+        self.on_terminate = callback
+
+    def remove_termination_listener(self, callback):
+        pass
+
+    def is_closed(self):
+        return self.closed
+
+    def notify(self, payload="1"):
+        self.listeners[spider_factory.NEW_ENTRY_CHANNEL](self, 1, spider_factory.NEW_ENTRY_CHANNEL, payload)
+
+
+def _listen_pool(conn):
+    pool = MagicMock()
+    pool.acquire = AsyncMock(return_value=conn)
+    pool.release = AsyncMock()
+    return pool
+
+
+@pytest.mark.asyncio
+async def test_listener_debounces_notifications():
+    '''
+    @brief Notifications arriving close together should end a single wait with their total.
+    '''
+    conn = _ListenConn()
+    pool = _listen_pool(conn)
+    listener = spider_factory.EntryNotificationListener(pool, debounce=0.05, max_delay=1.0)
+    assert await listener.start()
+    assert listener.active
+    assert await listener.wait(0.01) == 0
+
+    async def burst():
+        for payload in ("3", "2", "x"):
+            conn.notify(payload)
+            await asyncio.sleep(0.01)
+    task = asyncio.create_task(burst())
+    assert await listener.wait(1.0) == 6
+    await task
+    assert await listener.wait(0.01) == 0
+    await listener.close()
+    assert not listener.active
+    pool.release.assert_awaited_once_with(conn)
+
+
+@pytest.mark.asyncio
+async def test_listener_max_delay_and_termination():
+    '''
+    @brief A continuous stream should be cut at max_delay, and a lost connection deactivates the listener.
+    '''
+    conn = _ListenConn()
+    listener = spider_factory.EntryNotificationListener(_listen_pool(conn), debounce=0.05, max_delay=0.1)
+    await listener.start()
+
+    async def stream():
+        for _ in range(40):
+            conn.notify()
+            await asyncio.sleep(0.01)
+    task = asyncio.create_task(stream())
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    assert await listener.wait(1.0) >= 1
+    assert loop.time() - started < 0.3
+    task.cancel()
+    conn.on_terminate(conn)
+    assert not listener.active
+
+
+@pytest.mark.asyncio
+async def test_wait_for_next_run_wakes_on_notification():
+    '''
+    @brief The fallback wait should end early on a notification and respect the stop event.
+    '''
+    conn = _ListenConn()
+    listener = spider_factory.EntryNotificationListener(_listen_pool(conn), debounce=0.01)
+    await listener.start()
+    loop = asyncio.get_running_loop()
+    loop.call_later(0.05, conn.notify)
+    started = loop.time()
+    await spider_factory._wait_for_next_run(30, 0.02, None, listener)
+    assert loop.time() - started < 1
+    stop_event = threading.Event()
+    stop_event.set()
+    await spider_factory._wait_for_next_run(30, 0.02, stop_event, listener)
+
+
+@pytest.mark.asyncio
+@patch("src.app.services.scraping.spider_factory.install_new_entry_trigger", new_callable=AsyncMock)
+@patch("src.app.services.scraping.spider_factory.get_owner_uid", new_callable=AsyncMock, return_value=7)
+async def test_run_dynamic_spider_from_db_trigger_mode(mock_owner, mock_install, monkeypatch):
+    '''
+    @brief Trigger mode should install the trigger, listen, and close the listener on exit.
+    '''
+    pool, _ = _mock_pool()
+    started = []
+
+    async def fake_start(self):
+        started.append(self)
+        return True
+    closed = []
+
+    async def fake_close(self):
+        closed.append(self)
+    monkeypatch.setattr(spider_factory.EntryNotificationListener, "start", fake_start)
+    monkeypatch.setattr(spider_factory.EntryNotificationListener, "close", fake_close)
+    stop_event = threading.Event()
+
+    async def fake_wait(total_sleep, check_interval, stop_event_arg, listener):
+        assert listener is started[0]
+        stop_event.set()
+    monkeypatch.setattr(spider_factory, "_wait_for_next_run", fake_wait)
+    monkeypatch.setenv("DYNAMIC_SPIDER_TRIGGER_MODE", "true")
+    with patch("src.app.services.scraping.spider_factory.iter_unread_entry_batches", _batches()):
+        await spider_factory.run_dynamic_spider_from_db(pool, stop_event=stop_event, total_sleep=0.01, check_interval=0.01)
+    mock_install.assert_awaited()
+    assert closed == started and len(started) == 1
+
+
+# --- content-first ingestion ---
+LONG_TEXT = "Un nuevo ransomware cifra los servidores de varias empresas. " * 12
+
+
+def test_stored_entry_document_from_html_and_plain_text():
+    '''
+    @brief Should build the article dict from stored HTML or bare text, and reject empty or truncated content.
+    '''
+    data, full_text = spider_factory.stored_entry_document(
+        "http://a.com", " Título ", f"<h2>Alerta</h2><p>{LONG_TEXT}</p>"
+    )
+    assert data["url"] == "http://a.com" and data["title"] == "Título"
+    assert data["h2"] == ["Alerta"] and data["p"] == [LONG_TEXT.strip()]
+    assert list(data)[2:] == list(spider_factory.TEXT_TAGS)
+    assert full_text.startswith("título alerta un nuevo ransomware")
+
+    data, _ = spider_factory.stored_entry_document("http://b.com", None, LONG_TEXT + "<br>fin")
+    assert data["title"] == "Untitled" and data["p"][0].endswith("fin")
+
+    assert spider_factory.stored_entry_document("http://c.com", "T", "") is None
+    assert spider_factory.stored_entry_document("http://c.com", "T", "<p>Resumen corto</p>") is None
+    assert spider_factory.stored_entry_document("http://c.com", "T", f"<p>{LONG_TEXT} [...]</p>") is None
+
+
+def test_ingest_stored_entries_filters_and_returns_links_to_fetch():
+    '''
+    @brief Should store relevant stored entries, skip irrelevant ones and return the truncated ones for crawling.
+    '''
+    store = MagicMock()
+    store.append.return_value = True
+    entries = [
+        (1, "http://relevant.com", "T", f"<p>{LONG_TEXT}</p>"),
+        (2, "http://short.com", "T", "<p>Resumen</p>"),
+        (3, "http://other.com", "T", "<p>" + "Noticias del tiempo en la ciudad. " * 30 + "</p>"),
+        (4, "http://empty.com", "T", None),
+    ]
+    with patch("src.app.services.scraping.spider_factory.get_bulk_indexer") as mock_indexer, \
+         patch("src.app.services.scraping.spider_factory.get_result_store", return_value=store), \
+         patch("src.app.services.scraping.spider_factory.logger"):
+        to_fetch, processed = spider_factory.ingest_stored_entries(entries, ("localhost", 9200))
+    assert to_fetch == ["http://short.com", "http://empty.com"]
+    assert processed == 2
+    assert [c.args[0]["url"] for c in store.append.call_args_list] == ["http://relevant.com"]
+    assert mock_indexer.return_value.add.call_count == 1
+    assert mock_indexer.return_value.flush.called
+
+
+@pytest.mark.asyncio
+@patch("src.app.services.scraping.spider_factory.get_owner_uid", new_callable=AsyncMock, return_value=7)
+@patch("src.app.services.scraping.spider_factory.mark_entries_as_viewed", new_callable=AsyncMock)
+@patch("src.app.services.scraping.spider_factory.CrawlerService")
+async def test_run_dynamic_spider_from_db_content_first(mock_service, mock_mark, mock_owner):
+    '''
+    @brief Content-first mode should only crawl entries without usable stored content and mark the whole batch.
+    '''
+    pool, conn = _mock_pool()
+    entries = [(1, "http://stored.com", "T", "<p>x</p>"), (2, "http://fetch.com", "T", None)]
+    pages = _batches(entries)
+    with patch("src.app.services.scraping.spider_factory.iter_unread_entry_batches", pages), \
+         patch("src.app.services.scraping.spider_factory.ingest_stored_entries",
+               return_value=(["http://fetch.com"], 1)) as mock_ingest:
+        await spider_factory.run_dynamic_spider_from_db(
+            pool, total_sleep=0.01, check_interval=0.01, max_laps=1, content_first=True
+        )
+    assert mock_ingest.call_args.args[0] == entries
+    assert mock_service.return_value.crawl.call_args.args[:2] == ("dynamic", ["http://fetch.com"])
+    mock_mark.assert_awaited_once_with(conn, [1, 2], 7)
+
+
+@pytest.mark.asyncio
+@patch("src.app.services.scraping.spider_factory.get_owner_uid", new_callable=AsyncMock, return_value=7)
+@patch("src.app.services.scraping.spider_factory.mark_entries_as_viewed", new_callable=AsyncMock)
+@patch("src.app.services.scraping.spider_factory.CrawlerService")
+async def test_run_dynamic_spider_from_db_skips_crawled_urls(mock_service, mock_mark, mock_owner):
+    '''
+    @brief URLs already in the persistent URL filter are not crawled again but their entries are still marked.
+    '''
+    spider_factory.get_url_filter().add("https://seen.com/a")
+    pool, conn = _mock_pool()
+    pages = _batches(
+        [(1, "https://www.seen.com/a?utm_source=feed"), (2, "https://new.com/b")],
+        [(3, "https://new.com/b#comments")],
     )
-    assert mock_run.called or mock_process.called
+    mock_service.return_value.crawl.return_value = []
+    with patch("src.app.services.scraping.spider_factory.iter_unread_entry_batches", pages):
+        await spider_factory.run_dynamic_spider_from_db(pool, total_sleep=0.01, check_interval=0.01, max_laps=1)
+    assert [c.args[:2] for c in mock_service.return_value.crawl.call_args_list] == [("dynamic", ["https://new.com/b"])]
+    assert [c.args for c in mock_mark.await_args_list] == [(conn, [1, 2], 7), (conn, [3], 7)]
+    assert "https://new.com/b" in spider_factory.get_url_filter()
+    # Processed URLs are recorded as crawled in the article queue of the URL frontier
+    conn = spider_factory.open_frontier()
+    assert conn.execute("SELECT original FROM urls WHERE queue = 'article' AND last_crawled IS NOT NULL").fetchall() == [
+        ("https://new.com/b",),
+    ]
+    conn.close()
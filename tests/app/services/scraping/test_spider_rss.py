@@ -43,5 +43,10 @@ def test_create_rss_spider_yields_rss():
             return [Link()]
         def urljoin(self, href):
             return "http://test.com/rss.xml"
-    list(spider.parse(FakeResponse()))
+    items = list(spider.parse(FakeResponse()))
     assert "http://test.com/rss.xml" in results
+    assert items[-1] == {
+        "probe_url": "http://test.com",
+        "feeds": ["http://test.com/rss.xml"],
+        "fingerprint": spider_rss.feed_links_fingerprint(["http://test.com/rss.xml"]),
+    }
@@ -51,6 +51,48 @@ def test_tag_text_returns_entities_and_lang():
         assert any(e[0] == "Madrid" for e in entities)
 
 
+# --- tag_texts ---
+class _FakeEnt:
+    def __init__(self, text, label):
+        self.text, self.label_ = text, label
+
+class _FakeNLP:
+    pipe_names = ["tok2vec", "tagger", "parser", "ner"]
+    def __init__(self):
+        self.pipe_calls = []
+        self.disabled = []
+    def select_pipes(self, disable):
+        self.disabled.append(disable)
+        return MagicMock()
+    def pipe(self, texts, batch_size, n_process):
+        texts = list(texts)
+        self.pipe_calls.append((texts, batch_size, n_process))
+        for t in texts:
+            yield MagicMock(ents=[_FakeEnt(t.split()[0], "LOC")])
+
+def test_tag_texts_groups_by_language_and_keeps_order():
+    nlp_es, nlp_en = _FakeNLP(), _FakeNLP()
+    langs = {"Madrid es bonita": "es", "London is big": "en", "Sevilla es antigua": "es", "": "es"}
+    with patch("src.app.services.spacy.text_processor.detect_language", side_effect=lambda t: langs[t]), \
+         patch("src.app.services.spacy.text_processor._get_model", side_effect=lambda l: {"es": nlp_es, "en": nlp_en}[l]):
+        result = text_processor.tag_texts(list(langs), batch_size=8, n_process=1)
+    assert result == [
+        ([("Madrid", "LOC")], "es"),
+        ([("London", "LOC")], "en"),
+        ([("Sevilla", "LOC")], "es"),
+        ([], "es"),
+    ]
+    # One pipe call per language with every text of that language
+    assert nlp_es.pipe_calls == [(["Madrid es bonita", "Sevilla es antigua"], 8, 1)]
+    assert len(nlp_en.pipe_calls) == 1
+    # Only the NER components stay enabled
+    assert nlp_es.disabled == [["tagger", "parser"]]
+
+@patch("src.app.services.spacy.text_processor._get_model", return_value=None)
+def test_tag_texts_no_model(mock_get):
+    with patch("src.app.services.spacy.text_processor.detect_language", return_value="fr"):
+        assert text_processor.tag_texts(["Bonjour"]) == [([], "fr")]
+
 # --- _get_model ---
 @patch("src.app.services.spacy.text_processor.spacy.load")
 def test_get_model_success(mock_load):
@@ -81,32 +123,181 @@ def test_tag_text_no_model(mock_get):
 # --- process_json ---
 @patch("src.app.services.spacy.text_processor.get_connection_parameters", return_value=(0, "ok", ("localhost", 9200)))
 @patch("src.app.services.spacy.text_processor.ensure_index_exists")
-@patch("src.app.services.spacy.text_processor.store_in_opensearch")
-@patch("src.app.services.spacy.text_processor.text_exists_in_opensearch", return_value=False)
+@patch("src.app.services.spacy.text_processor.get_bulk_indexer")
+@patch("src.app.services.spacy.text_processor.existing_ids_in_opensearch", return_value=set())
 def test_process_json_basic(mock_exists, mock_store, mock_ensure, mock_conn, tmp_path):
     data = [{"title": "Madrid", "h1": ["España"]}]
     in_file = tmp_path / "in.json"
     out_file = tmp_path / "out.json"
     in_file.write_text(json.dumps(data), encoding="utf-8")
-    with patch("src.app.services.spacy.text_processor.tag_text", return_value=([("Madrid", "LOC")], "es")):
+    with patch("src.app.services.spacy.text_processor.tag_texts", side_effect=lambda texts, **kw: [([("Madrid", "LOC")], "es")] * len(texts)):
         text_processor.process_json(str(in_file), str(out_file))
     assert out_file.exists()
     result = json.loads(out_file.read_text(encoding="utf-8"))
     assert any("Madrid" in r["text"] for r in result)
     assert any(r["language"] == "es" for r in result)
+    # Documents go through the bulk indexer, which is flushed at the end of the run
+    assert mock_store.return_value.add.call_count == len(result)
+    assert mock_store.return_value.flush.called
 
 @patch("src.app.services.spacy.text_processor.get_connection_parameters", return_value=(1, "fail", ("localhost", 9200)))
 @patch("src.app.services.spacy.text_processor.create_config_file", return_value=(0, "created", ("localhost", 9200)))
 @patch("src.app.services.spacy.text_processor.ensure_index_exists")
-@patch("src.app.services.spacy.text_processor.store_in_opensearch")
-@patch("src.app.services.spacy.text_processor.text_exists_in_opensearch", return_value=False)
+@patch("src.app.services.spacy.text_processor.get_bulk_indexer")
+@patch("src.app.services.spacy.text_processor.existing_ids_in_opensearch", return_value=set())
 def test_process_json_creates_config(mock_exists, mock_store, mock_ensure, mock_create, mock_conn, tmp_path):
     data = [{"title": "Madrid"}]
     in_file = tmp_path / "in.json"
     out_file = tmp_path / "out.json"
     in_file.write_text(json.dumps(data), encoding="utf-8")
-    with patch("src.app.services.spacy.text_processor.tag_text", return_value=([("Madrid", "LOC")], "es")):
+    with patch("src.app.services.spacy.text_processor.tag_texts", side_effect=lambda texts, **kw: [([("Madrid", "LOC")], "es")] * len(texts)):
         text_processor.process_json(str(in_file), str(out_file))
     assert out_file.exists()
     result = json.loads(out_file.read_text(encoding="utf-8"))
     assert any("Madrid" in r["text"] for r in result)
+
+
+@patch("src.app.services.spacy.text_processor.get_connection_parameters", return_value=(0, "ok", ("localhost", 9200)))
+@patch("src.app.services.spacy.text_processor.ensure_index_exists")
+@patch("src.app.services.spacy.text_processor.get_bulk_indexer")
+def test_process_json_skips_indexed_texts_with_batched_check(mock_indexer, mock_ensure, mock_conn, tmp_path):
+    data = [{"title": "Madrid", "h1": ["España", "Madrid"]}, {"p": ["Berlin"]}]
+    in_file = tmp_path / "in.json"
+    out_file = tmp_path / "out.json"
+    in_file.write_text(json.dumps(data), encoding="utf-8")
+    existing = {text_processor.content_hash_id("España")}
+    with patch("src.app.services.spacy.text_processor.existing_ids_in_opensearch", return_value=existing) as mock_exists, \
+         patch("src.app.services.spacy.text_processor.tag_texts", side_effect=lambda texts, **kw: [([("X", "LOC")], "es")] * len(texts)) as mock_tag:
+        result = text_processor.process_json(str(in_file), str(out_file), batch_size=10)
+    # A single existence request for the whole batch of unique texts
+    assert mock_exists.call_count == 1
+    assert len(mock_exists.call_args.args[0]) == 3
+    # The texts are passed along to match documents indexed before the content-hash _id
+    texts = mock_exists.call_args.kwargs["texts"]
+    assert sorted(texts.values()) == ["Berlin", "España", "Madrid"]
+    assert all(text_processor.content_hash_id(text) == doc_id for doc_id, text in texts.items())
+    assert sorted(r["text"] for r in result) == ["Berlin", "Madrid"]
+    # Only the new texts are tagged, in a single batched call
+    assert mock_tag.call_count == 1
+    assert sorted(mock_tag.call_args.args[0]) == ["Berlin", "Madrid"]
+    ids = sorted(c.kwargs["doc_id"] for c in mock_indexer.return_value.add.call_args_list)
+    assert ids == sorted(text_processor.content_hash_id(t) for t in ["Berlin", "Madrid"])
+
+@patch("src.app.services.spacy.text_processor.get_connection_parameters", return_value=(0, "ok", ("localhost", 9200)))
+@patch("src.app.services.spacy.text_processor.ensure_index_exists")
+@patch("src.app.services.spacy.text_processor.get_bulk_indexer")
+def test_process_json_upsert_skips_precheck(mock_indexer, mock_ensure, mock_conn, tmp_path):
+    in_file = tmp_path / "in.json"
+    out_file = tmp_path / "out.json"
+    in_file.write_text(json.dumps([{"title": "Madrid", "p": ["Madrid", "Roma"]}]), encoding="utf-8")
+    with patch("src.app.services.spacy.text_processor.existing_ids_in_opensearch") as mock_exists, \
+         patch("src.app.services.spacy.text_processor.tag_texts", side_effect=lambda texts, **kw: [([], "es")] * len(texts)):
+        result = text_processor.process_json(str(in_file), str(out_file), upsert=True)
+    assert not mock_exists.called
+    assert len(result) == 2
+    assert mock_indexer.return_value.add.call_count == 2
+
+# --- process_json incremental ---
+@patch("src.app.services.spacy.text_processor.get_connection_parameters", return_value=(0, "ok", ("localhost", 9200)))
+@patch("src.app.services.spacy.text_processor.ensure_index_exists")
+@patch("src.app.services.spacy.text_processor.get_bulk_indexer")
+@patch("src.app.services.spacy.text_processor.existing_ids_in_opensearch", return_value=set())
+def test_process_json_incremental_only_tags_new_records(mock_exists, mock_indexer, mock_ensure, mock_conn, tmp_path):
+    from src.app.models import result_store
+    store_dir = str(tmp_path / "results")
+    out_file = tmp_path / "labels.json"
+    store = result_store.ResultStore(store_dir)
+    store.append({"url": "a", "title": "Madrid"})
+    fake_tag = lambda texts, **kw: [([("X", "LOC")] * len(t), "es") for t in texts]
+    with patch("src.app.services.spacy.text_processor.get_result_store", return_value=store), \
+         patch("src.app.services.spacy.text_processor.tag_texts", side_effect=fake_tag) as mock_tag:
+        text_processor.process_json(store_dir, str(out_file), incremental=True)
+        assert (tmp_path / "labels.watermark.json").exists()
+        # Nothing new: no tagging, output untouched
+        assert text_processor.process_json(store_dir, str(out_file), incremental=True) == []
+        assert mock_tag.call_count == 1
+        store.append({"url": "b", "title": "Berlin", "p": ["Roma"]})
+        new = text_processor.process_json(store_dir, str(out_file), incremental=True)
+    assert sorted(r["text"] for r in new) == ["Berlin", "Roma"]
+    assert mock_tag.call_args.args[0] == ["Berlin", "Roma"]
+    labels = json.loads(out_file.read_text(encoding="utf-8"))
+    assert [r["text"] for r in labels] == ["Madrid", "Berlin", "Roma"]
+
+@patch("src.app.services.spacy.text_processor.get_connection_parameters", return_value=(0, "ok", ("localhost", 9200)))
+@patch("src.app.services.spacy.text_processor.ensure_index_exists")
+@patch("src.app.services.spacy.text_processor.get_bulk_indexer")
+@patch("src.app.services.spacy.text_processor.existing_ids_in_opensearch", return_value=set())
+def test_process_json_incremental_rebuilds_without_output(mock_exists, mock_indexer, mock_ensure, mock_conn, tmp_path):
+    from src.app.models import result_store
+    store_dir = str(tmp_path / "results")
+    out_file = tmp_path / "labels.json"
+    store = result_store.ResultStore(store_dir)
+    store.append({"url": "a", "title": "Madrid"})
+    fake_tag = lambda texts, **kw: [([], "es") for _ in texts]
+    with patch("src.app.services.spacy.text_processor.get_result_store", return_value=store), \
+         patch("src.app.services.spacy.text_processor.tag_texts", side_effect=fake_tag):
+        text_processor.process_json(store_dir, str(out_file), incremental=True)
+        out_file.unlink()
+        # Output lost: the watermark is ignored and everything is labeled again
+        result = text_processor.process_json(store_dir, str(out_file), incremental=True)
+    assert [r["text"] for r in result] == ["Madrid"]
+    assert json.loads(out_file.read_text(encoding="utf-8"))[0]["text"] == "Madrid"
+
+def test_append_json_array(tmp_path):
+    path = tmp_path / "a.json"
+    path.write_text("[]", encoding="utf-8")
+    text_processor._append_json_array(str(path), [{"a": 1}])
+    text_processor._append_json_array(str(path), [{"b": 2}, {"c": 3}])
+    assert json.loads(path.read_text(encoding="utf-8")) == [{"a": 1}, {"b": 2}, {"c": 3}]
+    path.write_text("garbage", encoding="utf-8")
+    text_processor._append_json_array(str(path), [{"d": 4}])
+    assert json.loads(path.read_text(encoding="utf-8")) == [{"d": 4}]
+
+
+@patch("src.app.services.spacy.text_processor.get_connection_parameters", return_value=(0, "ok", ("localhost", 9200)))
+@patch("src.app.services.spacy.text_processor.ensure_index_exists")
+@patch("src.app.services.spacy.text_processor.get_bulk_indexer")
+@patch("src.app.services.spacy.text_processor.existing_ids_in_opensearch", return_value=set())
+def test_process_json_skips_near_duplicate_articles(mock_exists, mock_indexer, mock_ensure, mock_conn, tmp_path):
+    story = " ".join(f"palabra{i}" for i in range(80))
+    data = [
+        {"url": "https://a.com/1", "title": "Original", "p": [story]},
+        {"url": "https://b.com/2", "title": "Copia", "p": [story + " fuente agencias"]},
+    ]
+    in_file = tmp_path / "in.json"
+    out_file = tmp_path / "out.json"
+    in_file.write_text(json.dumps(data), encoding="utf-8")
+    with patch("src.app.services.spacy.text_processor.tag_texts", side_effect=lambda texts, **kw: [([], "es")] * len(texts)):
+        result = text_processor.process_json(str(in_file), str(out_file))
+    assert sorted(r["text"] for r in result) == sorted(["Original", story])
+
+@patch("src.app.services.spacy.text_processor.get_connection_parameters", return_value=(0, "ok", ("localhost", 9200)))
+@patch("src.app.services.spacy.text_processor.ensure_index_exists")
+@patch("src.app.services.spacy.text_processor.existing_ids_in_opensearch", return_value=set())
+def test_process_json_incremental_keeps_watermark_when_indexing_fails(mock_exists, mock_ensure, mock_conn, tmp_path):
+    import sys
+    from src.app.models import result_store
+    opensearh_db = sys.modules[text_processor.content_hash_id.__module__]
+    store_dir = str(tmp_path / "results")
+    out_file = tmp_path / "labels.json"
+    watermark = tmp_path / "labels.watermark.json"
+    store = result_store.ResultStore(store_dir)
+    store.append({"url": "a", "title": "Madrid"})
+    indexer = opensearh_db.BulkIndexer("localhost", 9200, "spacy_documents", flush_interval=None)
+    client = MagicMock()
+    with patch("src.app.services.spacy.text_processor.get_result_store", return_value=store), \
+         patch("src.app.services.spacy.text_processor.get_bulk_indexer", return_value=indexer), \
+         patch.object(opensearh_db, "get_opensearch_client", return_value=client), \
+         patch("src.app.services.spacy.text_processor.tag_texts", side_effect=lambda texts, **kw: [([], "es")] * len(texts)):
+        text_processor.process_json(store_dir, str(out_file), incremental=True)
+        saved = watermark.read_text(encoding="utf-8")
+        store.append({"url": "b", "title": "Berlin"})
+        client.bulk.side_effect = Exception("OpenSearch down")
+        text_processor.process_json(store_dir, str(out_file), incremental=True)
+        # The failed run did not move the watermark: the next run indexes "Berlin" again
+        assert watermark.read_text(encoding="utf-8") == saved
+        client.bulk.side_effect = None
+        client.bulk.return_value = {"items": [{"index": {"status": 201}}]}
+        retried = text_processor.process_json(store_dir, str(out_file), incremental=True)
+    assert [r["text"] for r in retried] == ["Berlin"]
+    assert watermark.read_text(encoding="utf-8") != saved
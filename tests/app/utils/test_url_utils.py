@@ -0,0 +1,39 @@
+"""
+@file test_url_utils.py
+@author naflashDev
+@brief Unit tests for url_utils.py
+@details Tests the canonical form used to deduplicate URLs: tracking parameters, host/scheme normalization, fragments, ports and non-http values.
+"""
+from src.app.utils.url_utils import canonicalize_url
+
+
+def test_canonicalize_url_variants_share_one_key():
+    '''
+    @brief Should map tracking, www., case, port, fragment and query order variants to the same URL.
+    '''
+    expected = "https://example.com/news/article?a=1&b=2"
+    for url in (
+        "https://example.com/news/article?b=2&a=1",
+        "HTTPS://WWW.Example.com:443/news/article/?a=1&utm_source=rss&b=2&fbclid=x#comments",
+        " https://example.com./news/article?a=1&b=2&UTM_Campaign=feed ",
+    ):
+        assert canonicalize_url(url) == expected
+
+
+def test_canonicalize_url_keeps_meaningful_parts():
+    '''
+    @brief Should keep the scheme, non-default ports, path case and real parameters.
+    '''
+    assert canonicalize_url("http://example.com") == "http://example.com/"
+    assert canonicalize_url("https://example.com:8443/A/b?id=") == "https://example.com:8443/A/b?id="
+    assert canonicalize_url("http://user:pw@[::1]:8080/x") == "http://user:pw@[::1]:8080/x"
+
+
+def test_canonicalize_url_leaves_other_values():
+    '''
+    @brief Should return non-http values stripped and unchanged.
+    '''
+    assert canonicalize_url(" nothttp ") == "nothttp"
+    assert canonicalize_url("mailto:a@b.com") == "mailto:a@b.com"
+    assert canonicalize_url("http://bad:port/") == "http://bad:port/"
+    assert canonicalize_url(None) == ""
@@ -0,0 +1,112 @@
+"""
+@file bench_keyword_matcher.py
+@author naflashDev
+@brief Microbenchmark of the compiled keyword matcher against the former substring scans.
+@details Run from the repository root with `python tests/benchmarks/bench_keyword_matcher.py`.
+         Builds a reproducible corpus of synthetic articles whose lengths follow
+         typical news pages (title + headings + paragraphs, ~1-40 KB of text),
+         a fraction of them containing a cybersecurity keyword, and times the
+         spider check (`any(k in text.lower())`), the former `news_gd.is_relevant`
+         (one `lower()` per keyword) and `KeywordMatcher.search`/`count`.
+         `--extra-keywords` grows the keyword list to show how each approach scales.
+         Not collected by pytest (file name does not start with `test_`).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from app.services.scraping.keyword_matcher import KeywordMatcher
+from app.services.scraping.spider_factory import CYBERSECURITY_KEYWORDS
+
+FILLER = (
+    "el gobierno anunció nuevas medidas para la economía digital y las empresas del sector "
+    "the company reported quarterly results and announced a new cloud platform for customers "
+    "los analistas esperan que el mercado crezca durante el próximo año según el informe "
+    "officials said the update will be released next month across all supported regions"
+).split()
+
+# Article text lengths in characters (short briefs to long reports)
+SIZES = [1_500, 4_000, 6_000, 9_000, 15_000, 40_000]
+
+
+def build_corpus(articles: int, relevant_ratio: float, seed: int = 0):
+    '''
+    @brief Build a reproducible list of article texts.
+
+    @param articles Number of articles (int).
+    @param relevant_ratio Fraction of articles containing a keyword (float).
+    @param seed Random seed (int).
+    @return List of article texts (list[str]).
+    '''
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(articles):
+        size = SIZES[i % len(SIZES)]
+        words = []
+        length = 0
+        while length < size:
+            word = rng.choice(FILLER)
+            words.append(word)
+            length += len(word) + 1
+        if rng.random() < relevant_ratio:
+            # Put the keyword late in the text, where a first-match scan is slowest
+            words.insert(int(len(words) * 0.9), rng.choice(CYBERSECURITY_KEYWORDS))
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def timed(fn, corpus, repeat: int) -> float:
+    '''
+    @brief Best wall time of running `fn` over the corpus.
+
+    @return Seconds (float).
+    '''
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=600)
+    parser.add_argument("--relevant-ratio", type=float, default=0.3)
+    parser.add_argument("--extra-keywords", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    keywords = list(CYBERSECURITY_KEYWORDS) + [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(5, 12)))
+        for _ in range(args.extra_keywords)
+    ]
+    corpus = build_corpus(args.articles, args.relevant_ratio)
+    megabytes = sum(len(t) for t in corpus) / 1e6
+    matcher = KeywordMatcher(keywords)
+
+    def spider_check(text):
+        # Former DynamicSpider.parse check: lowercase once, one substring scan per keyword
+        lowered = text.lower()
+        return any(keyword in lowered for keyword in keywords)
+
+    candidates = {
+        "spider any(k in text.lower())": spider_check,
+        "news_gd lower() per keyword": lambda t: any(k.lower() in t.lower() for k in keywords),
+        "KeywordMatcher.search": matcher.search,
+        "KeywordMatcher.count": matcher.count,
+    }
+    print(f"Articles: {len(corpus)} ({megabytes:.1f} MB)  keywords: {len(keywords)}  relevant: {args.relevant_ratio:.0%}")
+    for name, fn in candidates.items():
+        seconds = timed(fn, corpus, args.repeat)
+        print(f"{name:32s}: {len(corpus) / seconds:10.1f} articles/sec  {megabytes / seconds:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
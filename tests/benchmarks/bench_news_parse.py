@@ -0,0 +1,167 @@
+"""
+@file bench_news_parse.py
+@author naflashDev
+@brief Benchmark of `news_gd` article parsing: BeautifulSoup on the event loop versus lxml in the parse pool.
+@details Run from the repository root with `python tests/benchmarks/bench_news_parse.py`.
+         Generates reproducible news-like pages of increasing size and reports,
+         per page, the parse time of the former extraction
+         (`BeautifulSoup(html, "html.parser")` plus seven `find_all`) and of
+         `parse_news_html` (lxml, single traversal). It then parses a burst of
+         pages while a ticker coroutine sleeps 5 ms in a loop, and reports the
+         worst and mean event-loop lag (ticker lateness) when the former
+         extraction runs on the loop and when `parse_news_html_async` runs in
+         the shared process pool. Both extractions must return the same dict.
+         Not collected by pytest (file name does not start with `test_`).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from bs4 import BeautifulSoup
+from loguru import logger
+from app.services.scraping import news_gd
+
+WORDS = (
+    "ransomware ataque vulnerabilidad the company reported that attackers exploited a flaw "
+    "en los sistemas industriales según el informe publicado por los investigadores malware"
+).split()
+
+TICK = 0.005
+
+
+def build_page(paragraphs: int, seed: int = 0) -> str:
+    '''
+    @brief Build a news-like HTML page with the given number of paragraphs.
+
+    @param paragraphs Number of article paragraphs (int).
+    @param seed Random seed (int).
+    @return HTML (str).
+    '''
+    rng = random.Random(seed)
+
+    def sentence(n):
+        return " ".join(rng.choice(WORDS) for _ in range(n))
+
+    parts = ["<html><head><title>", sentence(8), "</title><script>var a = 1;</script></head><body>"]
+    parts.append("<nav>" + "".join(f"<a href='/s{i}'>{sentence(2)}</a>" for i in range(60)) + "</nav>")
+    parts.append(f"<article><h1>{sentence(10)}</h1>")
+    for i in range(paragraphs):
+        if i % 12 == 0:
+            parts.append(f"<h{2 + (i // 12) % 5}>{sentence(6)}</h{2 + (i // 12) % 5}>")
+        parts.append(
+            f"<p>{sentence(25)} <a href='/x{i}'>{sentence(3)}</a> {sentence(15)}"
+            f"<!-- ad slot --> <strong>{sentence(4)}</strong> {sentence(10)}</p>"
+        )
+        if i % 20 == 0:
+            parts.append("<div class='related'>" + "".join(f"<div><span>{sentence(5)}</span></div>" for _ in range(15)) + "</div>")
+    parts.append("</article><footer>" + "".join(f"<p>{sentence(4)}</p>" for _ in range(30)) + "</footer></body></html>")
+    return "".join(parts)
+
+
+def soup_parse(url: str, html: str):
+    '''
+    @brief Former extraction of `extract_news_structure` (BeautifulSoup + one find_all per tag).
+
+    @return News dict or None if irrelevant.
+    '''
+    soup = BeautifulSoup(html, "html.parser")
+
+    def extract_all(tag):
+        return [e.get_text(strip=True) for e in soup.find_all(tag)]
+
+    news = {"url": url, "title": soup.title.string.strip() if soup.title else ""}
+    for tag in news_gd.NEWS_TAGS:
+        news[tag] = extract_all(tag)
+    return news if news_gd.match_keywords(" ".join(news["p"])) else None
+
+
+def best_time(fn, html: str, repeat: int) -> float:
+    '''
+    @brief Best wall time of `fn(url, html)` over `repeat` runs.
+
+    @return Seconds (float).
+    '''
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn("http://bench.local/article", html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def measure_lag(parse_all) -> tuple:
+    '''
+    @brief Run `parse_all()` while a ticker sleeps TICK seconds in a loop; report its lateness.
+
+    @param parse_all Coroutine function parsing the burst of pages.
+    @return Tuple (worst lag, mean lag, wall time) in seconds.
+    '''
+    loop = asyncio.get_running_loop()
+    lags = []
+    running = True
+
+    async def ticker():
+        while running:
+            expected = loop.time() + TICK
+            await asyncio.sleep(TICK)
+            lags.append(max(0.0, loop.time() - expected))
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK * 2)
+    start = time.perf_counter()
+    await parse_all()
+    wall = time.perf_counter() - start
+    running = False
+    await task
+    return max(lags), sum(lags) / len(lags), wall
+
+
+async def lag_benchmark(pages) -> None:
+    url = "http://bench.local/article"
+
+    async def on_loop():
+        for html in pages:
+            soup_parse(url, html)
+            await asyncio.sleep(0)
+
+    async def in_pool():
+        await asyncio.gather(*(news_gd.parse_news_html_async(url, html) for html in pages))
+
+    # Warm the pool so worker start-up is not measured
+    await news_gd.parse_news_html_async(url, pages[0])
+    for name, fn in (("BeautifulSoup on the loop", on_loop), ("lxml in the parse pool", in_pool)):
+        worst, mean, wall = await measure_lag(fn)
+        print(f"{name:28s}: worst loop lag {worst * 1000:8.1f} ms | mean {mean * 1000:6.2f} ms | wall {wall:6.2f} s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[50, 400, 2000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--burst", type=int, default=24, help="pages parsed during the lag measurement")
+    args = parser.parse_args()
+    logger.remove()
+
+    for paragraphs in args.paragraphs:
+        html = build_page(paragraphs)
+        assert soup_parse("u", html) == news_gd.parse_news_html("u", html), "news dicts differ"
+        old_time = best_time(soup_parse, html, args.repeat)
+        new_time = best_time(news_gd.parse_news_html, html, args.repeat)
+        print(
+            f"{len(html) / 1024:8.0f} KB page ({paragraphs} <p>): BeautifulSoup {old_time * 1000:8.2f} ms | "
+            f"lxml single pass {new_time * 1000:7.2f} ms | x{old_time / new_time:.1f}"
+        )
+
+    pages = [build_page(400, seed) for seed in range(args.burst)]
+    print(f"\nEvent-loop lag while parsing {len(pages)} pages of ~{len(pages[0]) / 1024:.0f} KB ({news_gd.PARSE_WORKERS} pool workers):")
+    asyncio.run(lag_benchmark(pages))
+    news_gd.shutdown_parse_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+@file bench_search_scheduler.py
+@author naflashDev
+@brief Benchmark of the dork search cycle: fixed random sleeps versus the shared search scheduler.
+@details Run from the repository root with `python tests/benchmarks/bench_search_scheduler.py`.
+         Drives a local stand-in search backend (fixed latency, no network)
+         with the dorks of `feeds_gd` and `news_gd` running at the same time,
+         as when both workers are started. The former pacing (each worker
+         sleeping 8-15 s, resp. 20-35 s, after every dork, plus 1-2 s per feed
+         URL, with fetching in between) is compared with both workers sharing
+         one `SearchScheduler` at the same search quota. All times are scaled
+         by `--scale` so the run takes seconds; the report is in real seconds.
+         It shows the cycle time of each worker and the most searches issued
+         within any 60 s window, which the token bucket keeps at the quota
+         plus the burst. Not collected by pytest (file name does not start
+         with `test_`).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from loguru import logger
+from app.services.scraping import feeds_gd, news_gd
+from app.services.scraping.search_scheduler import SearchScheduler, SEARCH_BURST, SEARCH_RATE_PER_MINUTE
+
+
+class LocalSearch:
+    '''
+    @brief Stand-in search backend recording the time of every search.
+    '''
+
+    def __init__(self, scale: float, latency: float = 1.5) -> None:
+        self.scale = scale
+        self.latency = latency
+        self.times = []
+
+    async def __call__(self, query: str, num_results: int):
+        self.times.append(time.perf_counter())
+        await asyncio.sleep(self.latency * self.scale)
+        return [f"https://example{i}.com/{abs(hash(query)) % 1000}" for i in range(num_results)]
+
+    def peak_per_minute(self) -> int:
+        '''
+        @brief Most searches started within any 60 s (real time) window.
+
+        @return Count (int).
+        '''
+        window = 60 * self.scale
+        return max((sum(1 for t in self.times if start <= t < start + window) for start in self.times), default=0)
+
+
+async def fetch(scale: float, seconds: float) -> None:
+    '''
+    @brief Simulated processing of one dork's results (fetching articles or writing URLs).
+    '''
+    await asyncio.sleep(seconds * scale)
+
+
+async def former_worker(backend, dorks, num_results, pause, per_url, fetch_seconds, scale) -> float:
+    '''
+    @brief Former loop: search, process, then sleep a fixed random time before the next dork.
+
+    @return Cycle time in real seconds (float).
+    '''
+    start = time.perf_counter()
+    for index, dork in enumerate(dorks):
+        results = await backend(dork, num_results)
+        await fetch(scale, fetch_seconds)
+        for _ in results:
+            await asyncio.sleep(random.uniform(*per_url) * scale)
+        if index < len(dorks) - 1:
+            await asyncio.sleep(random.uniform(*pause) * scale)
+    return (time.perf_counter() - start) / scale
+
+
+async def scheduled_worker(scheduler, dorks, num_results, fetch_seconds, scale) -> float:
+    '''
+    @brief New loop: all dorks queued in the shared scheduler, processing overlaps the next token wait.
+
+    @return Cycle time in real seconds (float).
+    '''
+    start = time.perf_counter()
+    async for _, results in scheduler.iter_searches(dorks, num_results):
+        await fetch(scale, fetch_seconds)
+    return (time.perf_counter() - start) / scale
+
+
+async def run(scale: float, fetch_seconds: float) -> None:
+    random.seed(7)
+    feed_pause = (60 / 6 * 0.8, 60 / 6 * 1.5)
+
+    backend = LocalSearch(scale)
+    feeds_time, news_time = await asyncio.gather(
+        former_worker(backend, feeds_gd.DORKS, 15, feed_pause, (1, 2), 0.0, scale),
+        former_worker(backend, news_gd.DORKS, 5, (20, 35), (0, 0), fetch_seconds, scale),
+    )
+    print(
+        f"Fixed sleeps      : feeds cycle {feeds_time:7.1f} s | news cycle {news_time:7.1f} s | "
+        f"peak {backend.peak_per_minute()} searches/min ({len(backend.times)} searches)"
+    )
+
+    backend = LocalSearch(scale)
+    # The scheduler works in scaled time: rate multiplied by 1/scale
+    scheduler = SearchScheduler(backend, rate_per_minute=SEARCH_RATE_PER_MINUTE / scale, burst=SEARCH_BURST)
+    feeds_time, news_time = await asyncio.gather(
+        scheduled_worker(scheduler, feeds_gd.DORKS, 15, 0.0, scale),
+        scheduled_worker(scheduler, news_gd.DORKS, 5, fetch_seconds, scale),
+    )
+    print(
+        f"Shared scheduler  : feeds cycle {feeds_time:7.1f} s | news cycle {news_time:7.1f} s | "
+        f"peak {backend.peak_per_minute()} searches/min ({len(backend.times)} searches, "
+        f"quota {SEARCH_RATE_PER_MINUTE:g}/min + burst {SEARCH_BURST})"
+    )
+
+    start = time.perf_counter()
+    await scheduled_worker(scheduler, news_gd.DORKS, 5, fetch_seconds, scale)
+    print(f"Repeated news run : {(time.perf_counter() - start) / scale:7.1f} s (answered from the result cache)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", type=float, default=0.01, help="simulated seconds per real second")
+    parser.add_argument("--fetch-seconds", type=float, default=6.0, help="time to fetch the articles of one dork")
+    args = parser.parse_args()
+    logger.remove()
+    asyncio.run(run(args.scale, args.fetch_seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+@file bench_spider_parse.py
+@author naflashDev
+@brief Benchmark of `DynamicSpider.parse` text extraction: one selector per tag versus a single traversal.
+@details Run from the repository root with `python tests/benchmarks/bench_spider_parse.py`.
+         Generates reproducible HTML fixtures of increasing size (nested markup,
+         inline tags, comments and boilerplate blocks) and reports the per-page
+         time of the former extraction (seven `response.css(f"{tag}::text")`
+         selections plus string concatenation) and of `extract_tag_texts`.
+         Both start from an already parsed document, so the shared lxml parse
+         is not measured; its time is printed separately for reference.
+         Not collected by pytest (file name does not start with `test_`).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from scrapy.http import HtmlResponse
+from app.services.scraping.spider_factory import TEXT_TAGS, extract_tag_texts
+
+WORDS = (
+    "ransomware ataque vulnerabilidad the company reported that attackers exploited a flaw "
+    "en los sistemas industriales según el informe publicado por los investigadores"
+).split()
+
+
+def build_page(paragraphs: int, seed: int = 0) -> bytes:
+    '''
+    @brief Build a news-like HTML page with the given number of paragraphs.
+
+    @param paragraphs Number of article paragraphs (int).
+    @param seed Random seed (int).
+    @return Encoded HTML (bytes).
+    '''
+    rng = random.Random(seed)
+
+    def sentence(n):
+        return " ".join(rng.choice(WORDS) for _ in range(n))
+
+    parts = ["<html><head><title>", sentence(8), "</title></head><body>"]
+    parts.append("<nav>" + "".join(f"<a href='/s{i}'>{sentence(2)}</a>" for i in range(60)) + "</nav>")
+    parts.append(f"<article><h1>{sentence(10)}</h1>")
+    for i in range(paragraphs):
+        if i % 12 == 0:
+            parts.append(f"<h{2 + (i // 12) % 5}>{sentence(6)}</h{2 + (i // 12) % 5}>")
+        parts.append(
+            f"<p>{sentence(25)} <a href='/x{i}'>{sentence(3)}</a> {sentence(15)}"
+            f"<!-- ad slot --> <strong>{sentence(4)}</strong> {sentence(10)}</p>"
+        )
+        if i % 20 == 0:
+            parts.append("<div class='related'>" + "".join(f"<div><span>{sentence(5)}</span></div>" for _ in range(15)) + "</div>")
+    parts.append("</article><footer>" + "".join(f"<p>{sentence(4)}</p>" for _ in range(30)) + "</footer></body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def css_extract(response):
+    '''
+    @brief Former extraction in DynamicSpider.parse (one selector per tag, concatenated text).
+
+    @return Tuple (texts per tag, lowercase full text).
+    '''
+    title = response.css("title::text").get(default="Untitled")
+    buckets = {}
+    full_text = title.lower()
+    for tag in ["h1", "h2", "h3", "h4", "h5", "h6", "p"]:
+        elements = response.css(f"{tag}::text").getall()
+        clean_elements = [e.strip() for e in elements if e.strip()]
+        buckets[tag] = clean_elements
+        full_text += " " + " ".join(clean_elements).lower()
+    return buckets, full_text
+
+
+def single_pass(response):
+    '''
+    @brief Extraction now used by DynamicSpider.parse.
+
+    @return Tuple (texts per tag, lowercase full text).
+    '''
+    title = response.css("title::text").get(default="Untitled")
+    return extract_tag_texts(response.selector.root, title)
+
+
+def best_time(fn, response, repeat: int) -> float:
+    '''
+    @brief Best wall time of `fn(response)` over `repeat` runs.
+
+    @return Seconds (float).
+    '''
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(response)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[50, 400, 2000])
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    for paragraphs in args.paragraphs:
+        body = build_page(paragraphs)
+        response = HtmlResponse(url="http://bench.local/article", body=body, encoding="utf-8")
+        start = time.perf_counter()
+        response.selector.root  # parse once, shared by both extractors
+        parse_time = time.perf_counter() - start
+
+        old_buckets, old_text = css_extract(response)
+        new_buckets, new_text = single_pass(response)
+        assert old_buckets == new_buckets, "tag buckets differ"
+        assert old_text.split() == new_text.split(), "full text differs"
+
+        old_time = best_time(css_extract, response, args.repeat)
+        new_time = best_time(single_pass, response, args.repeat)
+        print(
+            f"{len(body) / 1024:8.0f} KB page ({paragraphs} <p>): lxml parse {parse_time * 1000:7.2f} ms | "
+            f"css per tag {old_time * 1000:7.2f} ms | single pass {new_time * 1000:7.2f} ms | "
+            f"x{old_time / new_time:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,34 @@ def isolate_test_files(tmp_path, monkeypatch):
     (test_root / "data").mkdir()
     monkeypatch.chdir(test_root)
     yield
+
+
+@pytest.fixture(autouse=True)
+def reset_opensearch_pools():
+    """Forget pooled OpenSearch clients and shared bulk indexers between tests
+    so a client cached while `OpenSearch` was patched does not leak into the
+    next test.
+    """
+    yield
+    import sys
+    for name in ("app.models.opensearh_db", "src.app.models.opensearh_db"):
+        module = sys.modules.get(name)
+        if module is not None:
+            module._clients.clear()
+            module._indexers.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_search_scheduler():
+    """Forget the process-wide search scheduler between tests so its token
+    bucket and result cache do not carry over from one test to the next.
+    """
+    yield
+    import sys
+    for name in ("app.services.scraping.search_scheduler", "src.app.services.scraping.search_scheduler"):
+        module = sys.modules.get(name)
+        if module is not None:
+            module.reset_search_scheduler()
 import os
 import sys
 
@@ -18,7 +18,7 @@ if SRC not in sys.path:
 from fastapi.testclient import TestClient
 from fastapi import FastAPI
 from app.controllers.routes.scrapy_news_controller import router as news_router, LINKS_FILE
-import feedparser
+from app.services.scraping.feed_service import FeedResult
 
 class DummyPool:
     pass
@@ -31,8 +31,9 @@ class TestScrapyNewsController(unittest.TestCase):
         self.client = TestClient(app)
 
     def test_save_feed_google_alerts_invalid(self):
-        # feedparser returns empty entries -> 400
-        with mock.patch('feedparser.parse', return_value=mock.Mock(entries=[])):
+        # feed downloaded but without entries -> 400
+        empty = FeedResult('http://x', 'ok', 200, parsed=mock.Mock(entries=[]))
+        with mock.patch('app.controllers.routes.scrapy_news_controller.fetch_feed', new=mock.AsyncMock(return_value=empty)):
             resp = self.client.post('/newsSpider/save-feed-google-alerts', json={'feed_url':'http://x'})
             self.assertEqual(resp.status_code, 400)
 
@@ -40,7 +41,8 @@ class TestScrapyNewsController(unittest.TestCase):
         fake_feed = mock.Mock()
         fake_feed.entries = [1]
         fake_feed.feed = {'title':'MyFeed'}
-        with mock.patch('feedparser.parse', return_value=fake_feed):
+        fetched = FeedResult('http://x', 'ok', 200, parsed=fake_feed)
+        with mock.patch('app.controllers.routes.scrapy_news_controller.fetch_feed', new=mock.AsyncMock(return_value=fetched)):
             # patch LINKS_FILE to a temp path to avoid writing repo files
             tmp = Path('tmp_links.txt')
             try:
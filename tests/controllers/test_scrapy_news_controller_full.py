@@ -18,7 +18,10 @@ from main import app
 
 def test_save_feed_google_alerts_invalid(monkeypatch):
     client = TestClient(app)
-    monkeypatch.setattr('feedparser.parse', lambda url: mock.Mock(entries=[]))
+    from app.services.scraping.feed_service import FeedResult
+    async def fake_fetch_feed(url):
+        return FeedResult(url, 'ok', 200, parsed=mock.Mock(entries=[]))
+    monkeypatch.setattr('app.controllers.routes.scrapy_news_controller.fetch_feed', fake_fetch_feed)
     resp = client.post('/newsSpider/save-feed-google-alerts', json={'feed_url':'http://x'})
     assert resp.status_code == 400
 
@@ -19,6 +19,7 @@ from fastapi.testclient import TestClient
 from fastapi import FastAPI
 
 from app.controllers.routes.scrapy_news_controller import router as news_router
+from app.services.scraping.feed_service import FeedResult
 from app.controllers.routes.spacy_controller import router as spacy_router
 from app.controllers.routes.llm_controller import router as llm_router
 
@@ -55,7 +56,7 @@ class TestIntegrationFullPipeline(unittest.TestCase):
         async def fake_insert(conn, feed_data):
             return
 
-        with mock.patch('feedparser.parse', return_value=fake_feed):
+        with mock.patch('app.controllers.routes.scrapy_news_controller.fetch_feed', new=mock.AsyncMock(return_value=FeedResult('http://x', 'ok', 200, parsed=fake_feed))):
             with mock.patch('app.models.ttrss_postgre_db.insert_feed_to_db', side_effect=fake_insert):
                 resp = self.client.post('/newsSpider/save-feed-google-alerts', json={'feed_url':'http://x'})
                 self.assertEqual(resp.status_code, 200)
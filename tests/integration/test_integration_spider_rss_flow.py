@@ -16,6 +16,7 @@ if SRC not in sys.path:
     sys.path.insert(0, SRC)
 
 from app.services.scraping import spider_rss as sr
+from app.services.scraping.feed_service import FeedResult
 
 
 class DummyConn:
@@ -36,19 +37,19 @@ class TestIntegrationSpiderRSSFlow(unittest.TestCase):
     def test_extract_and_save_end_to_end(self):
         '''
         @brief Happy Path: End-to-end RSS extraction and DB save (mocked).
-        Mocks feedparser and DB insert, validates integration logic without tocar servicios reales.
+        Mocks the feed service and DB insert, validates integration logic without tocar servicios reales.
         '''
         # Arrange
         fake_feed = mock.Mock()
         fake_feed.entries = [1]
         fake_feed.feed = {'title': 'IntFeed', 'link': 'https://site.example'}
 
-        async def fake_insert(conn, feed_data):
-            return
+        async def fake_insert(conn, feeds):
+            return {'inserted': len(feeds), 'skipped': 0}
 
         # Act & Assert
-        with mock.patch('app.services.scraping.spider_rss.feedparser.parse', return_value=fake_feed):
-            with mock.patch('app.models.ttrss_postgre_db.insert_feed_to_db', side_effect=fake_insert):
+        with mock.patch('app.services.scraping.spider_rss.fetch_feeds', new=mock.AsyncMock(side_effect=lambda urls, **kwargs: [FeedResult(u, 'ok', 200, parsed=fake_feed) for u in urls])):
+            with mock.patch('app.services.scraping.spider_rss.bulk_insert_feeds', side_effect=fake_insert):
                 pool = DummyPool()
                 asyncio.run(sr.extract_rss_and_save(pool, 'ignored'))
 
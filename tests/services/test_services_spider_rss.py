@@ -16,16 +16,7 @@ if SRC not in sys.path:
     sys.path.insert(0, SRC)
 
 from app.services.scraping import spider_rss as sr
-
-class FakeProcess:
-    def __init__(self, target, args=()):
-        self._target = target
-        self._args = args
-    def start(self):
-        # call target directly
-        self._target(*self._args)
-    def join(self):
-        return
+from app.services.scraping.feed_service import FeedResult
 
 class DummyConn:
     pass
@@ -53,25 +44,27 @@ class TestSpiderRSSServices(unittest.TestCase):
     def test_extract_rss_and_save_flow(self):
         # Prepare a fake urls file content by patching read_urls_from_file
         with mock.patch('app.services.scraping.spider_rss.read_urls_from_file', return_value=['https://feed.example/rss']):
-            # Patch Process to FakeProcess so spider runs synchronously and pushes results
-            with mock.patch('app.services.scraping.spider_rss.Process', new=FakeProcess):
-                # Patch feedparser.parse to return feed with entries
+            # Patch the crawler service so the spider "runs" synchronously and returns the feed
+            fake_service = mock.Mock()
+            fake_service.crawl.return_value = [{'feed_url': 'https://feed.example/rss'}]
+            with mock.patch('app.services.scraping.spider_rss.get_crawler_service', return_value=fake_service):
+                # Patch the feed service to return a parsed feed with entries
                 fake_feed = mock.Mock()
                 fake_feed.entries = [1]
                 fake_feed.feed = {'title':'T','link':'https://site.example'}
-                with mock.patch('app.services.scraping.spider_rss.feedparser.parse', return_value=fake_feed):
-                    # Patch insert_feed_to_db to a dummy async function
-                    async def fake_insert(conn, feed_data):
+                with mock.patch('app.services.scraping.spider_rss.fetch_feeds', new=mock.AsyncMock(side_effect=lambda urls, **kwargs: [FeedResult(u, 'ok', 200, parsed=fake_feed) for u in urls])):
+                    # Patch bulk_insert_feeds to a dummy async function
+                    inserted = []
+                    async def fake_insert(conn, feeds):
                         # simulate success
-                        return
-                    with mock.patch('app.services.scraping.spider_rss.insert_feed_to_db', side_effect=fake_insert):
-                        # Also patch run_rss_spider to append the feed URL into the queue
-                        def fake_run_spider(urls, queue):
-                            queue.put(['https://feed.example/rss'])
-                        with mock.patch('app.services.scraping.spider_rss.run_rss_spider', side_effect=fake_run_spider):
-                            pool = DummyPool()
-                            # run coroutine
-                            asyncio.run(sr.extract_rss_and_save(pool, 'ignored'))
+                        inserted.extend(str(feed.feed_url) for feed in feeds)
+                        return {'inserted': len(feeds), 'skipped': 0}
+                    with mock.patch('app.services.scraping.spider_rss.bulk_insert_feeds', side_effect=fake_insert):
+                        pool = DummyPool()
+                        # run coroutine
+                        counts = asyncio.run(sr.extract_rss_and_save(pool, 'ignored'))
+                        self.assertEqual(inserted, ['https://feed.example/rss'])
+                        self.assertEqual(counts, {'inserted': 1, 'skipped': 0, 'failed': 0})
 
 if __name__ == '__main__':
     unittest.main()
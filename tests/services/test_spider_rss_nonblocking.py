@@ -10,43 +10,24 @@ import time
 import pytest
 
 from app.services.scraping import spider_rss as sr
+from app.services.scraping.feed_service import FeedResult
 
 
 def test_extract_rss_and_save_does_not_block_event_loop(monkeypatch, tmp_path):
-    # Replace multiprocessing.Process and Queue with dummy implementations
-    # so we don't attempt to pickle local functions on Windows spawn.
-    def fake_run_rss_spider(urls, q):
-        time.sleep(0.5)
-        q.put(["http://example.com/feed"])
+    # Replace the crawler service with a slow in-process fake so the
+    # blocking wait must run off the event loop.
+    class FakeService:
+        def crawl(self, kind, urls):
+            time.sleep(0.5)
+            return [{"feed_url": "http://example.com/feed"}]
 
-    class DummyQueue:
-        def __init__(self):
-            self._val = None
-        def put(self, v):
-            self._val = v
-        def get(self):
-            return self._val
-
-    class DummyProcess:
-        def __init__(self, target=None, args=()):
-            self._target = target
-            self._args = args
-        def start(self):
-            # run target synchronously in this thread (the thread created by asyncio.to_thread)
-            if callable(self._target):
-                self._target(*self._args)
-        def join(self):
-            return None
-
-    monkeypatch.setattr(sr, 'Queue', DummyQueue)
-    monkeypatch.setattr(sr, 'Process', DummyProcess)
-    monkeypatch.setattr(sr, 'run_rss_spider', fake_run_rss_spider)
-
-    # Patch insert_feed_to_db used inside module to be an async no-op
-    async def fake_insert_feed_to_db(conn, feed_data):
-        return None
-
-    monkeypatch.setattr(sr, 'insert_feed_to_db', fake_insert_feed_to_db)
+    monkeypatch.setattr(sr, 'get_crawler_service', lambda name="default": FakeService())
+
+    # Patch bulk_insert_feeds used inside module to be an async no-op
+    async def fake_bulk_insert_feeds(conn, feeds):
+        return {"inserted": len(feeds), "skipped": 0}
+
+    monkeypatch.setattr(sr, 'bulk_insert_feeds', fake_bulk_insert_feeds)
 
     # Provide a dummy pool with async acquire context manager
     class DummyConn:
@@ -95,3 +76,138 @@ def test_extract_rss_and_save_does_not_block_event_loop(monkeypatch, tmp_path):
 
     # Run the async runner
     asyncio.run(runner())
+
+
+def test_extract_rss_and_save_claims_pages_from_frontier(monkeypatch, tmp_path):
+    # Pages are claimed from the URL frontier: a second run does not scan them again
+    crawled = []
+
+    class FakeService:
+        def crawl(self, kind, urls):
+            crawled.append(list(urls))
+            return [{"feed_url": "http://example.com/feed"}]
+
+    monkeypatch.setattr(sr, 'get_crawler_service', lambda name="default": FakeService())
+    inserted = []
+
+    async def fake_bulk_insert_feeds(conn, feeds):
+        inserted.extend(str(feed.feed_url) for feed in feeds)
+        return {"inserted": len(feeds), "skipped": 0}
+
+    monkeypatch.setattr(sr, 'bulk_insert_feeds', fake_bulk_insert_feeds)
+
+    class FakeFeed:
+        entries = [1]
+        feed = {"title": "T", "link": "http://example.com"}
+
+    fetch_options = []
+
+    async def fake_fetch_feeds(urls, **kwargs):
+        fetch_options.append(kwargs)
+        return [FeedResult(url, 'ok', 200, parsed=FakeFeed()) for url in urls]
+
+    monkeypatch.setattr(sr, 'fetch_feeds', fake_fetch_feeds)
+
+    class DummyAcquire:
+        async def __aenter__(self):
+            return object()
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+    class DummyPool:
+        def acquire(self):
+            return DummyAcquire()
+
+    path = tmp_path / "urls.txt"
+    path.write_text("http://example.com/a\nhttp://www.example.com/a?utm_source=x\nhttp://other.com/\n", encoding='utf-8')
+    asyncio.run(sr.extract_rss_and_save(DummyPool(), str(path)))
+    asyncio.run(sr.extract_rss_and_save(DummyPool(), str(path)))
+    assert crawled == [["http://example.com/a", "http://other.com/"]]
+    assert inserted == ["http://example.com/feed"]
+    # Discovery downloads the feeds without the poll validators of the feed registry
+    assert fetch_options == [{"conditional": False}]
+
+
+def test_extract_rss_and_save_probes_each_origin_once(monkeypatch, tmp_path):
+    # New pages of a site probed recently are not crawled again
+    crawled = []
+
+    class FakeService:
+        def crawl(self, kind, urls):
+            crawled.append(list(urls))
+            items = [{"feed_url": f"{url.rstrip('/')}/feed"} for url in urls]
+            return items + [{"probe_url": url, "feeds": [f"{url.rstrip('/')}/feed"], "fingerprint": "x"} for url in urls]
+
+    monkeypatch.setattr(sr, 'get_crawler_service', lambda name="default": FakeService())
+
+    async def fake_fetch_feeds(urls, **kwargs):
+        return []
+
+    monkeypatch.setattr(sr, 'fetch_feeds', fake_fetch_feeds)
+
+    path = tmp_path / "urls.txt"
+    path.write_text("http://example.com/a\nhttp://example.com/b\n", encoding='utf-8')
+    asyncio.run(sr.extract_rss_and_save(None, str(path)))
+    path.write_text("http://example.com/a\nhttp://example.com/b\nhttp://example.com/c\nhttp://other.com/x\n", encoding='utf-8')
+    asyncio.run(sr.extract_rss_and_save(None, str(path)))
+    assert crawled == [["http://example.com/a"], ["http://other.com/x"]]
+
+
+def test_extract_rss_and_save_retries_origins_after_failed_insert(monkeypatch, tmp_path):
+    # Probes and pages are recorded only once the feeds are stored: a failed insert is retried
+    crawled = []
+    fetched = []
+    inserted = []
+    fail = {"insert": True}
+
+    class FakeService:
+        def crawl(self, kind, urls):
+            crawled.append(list(urls))
+            return [{"feed_url": "http://example.com/feed"},
+                    {"probe_url": urls[0], "feeds": ["http://example.com/feed"], "fingerprint": "x"}]
+
+    monkeypatch.setattr(sr, 'get_crawler_service', lambda name="default": FakeService())
+
+    async def fake_bulk_insert_feeds(conn, feeds):
+        if fail["insert"]:
+            raise RuntimeError("database unavailable")
+        inserted.extend(str(feed.feed_url) for feed in feeds)
+        return {"inserted": len(feeds), "skipped": 0}
+
+    monkeypatch.setattr(sr, 'bulk_insert_feeds', fake_bulk_insert_feeds)
+
+    class FakeFeed:
+        entries = [1]
+        feed = {"title": "T", "link": "http://example.com"}
+
+    async def fake_fetch_feeds(urls, **kwargs):
+        fetched.append(list(urls))
+        return [FeedResult(url, 'ok', 200, parsed=FakeFeed()) for url in urls]
+
+    monkeypatch.setattr(sr, 'fetch_feeds', fake_fetch_feeds)
+
+    class DummyAcquire:
+        async def __aenter__(self):
+            return object()
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+    class DummyPool:
+        def acquire(self):
+            return DummyAcquire()
+
+    path = tmp_path / "urls.txt"
+    path.write_text("http://example.com/a\n", encoding='utf-8')
+    counts = asyncio.run(sr.extract_rss_and_save(DummyPool(), str(path)))
+    assert counts["failed"] == 1 and inserted == []
+    fail["insert"] = False
+    counts = asyncio.run(sr.extract_rss_and_save(DummyPool(), str(path)))
+    assert counts["inserted"] == 1 and inserted == ["http://example.com/feed"]
+    assert crawled == [["http://example.com/a"], ["http://example.com/a"]]
+    # A new page of the origin probed now is not crawled, but its cached feeds are fetched again
+    path.write_text("http://example.com/a\nhttp://example.com/b\n", encoding='utf-8')
+    asyncio.run(sr.extract_rss_and_save(DummyPool(), str(path)))
+    assert len(crawled) == 2
+    assert fetched[-1] == ["http://example.com/feed"]
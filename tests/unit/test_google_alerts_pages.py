@@ -5,6 +5,7 @@
             @details Este archivo contiene pruebas unitarias para las funciones del módulo google_alerts_pages, cubriendo casos de extracción y deduplicación de URLs en el contexto de feeds de Google Alerts.
 """
 import app.services.scraping.google_alerts_pages as gaps
+from app.services.scraping.feed_service import FeedResult
 
 def test_clean_google_redirect_url_happy_path():
     '''
@@ -47,7 +48,7 @@ def test_clean_google_redirect_url_empty():
 def test_fetch_and_save_alert_urls_dedupes(tmp_path, monkeypatch):
     '''
     @brief Happy Path + Dedupe: Only new unique URLs are appended.
-    Simulates feeds and output files, mocks feedparser, and checks deduplication logic.
+    Simulates feeds and output files, mocks the feed service, and checks deduplication logic.
     '''
     # Arrange
     feeds_file = tmp_path / "feeds.txt"
@@ -62,16 +63,80 @@ def test_fetch_and_save_alert_urls_dedupes(tmp_path, monkeypatch):
            
             self.entries = entries
 
-    def fake_parse(url):
-        return FakeFeed(entries=[{"link": "https://new.example/"}, {"link": "https://new.example/"}, {"link": "https://existing.example/"}])
+    async def fake_fetch_feeds(urls, **kwargs):
+        entries = [{"link": "https://new.example/"}, {"link": "https://new.example/"}, {"link": "https://existing.example/"}]
+        return [FeedResult(url, "ok", 200, parsed=FakeFeed(entries=entries)) for url in urls]
 
-    monkeypatch.setattr(gaps, "feedparser", type("m", (), {"parse": staticmethod(fake_parse)})())
+    monkeypatch.setattr(gaps, "fetch_feeds", fake_fetch_feeds)
 
     # Act
-    gaps.fetch_and_save_alert_urls()
+    delay = gaps.fetch_and_save_alert_urls()
 
     # Assert
+    # The outcome is recorded once the URLs are saved, so the feed is not due right away
+    assert gaps.FEED_POLL_MIN < delay <= gaps.FEED_POLL_MAX
     content = urls_file.read_text().splitlines()
     assert "https://existing.example/" in content  # Existing URL remains
     assert "https://new.example/" in content       # New URL added
     assert content.count("https://new.example/") == 1  # No duplicates
+
+
+def test_fetch_and_save_alert_urls_dedupes_canonical_variants(tmp_path, monkeypatch):
+    '''
+    @brief Dedupe: tracking parameters and www. variants of a known URL are not appended again.
+    '''
+    feeds_file = tmp_path / "feeds.txt"
+    feeds_file.write_text("http://feed1.example/rss\n")
+    urls_file = tmp_path / "urls.txt"
+    urls_file.write_text("https://existing.example/post\n")
+    monkeypatch.setattr(gaps, "FEEDS_FILE_PATH", str(feeds_file))
+    monkeypatch.setattr(gaps, "URLS_FILE_PATH", str(urls_file))
+
+    class FakeFeed:
+        entries = [
+            {"link": "https://www.existing.example/post?utm_source=alerts"},
+            {"link": "https://new.example/a#comments"},
+            {"link": "https://new.example/a"},
+        ]
+
+    async def fake_fetch_feeds(urls, **kwargs):
+        return [FeedResult(url, "ok", 200, parsed=FakeFeed()) for url in urls]
+
+    monkeypatch.setattr(gaps, "fetch_feeds", fake_fetch_feeds)
+    gaps.fetch_and_save_alert_urls()
+    gaps.fetch_and_save_alert_urls()
+    assert urls_file.read_text().splitlines() == ["https://existing.example/post", "https://new.example/a#comments"]
+
+
+def test_fetch_and_save_alert_urls_frontier_failure_keeps_feed_due(tmp_path, monkeypatch):
+    '''
+    @brief Error Handling: if the URL frontier cannot be updated, the feed outcome is not recorded.
+    The next run downloads the feed in full instead of getting "not modified", so its entries are not lost.
+    '''
+    feeds_file = tmp_path / "feeds.txt"
+    feeds_file.write_text("http://feed1.example/rss\n")
+    monkeypatch.setattr(gaps, "FEEDS_FILE_PATH", str(feeds_file))
+    monkeypatch.setattr(gaps, "URLS_FILE_PATH", str(tmp_path / "urls.txt"))
+
+    class FakeFeed:
+        entries = [{"link": "https://new.example/a"}]
+
+    calls = []
+
+    async def fake_fetch_feeds(urls, **kwargs):
+        calls.append(kwargs)
+        return [FeedResult(url, "ok", 200, etag='"v1"', parsed=FakeFeed()) for url in urls]
+
+    def broken_frontier():
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(gaps, "fetch_feeds", fake_fetch_feeds)
+    monkeypatch.setattr(gaps, "open_frontier", broken_frontier)
+
+    assert gaps.fetch_and_save_alert_urls() == gaps.FEED_POLL_MIN
+    assert calls == [{"due_only": True, "record": False}]
+    conn = gaps.open_feed_registry()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM feeds").fetchone()[0] == 0
+    finally:
+        conn.close()